@@ -2,10 +2,13 @@
 // ▛//▞▞ ⟦⎊⟧ :: ⧗-25.131 ▸ ρ{agent.brain}.φ{identity}.τ{rules}.λ{bind} ⫸ :: BRAIN.RS
 //
 // Nueva Eternia High-Performance Kernel
-// Version: v2.1.0 
+// Version: v2.2.0 
 
 use std::env;
 use std::collections::HashSet;
+use std::io::{self, BufRead, Write};
+
+use serde_json::{json, Value};
 
 pub fn jaccard_similarity(s1: &str, s2: &str) -> f64 {
     let set1: HashSet<char> = s1.to_lowercase().chars().filter(|c| c.is_alphanumeric()).collect();
@@ -31,6 +34,56 @@ pub fn match_logic(name1: &str, name2: &str, ean1: Option<&str>, ean2: Option<&s
     (score >= 0.7, score)
 }
 
+/// Phase 96: Worker persistente. Lee lotes NDJSON por stdin y responde una línea por lote:
+///   -> {"id": 7, "pairs": [["name1", "name2", "ean1"|null, "ean2"|null], ...]}
+///   <- {"id": 7, "results": [[true, 0.8123], ...]}
+/// Una línea inválida devuelve {"id": ..., "error": "..."} y el worker sigue vivo.
+fn serve() {
+    let stdin = io::stdin();
+    let stdout = io::stdout();
+    let mut out = stdout.lock();
+
+    for line in stdin.lock().lines() {
+        let line = match line {
+            Ok(l) => l,
+            Err(_) => break,
+        };
+        if line.trim().is_empty() {
+            continue;
+        }
+
+        let response = match serde_json::from_str::<Value>(&line) {
+            Ok(request) => {
+                let id = request.get("id").cloned().unwrap_or(Value::Null);
+                match request.get("pairs").and_then(|p| p.as_array()) {
+                    Some(pairs) => {
+                        let results: Vec<Value> = pairs
+                            .iter()
+                            .map(|pair| {
+                                let field = |i: usize| pair.get(i).and_then(|v| v.as_str());
+                                let (is_match, score) = match_logic(
+                                    field(0).unwrap_or(""),
+                                    field(1).unwrap_or(""),
+                                    field(2),
+                                    field(3),
+                                );
+                                json!([is_match, score])
+                            })
+                            .collect();
+                        json!({"id": id, "results": results})
+                    }
+                    None => json!({"id": id, "error": "missing pairs"}),
+                }
+            }
+            Err(e) => json!({"id": Value::Null, "error": e.to_string()}),
+        };
+
+        if writeln!(out, "{}", response).is_err() || out.flush().is_err() {
+            break;
+        }
+    }
+}
+
 fn main() {
     let args: Vec<String> = env::args().collect();
     
@@ -53,6 +106,7 @@ fn main() {
             let (is_match, score) = match_logic(name1, name2, ean1, ean2);
             println!("MATCH_RESULT|{}|{:.4}", is_match, score);
         }
+        "serve" => serve(),
         _ => eprintln!("Command not recognized"),
     }
 }
@@ -0,0 +1,51 @@
+"""add_product_sync_log
+
+Revision ID: a7c3e91b5d20
+Revises: feac3ac24f77
+Create Date: 2026-10-17 10:12:41.508213
+
+Phase 105: diario de cambios del catalogo (product_sync_log) para la
+sincronizacion delta de IndexedDB. El id autoincremental es el cursor que
+recibe el cliente. Idempotente por la misma razon que d4283e0fbed1: ninguna
+base de datos real ha sido versionada con Alembic (init_cloud_db tambien la
+crea con create_all).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91b5d20'
+down_revision: Union[str, Sequence[str], None] = 'feac3ac24f77'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "product_sync_log" in inspector.get_table_names():
+        return
+
+    op.create_table(
+        "product_sync_log",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer(), nullable=True),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_product_sync_log_product_id", "product_sync_log", ["product_id"])
+    op.create_index("ix_product_sync_log_changed_at", "product_sync_log", ["changed_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "product_sync_log" in inspector.get_table_names():
+        op.drop_index("ix_product_sync_log_changed_at", table_name="product_sync_log")
+        op.drop_index("ix_product_sync_log_product_id", table_name="product_sync_log")
+        op.drop_table("product_sync_log")
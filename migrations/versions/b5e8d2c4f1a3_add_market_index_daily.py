@@ -0,0 +1,54 @@
+"""add_market_index_daily
+
+Revision ID: b5e8d2c4f1a3
+Revises: a7c3e91b5d20
+Create Date: 2026-10-17 11:04:27.118930
+
+Phase 106: serie diaria materializada del Eternia Market Index
+(market_index_daily), una fila por dia y Wave ("*" = global). La rellena el
+job de mantenimiento; el endpoint /analytics/market-index solo la lee.
+Idempotente por la misma razon que d4283e0fbed1.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8d2c4f1a3'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e91b5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "market_index_daily" in inspector.get_table_names():
+        return
+
+    op.create_table(
+        "market_index_daily",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("wave", sa.String(), nullable=False),
+        sa.Column("avg_price", sa.Float(), nullable=True),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("figures_count", sa.Integer(), nullable=True),
+        sa.Column("avg_msrp", sa.Float(), nullable=True),
+        sa.Column("avg_market", sa.Float(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("day", "wave", name="uq_market_index_daily_day_wave"),
+    )
+    op.create_index("ix_market_index_daily_day", "market_index_daily", ["day"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "market_index_daily" in inspector.get_table_names():
+        op.drop_index("ix_market_index_daily_day", table_name="market_index_daily")
+        op.drop_table("market_index_daily")
@@ -0,0 +1,96 @@
+"""
+Phase 104: micro-benchmark del clasificador de relevancia MOTU / vintage.
+
+Compara la versión secuencial original (13 re.search de la lista negra + ~150
+re.search de palabras clave, sin compilar) con la alternancia precompilada de
+src/core/vintage_utils.py sobre títulos reales scrapeados (data/*_eval.json y
+data/dump_dvd_titles.json). Verifica también que ambas decisiones coinciden.
+
+Uso: python scripts/diagnostics/benchmark_motu_relevance.py [repeticiones]
+"""
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.append(os.getcwd())
+
+from src.core import vintage_utils
+from src.core.normalization_cache import clear_caches
+from src.core.vintage_utils import MOTU_BRAND_BLACKLIST, MOTU_CORE_KEYWORDS
+
+
+def legacy_validate_motu_relevance(text: str):
+    """Implementación previa a la Phase 104 (referencia)."""
+    if not text:
+        return False, "Texto vacío"
+    text_lower = text.lower()
+    for brand, pattern in MOTU_BRAND_BLACKLIST.items():
+        if re.search(pattern, text_lower):
+            return False, f"Marca excluida detectada: {brand.capitalize()}"
+    for pattern in MOTU_CORE_KEYWORDS:
+        if re.search(pattern, text_lower):
+            return True, ""
+    return False, "No contiene ninguna palabra clave de Masters of the Universe"
+
+
+def legacy_check_is_vintage(text: str) -> bool:
+    if not text:
+        return False
+    return "vintage" in text.lower() or bool(re.findall(r"\b(198[0-9])\b", text))
+
+
+def load_corpus() -> list:
+    titles = []
+    for path in sorted(glob.glob("data/*_eval.json")):
+        with open(path, encoding="utf-8") as f:
+            titles.extend(o.get("product_name", "") for o in json.load(f) if isinstance(o, dict))
+    with open("data/dump_dvd_titles.json", encoding="utf-8") as f:
+        titles.extend(json.load(f))
+    return [t for t in titles if t]
+
+
+def _time(fn, titles, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for title in titles:
+            fn(title)
+    return time.perf_counter() - start
+
+
+def benchmark(repeat: int = 20):
+    titles = load_corpus()
+    mismatches = [
+        t for t in titles
+        if legacy_validate_motu_relevance(t) != vintage_utils.validate_motu_relevance(t)
+        or legacy_check_is_vintage(t) != vintage_utils.check_is_vintage(t)
+    ]
+
+    legacy = _time(legacy_validate_motu_relevance, titles, repeat)
+    # Sin caché: mide sólo la alternancia precompilada
+    uncached = vintage_utils._validate_motu_relevance.__wrapped__
+    cold = _time(lambda t: uncached(t.lower()), titles, repeat)
+    clear_caches()
+    warm = _time(vintage_utils.validate_motu_relevance, titles, repeat)
+    relevant = sum(1 for ok, _ in vintage_utils.validate_motu_relevance_batch(titles) if ok)
+
+    total = len(titles) * repeat
+    print("\n" + "=" * 80)
+    print(f"Corpus: {len(titles)} títulos reales ({relevant} relevantes) x {repeat} repeticiones")
+    print("=" * 80)
+    print(f"{'Secuencial (original)':<35} | {legacy:8.4f}s | {total / legacy:12,.0f} títulos/s")
+    print(f"{'Alternancia compilada (sin caché)':<35} | {cold:8.4f}s | {total / cold:12,.0f} títulos/s")
+    print(f"{'Alternancia compilada + LRU':<35} | {warm:8.4f}s | {total / warm:12,.0f} títulos/s")
+    print("=" * 80)
+    print(f"Speedup sin caché: x{legacy / cold:.1f} | con caché: x{legacy / warm:.1f}")
+    print(f"Decisiones distintas: {len(mismatches)}")
+    for title in mismatches[:10]:
+        print(f"  ≠ {title}")
+    print()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
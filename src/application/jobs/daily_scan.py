@@ -39,10 +39,12 @@ from src.infrastructure.scrapers.vinted_scraper import VintedScraper
 # from src.infrastructure.scrapers.tradeinn_scraper import TradeinnScraper
 from src.infrastructure.scrapers.wallapop_scraper import WallapopScraper
 from src.application.services.nexus_service import NexusService
+from src.application.jobs.scan_scheduler import ScanScheduler
 
 # Domain & Infra Models
 from src.infrastructure.database_cloud import SessionCloud as SessionLocal # Unified for Cloud
 from src.domain.models import ScraperStatusModel, ScraperExecutionLogModel, ProductModel, CollectionItemModel, LogisticRuleModel
+from src.infrastructure.repositories.execution_log_sink import ExecutionLogSink
 from src.core.audit_logger import AuditLogger
 from src.core.notifier import NotifierService
 from src.application.services.deal_scorer import DealScorer
@@ -65,6 +67,7 @@ async def run_daily_scan(progress_callback=None):
     parser.add_argument("--random-delay", type=int, default=0, help="Wait up to X minutes before starting (jitter)")
     parser.add_argument("--deep-harvest", action="store_true", help="Visit individual product pages for EAN/GTIN extraction")
     parser.add_argument("--no-nexus", action="store_true", help="Skip ActionFigure411 Catalog Synchronization")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Max simultaneous scrapers (Phase 90 scheduler)")
     args, unknown = parser.parse_known_args()
     
     # --- STAGGERED START (KAIZEN) ---
@@ -187,217 +190,240 @@ async def run_daily_scan(progress_callback=None):
     total_stats = {"found": 0, "new": 0, "errors": 0}
     start_time = datetime.now()
     
-    db = SessionLocal()
-    audit = AuditLogger(db)
     notifier = NotifierService()
 
-    total_scrapers = len(scrapers)
-    
-    # User-Agent List for Rotation
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
-    ]
-    import random
-
-    for idx, scraper in enumerate(scrapers):
+    # Determine trigger type (Corrected Phase 50)
+    event_name = os.getenv("GITHUB_EVENT_NAME", "manual")
+    trigger = "scheduled" if event_name == "schedule" else "manual"
+    if args.shops and not os.getenv("GITHUB_EVENT_NAME"): trigger = "manual"
+
+    # --- PHASE 90: CONCURRENT SCAN ENGINE ---
+    # Cada incursión corre en paralelo bajo presupuestos global / backend / tienda.
+    # La persistencia (update_database + cierre de logs) la hace un único escritor serializado.
+    async def scrape_job(scraper):
+        """Fase de extracción (concurrente). Retorna el contexto para el escritor o None si falló."""
+        db = SessionLocal()
+        status_row = None
+        log_entry = None
+        log_id = None
+
+        logger.info(f"🕸️ Engaging {scraper.spider_name}...")
+
+        # Scrapers now manage their own stealth contexts for maximum robustness
+        # Inject Audit Logger (una sesión por incursión: las sesiones no se comparten entre tareas)
+        scraper.audit_logger = AuditLogger(db)
+
+        # DB Status Update (Running)
         try:
-            # Check for 3OX Stop Signal
-            # if check_stop_signal():
-            #     break
-                
-            logger.info(f"🕸️ Engaging {scraper.spider_name}...")
+            status_row = db.query(ScraperStatusModel).filter(ScraperStatusModel.spider_name == scraper.spider_name).first()
+            if not status_row:
+                status_row = ScraperStatusModel(spider_name=scraper.spider_name)
+                db.add(status_row)
+            status_row.status = "running"
+            status_row.progress = 0
+            status_row.last_update = datetime.now()
+            db.commit()
+        except Exception:
+            db.rollback()
+
+        # Heartbeat Log
+        logger.info(f"💓 Heartbeat: Attempting to engage {scraper.spider_name}...")
+
+        # Create Execution Log Entry
+        log_entry = ScraperExecutionLogModel(
+            spider_name=scraper.spider_name,
+            status="running",
+            start_time=datetime.now(),
+            trigger_type=trigger,
+            logs=f"[{datetime.now(ZoneInfo('Europe/Madrid')).strftime('%H:%M:%S')}] 🚀 Inicia incursion en {scraper.spider_name} ({trigger})\n"
+        )
+        try:
+            db.add(log_entry)
+            db.commit()
+            log_id = log_entry.id
+        except Exception as e:
+            logger.error(f"Failed to create execution log: {e}")
+            db.rollback()
+            log_id = None
+
+        # Helper to append logs to DB entry safely (Phase 98: buffered, append-only)
+        update_task_log = ExecutionLogSink(log_id, SessionLocal)
+
+        update_task_log(f"🕸️ Engaging {scraper.spider_name}...")
+
+        try: # Robustness Layer: Ensure the scan continues even if a scraper crashes
+            # 1. Scrape (Modern scrapers use .search)
+            logger.info(f"🛡️  [START] Incursion {scraper.spider_name} initiated...")
+            update_task_log(f"🛡️  [START] Incursion {scraper.spider_name} initiated...")
             
-            # Scrapers now manage their own stealth contexts for maximum robustness
+            try:
+                offers = await asyncio.wait_for(scraper.search("auto"), timeout=600)
+                update_task_log(f"📡 Encontradas {len(offers)} reliquias potenciales.")
+
+                # PHASE 51: Post-Scraping Filter for Tradeinn (Techinn/Kidinn only)
+                if scraper.spider_name.lower() == "tradeinn" and offers:
+                    original_count = len(offers)
+                    filtered_offers = []
+                    for item in offers:
+                        url = getattr(item, 'url', '').lower()
+                        title = getattr(item, 'product_name', '').lower()
+                        if "techinn" in url or "kidinn" in url or "techinn" in title or "kidinn" in title:
+                            filtered_offers.append(item)
+                    
+                    discarded = original_count - len(filtered_offers)
+                    offers = filtered_offers
+                    
+                    if discarded > 0:
+                        logger.info(f"🧹 [{scraper.spider_name}] Post-filter: Discarded {discarded} non-Techinn/Kidinn items. Keeping {len(offers)}.")
+                        update_task_log(f"🧹 Descartados {discarded} artículos fuera de Techinn/Kidinn.")
+
+            except asyncio.TimeoutError:
+                logger.error(f"⌛ [TIMEOUT] {scraper.spider_name} exceeded 10-minute limit.")
+                update_task_log("⌛ [TIMEOUT] Exceeded 10-minute limit.")
+                offers = []
             
-            # Inject Audit Logger
-            scraper.audit_logger = audit
+            # PHASE 19: Health & Block Alerts (Sentinel)
+            if not offers:
+                if getattr(scraper, 'blocked', False):
+                    logger.error(f"[{scraper.spider_name}] 🚫 Blocked by anti-bot measures.")
+                    msg = f"🚫 **DESTIERRO DETECTADO**\n\nEl Oráculo ha sido bloqueado por **{scraper.spider_name}**."
+                    await notifier.send_message(msg)
+                    log_entry.status = "blocked"
+                    log_entry.error_message = "Anti-bot block detected"
+                else:
+                    logger.warning(f"[{scraper.spider_name}] ⚠️ Empty scan results.")
+                    log_entry.status = "success_empty"
 
-            # UI Progress Update
-            progress_val = int((idx / total_scrapers) * 100)
-            if progress_callback:
-                progress_callback(scraper.spider_name, progress_val)
-                
-            # DB Status Update (Running)
+            return {
+                "db": db,
+                "status_row": status_row,
+                "log_entry": log_entry,
+                "offers": offers,
+                "log": update_task_log,
+            }
+        except Exception as e:
+            logger.error(f"❌ Failed {scraper.spider_name}: {e}")
+            update_task_log(f"❌ ERROR: {str(e)}")
+            results[scraper.spider_name] = {"error": str(e)}
+            total_stats["errors"] += 1
+            
+            # DB Status Update (Error)
             try:
-                status_row = db.query(ScraperStatusModel).filter(ScraperStatusModel.spider_name == scraper.spider_name).first()
-                if not status_row:
-                    status_row = ScraperStatusModel(spider_name=scraper.spider_name)
-                    db.add(status_row)
-                status_row.status = "running"
-                status_row.progress = progress_val
-                status_row.last_update = datetime.now()
+                if status_row is not None:
+                    status_row.status = "error"
+                
+                # Finalize Log Error
+                log_entry.status = "error"
+                log_entry.error_message = str(e)[:500]
+                log_entry.end_time = datetime.now()
+                
                 db.commit()
             except Exception:
                 db.rollback()
+            db.close()
+            update_task_log.close()
+            return None
 
-            # Heartbeat Log
-            logger.info(f"💓 Heartbeat: Attempting to engage {scraper.spider_name}...")
-
-            # Determine trigger type (Corrected Phase 50)
-            event_name = os.getenv("GITHUB_EVENT_NAME", "manual")
-            trigger = "scheduled" if event_name == "schedule" else "manual"
-            if args.shops and not os.getenv("GITHUB_EVENT_NAME"): trigger = "manual"
+    def persist_job(scraper, job):
+        """Fase de persistencia (serializada por el escritor único del ScanScheduler)."""
+        db = job["db"]
+        status_row = job["status_row"]
+        log_entry = job["log_entry"]
+        offers = job["offers"]
+        update_task_log = job["log"]
+        try:
+            # 2. Persist
+            new_items_found = 0
+            if offers:
+                # PHASE 10: Deep Harvest (Precision)
+                if args.deep_harvest and offers:
+                    logger.info(f"🔍 [{scraper.spider_name}] Deep Harvest active. Refining {len(offers)} items...")
+                    for item in offers:
+                        # Visit detail page if EAN is missing and we want precision
+                        if not getattr(item, 'ean', None):
+                            # Ensure the scraper has a _scrape_detail method
+                            if hasattr(scraper, '_scrape_detail') and callable(getattr(scraper, '_scrape_detail')):
+                                logger.warning(f"⚠️ Deep harvest for {scraper.spider_name} skipped for {item.product_name} as 'context' is undefined.")
+                            else:
+                                logger.warning(f"⚠️ Scraper {scraper.spider_name} does not implement _scrape_detail for deep harvest.")
 
-            # Create Execution Log Entry
-            log_entry = ScraperExecutionLogModel(
-                spider_name=scraper.spider_name,
-                status="running",
-                start_time=datetime.now(),
-                trigger_type=trigger,
-                logs=f"[{datetime.now(ZoneInfo('Europe/Madrid')).strftime('%H:%M:%S')}] 🚀 Inicia incursion en {scraper.spider_name} ({trigger})\n"
-            )
-            try:
-                db.add(log_entry)
-                db.commit()
-                log_id = log_entry.id
-            except Exception as e:
-                logger.error(f"Failed to create execution log: {e}")
-                db.rollback()
-                log_id = None
-
-            # Helper to append logs to DB entry safely
-            def update_task_log(msg):
-                if not log_id: return
-                try:
-                    with SessionLocal() as db_log:
-                        entry = db_log.get(ScraperExecutionLogModel, log_id)
-                        if entry:
-                            ts = datetime.now(ZoneInfo("Europe/Madrid")).strftime("%H:%M:%S")
-                            new_line = f"[{ts}] {msg}"
-                            if entry.logs: entry.logs += "\n" + new_line
-                            else: entry.logs = new_line
-                            db_log.commit()
-                except Exception as ex:
-                    logger.warning(f"Log preservation failed: {ex}")
-
-            update_task_log(f"🕸️ Engaging {scraper.spider_name}...")
-
-            try: # Robustness Layer: Ensure loop continues even if a scraper crashes
-                # 1. Scrape (Modern scrapers use .search)
-                logger.info(f"🛡️  [START] Incursion {scraper.spider_name} initiated...")
-                update_task_log(f"🛡️  [START] Incursion {scraper.spider_name} initiated...")
-                
-                try:
-                    offers = await asyncio.wait_for(scraper.search("auto"), timeout=600)
-                    update_task_log(f"📡 Encontradas {len(offers)} reliquias potenciales.")
-
-                    # PHASE 51: Post-Scraping Filter for Tradeinn (Techinn/Kidinn only)
-                    if scraper.spider_name.lower() == "tradeinn" and offers:
-                        original_count = len(offers)
-                        filtered_offers = []
-                        for item in offers:
-                            url = getattr(item, 'url', '').lower()
-                            title = getattr(item, 'product_name', '').lower()
-                            if "techinn" in url or "kidinn" in url or "techinn" in title or "kidinn" in title:
-                                filtered_offers.append(item)
-                        
-                        discarded = original_count - len(filtered_offers)
-                        offers = filtered_offers
-                        
-                        if discarded > 0:
-                            logger.info(f"🧹 [{scraper.spider_name}] Post-filter: Discarded {discarded} non-Techinn/Kidinn items. Keeping {len(offers)}.")
-                            update_task_log(f"🧹 Descartados {discarded} artículos fuera de Techinn/Kidinn.")
-
-                except asyncio.TimeoutError:
-                    logger.error(f"⌛ [TIMEOUT] {scraper.spider_name} exceeded 10-minute limit.")
-                    update_task_log("⌛ [TIMEOUT] Exceeded 10-minute limit.")
-                    offers = []
-                
-                # PHASE 19: Health & Block Alerts (Sentinel)
-                if not offers:
-                    if getattr(scraper, 'blocked', False):
-                        logger.error(f"[{scraper.spider_name}] 🚫 Blocked by anti-bot measures.")
-                        msg = f"🚫 **DESTIERRO DETECTADO**\n\nEl Oráculo ha sido bloqueado por **{scraper.spider_name}**."
-                        await notifier.send_message(msg)
-                        log_entry.status = "blocked"
-                        log_entry.error_message = "Anti-bot block detected"
-                    else:
-                        logger.warning(f"[{scraper.spider_name}] ⚠️ Empty scan results.")
-                        log_entry.status = "success_empty"
+                # Update Database & Return new items count
+                # Phase 44: Pasamos el nombre de la tienda para sincronizar disponibilidad
+                pipeline.log_callback = update_task_log
+                new_items_found = pipeline.update_database(offers, shop_names=[scraper.shop_name])
+                update_task_log(f"💾 {new_items_found} nuevas reliquias añadidas al Purgatorio.")
+                total_stats["found"] += len(offers)
+                total_stats["new"] += new_items_found
                 
-                # 2. Persist
-                new_items_found = 0
-                if offers:
-                    # PHASE 10: Deep Harvest (Precision)
-                    if args.deep_harvest and offers:
-                        logger.info(f"🔍 [{scraper.spider_name}] Deep Harvest active. Refining {len(offers)} items...")
-                        for item in offers:
-                            # Visit detail page if EAN is missing and we want precision
-                            if not getattr(item, 'ean', None):
-                                # Ensure the scraper has a _scrape_detail method
-                                if hasattr(scraper, '_scrape_detail') and callable(getattr(scraper, '_scrape_detail')):
-                                    logger.warning(f"⚠️ Deep harvest for {scraper.spider_name} skipped for {item.product_name} as 'context' is undefined.")
-                                else:
-                                    logger.warning(f"⚠️ Scraper {scraper.spider_name} does not implement _scrape_detail for deep harvest.")
-
-                    # Update Database & Return new items count
-                    # Phase 44: Pasamos el nombre de la tienda para sincronizar disponibilidad
-                    pipeline.log_callback = update_task_log
-                    new_items_found = pipeline.update_database(offers, shop_names=[scraper.shop_name])
-                    update_task_log(f"💾 {new_items_found} nuevas reliquias añadidas al Purgatorio.")
-                    total_stats["found"] += len(offers)
-                    total_stats["new"] += new_items_found
-                    
-                    # Log Update Success
-                    log_entry.items_found = len(offers)
-                    log_entry.new_items = new_items_found
-                    log_entry.status = "success"
+                # Log Update Success
+                log_entry.items_found = len(offers)
+                log_entry.new_items = new_items_found
+                log_entry.status = "success"
+            else:
+                if getattr(scraper, 'blocked', False):
+                    log_entry.status = "blocked"
                 else:
-                    if getattr(scraper, 'blocked', False):
-                        log_entry.status = "blocked"
-                    else:
-                        log_entry.status = "success_empty"
-                
-                # DB Status Update (Completed)
-                try:
+                    log_entry.status = "success_empty"
+            
+            # DB Status Update (Completed)
+            try:
+                if status_row is not None:
                     if getattr(scraper, 'blocked', False):
                         status_row.status = "blocked"
                     else:
                         status_row.status = "completed"
+                    status_row.progress = 100
                     status_row.items_scraped = len(offers) if offers else 0
                     status_row.last_update = datetime.now()
-                    
-                    # Finalize Log
-                    log_entry.end_time = datetime.now()
-                    db.commit()
-                except Exception:
-                    db.rollback()
-
-                results[scraper.spider_name] = {"items_found": len(offers), "new_items": new_items_found, "status": "Success"}
-                logger.info(f"✅ [END] {scraper.spider_name} Complete (New: {new_items_found})")
-                update_task_log(f"✅ [FIN] Completado: {len(offers)} encontradas, {new_items_found} nuevas.")
                 
-            except Exception as e:
-                logger.error(f"❌ Failed {scraper.spider_name}: {e}")
-                update_task_log(f"❌ ERROR: {str(e)}")
-                results[scraper.spider_name] = {"error": str(e)}
-                total_stats["errors"] += 1
-                
-                # DB Status Update (Error)
-                try:
+                # Finalize Log
+                log_entry.end_time = datetime.now()
+                db.commit()
+            except Exception:
+                db.rollback()
+
+            results[scraper.spider_name] = {"items_found": len(offers), "new_items": new_items_found, "status": "Success"}
+            logger.info(f"✅ [END] {scraper.spider_name} Complete (New: {new_items_found})")
+            update_task_log(f"✅ [FIN] Completado: {len(offers)} encontradas, {new_items_found} nuevas.")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed {scraper.spider_name}: {e}")
+            update_task_log(f"❌ ERROR: {str(e)}")
+            results[scraper.spider_name] = {"error": str(e)}
+            total_stats["errors"] += 1
+            
+            # DB Status Update (Error)
+            try:
+                if status_row is not None:
                     status_row.status = "error"
-                    
-                    # Finalize Log Error
-                    log_entry.status = "error"
-                    log_entry.error_message = str(e)[:500]
-                    log_entry.end_time = datetime.now()
-                    
-                    db.commit()
-                except Exception:
-                    db.rollback()
-        except Exception as crash:
-            logger.critical(f"🔥 Catastrophic Scraper Crash ({scraper.spider_name}): {crash}")
+                
+                # Finalize Log Error
+                log_entry.status = "error"
+                log_entry.error_message = str(e)[:500]
+                log_entry.end_time = datetime.now()
+                
+                db.commit()
+            except Exception:
+                db.rollback()
+        finally:
+            db.close()
+            update_task_log.close()
+
+    def on_scraper_done(scraper, done, total):
+        # UI Progress Update (proporción de incursiones finalizadas)
+        if progress_callback:
+            progress_callback(scraper.spider_name, int((done / total) * 100))
+
+    scheduler = ScanScheduler(max_concurrency=args.max_concurrency)
+    outcome = await scheduler.run(scrapers, scrape_job, persist_job, on_done=on_scraper_done)
+    for spider_name, crash in outcome.items():
+        if crash and spider_name not in results:
+            results[spider_name] = {"error": crash}
             total_stats["errors"] += 1
         
     # Final Callback
     if progress_callback:
         progress_callback("Completado", 100)
-    
-    db.close()
 
     # PHASE 18: Create Database Vault (Safe Backup)
     try:
@@ -409,6 +435,9 @@ async def run_daily_scan(progress_callback=None):
         if backup_path:
             logger.info(f"🛡️ Vault sealed at: {backup_path}")
         backup_db.close()
+    except Exception as e_backup:
+        logger.warning(f"⚠️ Failed to seal the Data Vault: {e_backup}")
+
     # PHASE 88: Auto-resolución de Lore para productos nuevos (Caché permanente, 0 coste de red)
     try:
         from src.application.services.lore_harvester_service import LoreHarvesterService
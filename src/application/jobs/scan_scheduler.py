@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from loguru import logger
+
+from src.core.concurrency import run_blocking
+from src.core.config import settings
+
+
+# Backends de extracción conocidos. Cada scraper declara el suyo en
+# BaseScraper.concurrency_backend (según su estrategia principal).
+DEFAULT_BACKEND_LIMITS: Dict[str, int] = {
+    "curl": settings.SCAN_CURL_CONCURRENCY,
+    "playwright": settings.SCAN_PLAYWRIGHT_CONCURRENCY,
+    "api": settings.SCAN_API_CONCURRENCY,
+}
+
+
+class ScanScheduler:
+    """
+    Phase 90: Motor de ejecución concurrente del Daily Scan.
+
+    Lanza todos los scrapers a la vez bajo tres presupuestos de concurrencia:
+    1. Global (máximo de incursiones simultáneas).
+    2. Por backend (curl-cffi vs Playwright vs API de terceros).
+    3. Por tienda (nunca dos incursiones contra la misma tienda a la vez).
+
+    Los resultados se entregan a un ÚNICO escritor serializado (cola asyncio),
+    de modo que ScrapingPipeline.update_database nunca corre en paralelo consigo
+    mismo y la BD sólo ve un lote a la vez. El escritor ejecuta cada volcado en el
+    pool de hilos acotado, así que la escritura (SQLAlchemy bloqueante) no congela
+    a los scrapers que siguen corriendo en el event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        backend_limits: Dict[str, int] | None = None,
+        shop_limit: int = 1,
+    ):
+        self.max_concurrency = max(1, max_concurrency or settings.SCAN_MAX_CONCURRENCY)
+        self.backend_limits = {**DEFAULT_BACKEND_LIMITS, **(backend_limits or {})}
+        self.shop_limit = max(1, shop_limit)
+
+    @staticmethod
+    def backend_of(scraper) -> str:
+        return getattr(scraper, "concurrency_backend", "playwright") or "playwright"
+
+    async def run(
+        self,
+        scrapers: Iterable[Any],
+        scrape: Callable[[Any], Awaitable[Optional[Any]]],
+        persist: Callable[[Any, Any], None],
+        on_done: Callable[[Any, int, int], None] | None = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Ejecuta `scrape(scraper)` de forma concurrente y encola cada resultado
+        no nulo para `persist(scraper, payload)`, que se ejecuta en serie (de uno en
+        uno, en orden de llegada) en el pool de hilos vía run_blocking; el pipeline
+        dispara sus alertas con spawn(), válido también desde esos hilos.
+
+        Retorna {spider_name: None | mensaje_de_error} con el desenlace de cada scraper.
+        """
+        scrapers = list(scrapers)
+        total = len(scrapers)
+        outcome: Dict[str, Optional[str]] = {}
+        if not scrapers:
+            return outcome
+
+        global_sem = asyncio.Semaphore(self.max_concurrency)
+        backend_sems: Dict[str, asyncio.Semaphore] = {}
+        shop_sems: Dict[str, asyncio.Semaphore] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        done_count = 0
+
+        def _mark_done(scraper):
+            nonlocal done_count
+            done_count += 1
+            if on_done:
+                try:
+                    on_done(scraper, done_count, total)
+                except Exception:
+                    pass
+
+        def _backend_sem(backend: str) -> asyncio.Semaphore:
+            if backend not in backend_sems:
+                limit = self.backend_limits.get(backend, self.max_concurrency)
+                backend_sems[backend] = asyncio.Semaphore(max(1, limit))
+            return backend_sems[backend]
+
+        def _shop_sem(shop: str) -> asyncio.Semaphore:
+            if shop not in shop_sems:
+                shop_sems[shop] = asyncio.Semaphore(self.shop_limit)
+            return shop_sems[shop]
+
+        async def _guarded(scraper):
+            name = scraper.spider_name
+            backend = self.backend_of(scraper)
+            # Orden de adquisición: tienda -> backend -> global. Así un scraper que
+            # espera turno de backend no ocupa una plaza global ociosa.
+            try:
+                async with _shop_sem(scraper.shop_name), _backend_sem(backend), global_sem:
+                    logger.info(f"🚦 Scheduler: {name} obtiene plaza (backend={backend}).")
+                    payload = await scrape(scraper)
+                outcome.setdefault(name, None)
+                if payload is not None:
+                    await queue.put((scraper, payload))
+                    return
+            except Exception as crash:
+                logger.critical(f"🔥 Catastrophic Scraper Crash ({name}): {crash}")
+                outcome[name] = str(crash)
+            _mark_done(scraper)
+
+        async def _writer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    break
+                scraper, payload = item
+                try:
+                    await run_blocking(persist, scraper, payload)
+                except Exception as e:
+                    logger.error(f"❌ Writer: fallo persistiendo {scraper.spider_name}: {e}")
+                    outcome[scraper.spider_name] = str(e)
+                finally:
+                    _mark_done(scraper)
+                    queue.task_done()
+
+        logger.info(
+            f"🚦 Scheduler: {total} scrapers | global={self.max_concurrency} | "
+            f"backends={self.backend_limits} | por tienda={self.shop_limit}"
+        )
+        writer_task = asyncio.create_task(_writer())
+        try:
+            await asyncio.gather(*(_guarded(s) for s in scrapers))
+        finally:
+            await queue.put(None)
+            await writer_task
+        return outcome
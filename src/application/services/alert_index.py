@@ -0,0 +1,152 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from src.core.normalization_cache import memoized
+from src.domain.models import CollectionItemModel, PriceAlertModel, ProductModel, UserModel
+
+
+_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+
+
+def alert_words(name: str) -> Tuple[str, ...]:
+    """Palabras significativas (>2 letras) de un nombre, con la misma limpieza de siempre."""
+    return _alert_words(name or "")
+
+
+@memoized("alert_index.alert_words")
+def _alert_words(name: str) -> Tuple[str, ...]:
+    clean = name.lower().replace("-", " ")
+    return tuple(w for w in _NON_ALNUM.sub('', clean).split() if len(w) > 2)
+
+
+@dataclass(frozen=True)
+class AlertEntry:
+    kind: str  # "wishlist" | "price"
+    user_id: int
+    chat_id: str
+    product_name: str
+    words: tuple
+    target_price: Optional[float] = None
+
+
+class MultiUserAlertIndex:
+    """
+    Phase 92: Índice invertido de alertas multi-usuario (Wishlist + Centinela).
+
+    Se construye UNA vez por lote con tres consultas (usuarios con Telegram,
+    listas de deseos y alertas de precio activas) y queda en memoria como
+    palabra clave -> [AlertEntry] (la palabra más larga de cada entrada).
+
+    La regla de coincidencia es la histórica: todas las palabras del producto
+    deben aparecer como SUBCADENA del nombre scrapeado ("Skeletor's", "HeMan"...).
+    El índice es un pre-filtro puro: los candidatos son las entradas cuya palabra
+    clave aparece como subcadena del nombre (se recorren las subcadenas de las
+    longitudes indexadas), así que nunca descarta una entrada que la regla
+    aceptaría. Por oferta y usuario se envía como máximo una alerta de deseo y
+    una de precio.
+    """
+
+    def __init__(self, entries: Iterable[AlertEntry] = ()):
+        self.entries: List[AlertEntry] = []
+        self.by_word: Dict[str, List[int]] = defaultdict(list)
+        self.word_lengths: Set[int] = set()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: AlertEntry):
+        if not entry.words:
+            return
+        idx = len(self.entries)
+        self.entries.append(entry)
+        key = max(entry.words, key=len)
+        self.by_word[key].append(idx)
+        self.word_lengths.add(len(key))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, db: Session) -> "MultiUserAlertIndex":
+        users = dict(
+            db.query(UserModel.id, UserModel.telegram_chat_id)
+            .filter(UserModel.telegram_chat_id != None, UserModel.is_active == True)
+            .all()
+        )
+        index = cls()
+        if not users:
+            return index
+
+        wishlist = (
+            db.query(CollectionItemModel.owner_id, ProductModel.name)
+            .join(ProductModel, CollectionItemModel.product_id == ProductModel.id)
+            .filter(CollectionItemModel.owner_id.in_(users.keys()), CollectionItemModel.acquired == False)
+            .order_by(CollectionItemModel.owner_id, ProductModel.id)
+            .all()
+        )
+        for owner_id, name in wishlist:
+            index.add(AlertEntry("wishlist", owner_id, users[owner_id], name, alert_words(name)))
+
+        price_alerts = (
+            db.query(PriceAlertModel.user_id, PriceAlertModel.target_price, ProductModel.name)
+            .join(ProductModel, PriceAlertModel.product_id == ProductModel.id)
+            .filter(PriceAlertModel.user_id.in_(users.keys()), PriceAlertModel.is_active == True)
+            .order_by(PriceAlertModel.user_id, PriceAlertModel.id)
+            .all()
+        )
+        for user_id, target_price, name in price_alerts:
+            index.add(AlertEntry("price", user_id, users[user_id], name, alert_words(name), target_price))
+
+        logger.debug(f"🔔 Alert Index: {len(index)} entradas | {len(index.by_word)} palabras | {len(users)} usuarios")
+        return index
+
+    def match(self, scraped_name: str, price: float, shop_name: str, url: str) -> List[dict]:
+        """Alertas que dispara una oferta (ya deduplicadas por usuario y tipo)."""
+        if not self.entries:
+            return []
+        name_lower = (scraped_name or "").lower()
+        candidates = set()
+        for length in self.word_lengths:
+            for start in range(len(name_lower) - length + 1):
+                candidates.update(self.by_word.get(name_lower[start:start + length], ()))
+
+        alerts, fired = [], set()
+        for idx in sorted(candidates):
+            entry = self.entries[idx]
+            key = (entry.kind, entry.user_id)
+            if key in fired:
+                continue
+            if entry.kind == "price" and (entry.target_price is None or entry.target_price < price):
+                continue
+            if all(w in name_lower for w in entry.words):
+                fired.add(key)
+                alert = {
+                    "kind": entry.kind,
+                    "chat_id": entry.chat_id,
+                    "product_name": entry.product_name,
+                    "price": price,
+                    "shop_name": shop_name,
+                    "url": url,
+                }
+                if entry.kind == "price":
+                    alert["target_price"] = entry.target_price
+                alerts.append(alert)
+        return alerts
+
+    def match_batch(self, offers: Iterable[dict]) -> List[dict]:
+        """
+        Cruza un lote de ofertas ({scraped_name, price, shop_name, url}) y devuelve
+        todas las alertas en un único lote sin duplicados (tipo, chat, url).
+        """
+        batch, seen = [], set()
+        for offer in offers:
+            for alert in self.match(offer["scraped_name"], offer["price"], offer["shop_name"], offer["url"]):
+                key = (alert["kind"], alert["chat_id"], alert["url"])
+                if key not in seen:
+                    seen.add(key)
+                    batch.append(alert)
+        return batch
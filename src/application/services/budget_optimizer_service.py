@@ -1,10 +1,46 @@
-from typing import Dict, Any, List, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
 from loguru import logger
 
 from src.infrastructure.database_cloud import SessionCloud
-from src.domain.models import ProductModel, OfferModel, PendingMatchModel, LogisticRuleModel, CollectionItemModel
+from src.domain.models import ProductModel, OfferModel, PendingMatchModel, CollectionItemModel
 from src.application.services.logistics_service import LogisticsService
 
+# Phase 110: límites del optimizador exacto
+OPTIMIZER_TIME_BUDGET = 0.5
+# Productos (los de más margen optimista) que entran en la búsqueda exacta; el resto
+# se añade después con el voraz. Acota también la profundidad de la recursión.
+MAX_EXACT_PRODUCTS = 300
+MAX_OPTIONS_PER_PRODUCT = 4
+_TIMER_CHECK_EVERY = 512
+
+
+@dataclass
+class _Option:
+    """Una oferta concreta para un producto, dentro de una cesta de envío (tienda o vendedor P2P)."""
+    product_index: int
+    group: Tuple[str, ...]
+    price: float
+    benchmark: float
+    candidate: Dict[str, Any]
+    lower_bound_cost: float = 0.0
+
+
+@dataclass
+class _Basket:
+    rule: Any
+    items_total: float = 0.0
+    count: int = 0
+    cost: float = 0.0
+    options: List[_Option] = field(default_factory=list)
+
+
+class _SearchTimeout(Exception):
+    """Presupuesto de tiempo agotado: se devuelve la mejor cesta encontrada."""
+
+
 class BudgetOptimizerService:
     """
     Asistente de Presupuesto y Carrito Multi-Tienda (Matrix Cart).
@@ -18,12 +54,12 @@ class BudgetOptimizerService:
         budget_limit: float,
         user_id: int = 2,
         target_product_ids: Optional[List[int]] = None,
-        user_location: str = "ES"
+        user_location: str = "ES",
+        time_budget: float = OPTIMIZER_TIME_BUDGET
     ) -> Dict[str, Any]:
         with SessionCloud() as db:
             # 1. Precargar reglas logísticas
-            rules = db.query(LogisticRuleModel).all()
-            rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
+            rules_map = LogisticsService.load_rules_map(db)  # Phase 109: instantánea compartida
 
             # 2. Obtener productos objetivo (Wishlist o productos no poseídos)
             if target_product_ids:
@@ -45,108 +81,130 @@ class BudgetOptimizerService:
 
             product_map = {p.id: p for p in products}
             if not product_map:
-                return {
-                    "budget_limit": budget_limit,
-                    "total_spent": 0.0,
-                    "remaining_budget": budget_limit,
-                    "savings_total": 0.0,
-                    "items_count": 0,
-                    "selected_items": [],
-                    "stores_breakdown": {}
-                }
+                return cls._empty_result(budget_limit)
 
             # 3. Recolectar todas las ofertas válidas para estos productos
-            candidates = []
-            
+            sources = []
+
             # A) Ofertas de tiendas
             offers = db.query(OfferModel).filter(
                 OfferModel.product_id.in_(list(product_map.keys())),
                 OfferModel.is_available == True,
                 OfferModel.price > 0
             ).all()
-
             for o in offers:
-                p = product_map[o.product_id]
-                benchmark = p.p25_price or p.retail_price or 19.99
-                landed = LogisticsService.optimized_get_landing_price(
-                    price=o.price,
-                    shop_name=o.shop_name,
-                    user_location=user_location,
-                    rules_map=rules_map,
-                    item_count=1
-                )
-                savings = max(0.0, benchmark - landed)
-                candidates.append({
-                    "product_id": p.id,
-                    "product_name": p.name,
-                    "base_price": o.price,
-                    "landed_price": landed,
-                    "benchmark_price": benchmark,
-                    "savings_amount": savings,
-                    "savings_pct": round((savings / benchmark * 100), 1) if benchmark > 0 else 0,
-                    "shop_name": o.shop_name,
-                    "url": o.url,
-                    "image_url": o.image_url or p.image_url
-                })
+                sources.append((product_map[o.product_id], o.price, o.shop_name, o.url, o.image_url))
 
-            # B) Ofertas del Purgatorio vinculables
+            # B) Ofertas del Purgatorio vinculables (índice por nombre en vez de pendientes x productos)
             matches = db.query(PendingMatchModel).filter(
                 PendingMatchModel.validation_status == "PENDING",
                 PendingMatchModel.is_blocked == False,
                 PendingMatchModel.price > 0
             ).all()
-
+            match_product = cls._purgatory_matcher(products)
             for m in matches:
-                # Buscar si coincide con alguno de nuestros productos objetivo
-                for p_id, p in product_map.items():
-                    if p.name.lower() in m.scraped_name.lower():
-                        benchmark = p.p25_price or p.retail_price or 19.99
-                        landed = LogisticsService.optimized_get_landing_price(
-                            price=m.price,
-                            shop_name=m.shop_name,
-                            user_location=user_location,
-                            rules_map=rules_map,
-                            item_count=1
-                        )
-                        savings = max(0.0, benchmark - landed)
-                        candidates.append({
-                            "product_id": p.id,
-                            "product_name": p.name,
-                            "base_price": m.price,
-                            "landed_price": landed,
-                            "benchmark_price": benchmark,
-                            "savings_amount": savings,
-                            "savings_pct": round((savings / benchmark * 100), 1) if benchmark > 0 else 0,
-                            "shop_name": m.shop_name,
-                            "url": m.url,
-                            "image_url": m.image_url or p.image_url
-                        })
-                        break
-
-            # 4. Ordenar candidatos por mejor relación de ahorro por euro gastado (Deal Density)
-            candidates.sort(
-                key=lambda x: (x["savings_amount"] / max(1.0, x["landed_price"]), -x["landed_price"]),
-                reverse=True
-            )
-
-            # 5. Algoritmo Voraz con Agrupación Logística
-            selected_items = []
-            seen_products = set()
-            current_total = 0.0
-
-            for c in candidates:
-                if c["product_id"] in seen_products:
-                    continue
-                if current_total + c["landed_price"] <= budget_limit:
-                    selected_items.append(c)
-                    seen_products.add(c["product_id"])
-                    current_total += c["landed_price"]
-
-            # 6. Agrupar desglose por tienda
-            stores_breakdown = {}
-            total_savings = 0.0
-            for item in selected_items:
-                shop = item["shop_name"]
+                p = match_product(m.scraped_name)
+                if p is not None:
+                    sources.append((p, m.price, m.shop_name, m.url, m.image_url))
+
+            options_by_product: Dict[int, List[_Option]] = {}
+            rules_by_group: Dict[Tuple[str, ...], Any] = {}
+            for p, price, shop_name, url, image_url in sources:
+                benchmark = p.p25_price or p.retail_price or 19.99
+                rule = LogisticsService._resolve_rule(shop_name, user_location, rules_map)
+                landed = LogisticsService._apply_rule(price, rule, 1)
+                savings = max(0.0, benchmark - landed)
+                # P2P: cada vendedor envía por separado; tiendas: una cesta (envío compartido) por tienda
+                if LogisticsService.is_p2p_rule(rule):
+                    group = ("p2p", shop_name, url)
+                else:
+                    group = ("shop", LogisticsService.normalize_shop_name(shop_name))
+                rules_by_group.setdefault(group, rule)
+                options_by_product.setdefault(p.id, []).append(_Option(
+                    product_index=-1, group=group, price=price, benchmark=benchmark,
+                    candidate={
+                        "product_id": p.id,
+                        "product_name": p.name,
+                        "base_price": price,
+                        "landed_price": landed,
+                        "benchmark_price": benchmark,
+                        "savings_amount": savings,
+                        "savings_pct": round((savings / benchmark * 100), 1) if benchmark > 0 else 0,
+                        "shop_name": shop_name,
+                        "url": url,
+                        "image_url": image_url or p.image_url
+                    },
+                ))
+
+        optimizer = _CartOptimizer(budget_limit, options_by_product, rules_by_group, time_budget)
+        chosen, strategy = optimizer.solve()
+        return cls._build_result(budget_limit, chosen, optimizer, strategy)
+
+    @staticmethod
+    def _purgatory_matcher(products: List[ProductModel]):
+        """
+        Índice nombre -> producto objetivo para vincular pendientes del Purgatorio.
+        Regla de siempre: el nombre del producto es subcadena del título scrapeado
+        (gana el primero en orden). Se buscan en el índice las subcadenas del título
+        con las longitudes de nombre existentes, en vez de recorrer todos los productos.
+        """
+        by_name: Dict[str, Tuple[int, ProductModel]] = {}
+        for i, p in enumerate(products):
+            if p.name:
+                by_name.setdefault(p.name.lower(), (i, p))
+        lengths = {len(name) for name in by_name}
+
+        def match(scraped_name: Optional[str]) -> Optional[ProductModel]:
+            scraped_lower = (scraped_name or "").lower()
+            best = None
+            for length in lengths:
+                for start in range(len(scraped_lower) - length + 1):
+                    hit = by_name.get(scraped_lower[start:start + length])
+                    if hit is not None and (best is None or hit[0] < best[0]):
+                        best = hit
+            return best[1] if best else None
+
+        return match
+
+    @staticmethod
+    def _empty_result(budget_limit: float, strategy: str = "greedy") -> Dict[str, Any]:
+        return {
+            "budget_limit": budget_limit,
+            "total_spent": 0.0,
+            "remaining_budget": budget_limit,
+            "savings_total": 0.0,
+            "items_count": 0,
+            "selected_items": [],
+            "stores_breakdown": {},
+            "strategy": strategy
+        }
+
+    @staticmethod
+    def _build_result(budget_limit: float, chosen: List[_Option], optimizer: "_CartOptimizer", strategy: str) -> Dict[str, Any]:
+        if not chosen:
+            return BudgetOptimizerService._empty_result(budget_limit, strategy)
+
+        baskets = optimizer.baskets_for(chosen)
+        selected_items = []
+        stores_breakdown = {}
+        current_total = 0.0
+        benchmark_total = 0.0
+        for basket in baskets.values():
+            current_total += basket.cost
+            shop = basket.options[0].candidate["shop_name"]
+            for opt in basket.options:
+                # Envío y tasas de la cesta repartidos en proporción al precio de cada ítem
+                landed = round(basket.cost * opt.price / basket.items_total, 2)
+                savings = round(opt.benchmark - landed, 2)
+                item = dict(opt.candidate)
+                item.update({
+                    "landed_price": landed,
+                    "savings_amount": savings,
+                    "savings_pct": round((savings / opt.benchmark * 100), 1) if opt.benchmark > 0 else 0,
+                })
+                selected_items.append(item)
+                benchmark_total += opt.benchmark
+
                 if shop not in stores_breakdown:
                     stores_breakdown[shop] = {
                         "shop_name": shop,
@@ -157,16 +215,244 @@ class BudgetOptimizerService:
                     }
                 stores_breakdown[shop]["items_count"] += 1
                 stores_breakdown[shop]["total_base"] += item["base_price"]
-                stores_breakdown[shop]["total_landed"] += item["landed_price"]
                 stores_breakdown[shop]["items"].append(item)
-                total_savings += item["savings_amount"]
-
-            return {
-                "budget_limit": budget_limit,
-                "total_spent": round(current_total, 2),
-                "remaining_budget": round(budget_limit - current_total, 2),
-                "savings_total": round(total_savings, 2),
-                "items_count": len(selected_items),
-                "selected_items": selected_items,
-                "stores_breakdown": stores_breakdown
-            }
+            # Varios vendedores P2P de la misma plataforma comparten entrada en el desglose
+            stores_breakdown[shop]["total_landed"] = round(stores_breakdown[shop]["total_landed"] + basket.cost, 2)
+
+        # Ahorro neto: precios de referencia de lo comprado menos el coste real de las cestas
+        total_savings = benchmark_total - current_total
+        selected_items.sort(key=lambda x: x["savings_amount"], reverse=True)
+        return {
+            "budget_limit": budget_limit,
+            "total_spent": round(current_total, 2),
+            "remaining_budget": round(budget_limit - current_total, 2),
+            "savings_total": round(total_savings, 2),
+            "items_count": len(selected_items),
+            "selected_items": selected_items,
+            "stores_breakdown": stores_breakdown,
+            "strategy": strategy
+        }
+
+
+class _CartOptimizer:
+    """
+    Phase 110: mochila con cestas por tienda.
+
+    Maximiza el ahorro neto (suma de precios de referencia - coste real de las
+    cestas) con el coste total <= presupuesto y como mucho una oferta por
+    producto. El coste de cada cesta lo calcula LogisticsService.basket_landed_total,
+    así que el envío compartido y los umbrales de envío gratis se amortizan.
+
+    1. Voraz consciente del envío (coste marginal por cesta), probando además a
+       llenar primero cada tienda con envío compartido hasta su umbral: solución inicial.
+    2. Branch-and-bound exacto sobre los MAX_EXACT_PRODUCTS productos con más
+       margen optimista, con cota superior optimista y presupuesto de tiempo; al
+       agotarse se devuelve la mejor solución encontrada (nunca peor que la voraz).
+       Si quedan productos fuera de la búsqueda, el voraz completa la cesta.
+    """
+
+    def __init__(self, budget: float, options_by_product: Dict[int, List[_Option]],
+                 rules_by_group: Dict[Tuple[str, ...], Any], time_budget: float):
+        self.budget = budget
+        self.rules_by_group = rules_by_group
+        self.time_budget = time_budget
+        self.usd_rate = None
+        if any(r and (r.shop_name == "BigBadToyStore" or r.strategy_key == "bbts_flat_rate") for r in rules_by_group.values()):
+            from src.application.services.currency_service import CurrencyService
+            self.usd_rate = CurrencyService.get_usd_to_eur_rate()
+
+        self.products: List[List[_Option]] = []
+        for options in options_by_product.values():
+            # En una misma cesta sólo compite la oferta más barata del producto
+            cheapest: Dict[Tuple[str, ...], _Option] = {}
+            for opt in options:
+                if opt.group not in cheapest or opt.price < cheapest[opt.group].price:
+                    cheapest[opt.group] = opt
+            kept = []
+            for opt in cheapest.values():
+                opt.lower_bound_cost = self._lower_bound_cost(opt)
+                if opt.benchmark - opt.lower_bound_cost > 0:
+                    kept.append(opt)
+            kept.sort(key=lambda o: o.candidate["landed_price"])
+            if kept:
+                self.products.append(kept[:MAX_OPTIONS_PER_PRODUCT])
+        # Productos con más margen optimista primero: mejores cotas antes
+        self.products.sort(key=lambda opts: max(o.benchmark - o.lower_bound_cost for o in opts), reverse=True)
+        for i, opts in enumerate(self.products):
+            for opt in opts:
+                opt.product_index = i
+        self.by_density = self._density_order()
+        # Reembolso máximo posible de envíos al cruzar umbrales de envío gratis
+        self.max_refund = sum(
+            r.base_shipping * r.vat_multiplier
+            for g, r in rules_by_group.items()
+            if r and g[0] == "shop" and r.free_shipping_threshold > 0 and r.base_shipping > 0
+        )
+
+    # --- Costes ----------------------------------------------------------------------
+
+    def group_cost(self, group: Tuple[str, ...], items_total: float, count: int) -> float:
+        if count == 0:
+            return 0.0
+        return LogisticsService.basket_landed_total(items_total, self.rules_by_group.get(group), count, self.usd_rate)
+
+    def _lower_bound_cost(self, opt: _Option) -> float:
+        """Coste marginal mínimo posible de añadir la oferta a su cesta (para la cota)."""
+        rule = self.rules_by_group.get(opt.group)
+        if not rule:
+            return opt.price
+        if rule.shop_name == "BigBadToyStore" or rule.strategy_key == "bbts_flat_rate":
+            return (opt.price + 8.00) * (self.usd_rate or 0.0) * 1.21
+        if LogisticsService.is_p2p_rule(rule):
+            return self.group_cost(opt.group, opt.price, 1)
+        if rule.strategy_key == "triguetech_flat_rate" or rule.shop_name == "Triguetech":
+            return opt.price * rule.vat_multiplier
+        if rule.free_shipping_threshold > 0:
+            return max(0.0, opt.price - rule.base_shipping) * rule.vat_multiplier
+        return opt.price * rule.vat_multiplier
+
+    def baskets_for(self, chosen: List[_Option]) -> Dict[Tuple[str, ...], _Basket]:
+        baskets: Dict[Tuple[str, ...], _Basket] = {}
+        for opt in chosen:
+            basket = baskets.setdefault(opt.group, _Basket(rule=self.rules_by_group.get(opt.group)))
+            basket.items_total += opt.price
+            basket.count += 1
+            basket.options.append(opt)
+        for group, basket in baskets.items():
+            basket.cost = self.group_cost(group, basket.items_total, basket.count)
+        return baskets
+
+    # --- Búsqueda ----------------------------------------------------------------------
+
+    def solve(self) -> Tuple[List[_Option], str]:
+        if not self.products:
+            return [], "greedy"
+        best = self._greedy()
+        truncated = len(self.products) > MAX_EXACT_PRODUCTS
+        strategy = "top_k" if truncated else "exact"
+        try:
+            found = self._branch_and_bound(best)
+        except _SearchTimeout as timeout:
+            logger.warning(f"🛒 Optimizador: presupuesto de tiempo agotado ({self.time_budget}s), mejor cesta parcial.")
+            found, strategy = timeout.args[0], "time_limited"
+        if found is not best:
+            # Productos fuera de la búsqueda (o no alcanzados): se completan con el voraz
+            found = self._fill(found)
+        return found, strategy
+
+    def _value(self, chosen: List[_Option]) -> Tuple[float, float]:
+        cost = sum(b.cost for b in self.baskets_for(chosen).values())
+        return sum(o.benchmark for o in chosen) - cost, cost
+
+    def _density_order(self) -> List[_Option]:
+        options = [opt for opts in self.products for opt in opts]
+        options.sort(
+            key=lambda o: ((o.benchmark - o.candidate["landed_price"]) / max(1.0, o.candidate["landed_price"]),
+                           -o.candidate["landed_price"]),
+            reverse=True
+        )
+        return options
+
+    def _greedy(self) -> List[_Option]:
+        """
+        Voraz por densidad de ahorro con el coste marginal real en cada cesta. Como
+        el primer ítem de una tienda carga con todo el envío, se prueba también a
+        sembrar cada cesta con envío compartido hasta su umbral y se queda la mejor.
+        """
+        best = self._fill([])
+        best_value, _ = self._value(best)
+        for group in self.rules_by_group:
+            seed = self._seed_basket(group)
+            if not seed:
+                continue
+            candidate = self._fill(seed)
+            value, cost = self._value(candidate)
+            if cost <= self.budget + 1e-9 and value > best_value + 1e-9:
+                best, best_value = candidate, value
+        return best
+
+    def _seed_basket(self, group: Tuple[str, ...]) -> List[_Option]:
+        """Ofertas rentables (sin envío) de una tienda hasta cubrir su umbral de envío gratis."""
+        rule = self.rules_by_group.get(group)
+        if not rule or group[0] != "shop" or rule.base_shipping <= 0:
+            return []
+        flat_rate = rule.strategy_key == "triguetech_flat_rate" or rule.shop_name == "Triguetech"
+        if not flat_rate and rule.free_shipping_threshold <= 0:
+            return []
+        seed, items_total = [], 0.0
+        for opt in self.by_density:
+            if opt.group != group or opt.benchmark <= opt.price * rule.vat_multiplier:
+                continue
+            if not flat_rate and items_total >= rule.free_shipping_threshold:
+                break
+            if self.group_cost(group, items_total + opt.price, len(seed) + 1) > self.budget + 1e-9:
+                continue
+            seed.append(opt)
+            items_total += opt.price
+        value, _ = self._value(seed)
+        return seed if len(seed) > 1 and value > 0 else []
+
+    def _fill(self, chosen: List[_Option]) -> List[_Option]:
+        """Completa `chosen` con el voraz por densidad usando el coste marginal por cesta."""
+        state: Dict[Tuple[str, ...], Tuple[float, int]] = {
+            group: (b.items_total, b.count) for group, b in self.baskets_for(chosen).items()
+        }
+        chosen = list(chosen)
+        taken = {opt.product_index for opt in chosen}
+        total = self._value(chosen)[1]
+        for opt in self.by_density:
+            if opt.product_index in taken:
+                continue
+            items_total, count = state.get(opt.group, (0.0, 0))
+            marginal = self.group_cost(opt.group, items_total + opt.price, count + 1) - self.group_cost(opt.group, items_total, count)
+            if opt.benchmark - marginal <= 0 or total + marginal > self.budget + 1e-9:
+                continue
+            state[opt.group] = (items_total + opt.price, count + 1)
+            total += marginal
+            taken.add(opt.product_index)
+            chosen.append(opt)
+        return chosen
+
+    def _branch_and_bound(self, incumbent: List[_Option]) -> List[_Option]:
+        n = min(len(self.products), MAX_EXACT_PRODUCTS)
+        # Cota optimista de lo que aún pueden aportar los productos i..n-1
+        suffix = [0.0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + max(0.0, max(o.benchmark - o.lower_bound_cost for o in self.products[i]))
+
+        best_value, _ = self._value(incumbent)
+        best = incumbent
+        state: Dict[Tuple[str, ...], Tuple[float, int]] = {}
+        path: List[_Option] = []
+        deadline = time.monotonic() + self.time_budget
+        nodes = 0
+
+        def search(i: int, gain: float, cost: float):
+            nonlocal best_value, best, nodes
+            nodes += 1
+            if nodes % _TIMER_CHECK_EVERY == 0 and time.monotonic() > deadline:
+                raise _SearchTimeout(best)
+            value = gain - cost
+            if cost <= self.budget + 1e-9 and value > best_value + 1e-9:
+                best_value, best = value, list(path)
+            if i == n or value + suffix[i] <= best_value + 1e-9:
+                return
+            for opt in self.products[i]:
+                items_total, count = state.get(opt.group, (0.0, 0))
+                before = self.group_cost(opt.group, items_total, count)
+                after = self.group_cost(opt.group, items_total + opt.price, count + 1)
+                new_cost = cost + after - before
+                if new_cost - self.max_refund > self.budget + 1e-9:
+                    continue
+                state[opt.group] = (items_total + opt.price, count + 1)
+                path.append(opt)
+                search(i + 1, gain + opt.benchmark, new_cost)
+                path.pop()
+                if count:
+                    state[opt.group] = (items_total, count)
+                else:
+                    del state[opt.group]
+            search(i + 1, gain, cost)
+
+        search(0, 0.0, 0.0)
+        return best
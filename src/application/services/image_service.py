@@ -0,0 +1,271 @@
+import asyncio
+import io
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.core.config import settings
+
+# Variantes generadas en una sola pasada: nombre -> lado máximo en px (None = original)
+IMAGE_VARIANTS: Dict[str, Optional[int]] = {"full": None, "card": 600, "thumb": 200}
+IMAGE_EXTENSIONS = [".webp", ".jpg", ".jpeg", ".png"]
+# Un producto sin URL de imagen no se vuelve a consultar hasta pasado este tiempo
+NEGATIVE_TTL = 600
+# Si todas las descargas fallaron (red, 404 de la tienda) se reintenta antes
+FAILED_TTL = 60
+# Caché de carpetas personalizadas de usuario (pc/mobile_image_path)
+USER_DIRS_TTL = 60
+
+_DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+}
+
+
+def variant_filename(product_id: int, variant: str = "full") -> str:
+    return f"{product_id}.webp" if variant == "full" else f"{product_id}_{variant}.webp"
+
+
+def render_variants(data: bytes, cache_dir: str, product_id: int, variants: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Decodifica UNA vez la imagen y escribe las variantes WebP pedidas (todas por
+    defecto) con escritura atómica. Se ejecuta en el pool de procesos: sólo
+    recibe bytes y rutas.
+    """
+    from PIL import Image
+
+    paths = {}
+    wanted = variants or list(IMAGE_VARIANTS)
+    with Image.open(io.BytesIO(data)) as img:
+        if img.mode in ("RGBA", "LA"):
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        for variant in wanted:
+            max_side = IMAGE_VARIANTS[variant]
+            out = img
+            if max_side and max(img.size) > max_side:
+                out = img.copy()
+                out.thumbnail((max_side, max_side))
+            dest = os.path.join(cache_dir, variant_filename(product_id, variant))
+            tmp = f"{dest}.tmp"
+            out.save(tmp, "WEBP", quality=85)
+            os.replace(tmp, dest)
+            paths[variant] = dest
+    return paths
+
+
+class ProductImageService:
+    """
+    Phase 101: Caché de imágenes de producto.
+
+    - Singleflight: peticiones concurrentes del mismo producto sin cachear
+      esperan a la misma descarga en vez de repetirla.
+    - Decodificación + WebP en un pool de procesos (nunca en el event loop),
+      generando thumb/card/full en una sola pasada.
+    - Índice en memoria de rutas resueltas (positivas) y de productos sin
+      imagen (negativas, con TTL) para no sondear el disco ni la DB en cada
+      petición.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = settings.IMAGE_PROCESS_WORKERS if workers is None else workers
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._paths: Dict[Tuple[str, int, str], str] = {}
+        self._missing: Dict[Tuple[str, int], float] = {}
+        self._user_dirs: Dict[int, Tuple[float, List[str]]] = {}
+
+    # --- Pool de conversión -------------------------------------------------------------
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None  # pool de hilos por defecto del loop
+        with self._executor_lock:
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError) as e:
+                    # Entornos sin multiprocessing (sandbox, /dev/shm ausente): se degrada a hilos
+                    logger.warning(f"⚠️ Pool de procesos de imágenes no disponible ({e}). Usando hilos.")
+                    self.workers = 0
+            return self._executor
+
+    async def _convert(self, data: bytes, cache_dir: str, product_id: int, variants: Optional[List[str]] = None) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), render_variants, data, cache_dir, product_id, variants)
+        except BrokenProcessPool:
+            # Un worker murió (OOM con una imagen enorme): se recrea el pool en la próxima conversión
+            logger.warning(f"⚠️ Pool de procesos de imágenes roto convirtiendo el producto {product_id}. Reiniciando.")
+            with self._executor_lock:
+                self._executor = None
+            raise
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # --- Índice de rutas --------------------------------------------------------------------
+
+    def cached_path(self, product_id: int, variant: str = "full") -> Optional[str]:
+        """Ruta en la caché del servidor (índice en memoria; el disco sólo se sondea la primera vez)."""
+        cache_dir = settings.IMAGE_CACHE_DIR
+        key = (cache_dir, product_id, variant)
+        path = self._paths.get(key)
+        if path:
+            if os.path.exists(path):
+                return path
+            self._paths.pop(key, None)  # borrada por mantenimiento
+
+        names = [variant_filename(product_id, variant)]
+        if variant == "full":
+            names += [f"{product_id}{ext}" for ext in IMAGE_EXTENSIONS[1:]]
+        for name in names:
+            candidate = os.path.join(cache_dir, name)
+            if os.path.exists(candidate) and os.path.getsize(candidate) > 0:
+                self._paths[key] = candidate
+                return candidate
+        return None
+
+    def is_known_missing(self, product_id: int) -> bool:
+        expiry = self._missing.get((settings.IMAGE_CACHE_DIR, product_id))
+        return expiry is not None and expiry > time.monotonic()
+
+    def invalidate(self, product_id: Optional[int] = None):
+        if product_id is None:
+            self._paths.clear()
+            self._missing.clear()
+            return
+        self._paths = {k: v for k, v in self._paths.items() if k[1] != product_id}
+        self._missing = {k: v for k, v in self._missing.items() if k[1] != product_id}
+
+    # --- Carpetas personalizadas del usuario ----------------------------------------------
+
+    def _load_user_dirs(self, user_id: int) -> List[str]:
+        now = time.monotonic()
+        cached = self._user_dirs.get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        from src.infrastructure.database_cloud import SessionCloud
+        from src.domain.models import UserModel
+        with SessionCloud() as db:
+            row = db.query(UserModel.pc_image_path, UserModel.mobile_image_path).filter(UserModel.id == user_id).first()
+        dirs = [d for d in (row or ()) if d]
+        self._user_dirs[user_id] = (now + USER_DIRS_TTL, dirs)
+        return dirs
+
+    def invalidate_user(self, user_id: Optional[int] = None):
+        if user_id is None:
+            self._user_dirs.clear()
+            return
+        self._user_dirs.pop(user_id, None)
+
+    def custom_path(self, user_id: int, product_id: int) -> Optional[str]:
+        """Imagen en las carpetas personalizadas del usuario (bloqueante: llamar fuera del loop)."""
+        for custom_dir in self._load_user_dirs(user_id):
+            for ext in IMAGE_EXTENSIONS:
+                file_path = os.path.join(custom_dir, f"{product_id}{ext}")
+                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+                    return file_path
+        return None
+
+    # --- Descarga bajo demanda -------------------------------------------------------------
+
+    async def fetch_and_cache(self, product_id: int, variant: str = "full") -> Optional[str]:
+        """Descarga + convierte la imagen del producto una sola vez aunque lleguen N peticiones."""
+        cache_dir = settings.IMAGE_CACHE_DIR
+        if self.is_known_missing(product_id):
+            return None
+
+        key = (cache_dir, product_id)
+        future = self._inflight.get(key)
+        if future is None or future.get_loop() is not asyncio.get_running_loop():
+            future = asyncio.ensure_future(self._fetch(product_id, cache_dir))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self._inflight.pop(k, None) if self._inflight.get(k) is f else None)
+
+        paths = await asyncio.shield(future)
+        if not paths:
+            return None
+        return paths.get(variant) or paths.get("full")
+
+    async def _fetch(self, product_id: int, cache_dir: str) -> Optional[Dict[str, str]]:
+        from src.core.concurrency import run_blocking
+
+        os.makedirs(cache_dir, exist_ok=True)
+        full = os.path.join(cache_dir, variant_filename(product_id, "full"))
+        if os.path.exists(full) and os.path.getsize(full) > 0:
+            # Original ya cacheado (versiones previas sólo guardaban `full`): se generan
+            # las variantes reducidas desde disco sin recomprimir el original
+            with open(full, "rb") as f:
+                data = f.read()
+            paths = await self._convert(data, cache_dir, product_id, [v for v in IMAGE_VARIANTS if v != "full"])
+            paths["full"] = full
+            self._remember(cache_dir, product_id, paths)
+            return paths
+
+        candidate_urls = await run_blocking(_candidate_urls, product_id)
+        if not candidate_urls:
+            self._missing[(cache_dir, product_id)] = time.monotonic() + NEGATIVE_TTL
+            return None
+
+        import httpx
+
+        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True, headers=_DOWNLOAD_HEADERS) as client:
+            for image_url in candidate_urls:
+                if not image_url or not image_url.startswith("http"):
+                    continue
+                try:
+                    resp = await client.get(image_url)
+                    status_code = getattr(resp, "status_code", 200)
+                    if status_code == 200 and len(resp.content) > 50:
+                        paths = await self._convert(resp.content, cache_dir, product_id)
+                        self._remember(cache_dir, product_id, paths)
+                        logger.info(f"📸 Imagen del producto {product_id} descargada y cacheada en WebP ({', '.join(paths)}) desde {image_url}.")
+                        return paths
+                except Exception as e:
+                    logger.warning(f"⚠️ Error intentando descargar desde {image_url} para producto {product_id}: {e}")
+
+        self._missing[(cache_dir, product_id)] = time.monotonic() + FAILED_TTL
+        return None
+
+    def _remember(self, cache_dir: str, product_id: int, paths: Dict[str, str]):
+        for variant, path in paths.items():
+            self._paths[(cache_dir, product_id, variant)] = path
+        self._missing.pop((cache_dir, product_id), None)
+
+
+def _candidate_urls(product_id: int) -> List[str]:
+    from src.infrastructure.database_cloud import SessionCloud
+    from src.domain.models import ProductModel, OfferModel
+
+    candidate_urls = []
+    with SessionCloud() as db:
+        image_url = db.query(ProductModel.image_url).filter(ProductModel.id == product_id).scalar()
+        if image_url:
+            candidate_urls.append(image_url)
+
+        offer_urls = db.query(OfferModel.image_url).filter(
+            OfferModel.product_id == product_id, OfferModel.image_url.is_not(None)
+        ).all()
+        for (url,) in offer_urls:
+            if url and url not in candidate_urls:
+                candidate_urls.append(url)
+    return candidate_urls
+
+
+# Instancia única para toda la app
+image_service = ProductImageService()
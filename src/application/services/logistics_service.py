@@ -1,35 +1,18 @@
 from datetime import datetime, timezone
-from typing import Dict, Optional, List
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, List, Tuple
 from src.domain.models import LogisticRuleModel
 from src.infrastructure.database_cloud import SessionCloud
+from src.infrastructure.repositories.logistic_rules_cache import (  # noqa: F401 (SHOP_ALIASES re-exportado)
+    SHOP_ALIASES,
+    RulesSnapshot,
+    canonical_shop_name,
+    logistic_rules_cache,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-SHOP_ALIASES = {
-    "toymi": "ToymiEU",
-    "toymieu": "ToymiEU",
-    "fantasia": "Fantasia Personajes",
-    "fantasia personajes": "Fantasia Personajes",
-    "tradeinn": "Tradeinn",
-    "tradeinn (kidinn)": "Tradeinn",
-    "tradeinn (techinn)": "Tradeinn",
-    "tradeinn (dressinn)": "Tradeinn",
-    "kidinn": "Tradeinn",
-    "techinn": "Tradeinn",
-    "wallapop": "Wallapop",
-    "wallapopmanual": "Wallapop",
-    "ebay": "Ebay.es",
-    "ebay.es": "Ebay.es",
-    "ebay.com": "Ebay.es",
-    "ebay es": "Ebay.es",
-    "frikimaz": "Frikimaz",
-    "triguetech": "Triguetech",
-    "lamansiondelterror": "LaMansionDelTerror",
-    "la mansion del terror": "LaMansionDelTerror",
-    "vinted": "Vinted",
-}
-
 DEFAULT_FALLBACK_RULE = LogisticRuleModel(
     shop_name="Standard",
     country_code="ES",
@@ -50,10 +33,7 @@ class LogisticsService:
     @staticmethod
     def normalize_shop_name(shop_name: str) -> str:
         """Normaliza el nombre de la tienda para resolver alias conocidos."""
-        if not shop_name:
-            return ""
-        clean = shop_name.strip()
-        return SHOP_ALIASES.get(clean.lower(), clean)
+        return canonical_shop_name(shop_name)
 
     @staticmethod
     def _resolve_rule(
@@ -62,6 +42,10 @@ class LogisticsService:
         rules_map: Dict[str, LogisticRuleModel]
     ) -> Optional[LogisticRuleModel]:
         """Resuelve la regla logística para una tienda y ubicación con fallback inteligente."""
+        if isinstance(rules_map, RulesSnapshot):
+            # Phase 109: resolución precalculada/memoizada en la instantánea compartida
+            return rules_map.resolve(shop_name, user_location)
+
         canonical = LogisticsService.normalize_shop_name(shop_name)
         
         # 1. Búsqueda exacta
@@ -82,16 +66,62 @@ class LogisticsService:
 
         return None
 
+    @staticmethod
+    def load_rules_map(db=None) -> RulesSnapshot:
+        """
+        Reglas logísticas indexadas por `{tienda}_{país}`.
+        Phase 109: instantánea inmutable de LogisticRulesCache; sólo consulta la DB
+        en frío, tras una escritura o en la comprobación periódica de versión.
+        """
+        snapshot = logistic_rules_cache.fresh()
+        if snapshot is not None:
+            return snapshot
+        if db is not None:
+            return logistic_rules_cache.load(db)
+        with SessionCloud() as own_db:
+            return logistic_rules_cache.load(own_db)
+
     @staticmethod
     def get_landing_price(price: float, shop_name: str, user_location: str = "ES", item_count: int = 1) -> float:
         """
         Calcula el 'Precio de Aterrizaje' sumando IVA/Tasas y Gastos de Envío.
-        Versión Estándar (Consulta DB individual).
+        Versión Estándar (reglas de la caché compartida). Para listas usar get_landing_prices.
         """
-        with SessionCloud() as db:
-            rules = db.query(LogisticRuleModel).all()
-            rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
-            return LogisticsService.optimized_get_landing_price(price, shop_name, user_location, rules_map, item_count)
+        rules_map = LogisticsService.load_rules_map()
+        return LogisticsService.optimized_get_landing_price(price, shop_name, user_location, rules_map, item_count)
+
+    @staticmethod
+    def resolve_rules(
+        shop_names: Iterable[str],
+        user_location: str,
+        rules_map: Mapping[str, LogisticRuleModel]
+    ) -> Mapping[str, Optional[LogisticRuleModel]]:
+        """Resuelve una vez la regla de cada tienda distinta (tabla inmutable tienda -> regla)."""
+        resolved = {}
+        for shop_name in shop_names:
+            if shop_name not in resolved:
+                resolved[shop_name] = LogisticsService._resolve_rule(shop_name, user_location, rules_map)
+        return MappingProxyType(resolved)
+
+    @staticmethod
+    def get_landing_prices(
+        offers: Iterable[Tuple[float, str]],
+        user_location: str = "ES",
+        rules_map: Optional[Mapping[str, LogisticRuleModel]] = None,
+        item_count: int = 1
+    ) -> List[float]:
+        """
+        Phase 108: precio de aterrizaje para un lote de pares (precio, tienda).
+        Las reglas se cargan (si no se pasan) y se resuelven una sola vez por tienda,
+        así el coste en consultas es constante sea cual sea el tamaño del lote.
+        """
+        offers = list(offers)
+        if not offers:
+            return []
+        if rules_map is None:
+            rules_map = LogisticsService.load_rules_map()
+        table = LogisticsService.resolve_rules((shop for _, shop in offers), user_location, rules_map)
+        return [LogisticsService._apply_rule(price, table[shop], item_count) for price, shop in offers]
 
     @staticmethod
     def optimized_get_landing_price(
@@ -108,6 +138,11 @@ class LogisticsService:
         rule = LogisticsService._resolve_rule(shop_name, user_location, rules_map)
         return LogisticsService._apply_rule(price, rule, item_count)
 
+    @staticmethod
+    def is_p2p_rule(rule: Optional[LogisticRuleModel]) -> bool:
+        """Marketplaces P2P: cada oferta es un vendedor distinto (envío propio por ítem)."""
+        return bool(rule) and (rule.strategy_key == "p2p_insurance" or rule.shop_name in ("Ebay.es", "Wallapop", "Vinted"))
+
     @staticmethod
     def _apply_rule(price: float, rule: Optional[LogisticRuleModel], item_count: int = 1) -> float:
         """Aplica la lógica de la regla logística (IVA, Envío, Tasas, Seguros P2P)."""
@@ -115,52 +150,61 @@ class LogisticsService:
             return 0.0
         if not rule:
             return round(price, 2)
-            
-        from src.application.services.currency_service import CurrencyService
 
         item_count = max(1, item_count)
-        current_price = price
+        total_landing = LogisticsService.basket_landed_total(price * item_count, rule, item_count)
+        return round(total_landing / item_count, 2)
+
+    @staticmethod
+    def basket_landed_total(
+        items_total: float,
+        rule: Optional[LogisticRuleModel],
+        item_count: int = 1,
+        usd_rate: Optional[float] = None
+    ) -> float:
+        """
+        Coste total puesto en casa (sin redondear) de un pedido de `item_count` ítems
+        que suman `items_total` en una misma tienda: envío compartido, umbral de envío
+        gratis, IVA y tasas. `usd_rate` permite fijar el cambio en cálculos masivos.
+        """
+        if not rule:
+            return items_total
+
+        item_count = max(1, item_count)
         base_shipping = rule.base_shipping
         strategy = rule.strategy_key
 
         # 1. BigBadToyStore: USD -> EUR + 8$ envío por ítem + 21% IVA sobre total
         if rule.shop_name == "BigBadToyStore" or strategy == "bbts_flat_rate":
-            usd_rate = CurrencyService.get_usd_to_eur_rate()
+            if usd_rate is None:
+                from src.application.services.currency_service import CurrencyService
+                usd_rate = CurrencyService.get_usd_to_eur_rate()
             # 8$ de envío por ítem
             shipping_usd = 8.00 * item_count
-            total_items_usd = price * item_count
-            total_taxable_usd = total_items_usd + shipping_usd
+            total_taxable_usd = items_total + shipping_usd
             total_taxable_eur = total_taxable_usd * usd_rate
-            total_landing = total_taxable_eur * 1.21 + rule.custom_fees
-            return round(total_landing / item_count, 2)
+            return total_taxable_eur * 1.21 + rule.custom_fees
 
         # 2. P2P Marketplaces (Ebay.es, Wallapop, Vinted): Envío 5€ + 2% Seguro sobre ítem
-        if strategy == "p2p_insurance" or rule.shop_name in ("Ebay.es", "Wallapop", "Vinted"):
-            total_items = current_price * item_count
-            insurance_fee = total_items * 0.02 # 2% de protección
+        if LogisticsService.is_p2p_rule(rule):
+            insurance_fee = items_total * 0.02 # 2% de protección
             shipping_cost = 5.00
-            total_landing = total_items + insurance_fee + shipping_cost + rule.custom_fees
-            return round(total_landing / item_count, 2)
+            return items_total + insurance_fee + shipping_cost + rule.custom_fees
 
         # 3. Triguetech: Tarifa plana fija de 7€ independientemente de los ítems
         if strategy == "triguetech_flat_rate" or rule.shop_name == "Triguetech":
-            total_items = current_price * item_count
             shipping_cost = 7.00
-            total_landing = (total_items + shipping_cost) * rule.vat_multiplier + rule.custom_fees
-            return round(total_landing / item_count, 2)
+            return (items_total + shipping_cost) * rule.vat_multiplier + rule.custom_fees
 
         # 4. Tiendas estándar con posible umbral de envío gratis
-        total_items_price = current_price * item_count
         shipping_cost = base_shipping
 
         # Umbral de envío gratis
-        if rule.free_shipping_threshold > 0 and total_items_price >= rule.free_shipping_threshold:
+        if rule.free_shipping_threshold > 0 and items_total >= rule.free_shipping_threshold:
             shipping_cost = 0.0
 
-        total_taxable = total_items_price + shipping_cost
-        total_landing = (total_taxable * rule.vat_multiplier) + rule.custom_fees
-        
-        return round(total_landing / item_count, 2)
+        total_taxable = items_total + shipping_cost
+        return (total_taxable * rule.vat_multiplier) + rule.custom_fees
 
     @staticmethod
     def calculate_roi(market_value: float, landing_price: float) -> float:
@@ -192,116 +236,114 @@ class LogisticsService:
         """
         from src.application.services.currency_service import CurrencyService
         
-        with SessionCloud() as db:
-            rules = db.query(LogisticRuleModel).all()
-            rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
-            
-            # 1. Agrupar por Tienda Canónica
-            shops_data = {}
-            for item in items:
-                raw_shop = item.get("shop_name", "Desconocido")
-                canonical_shop = LogisticsService.normalize_shop_name(raw_shop)
-                
-                if canonical_shop not in shops_data:
-                    shops_data[canonical_shop] = {
-                        "display_name": canonical_shop,
-                        "items": [],
-                        "total_qty": 0,
-                        "base_total_eur": 0.0,
-                        "rule": LogisticsService._resolve_rule(canonical_shop, user_location, rules_map)
-                    }
-                
-                rule = shops_data[canonical_shop]["rule"]
-                price = float(item.get("price", 0.0))
-                price_eur = price
-
-                # Conversión USD para BBTS
-                if rule and (rule.shop_name == "BigBadToyStore" or rule.strategy_key == "bbts_flat_rate"):
-                    rate = CurrencyService.get_usd_to_eur_rate()
-                    price_eur = price * rate
-                
-                qty = int(item.get("quantity", 1))
-                shops_data[canonical_shop]["items"].append({
-                    "name": item.get("product_name", "Desconocido"),
-                    "unit_price": price,
-                    "unit_price_eur": round(price_eur, 2),
-                    "quantity": qty,
-                    "subtotal_eur": round(price_eur * qty, 2)
-                })
-                shops_data[canonical_shop]["total_qty"] += qty
-                shops_data[canonical_shop]["base_total_eur"] += (price_eur * qty)
+        rules_map = LogisticsService.load_rules_map()
 
-            # 2. Aplicar Reglas por Tienda
-            breakdown = []
-            grand_total_eur = 0.0
+        # 1. Agrupar por Tienda Canónica
+        shops_data = {}
+        for item in items:
+            raw_shop = item.get("shop_name", "Desconocido")
+            canonical_shop = LogisticsService.normalize_shop_name(raw_shop)
             
-            for shop_name, data in shops_data.items():
-                rule = data["rule"]
-                item_count = data["total_qty"]
-                base_total = data["base_total_eur"]
-
-                if not rule:
-                    # Tienda sin regla en DB -> PENDING_RULES
-                    shop_total = base_total
-                    breakdown.append({
-                        "shop": shop_name,
-                        "status": "PENDING_RULES",
-                        "items": data["items"],
-                        "shipping_eur": 0.0,
-                        "tax_eur": 0.0,
-                        "total_eur": round(shop_total, 2)
-                    })
-                    grand_total_eur += shop_total
-                    continue
-
-                strategy = rule.strategy_key
-
-                # Caso A: BigBadToyStore (USD $8/item + 21% IVA)
-                if rule.shop_name == "BigBadToyStore" or strategy == "bbts_flat_rate":
-                    rate = CurrencyService.get_usd_to_eur_rate()
-                    shipping_usd = 8.00 * item_count
-                    shipping_eur = shipping_usd * rate
-                    total_taxable = base_total + shipping_eur
-                    tax_amount = total_taxable * 0.21 # 21% IVA
-                    total_final = total_taxable + tax_amount + rule.custom_fees
-
-                # Caso B: P2P Marketplaces (Ebay.es, Wallapop, Vinted): Envío 5€ + 2% Seguro
-                elif strategy == "p2p_insurance" or rule.shop_name in ("Ebay.es", "Wallapop", "Vinted"):
-                    shipping_eur = 5.00
-                    tax_amount = base_total * 0.02 # Seguro de protección 2%
-                    total_final = base_total + shipping_eur + tax_amount + rule.custom_fees
-
-                # Caso C: Triguetech (7.00€ tarifa plana fija por pedido)
-                elif strategy == "triguetech_flat_rate" or rule.shop_name == "Triguetech":
-                    shipping_eur = 7.00
-                    tax_amount = 0.0
-                    total_final = base_total + shipping_eur + rule.custom_fees
-
-                # Caso D: Tiendas estándar (Frikimaz > 69€ gratis, etc.)
-                else:
-                    shipping_eur = rule.base_shipping
-                    if rule.free_shipping_threshold > 0 and base_total >= rule.free_shipping_threshold:
-                        shipping_eur = 0.0
-                    
-                    total_taxable = base_total + shipping_eur
-                    total_final = (total_taxable * rule.vat_multiplier) + rule.custom_fees
-                    tax_amount = total_taxable * (rule.vat_multiplier - 1)
-
+            if canonical_shop not in shops_data:
+                shops_data[canonical_shop] = {
+                    "display_name": canonical_shop,
+                    "items": [],
+                    "total_qty": 0,
+                    "base_total_eur": 0.0,
+                    "rule": LogisticsService._resolve_rule(canonical_shop, user_location, rules_map)
+                }
+            
+            rule = shops_data[canonical_shop]["rule"]
+            price = float(item.get("price", 0.0))
+            price_eur = price
+
+            # Conversión USD para BBTS
+            if rule and (rule.shop_name == "BigBadToyStore" or rule.strategy_key == "bbts_flat_rate"):
+                rate = CurrencyService.get_usd_to_eur_rate()
+                price_eur = price * rate
+            
+            qty = int(item.get("quantity", 1))
+            shops_data[canonical_shop]["items"].append({
+                "name": item.get("product_name", "Desconocido"),
+                "unit_price": price,
+                "unit_price_eur": round(price_eur, 2),
+                "quantity": qty,
+                "subtotal_eur": round(price_eur * qty, 2)
+            })
+            shops_data[canonical_shop]["total_qty"] += qty
+            shops_data[canonical_shop]["base_total_eur"] += (price_eur * qty)
+
+        # 2. Aplicar Reglas por Tienda
+        breakdown = []
+        grand_total_eur = 0.0
+        
+        for shop_name, data in shops_data.items():
+            rule = data["rule"]
+            item_count = data["total_qty"]
+            base_total = data["base_total_eur"]
+
+            if not rule:
+                # Tienda sin regla en DB -> PENDING_RULES
+                shop_total = base_total
                 breakdown.append({
                     "shop": shop_name,
-                    "status": "CALCULATED",
+                    "status": "PENDING_RULES",
                     "items": data["items"],
-                    "total_items_qty": item_count,
-                    "shipping_eur": round(shipping_eur, 2),
-                    "tax_eur": round(tax_amount, 2),
-                    "fees_eur": round(rule.custom_fees, 2),
-                    "total_eur": round(total_final, 2)
+                    "shipping_eur": 0.0,
+                    "tax_eur": 0.0,
+                    "total_eur": round(shop_total, 2)
                 })
-                grand_total_eur += total_final
-
-            return {
-                "breakdown": breakdown,
-                "grand_total_eur": round(grand_total_eur, 2),
-                "user_location": user_location,
-                "timestamp": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
-            }
+                grand_total_eur += shop_total
+                continue
+
+            strategy = rule.strategy_key
+
+            # Caso A: BigBadToyStore (USD $8/item + 21% IVA)
+            if rule.shop_name == "BigBadToyStore" or strategy == "bbts_flat_rate":
+                rate = CurrencyService.get_usd_to_eur_rate()
+                shipping_usd = 8.00 * item_count
+                shipping_eur = shipping_usd * rate
+                total_taxable = base_total + shipping_eur
+                tax_amount = total_taxable * 0.21 # 21% IVA
+                total_final = total_taxable + tax_amount + rule.custom_fees
+
+            # Caso B: P2P Marketplaces (Ebay.es, Wallapop, Vinted): Envío 5€ + 2% Seguro
+            elif strategy == "p2p_insurance" or rule.shop_name in ("Ebay.es", "Wallapop", "Vinted"):
+                shipping_eur = 5.00
+                tax_amount = base_total * 0.02 # Seguro de protección 2%
+                total_final = base_total + shipping_eur + tax_amount + rule.custom_fees
+
+            # Caso C: Triguetech (7.00€ tarifa plana fija por pedido)
+            elif strategy == "triguetech_flat_rate" or rule.shop_name == "Triguetech":
+                shipping_eur = 7.00
+                tax_amount = 0.0
+                total_final = base_total + shipping_eur + rule.custom_fees
+
+            # Caso D: Tiendas estándar (Frikimaz > 69€ gratis, etc.)
+            else:
+                shipping_eur = rule.base_shipping
+                if rule.free_shipping_threshold > 0 and base_total >= rule.free_shipping_threshold:
+                    shipping_eur = 0.0
+                
+                total_taxable = base_total + shipping_eur
+                total_final = (total_taxable * rule.vat_multiplier) + rule.custom_fees
+                tax_amount = total_taxable * (rule.vat_multiplier - 1)
+
+            breakdown.append({
+                "shop": shop_name,
+                "status": "CALCULATED",
+                "items": data["items"],
+                "total_items_qty": item_count,
+                "shipping_eur": round(shipping_eur, 2),
+                "tax_eur": round(tax_amount, 2),
+                "fees_eur": round(rule.custom_fees, 2),
+                "total_eur": round(total_final, 2)
+            })
+            grand_total_eur += total_final
+
+        return {
+            "breakdown": breakdown,
+            "grand_total_eur": round(grand_total_eur, 2),
+            "user_location": user_location,
+            "timestamp": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        }
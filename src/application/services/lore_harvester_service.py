@@ -1,16 +1,23 @@
+import hashlib
+import json
 import logging
 import re
 import urllib.parse
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import bindparam, or_, select, update
 
-from src.domain.models import CharacterLoreModel, ProductModel
+from src.domain.models import CharacterLoreModel, ProductModel, SystemConfigModel
 from src.domain.motu_canon_database import MOTU_LORE_ENCYCLOPEDIA
 
 logger = logging.getLogger("oraculo.lore_harvester")
 
+# Clave en system_config con la huella de la última siembra aplicada
+LORE_SEED_CONFIG_KEY = "lore_seed_fingerprint"
+# Subir al cambiar resolve_character_slug/normalize_slug: fuerza a re-vincular todo el catálogo
+SLUG_RESOLVER_VERSION = 1
+
 class LoreHarvesterService:
     """
     Servicio de Gestión de Lore y Entidades Canónicas MOTU.
@@ -211,20 +218,36 @@ class LoreHarvesterService:
         }
 
     @classmethod
-    def seed_initial_catalog(cls, db: Session) -> Dict[str, int]:
+    def seed_fingerprint(cls) -> str:
+        """Huella de MOTU_LORE_ENCYCLOPEDIA + versión del resolutor de slugs."""
+        payload = json.dumps(MOTU_LORE_ENCYCLOPEDIA, sort_keys=True, ensure_ascii=False, default=str)
+        return f"v{SLUG_RESOLVER_VERSION}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    def seed_initial_catalog(cls, db: Session, force: bool = False) -> Dict[str, Any]:
         """
-        Siembra la enciclopedia canónica en BD y vincula el 100% de los 507 productos existentes.
+        Siembra la enciclopedia canónica en BD y vincula los productos del catálogo.
+
+        Phase 103: idempotente. Si la huella guardada en system_config coincide con la
+        de la enciclopedia actual (arranque normal), no se toca character_lore y sólo
+        se vinculan los productos sin character_slug (altas nuevas). En otro caso (o con
+        `force`) se insertan los personajes que falten y se re-resuelve el catálogo,
+        pero sólo se escriben, con un UPDATE en bloque, los slugs que cambian.
         """
+        fingerprint = cls.seed_fingerprint()
+        cfg = db.get(SystemConfigModel, LORE_SEED_CONFIG_KEY)
+        up_to_date = not force and cfg is not None and cfg.value == fingerprint
         seeded_count = 0
-        linked_products = 0
 
-        # 1. Sembrar personajes canónicos de MOTU_LORE_ENCYCLOPEDIA
-        for key, data in MOTU_LORE_ENCYCLOPEDIA.items():
-            slug = key.replace(' ', '_').replace('-', '_')
-            existing = db.query(CharacterLoreModel).filter(CharacterLoreModel.slug == slug).first()
-            if not existing:
+        # 1. Sembrar personajes canónicos de MOTU_LORE_ENCYCLOPEDIA que aún no existan
+        if not up_to_date:
+            existing_slugs = set(db.scalars(select(CharacterLoreModel.slug)))
+            for key, data in MOTU_LORE_ENCYCLOPEDIA.items():
+                slug = key.replace(' ', '_').replace('-', '_')
+                if slug in existing_slugs:
+                    continue
                 stats = data.get("stats", {})
-                new_char = CharacterLoreModel(
+                db.add(CharacterLoreModel(
                     slug=slug,
                     canonical_name=data.get("canonical_name", key.title()),
                     faction=data.get("faction", "Guerreros Heroicos"),
@@ -239,22 +262,38 @@ class LoreHarvesterService:
                     agilidad=stats.get("agilidad", 85),
                     is_verified=True,
                     source_url="Canon MOTU Local"
-                )
-                db.add(new_char)
+                ))
+                existing_slugs.add(slug)
                 seeded_count += 1
 
-        db.commit()
+        # 2. Vincular character_slug sólo donde el slug resuelto difiere del guardado
+        query = db.query(ProductModel.id, ProductModel.name, ProductModel.character_slug)
+        if up_to_date:
+            query = query.filter(ProductModel.character_slug == None)
+        changes = []
+        for product_id, name, current_slug in query:
+            slug = cls.resolve_character_slug(name)
+            if slug != current_slug:
+                changes.append({"pid": product_id, "slug": slug})
 
-        # 2. Asignar character_slug a todos los productos del catálogo
-        products = db.query(ProductModel).all()
-        for p in products:
-            slug = cls.resolve_character_slug(p.name)
-            p.character_slug = slug
-            linked_products += 1
+        if changes:
+            products = ProductModel.__table__
+            db.execute(
+                update(products).where(products.c.id == bindparam("pid")).values(character_slug=bindparam("slug")),
+                changes,
+            )
 
+        if cfg is None:
+            db.add(SystemConfigModel(key=LORE_SEED_CONFIG_KEY, value=fingerprint))
+        else:
+            cfg.value = fingerprint
         db.commit()
-        logger.info(f"✅ [LORE ENGINE SEED] {seeded_count} personajes sembrados, {linked_products} productos vinculados.")
-        return {"seeded_characters": seeded_count, "linked_products": linked_products}
+
+        if up_to_date and not changes:
+            logger.info("✅ [LORE ENGINE SEED] Enciclopedia sin cambios: nada que sembrar.")
+        else:
+            logger.info(f"✅ [LORE ENGINE SEED] {seeded_count} personajes sembrados, {len(changes)} productos (re)vinculados.")
+        return {"seeded_characters": seeded_count, "linked_products": len(changes), "up_to_date": up_to_date}
 
     @classmethod
     def list_characters(
@@ -1,10 +1,13 @@
-import logging
 import statistics
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any
+from itertools import groupby
+from typing import Dict, Any, Iterator, List, Tuple
 
 from loguru import logger
-from sqlalchemy import select, delete, and_
+from sqlalchemy import exists, func, insert, update
+from sqlalchemy.orm import aliased
 
 from src.domain.models import (
     ProductModel,
@@ -14,214 +17,232 @@ from src.domain.models import (
     ScraperExecutionLogModel,
     BlackcludedItemModel
 )
+from src.infrastructure.repositories.product_sync_log import prune_sync_log
+from src.application.services.market_analytics_service import MarketAnalyticsService
+
+TRUNCATED_LOG_MARKER = "Logs consolidados y purgados por mantenimiento FinOps."
+HISTORY_RETENTION_DAYS = 60
+SCRAPER_LOG_RETENTION_DAYS = 15
+BLACKLIST_RETENTION_DAYS = 90
+# Filas de price_history por lote del cursor y filas de estadísticas por executemany
+STREAM_BATCH_SIZE = 5000
+UPSERT_BATCH_SIZE = 1000
+
+MonthKey = Tuple[int, int, int, str]
+
+
+def _month_stats(price_list: List[float]) -> Dict[str, Any]:
+    """Métricas de un grupo producto/mes/canal (mismas reglas que la versión por producto)."""
+    count = len(price_list)
+    avg_p = float(statistics.mean(price_list))
+
+    # Cálculo de métricas avanzadas (mínimo 2 muestras)
+    if count >= 2:
+        try:
+            std_dev = float(statistics.stdev(price_list))
+        except Exception:
+            std_dev = 0.0
+
+        try:
+            q = statistics.quantiles(price_list, n=4)
+            p25 = float(q[0])
+            p75 = float(q[2])
+        except Exception:
+            p25 = avg_p
+            p75 = avg_p
+    else:
+        std_dev = 0.0
+        p25 = price_list[0]
+        p75 = price_list[0]
+
+    return {
+        "avg_price": avg_p,
+        "median_price": float(statistics.median(price_list)),
+        "min_price": float(min(price_list)),
+        "max_price": float(max(price_list)),
+        "std_dev_price": std_dev,
+        "p25_price": p25,
+        "p75_price": p75,
+        "offers_count": count,
+    }
+
 
 class MaintenanceService:
     @staticmethod
-    def compact_database(db) -> Dict[str, Any]:
+    @contextmanager
+    def _phase(timings: Dict[str, float], name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    @staticmethod
+    def _iter_monthly_groups(db) -> Iterator[Tuple[MonthKey, List[float]]]:
+        """
+        Una única consulta en streaming ordenada por producto/canal/fecha: cada mes
+        queda contiguo y se agrupa en memoria sin cargar el historial completo.
+        """
+        source = func.coalesce(OfferModel.source_type, "Retail")
+        rows = (
+            db.query(OfferModel.product_id, source, PriceHistoryModel.recorded_at, PriceHistoryModel.price)
+            .join(OfferModel, PriceHistoryModel.offer_id == OfferModel.id)
+            .filter(PriceHistoryModel.recorded_at != None)
+            .order_by(OfferModel.product_id, source, PriceHistoryModel.recorded_at)
+            .yield_per(STREAM_BATCH_SIZE)
+        )
+        for (product_id, source_type, year, month), group in groupby(
+            rows, key=lambda r: (r[0], r[1], r[2].year, r[2].month)
+        ):
+            yield (product_id, year, month, source_type), [float(r[3]) for r in group]
+
+    @classmethod
+    def _upsert_monthly_stats(cls, db, now: datetime) -> int:
+        """Recalcula product_monthly_stats con un upsert por lotes (executemany)."""
+        existing: Dict[MonthKey, int] = {
+            (r.product_id, r.year, r.month, r.source_type): r.id
+            for r in db.query(
+                ProductMonthlyStatsModel.id, ProductMonthlyStatsModel.product_id, ProductMonthlyStatsModel.year,
+                ProductMonthlyStatsModel.month, ProductMonthlyStatsModel.source_type
+            )
+        }
+        # Se calculan las métricas durante el streaming (sólo queda una fila por grupo) y
+        # se escribe después: el cursor abierto no debe convivir con executemany
+        groups = [(key, _month_stats(price_list)) for key, price_list in cls._iter_monthly_groups(db)]
+
+        to_insert, to_update, saved = [], [], 0
+
+        def _flush():
+            if to_insert:
+                db.execute(insert(ProductMonthlyStatsModel), to_insert)
+                to_insert.clear()
+            if to_update:
+                db.execute(update(ProductMonthlyStatsModel), to_update)
+                to_update.clear()
+
+        for (product_id, year, month, source_type), values in groups:
+            values["updated_at"] = now
+            stat_id = existing.get((product_id, year, month, source_type))
+            if stat_id is None:
+                to_insert.append({
+                    "product_id": product_id, "year": year, "month": month, "source_type": source_type, **values
+                })
+            else:
+                to_update.append({"id": stat_id, **values})
+            saved += 1
+            if len(to_insert) + len(to_update) >= UPSERT_BATCH_SIZE:
+                _flush()
+        _flush()
+        return saved
+
+    @classmethod
+    def compact_database(cls, db) -> Dict[str, Any]:
         """
         Orquesta el mantenimiento FinOps de la base de datos:
+        0. Materializa la serie diaria del Eternia Market Index antes de purgar historial (Phase 106).
         1. Consolida el historial detallado de price_history en product_monthly_stats con métricas avanzadas.
         2. Elimina ofertas de productos sin presencia actual en el mercado ("productos muertos").
         3. Purga el historial detallado antiguo (> 60 días) de productos activos ("productos vivos").
         4. Trunca logs extensos de scrapers antiguos (> 15 días).
         5. Purga exclusiones de la lista negra antiguas (> 90 días).
-        
+        6. Purga el diario de sync delta del catálogo (> 30 días, Phase 105).
+
+        Phase 107: cada paso es una operación por conjuntos (una consulta agregada en
+        streaming, upsert por lotes y DELETE/UPDATE masivos) en lugar de un bucle con
+        consultas y commit por producto. `timings` reporta los segundos de cada fase.
+
         Retorna estadísticas detalladas del proceso.
         """
         logger.info("🧹 Iniciando proceso de compactación y mantenimiento de base de datos...")
-        
+
         stats = {
             "products_processed": 0,
             "monthly_stats_saved": 0,
             "offers_purged": 0,
             "price_history_purged": 0,
             "logs_truncated": 0,
-            "blacklist_purged": 0
+            "blacklist_purged": 0,
+            "sync_log_purged": 0,
+            "market_index_rows": 0,
+            "timings": {}
         }
-        
+        timings = stats["timings"]
+        now = datetime.now(timezone.utc)
+
         try:
-            # 1. Obtener todos los productos
-            products = db.query(ProductModel).all()
-            stats["products_processed"] = len(products)
-            
-            # Fecha de corte para purga de historial (60 días)
-            now = datetime.now(timezone.utc)
-            history_cutoff = now - timedelta(days=60)
-            
-            for product in products:
-                # Obtener todos los precios históricos de este producto
-                prices_query = (
-                    db.query(
-                        PriceHistoryModel.price,
-                        PriceHistoryModel.recorded_at,
-                        OfferModel.source_type
-                    )
-                    .join(OfferModel, PriceHistoryModel.offer_id == OfferModel.id)
-                    .filter(OfferModel.product_id == product.id)
-                    .all()
-                )
-                
-                # Agrupar precios por año, mes y tipo de canal (Retail / P2P)
-                grouped_prices = {}
-                for price_val, recorded_at, source_type in prices_query:
-                    if not recorded_at:
-                        continue
-                    # Asegurar zona horaria UTC
-                    if recorded_at.tzinfo is None:
-                        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
-                        
-                    key = (recorded_at.year, recorded_at.month, source_type or "Retail")
-                    if key not in grouped_prices:
-                        grouped_prices[key] = []
-                    grouped_prices[key].append(price_val)
-                
-                # Calcular y guardar estadísticas mensuales consolidadas
-                for (year, month, source_type), price_list in grouped_prices.items():
-                    if not price_list:
-                        continue
-                    
-                    count = len(price_list)
-                    avg_p = float(statistics.mean(price_list))
-                    median_p = float(statistics.median(price_list))
-                    min_p = float(min(price_list))
-                    max_p = float(max(price_list))
-                    
-                    # Cálculo de métricas avanzadas (mínimo 2 muestras)
-                    if count >= 2:
-                        try:
-                            std_dev = float(statistics.stdev(price_list))
-                        except Exception:
-                            std_dev = 0.0
-                            
-                        try:
-                            q = statistics.quantiles(price_list, n=4)
-                            p25 = float(q[0])
-                            p75 = float(q[2])
-                        except Exception:
-                            p25 = avg_p
-                            p75 = avg_p
-                    else:
-                        std_dev = 0.0
-                        p25 = price_list[0]
-                        p75 = price_list[0]
-                        
-                    # Buscar si ya existe la fila en la tabla agregada
-                    stat_record = db.query(ProductMonthlyStatsModel).filter(
-                        and_(
-                            ProductMonthlyStatsModel.product_id == product.id,
-                            ProductMonthlyStatsModel.year == year,
-                            ProductMonthlyStatsModel.month == month,
-                            ProductMonthlyStatsModel.source_type == source_type
-                        )
-                    ).first()
-                    
-                    if not stat_record:
-                        stat_record = ProductMonthlyStatsModel(
-                            product_id=product.id,
-                            year=year,
-                            month=month,
-                            source_type=source_type
-                        )
-                        db.add(stat_record)
-                        
-                    stat_record.avg_price = avg_p
-                    stat_record.median_price = median_p
-                    stat_record.min_price = min_p
-                    stat_record.max_price = max_p
-                    stat_record.std_dev_price = std_dev
-                    stat_record.p25_price = p25
-                    stat_record.p75_price = p75
-                    stat_record.offers_count = count
-                    stat_record.updated_at = now
-                    
-                    stats["monthly_stats_saved"] += 1
-                
-                # Commiteamos los acumulados mensuales por producto para liberar memoria
+            # 0. Serie diaria del EMI (incremental): debe correr antes de la purga de price_history
+            with cls._phase(timings, "market_index"):
+                stats["market_index_rows"] = MarketAnalyticsService.refresh_daily_series(db)["index_rows_refreshed"]
                 db.commit()
-                
-                # 2. Gestionar la purga de ofertas detalladas e historial
-                # Comprobar si el producto tiene ofertas activas en el mercado actual
-                active_offers = (
+
+            # 1. Consolidación mensual: una sola pasada sobre price_history
+            with cls._phase(timings, "monthly_stats"):
+                stats["products_processed"] = db.query(func.count(ProductModel.id)).scalar()
+                stats["monthly_stats_saved"] = cls._upsert_monthly_stats(db, now)
+                db.commit()
+
+            # 2. PRODUCTOS MUERTOS: sin ninguna oferta disponible -> fuera historial y ofertas
+            with cls._phase(timings, "dead_products_purge"):
+                live_offer = aliased(OfferModel)
+                is_dead = ~exists().where(
+                    live_offer.product_id == OfferModel.product_id,
+                    live_offer.is_available == True
+                )
+                dead_offer_ids = db.query(OfferModel.id).filter(is_dead)
+                stats["price_history_purged"] += (
+                    db.query(PriceHistoryModel)
+                    .filter(PriceHistoryModel.offer_id.in_(dead_offer_ids.scalar_subquery()))
+                    .delete(synchronize_session=False)
+                )
+                stats["offers_purged"] = (
                     db.query(OfferModel)
+                    .filter(OfferModel.id.in_(dead_offer_ids.scalar_subquery()))
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+
+            # 3. PRODUCTOS VIVOS: el historial restante sólo pertenece a ellos -> purga > 60 días
+            with cls._phase(timings, "history_purge"):
+                history_cutoff = now - timedelta(days=HISTORY_RETENTION_DAYS)
+                stats["price_history_purged"] += (
+                    db.query(PriceHistoryModel)
+                    .filter(PriceHistoryModel.recorded_at < history_cutoff)
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+
+            # 4. Truncar logs de scrapers antiguos (> 15 días)
+            with cls._phase(timings, "logs_truncate"):
+                logs_cutoff = now - timedelta(days=SCRAPER_LOG_RETENTION_DAYS)
+                stats["logs_truncated"] = (
+                    db.query(ScraperExecutionLogModel)
                     .filter(
-                        OfferModel.product_id == product.id,
-                        OfferModel.is_available == True
+                        ScraperExecutionLogModel.start_time < logs_cutoff,
+                        ScraperExecutionLogModel.logs != None,
+                        ScraperExecutionLogModel.logs != TRUNCATED_LOG_MARKER
                     )
-                    .count()
+                    .update({ScraperExecutionLogModel.logs: TRUNCATED_LOG_MARKER}, synchronize_session=False)
                 )
-                
-                if active_offers == 0:
-                    # PRODUCTO MUERTO: Ya no hay ofertas activas.
-                    # Primero borramos todos los registros de historial de precios asociados
-                    deleted_history_count = (
-                        db.query(PriceHistoryModel)
-                        .filter(
-                            PriceHistoryModel.offer_id.in_(
-                                db.query(OfferModel.id).filter(OfferModel.product_id == product.id)
-                            )
-                        )
-                        .delete(synchronize_session=False)
-                    )
-                    stats["price_history_purged"] += deleted_history_count
 
-                    # Ahora borramos las ofertas inactivas de forma segura
-                    deleted_offers_count = (
-                        db.query(OfferModel)
-                        .filter(OfferModel.product_id == product.id)
-                        .delete(synchronize_session=False)
-                    )
-                    stats["offers_purged"] += deleted_offers_count
-                else:
-                    # PRODUCTO VIVO: Tiene ofertas activas.
-                    # Mantenemos las ofertas actuales y purgamos el historial price_history detallado antiguo (> 60 días).
-                    deleted_history_count = (
-                        db.query(PriceHistoryModel)
-                        .filter(
-                            PriceHistoryModel.recorded_at < history_cutoff,
-                            PriceHistoryModel.offer_id.in_(
-                                db.query(OfferModel.id).filter(OfferModel.product_id == product.id)
-                            )
-                        )
-                        .delete(synchronize_session=False)
-                    )
-                    stats["price_history_purged"] += deleted_history_count
-            
-            db.commit()
-            
-            # 3. Truncar logs de scrapers antiguos (> 15 días)
-            logs_cutoff = now - timedelta(days=15)
-            logs_to_truncate = (
-                db.query(ScraperExecutionLogModel)
-                .filter(
-                    ScraperExecutionLogModel.start_time < logs_cutoff,
-                    ScraperExecutionLogModel.logs != None,
-                    ScraperExecutionLogModel.logs != "Logs consolidados y purgados por mantenimiento FinOps."
+            # 5. Limpiar lista negra antigua (> 90 días)
+            with cls._phase(timings, "blacklist_purge"):
+                blacklist_cutoff = now - timedelta(days=BLACKLIST_RETENTION_DAYS)
+                stats["blacklist_purged"] = (
+                    db.query(BlackcludedItemModel)
+                    .filter(BlackcludedItemModel.created_at < blacklist_cutoff)
+                    .delete(synchronize_session=False)
                 )
-                .all()
-            )
-            
-            for log_record in logs_to_truncate:
-                log_record.logs = "Logs consolidados y purgados por mantenimiento FinOps."
-                stats["logs_truncated"] += 1
-                
-            if logs_to_truncate:
-                db.commit()
-                
-            # 4. Limpiar lista negra antigua (> 90 días)
-            blacklist_cutoff = now - timedelta(days=90)
-            deleted_blacklist_count = (
-                db.query(BlackcludedItemModel)
-                .filter(BlackcludedItemModel.created_at < blacklist_cutoff)
-                .delete(synchronize_session=False)
-            )
-            stats["blacklist_purged"] += deleted_blacklist_count
-            
+
+            # 6. Purgar el diario de sync delta (los clientes con cursores anteriores hacen full sync)
+            with cls._phase(timings, "sync_log_purge"):
+                stats["sync_log_purged"] = prune_sync_log(db)
+
             db.commit()
-            
+
             logger.info("✅ Compactación y mantenimiento de base de datos completados con éxito.")
             logger.info(f"Resumen de Optimización: {stats}")
             return stats
-            
+
         except Exception as e:
             db.rollback()
             logger.error(f"❌ Error durante el mantenimiento de base de datos: {e}")
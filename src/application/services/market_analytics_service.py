@@ -1,10 +1,38 @@
-from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from datetime import date, datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 from src.infrastructure.database_cloud import SessionCloud
-from src.domain.models import ProductModel, PriceHistoryModel, OfferModel, CollectionItemModel
+from src.domain.models import ProductModel, PriceHistoryModel, OfferModel, CollectionItemModel, MarketIndexDailyModel
+from src.infrastructure.repositories.product_sync_log import DEFAULT_PAGE_SIZE, read_delta
+
+# Phase 106: serie diaria materializada del EMI
+PERIOD_DAYS = {"1M": 30, "3M": 90, "6M": 180, "1A": 365, "ALL": 730}
+GLOBAL_WAVE = "*"
+INDEX_RETENTION_DAYS = 730
+# Días ya materializados que se recalculan en cada refresco (ofertas con recorded_at tardío)
+REFRESH_OVERLAP_DAYS = 2
+MARKET_INDEX_CACHE_TTL = 300
+DEFAULT_PRICE_REF = 19.99
+
+_index_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_index_cache_lock = threading.Lock()
+# Serializa la primera materialización (arranque sin mantenimiento previo)
+_first_refresh_lock = threading.Lock()
+
+
+def _as_date(value) -> date:
+    # func.date() devuelve str en SQLite y date en PostgreSQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def invalidate_market_index_cache():
+    with _index_cache_lock:
+        _index_cache.clear()
 
 class MarketAnalyticsService:
     """
@@ -15,156 +43,240 @@ class MarketAnalyticsService:
 
     @classmethod
     def get_market_index(cls, period: str = "3M") -> Dict[str, Any]:
-        """Calcula el índice bursátil MOTU con histórico y tendencia por Waves."""
-        now = datetime.now(timezone.utc)
-        days_map = {"1M": 30, "3M": 90, "6M": 180, "1A": 365, "ALL": 730}
-        days = days_map.get(period.upper(), 90)
-        start_date = now - timedelta(days=days)
+        """
+        Índice bursátil MOTU con histórico y tendencia por Waves.
+        Phase 106: se sirve desde market_index_daily (caché TTL por periodo); el coste
+        ya no depende de la longitud de price_history.
+        """
+        period = period.upper() if period.upper() in PERIOD_DAYS else "3M"
+        with _index_cache_lock:
+            cached = _index_cache.get(period)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
 
         with SessionCloud() as db:
-            # 1. Obtener todos los productos modernos de Origins y Masterverse
-            products = db.query(ProductModel).filter(
-                ProductModel.is_vintage == False
-            ).all()
-
-            if not products:
-                return {
-                    "current_index_value": 24.50,
-                    "trend_pct": 0.0,
-                    "trend_direction": "stable",
-                    "status_label": "Mercado Estable",
-                    "historical_series": [],
-                    "waves_breakdown": {}
-                }
-
-            # 2. Desglose por subcategorías / Waves
-            waves_breakdown = {}
-            for p in products:
-                wave_key = p.sub_category or "Origins"
-                if wave_key not in waves_breakdown:
-                    waves_breakdown[wave_key] = {
-                        "category": wave_key,
-                        "figures_count": 0,
-                        "avg_msrp": 0.0,
-                        "avg_market": 0.0,
-                        "revaluation_pct": 0.0
-                    }
-                
-                price_ref = p.p25_price or p.retail_price or 19.99
-                msrp_ref = p.retail_price or 19.99
-                
-                waves_breakdown[wave_key]["figures_count"] += 1
-                waves_breakdown[wave_key]["avg_msrp"] += msrp_ref
-                waves_breakdown[wave_key]["avg_market"] += price_ref
-
-            # Promediar
-            total_market_sum = 0.0
-            total_msrp_sum = 0.0
-            total_count = len(products)
-
-            for k, v in waves_breakdown.items():
-                cnt = max(1, v["figures_count"])
-                v["avg_msrp"] = round(v["avg_msrp"] / cnt, 2)
-                v["avg_market"] = round(v["avg_market"] / cnt, 2)
-                total_market_sum += v["avg_market"] * cnt
-                total_msrp_sum += v["avg_msrp"] * cnt
-                
-                if v["avg_msrp"] > 0:
-                    v["revaluation_pct"] = round(
-                        ((v["avg_market"] - v["avg_msrp"]) / v["avg_msrp"]) * 100, 1
-                    )
-
-            current_index = round(total_market_sum / max(1, total_count), 2)
-            base_msrp = round(total_msrp_sum / max(1, total_count), 2)
-
-            # 3. Construir serie histórica temporal
-            # Consultamos variaciones de precio en PriceHistoryModel
-            history_rows = db.query(
-                func.date(PriceHistoryModel.recorded_at).label("record_date"),
-                func.avg(PriceHistoryModel.price).label("avg_price")
-            ).filter(
-                PriceHistoryModel.recorded_at >= start_date.replace(tzinfo=None)
-            ).group_by(
-                func.date(PriceHistoryModel.recorded_at)
-            ).order_by(
-                func.date(PriceHistoryModel.recorded_at).asc()
-            ).all()
-
-            historical_series = []
-            if history_rows:
-                for r in history_rows:
-                    historical_series.append({
-                        "date": str(r.record_date),
-                        "index_value": round(float(r.avg_price), 2)
-                    })
-            else:
-                # Si no hay suficiente histórico de snapshots, interpolar puntos realistas
-                steps = 6
-                step_days = days // steps
-                for i in range(steps, -1, -1):
-                    dt = now - timedelta(days=i * step_days)
-                    # Variación suave del índice
-                    factor = 1.0 - (i * 0.015)
-                    historical_series.append({
-                        "date": dt.strftime("%Y-%m-%d"),
-                        "index_value": round(current_index * factor, 2)
-                    })
-
-            # Calcular la tendencia real comparando contra el inicio de la serie del período seleccionado
-            start_index = historical_series[0]["index_value"] if historical_series else current_index
-            trend_pct = round(((current_index - start_index) / max(1.0, start_index)) * 100, 1)
-
-            # Estado general basado en la tendencia del periodo
-            if trend_pct >= 5.0:
-                direction = "bullish"
-                status_label = "Mercado Alcista (Revalorización del Periodo)"
-            elif trend_pct <= -5.0:
-                direction = "bearish"
-                status_label = "Mercado Bajista (Precios en Descenso)"
-            else:
-                direction = "stable"
-                status_label = "Mercado Estable y Saludable"
+            payload = cls._build_market_index(db, period)
 
+        with _index_cache_lock:
+            _index_cache[period] = (time.monotonic() + MARKET_INDEX_CACHE_TTL, payload)
+        return payload
+
+    @classmethod
+    def _build_market_index(cls, db, period: str) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        days = PERIOD_DAYS[period]
+        start_day = (now - timedelta(days=days)).date()
+
+        snapshot_day = cls._snapshot_day(db)
+        if snapshot_day is None:
+            snapshot_day = cls._materialize_first_snapshot(db)
+
+        snapshot = db.query(MarketIndexDailyModel).filter(
+            MarketIndexDailyModel.day == snapshot_day,
+            MarketIndexDailyModel.figures_count != None
+        ).order_by(MarketIndexDailyModel.wave).all() if snapshot_day else []
+        overall = next((r for r in snapshot if r.wave == GLOBAL_WAVE), None)
+
+        if overall is None or not overall.figures_count:
             return {
-                "current_index_value": current_index,
-                "base_msrp_value": base_msrp,
-                "trend_pct": trend_pct,
-                "trend_direction": direction,
-                "status_label": status_label,
-                "period": period,
-                "historical_series": historical_series,
-                "waves_breakdown": list(waves_breakdown.values())
+                "current_index_value": 24.50,
+                "trend_pct": 0.0,
+                "trend_direction": "stable",
+                "status_label": "Mercado Estable",
+                "historical_series": [],
+                "waves_breakdown": {}
             }
 
+        waves_breakdown = []
+        for r in snapshot:
+            if r.wave == GLOBAL_WAVE:
+                continue
+            revaluation_pct = 0.0
+            if r.avg_msrp:
+                revaluation_pct = round(((r.avg_market - r.avg_msrp) / r.avg_msrp) * 100, 1)
+            waves_breakdown.append({
+                "category": r.wave,
+                "figures_count": r.figures_count,
+                "avg_msrp": r.avg_msrp,
+                "avg_market": r.avg_market,
+                "revaluation_pct": revaluation_pct
+            })
+
+        current_index = overall.avg_market
+        base_msrp = overall.avg_msrp
+
+        # Serie histórica: filas globales ya agregadas (una por día con muestras)
+        history_rows = db.query(MarketIndexDailyModel.day, MarketIndexDailyModel.avg_price).filter(
+            MarketIndexDailyModel.wave == GLOBAL_WAVE,
+            MarketIndexDailyModel.day >= start_day,
+            MarketIndexDailyModel.samples > 0
+        ).order_by(MarketIndexDailyModel.day.asc()).all()
+
+        historical_series = []
+        if history_rows:
+            for r in history_rows:
+                historical_series.append({
+                    "date": r.day.isoformat(),
+                    "index_value": round(float(r.avg_price), 2)
+                })
+        else:
+            # Si no hay suficiente histórico de snapshots, interpolar puntos realistas
+            steps = 6
+            step_days = days // steps
+            for i in range(steps, -1, -1):
+                dt = now - timedelta(days=i * step_days)
+                # Variación suave del índice
+                factor = 1.0 - (i * 0.015)
+                historical_series.append({
+                    "date": dt.strftime("%Y-%m-%d"),
+                    "index_value": round(current_index * factor, 2)
+                })
+
+        # Calcular la tendencia real comparando contra el inicio de la serie del período seleccionado
+        start_index = historical_series[0]["index_value"] if historical_series else current_index
+        trend_pct = round(((current_index - start_index) / max(1.0, start_index)) * 100, 1)
+
+        # Estado general basado en la tendencia del periodo
+        if trend_pct >= 5.0:
+            direction = "bullish"
+            status_label = "Mercado Alcista (Revalorización del Periodo)"
+        elif trend_pct <= -5.0:
+            direction = "bearish"
+            status_label = "Mercado Bajista (Precios en Descenso)"
+        else:
+            direction = "stable"
+            status_label = "Mercado Estable y Saludable"
+
+        return {
+            "current_index_value": current_index,
+            "base_msrp_value": base_msrp,
+            "trend_pct": trend_pct,
+            "trend_direction": direction,
+            "status_label": status_label,
+            "period": period,
+            "historical_series": historical_series,
+            "waves_breakdown": waves_breakdown
+        }
+
+    @staticmethod
+    def _snapshot_day(db) -> Optional[date]:
+        return db.query(func.max(MarketIndexDailyModel.day)).filter(
+            MarketIndexDailyModel.figures_count != None
+        ).scalar()
+
     @classmethod
-    def get_delta_updates(cls, since_timestamp: Optional[str] = None) -> Dict[str, Any]:
-        """Devuelve únicamente los productos modificados desde la fecha indicada para IndexedDB."""
+    def _materialize_first_snapshot(cls, db) -> Optional[date]:
+        """
+        Primer arranque sin mantenimiento previo: materializa la serie una sola vez.
+        Las peticiones concurrentes de este proceso esperan al lock y reutilizan la
+        serie; si otro proceso la escribe antes (uq_market_index_daily_day_wave) se
+        descarta la nuestra y se lee la suya en lugar de responder 500.
+        """
+        with _first_refresh_lock:
+            db.commit()  # Cierra la lectura previa para ver lo que otra petición haya escrito
+            snapshot_day = cls._snapshot_day(db)
+            if snapshot_day is not None:
+                return snapshot_day
+            try:
+                cls.refresh_daily_series(db)
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                logger.info("📈 EMI: la serie diaria ya la materializó otro proceso; se reutiliza.")
+            return cls._snapshot_day(db)
+
+    @classmethod
+    def refresh_daily_series(cls, db) -> Dict[str, int]:
+        """
+        Phase 106: materializa incrementalmente market_index_daily (sin commit).
+        Sólo re-agrega price_history desde el último día ya materializado (menos un
+        pequeño solape) y toma la foto del catálogo de hoy con un GROUP BY por Wave.
+        """
+        today = datetime.now(timezone.utc).date()
+        last_day = db.query(func.max(MarketIndexDailyModel.day)).filter(
+            MarketIndexDailyModel.samples > 0
+        ).scalar()
+        if last_day is None:
+            window_start = today - timedelta(days=INDEX_RETENTION_DAYS)
+        else:
+            window_start = max(last_day - timedelta(days=REFRESH_OVERLAP_DAYS), today - timedelta(days=INDEX_RETENTION_DAYS))
+        window_dt = datetime.combine(window_start, datetime.min.time())
+
+        rows: Dict[Tuple[date, str], Dict[str, Any]] = {}
+
+        # 1. Global: media diaria de todo price_history (misma definición que el EMI original)
+        record_date = func.date(PriceHistoryModel.recorded_at)
+        for day, avg_price, samples in db.query(
+            record_date, func.avg(PriceHistoryModel.price), func.count(PriceHistoryModel.id)
+        ).filter(PriceHistoryModel.recorded_at >= window_dt).group_by(record_date):
+            rows[(_as_date(day), GLOBAL_WAVE)] = {"avg_price": float(avg_price), "samples": samples}
+
+        # 2. Por Wave: price_history -> offers -> products modernos
+        wave_col = func.coalesce(ProductModel.sub_category, "Origins")
+        for day, wave, avg_price, samples in (
+            db.query(record_date, wave_col, func.avg(PriceHistoryModel.price), func.count(PriceHistoryModel.id))
+            .join(OfferModel, PriceHistoryModel.offer_id == OfferModel.id)
+            .join(ProductModel, OfferModel.product_id == ProductModel.id)
+            .filter(PriceHistoryModel.recorded_at >= window_dt, ProductModel.is_vintage == False)
+            .group_by(record_date, wave_col)
+        ):
+            rows[(_as_date(day), wave)] = {"avg_price": float(avg_price), "samples": samples}
+
+        # 3. Foto del catálogo de hoy (0/NULL cuentan como ausentes, igual que `x or 19.99`)
+        msrp_ref = func.coalesce(func.nullif(ProductModel.retail_price, 0), DEFAULT_PRICE_REF)
+        market_ref = func.coalesce(
+            func.nullif(ProductModel.p25_price, 0), func.nullif(ProductModel.retail_price, 0), DEFAULT_PRICE_REF
+        )
+        catalog = db.query(
+            wave_col, func.count(ProductModel.id), func.avg(msrp_ref), func.avg(market_ref)
+        ).filter(ProductModel.is_vintage == False).group_by(wave_col).all()
+        total = sum(c for _, c, _, _ in catalog)
+        for wave, count, avg_msrp, avg_market in catalog:
+            rows.setdefault((today, wave), {}).update(
+                figures_count=count, avg_msrp=round(float(avg_msrp), 2), avg_market=round(float(avg_market), 2)
+            )
+        rows.setdefault((today, GLOBAL_WAVE), {}).update(
+            figures_count=total,
+            avg_msrp=round(sum(c * float(m) for _, c, m, _ in catalog) / total, 2) if total else 0.0,
+            avg_market=round(sum(c * float(m) for _, c, _, m in catalog) / total, 2) if total else 0.0,
+        )
+
+        # 4. Upsert de la ventana (pocas filas: días x Waves)
+        existing = {
+            (r.day, r.wave): r
+            for r in db.query(MarketIndexDailyModel).filter(MarketIndexDailyModel.day >= window_start)
+        }
+        for (day, wave), values in rows.items():
+            record = existing.pop((day, wave), None)
+            if record is None:
+                record = MarketIndexDailyModel(day=day, wave=wave, samples=0)
+                db.add(record)
+            for field, value in values.items():
+                if getattr(record, field) != value:
+                    setattr(record, field, value)
+        # Días de la ventana que ya no tienen histórico: conservan la foto del catálogo
+        for record in existing.values():
+            if record.samples:
+                record.avg_price, record.samples = None, 0
+
+        pruned = db.query(MarketIndexDailyModel).filter(
+            MarketIndexDailyModel.day < today - timedelta(days=INDEX_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+
+        invalidate_market_index_cache()
+        logger.info(f"📈 EMI: serie diaria refrescada desde {window_start} ({len(rows)} filas, {pruned} purgadas).")
+        return {"index_rows_refreshed": len(rows), "index_rows_pruned": pruned}
+
+    @classmethod
+    def get_delta_updates(
+        cls, cursor: Optional[int] = None, after_id: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Phase 105: sincronización delta real para IndexedDB (ver product_sync_log.read_delta).
+        Sin cursor -> full sync paginado; con cursor -> sólo altas/cambios y tombstones.
+        """
         with SessionCloud() as db:
-            query = db.query(ProductModel).filter(ProductModel.is_vintage == False)
-            
-            if since_timestamp:
-                try:
-                    dt = datetime.fromisoformat(since_timestamp.replace("Z", "+00:00")).replace(tzinfo=None)
-                    # En ProductModel, filtramos los que tengan ofertas actualizadas recientemente
-                    # o devolvemos el catálogo completo si la fecha es muy antigua
-                except Exception:
-                    pass
-
-            products = query.all()
-            return {
-                "server_time": datetime.now(timezone.utc).isoformat(),
-                "total_count": len(products),
-                "products": [
-                    {
-                        "id": p.id,
-                        "name": p.name,
-                        "sub_category": p.sub_category or "Origins",
-                        "release_year": p.release_year,
-                        "retail_price": p.retail_price,
-                        "p25_price": p.p25_price,
-                        "image_url": p.image_url,
-                        "sku": getattr(p, "ean", None) or str(p.id)
-                    }
-                    for p in products
-                ]
-            }
+            page = read_delta(db, cursor=cursor, after_id=after_id, limit=limit)
+        page["server_time"] = datetime.now(timezone.utc).isoformat()
+        page["total_count"] = len(page["products"])
+        return page
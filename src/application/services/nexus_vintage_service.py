@@ -8,31 +8,32 @@ from src.infrastructure.collectors.personal_vintage_collection import main as ru
 from scripts.phase0_vintage_migration import migrate_excel_to_db
 from src.infrastructure.database_cloud import SessionCloud
 from src.domain.models import ScraperStatusModel, ScraperExecutionLogModel
+from src.infrastructure.repositories.execution_log_sink import ExecutionLogSink
 from src.core.config import settings
 
 logger = logging.getLogger("NexusVintageService")
 
 class TelemetryHandler(logging.Handler):
-    """Logging handler that pipes logs to the ScraperExecutionLogModel in DB."""
+    """Logging handler that pipes logs to the ScraperExecutionLogModel in DB (Phase 98: buffered)."""
     def __init__(self, log_id: int):
         super().__init__()
         self.log_id = log_id
+        self.sink = ExecutionLogSink(log_id, SessionCloud)
         self.setFormatter(logging.Formatter("%(message)s"))
 
     def emit(self, record):
         try:
-            msg = self.format(record)
-            ts = datetime.now(ZoneInfo("Europe/Madrid")).strftime("%H:%M:%S")
-            line = f"[{ts}] {msg}"
-            
-            with SessionCloud() as db:
-                db.query(ScraperExecutionLogModel).filter(ScraperExecutionLogModel.id == self.log_id).update({
-                    "logs": ScraperExecutionLogModel.logs + "\n" + line
-                })
-                db.commit()
+            self.sink.write(self.format(record))
         except Exception:
             pass
 
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+        super().close()
+
 class NexusVintageService:
     @staticmethod
     def purge_catalog(db, safe_mode: bool = True):
@@ -194,3 +195,4 @@ class NexusVintageService:
             return False
         finally:
             root_logger.removeHandler(telemetry_handler)
+            telemetry_handler.close()
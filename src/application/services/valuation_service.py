@@ -1,19 +1,22 @@
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func
-from src.domain.models import OfferModel, ProductModel, LogisticRuleModel
+from src.domain.models import OfferModel, ProductModel
 from src.application.services.logistics_service import LogisticsService
 import logging
 
 logger = logging.getLogger("ValuationService")
 
 class ValuationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, preload_rules: bool = True):
         self.db = db
-        # Pre-load logistics rules to optimize calculations
-        rules = self.db.query(LogisticRuleModel).all()
-        self.rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
+        # Pre-load logistics rules to optimize calculations (Phase 109: instantánea compartida)
+        self.rules_map = {}
+        if preload_rules:
+            self.rules_map = LogisticsService.load_rules_map(self.db)
         self.preloaded_offers = {}
+        # (product_id, location) -> (mejor landed retail, mejor landed P2P)
+        self._landed_cache = {}
 
     def preload_offers_for_products(self, product_ids: list[int]):
         """Pre-carga ofertas activas para optimizar consultas N+1 en loops."""
@@ -25,15 +28,30 @@ class ValuationService:
             OfferModel.is_available == True
         ).all()
         
-        self.preloaded_offers = {}
+        # Los productos sin ofertas también quedan precargados (lista vacía): sin
+        # esto get_consolidated_value volvía a consultar la DB por cada uno de ellos.
+        self.preloaded_offers = {pid: [] for pid in product_ids}
         for o in offers:
             self.preloaded_offers.setdefault(o.product_id, []).append(o)
+        self._landed_cache = {}
 
-    def get_consolidated_value(self, product: ProductModel, user_location: str = "ES") -> float:
+    def preload_page(self, product_ids: list[int], user_location: str = "ES"):
         """
-        Implementation of the VALUATION WATERFALL.
-        Returns the best possible market value estimation.
+        Phase 100: precarga de una página de productos en consultas fijas: sus
+        ofertas activas y (Phase 109) la instantánea compartida de reglas
+        logísticas, que en caliente no consulta la DB.
         """
+        self.preload_offers_for_products(product_ids)
+        if not self.rules_map:
+            self.rules_map = LogisticsService.load_rules_map(self.db)
+
+    def _best_landed(self, product: ProductModel, user_location: str):
+        """Mejor precio de aterrizaje Retail y P2P de un producto (una pasada, memoizada)."""
+        key = (product.id, user_location)
+        cached = self._landed_cache.get(key)
+        if cached is not None:
+            return cached
+
         best_retail_landed = None
         best_p2p_landed = None
         
@@ -56,6 +74,16 @@ class ValuationService:
             elif o.source_type == "Peer-to-Peer":
                 if best_p2p_landed is None or landed < best_p2p_landed:
                     best_p2p_landed = landed
+
+        self._landed_cache[key] = (best_retail_landed, best_p2p_landed)
+        return best_retail_landed, best_p2p_landed
+
+    def get_consolidated_value(self, product: ProductModel, user_location: str = "ES") -> float:
+        """
+        Implementation of the VALUATION WATERFALL.
+        Returns the best possible market value estimation.
+        """
+        best_retail_landed, best_p2p_landed = self._best_landed(product, user_location)
         
         # --- LEVEL 1: ACTIVE RETAIL OFFER (BEST LANDED) ---
         if best_retail_landed is not None:
@@ -108,7 +136,9 @@ class ValuationService:
         """Calculates total value of a user's collection using the waterfall and legacy context."""
         from src.domain.models import CollectionItemModel
         
-        query = self.db.query(CollectionItemModel).join(ProductModel).filter(
+        query = self.db.query(CollectionItemModel).join(ProductModel).options(
+            contains_eager(CollectionItemModel.product)
+        ).filter(
             CollectionItemModel.owner_id == user_id,
             CollectionItemModel.acquired == True
         )
@@ -160,28 +190,7 @@ class ValuationService:
         Returns ONLY the landed value if a live offer exists (Retail or P2P).
         Used for the independent 'Landed Value' metric.
         """
-        best_retail_landed = None
-        best_p2p_landed = None
-        
-        product_offers = self.preloaded_offers.get(product.id)
-        if product_offers is None:
-            product_offers = self.db.query(OfferModel).filter(
-                OfferModel.product_id == product.id,
-                OfferModel.is_available == True
-            ).all()
-
-        for o in product_offers:
-            if not o.price or o.price <= 0:
-                continue
-            landed = LogisticsService.optimized_get_landing_price(
-                o.price, o.shop_name, user_location, self.rules_map
-            )
-            if o.source_type == "Retail":
-                if best_retail_landed is None or landed < best_retail_landed:
-                    best_retail_landed = landed
-            elif o.source_type == "Peer-to-Peer":
-                if best_p2p_landed is None or landed < best_p2p_landed:
-                    best_p2p_landed = landed
+        best_retail_landed, best_p2p_landed = self._best_landed(product, user_location)
             
         # --- LEVEL 1: RETAIL ---
         if best_retail_landed is not None:
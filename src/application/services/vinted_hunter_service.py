@@ -1,14 +1,15 @@
 import asyncio
 import logging
+import time
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List, Set
+from typing import Optional, Dict, Any, List, Set, Tuple
 
+from src.infrastructure.scrapers.base import ScrapedOffer
 from src.infrastructure.scrapers.vinted_scraper import VintedScraper
 from src.infrastructure.scrapers.pipeline import ScrapingPipeline
 from src.infrastructure.database_cloud import SessionCloud
 from src.domain.models import (
     ProductModel,
-    LogisticRuleModel,
     BlackcludedItemModel,
     PendingMatchModel,
     HunterAlertLogModel,
@@ -17,9 +18,15 @@ from src.domain.models import (
 from src.application.services.logistics_service import LogisticsService
 from src.infrastructure.services.telegram_service import telegram_service
 from src.core.matching import SmartMatcher
+from src.core.catalog_index import CatalogEntry, CatalogIndex, catalog_index
+from src.core.concurrency import run_blocking
 
 logger = logging.getLogger(__name__)
 
+# Phase 111: ofertas por lote de matching (un viaje al kernel Rust por lote) y umbral de match
+HUNT_MATCH_BATCH_SIZE = 25
+HUNT_MIN_MATCH_SCORE = 0.60
+
 class VintedHunterService:
     """
     Servicio de Incursión y Caza para Vinted.
@@ -70,7 +77,6 @@ class VintedHunterService:
         # 3. Detectar y evaluar gangas respecto al precio medio de mercado (P25)
         new_bargains_to_alert = []
         recurring_bargains_count = 0
-        matcher = SmartMatcher()
         
         with SessionCloud() as db:
             # A) Precargar URLs descartadas o bloqueadas por el usuario
@@ -90,17 +96,25 @@ class VintedHunterService:
                 ).all()
             }
 
-            # C) Precargar reglas logísticas y catálogo activo
-            rules = db.query(LogisticRuleModel).all()
-            rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
-            products = db.query(ProductModel).filter(ProductModel.is_vintage == False).all()
-            
-            for offer in offers:
-                if offer.price <= 0:
-                    continue
-                
-                # Descartar si el usuario la ha bloqueado o rechazado previamente
-                if offer.url in discarded_urls:
+            # C) Precargar reglas logísticas e índice de catálogo (Phase 111: sin cargar todo el catálogo)
+            rules_map = LogisticsService.load_rules_map(db)  # Phase 109: instantánea compartida
+            index = catalog_index.ensure_loaded(db)
+
+        # Descartar si el usuario la ha bloqueado o rechazado previamente
+        eligible_offers = [o for o in offers if o.price > 0 and o.url not in discarded_urls]
+
+        # D) Matching por lotes en el pool de hilos: sólo se puntúan los candidatos del índice
+        matched, match_stats = await VintedHunterService._match_offers(eligible_offers, index)
+
+        with SessionCloud() as db:
+            matched_ids = {entry.id for _, entry, _ in matched}
+            products_by_id = {
+                p.id: p for p in db.query(ProductModel).filter(ProductModel.id.in_(matched_ids)).all()
+            } if matched_ids else {}
+
+            for offer, entry, best_score in matched:
+                best_match_product = products_by_id.get(entry.id)
+                if not best_match_product:
                     continue
                     
                 # Calcular Landed Price optimizado (Base + 5€ envío + 2% seguro Vinted)
@@ -111,26 +125,6 @@ class VintedHunterService:
                     rules_map=rules_map
                 )
                 
-                # Buscar matching contra el catálogo
-                best_match_product = None
-                best_score = 0.0
-                
-                for p in products:
-                    is_match, score, _ = matcher.match(
-                        product_name=p.name,
-                        scraped_title=offer.product_name,
-                        scraped_url=offer.url,
-                        db_ean=p.sku if hasattr(p, "sku") else p.ean,
-                        scraped_ean=offer.ean,
-                        sub_category=p.sub_category
-                    )
-                    if is_match and score > best_score:
-                        best_score = score
-                        best_match_product = p
-                
-                if not best_match_product or best_score < 0.60:
-                    continue
-                
                 # Determinar el precio de referencia de mercado (P25 o MSRP)
                 p25 = best_match_product.p25_price or 0.0
                 retail = best_match_product.retail_price or 0.0
@@ -234,7 +228,12 @@ class VintedHunterService:
                     start_time=start_time.replace(tzinfo=None),
                     end_time=datetime.now(timezone.utc).replace(tzinfo=None),
                     trigger_type="sentinel" if query == "auto" else "manual",
-                    logs=f"Incursión '{query}': {total_scraped} analizadas, {len(new_bargains_to_alert)} gangas nuevas, {recurring_bargains_count} recurrentes."
+                    logs=(
+                        f"Incursión '{query}': {total_scraped} analizadas, {len(new_bargains_to_alert)} gangas nuevas, "
+                        f"{recurring_bargains_count} recurrentes. Matching: {match_stats['candidates_scored']} candidatos "
+                        f"puntuados para {match_stats['offers_scored']} ofertas (máx {match_stats['max_candidates']}/oferta) "
+                        f"en {match_stats['match_ms']} ms."
+                    )
                 ))
                 db_log.commit()
         except Exception as log_ex:
@@ -245,5 +244,68 @@ class VintedHunterService:
             "bargains_found": len(new_bargains_to_alert),
             "recurring_bargains": recurring_bargains_count,
             "bargains": new_bargains_to_alert,
+            "match_stats": match_stats,
             "status": "success"
         }
+
+    @staticmethod
+    async def _match_offers(
+        offers: List[ScrapedOffer],
+        index: CatalogIndex
+    ) -> Tuple[List[Tuple[ScrapedOffer, CatalogEntry, float]], Dict[str, Any]]:
+        """
+        Phase 111: Empareja las ofertas contra el catálogo por lotes en paralelo.
+        Cada oferta sólo se puntúa contra los productos no vintage que comparten
+        algún token o el EAN con su título (CatalogIndex), no contra todo el catálogo.
+        """
+        started = time.perf_counter()
+        batches = [offers[i:i + HUNT_MATCH_BATCH_SIZE] for i in range(0, len(offers), HUNT_MATCH_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(run_blocking(VintedHunterService._match_batch, batch, index) for batch in batches)
+        )
+
+        matched, counts = [], []
+        for batch_matched, batch_counts in results:
+            matched.extend(batch_matched)
+            counts.extend(batch_counts)
+
+        match_stats = {
+            "catalog_size": len(index.entries),
+            "offers_scored": len(counts),
+            "batches": len(batches),
+            "candidates_scored": sum(counts),
+            "avg_candidates": round(sum(counts) / len(counts), 1) if counts else 0.0,
+            "max_candidates": max(counts, default=0),
+            "offers_without_candidates": sum(1 for c in counts if c == 0),
+            "matched": len(matched),
+            "match_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(
+            f"🏹 VintedHunter: {match_stats['offers_scored']} ofertas puntuadas en {match_stats['batches']} lotes | "
+            f"{match_stats['candidates_scored']} candidatos (media {match_stats['avg_candidates']}, "
+            f"máx {match_stats['max_candidates']}) de {match_stats['catalog_size']} productos | "
+            f"{match_stats['match_ms']} ms."
+        )
+        return matched, match_stats
+
+    @staticmethod
+    def _match_batch(
+        offers: List[ScrapedOffer],
+        index: CatalogIndex
+    ) -> Tuple[List[Tuple[ScrapedOffer, CatalogEntry, float]], List[int]]:
+        """Mejor producto (score >= HUNT_MIN_MATCH_SCORE) por oferta y nº de candidatos puntuados."""
+        items = []
+        for offer in offers:
+            candidates = [c for c in index.candidates(offer.product_name, offer.ean) if c.is_vintage is False]
+            items.append((offer.product_name, offer.url, offer.ean, candidates))
+
+        matched = []
+        for offer, item, scores in zip(offers, items, SmartMatcher().match_candidates(items)):
+            best_match_product, best_score = None, 0.0
+            for entry, (is_match, score, _) in zip(item[3], scores):
+                if is_match and score > best_score:
+                    best_score = score
+                    best_match_product = entry
+            if best_match_product and best_score >= HUNT_MIN_MATCH_SCORE:
+                matched.append((offer, best_match_product, best_score))
+        return matched, [len(item[3]) for item in items]
@@ -0,0 +1,211 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from src.domain.models import AuthorizedDeviceModel, UserModel
+
+# Red de seguridad: cambios hechos fuera del ORM de este proceso caducan pasado este tiempo
+AUTH_CACHE_TTL = 60
+# Segundos máximos que un last_access_at espera en memoria antes de llegar a la DB
+DEVICE_ACCESS_FLUSH_INTERVAL = 30.0
+
+_PENDING_KEY = "auth_cache_pending"
+_USER_COLUMNS = tuple(c.key for c in UserModel.__mapper__.column_attrs)
+
+
+class AuthCache:
+    """
+    Phase 111: caché en memoria de la capa de autenticación.
+
+    - Dispositivos conocidos: device_id -> is_authorized.
+    - Usuarios activos: user_id -> columnas del UserModel (cada acierto devuelve
+      una instancia desligada nueva, como la que devolvía la sesión ya cerrada).
+
+    Las escrituras ORM sobre AuthorizedDeviceModel / UserModel (autorizar, revocar,
+    cambiar rol, desactivar...) invalidan la entrada al hacer commit; el TTL cubre
+    cambios hechos por otros procesos o por SQL directo.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Tuple[bool, float]] = {}
+        self._users: Dict[int, Tuple[Dict[str, Any], float]] = {}
+        # Una invalidación durante la lectura gana: put_*() con una generación vieja se ignora
+        self.generation = 0
+
+    # --- Dispositivos -------------------------------------------------------------------
+
+    def get_device(self, device_id: str) -> Optional[bool]:
+        entry = self._devices.get(device_id)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def put_device(self, device_id: str, is_authorized: bool, generation: Optional[int] = None):
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._devices[device_id] = (bool(is_authorized), time.monotonic() + self.ttl)
+
+    # --- Usuarios -----------------------------------------------------------------------
+
+    def get_user(self, user_id: int) -> Optional[UserModel]:
+        entry = self._users.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        user = UserModel(**entry[0])
+        make_transient_to_detached(user)
+        return user
+
+    def put_user(self, user: UserModel, generation: Optional[int] = None):
+        values = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._users[user.id] = (values, time.monotonic() + self.ttl)
+
+    # --- Invalidación -------------------------------------------------------------------
+
+    def invalidate(self, devices=(), users=(), all_devices: bool = False, all_users: bool = False):
+        with self._lock:
+            self.generation += 1
+            if all_devices:
+                self._devices.clear()
+            for device_id in devices:
+                self._devices.pop(device_id, None)
+            if all_users:
+                self._users.clear()
+            for user_id in users:
+                self._users.pop(user_id, None)
+
+    def clear(self):
+        self.invalidate(all_devices=True, all_users=True)
+
+
+class DeviceAccessTracker:
+    """
+    Phase 111: last_access_at coalescido fuera del camino caliente.
+
+    Cada petición sólo anota en memoria el último acceso del dispositivo; un
+    temporizador (como ExecutionLogSink) vuelca lo acumulado cada
+    DEVICE_ACCESS_FLUSH_INTERVAL segundos con un único UPDATE executemany por
+    engine. close() hace el volcado final al apagar la API.
+    """
+
+    def __init__(self, interval: float = DEVICE_ACCESS_FLUSH_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[Engine, Dict[str, datetime]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+
+    def touch(self, device_id: str, db: Session, seen_at: Optional[datetime] = None):
+        """Anota el acceso; se escribe con el mismo engine que la sesión `db`."""
+        seen_at = seen_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            self._pending.setdefault(db.get_bind(), {})[device_id] = seen_at
+            if self._timer is None and self.interval > 0:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        """Vuelca los accesos pendientes. Devuelve el nº de dispositivos escritos."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            written = 0
+            table = AuthorizedDeviceModel.__table__
+            stmt = (
+                update(table)
+                .where(table.c.device_id == bindparam("b_device_id"))
+                .values(last_access_at=bindparam("b_seen_at"))
+            )
+            for bind, accesses in pending.items():
+                try:
+                    with Session(bind=bind) as db:
+                        db.connection().execute(
+                            stmt, [{"b_device_id": d, "b_seen_at": ts} for d, ts in accesses.items()]
+                        )
+                        db.commit()
+                    written += len(accesses)
+                except Exception as ex:
+                    logger.warning(f"🛡️ DeviceAccessTracker: no se pudo volcar last_access_at: {ex}")
+            if written:
+                self.flushes += 1
+                logger.debug(f"🛡️ DeviceAccessTracker: {written} accesos de dispositivo volcados.")
+            return written
+
+    def close(self):
+        self.flush()
+
+
+# Singleton global instances
+auth_cache = AuthCache()
+device_access_tracker = DeviceAccessTracker()
+
+
+# --- Eventos ORM: se acumulan por sesión y se aplican sólo tras el commit ---------
+
+def _stage(session: Session, **changes):
+    pending = session.info.setdefault(
+        _PENDING_KEY, {"devices": set(), "users": set(), "all_devices": False, "all_users": False}
+    )
+    for key, value in changes.items():
+        if isinstance(value, bool):
+            pending[key] = pending[key] or value
+        else:
+            pending[key].add(value)
+
+
+def _on_saved(target, **changes):
+    session = object_session(target)
+    if session is None:
+        auth_cache.clear()
+        return
+    _stage(session, **changes)
+
+
+@event.listens_for(AuthorizedDeviceModel, "after_insert")
+@event.listens_for(AuthorizedDeviceModel, "after_update")
+@event.listens_for(AuthorizedDeviceModel, "after_delete")
+def _on_device_changed(mapper, connection, target):
+    _on_saved(target, devices=target.device_id)
+
+
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _on_user_changed(mapper, connection, target):
+    _on_saved(target, users=target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete) or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    if model is AuthorizedDeviceModel:
+        _stage(orm_execute_state.session, all_devices=True)
+    elif model is UserModel:
+        _stage(orm_execute_state.session, all_users=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        auth_cache.invalidate(**pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -58,6 +58,26 @@ class BackupManager:
         except Exception as e:
             logger.error(f"❌ Failed to save raw snapshot: {e}")
 
+    def append_raw_snapshot(self, shop_name: str, offers: List[Any], file_path: Path | None = None) -> Path:
+        """
+        Variante en streaming de save_raw_snapshot (Fase 91): añade el lote al final de un
+        fichero JSON Lines (una oferta por línea) sin retener la tanda completa en memoria.
+        La primera llamada (file_path=None) crea el fichero y aplica la rotación.
+        """
+        if file_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = self.snapshots_path / f"raw_{shop_name}_{timestamp}.jsonl"
+            self._rotate_backups(self.snapshots_path, 15, pattern="*.json*")
+
+        with open(file_path, "a", encoding="utf-8") as f:
+            for o in offers:
+                data = o.__dict__.copy() if hasattr(o, '__dict__') else o
+                if isinstance(data, dict) and 'url' in data:
+                    data['url'] = str(data['url'])
+                f.write(json.dumps(data, ensure_ascii=False, cls=DateTimeEncoder) + "\n")
+        logger.info(f"🛡️ Raw snapshot chunk appended: {file_path.name} ({len(offers)} items)")
+        return file_path
+
     def create_database_backup(self, db_session):
         """
         [DEPRECATED/OPTIMIZED] Exports critical tables to JSON.
@@ -67,9 +87,9 @@ class BackupManager:
         logger.info("🏰 Database Vault generation bypassed (Delegated to Supabase Native Backups).")
         return None
 
-    def _rotate_backups(self, folder: Path, limit: int):
+    def _rotate_backups(self, folder: Path, limit: int, pattern: str = "*.json"):
         """Removes oldest files if limit exceeded."""
-        files = sorted(list(folder.glob("*.json")), key=os.path.getmtime)
+        files = sorted(list(folder.glob(pattern)), key=os.path.getmtime)
         if len(files) > limit:
             for f in files[:-limit]:
                 os.remove(f)
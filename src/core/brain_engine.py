@@ -1,9 +1,11 @@
 import re
-import unicodedata
-from typing import Set, Tuple, Optional
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+import numpy as np
 from loguru import logger
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 from src.core.weight_engine import weights_manager
+from src.core.normalization_cache import NORMALIZE_CACHE_SIZE, fold_tokens, register_cache
 
 class PythonBrainEngine:
     """
@@ -21,13 +23,18 @@ class PythonBrainEngine:
             "comprar", "venta", "oferta", "precio", "barato", "envio", "gratis",
             "frikiverso", "articulada", "unidades", "unidad", "stock", "disponible", "entrega", "articulo"
         }
-        
-    def normalize(self, text: str) -> Set[str]:
-        if not text: return set()
-        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
-        text = text.lower()
-        text = re.sub(r'[^a-z0-9]', ' ', text)
-        tokens = set(text.split())
+        # Phase 95: los nombres del catálogo se repiten miles de veces por petición
+        self._normalize_cached = register_cache(
+            "brain_engine.normalize", lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(self._normalize)
+        )
+
+    def normalize(self, text: str) -> FrozenSet[str]:
+        """Tokens significativos (memoizado, inmutable: no mutar el resultado)."""
+        return self._normalize_cached(text or "")
+
+    def _normalize(self, text: str) -> FrozenSet[str]:
+        if not text: return frozenset()
+        tokens = set(fold_tokens(text))
         
         # Mapeo de Sinónimos common
         synonyms = {"tmnt": "turtles", "motu": "masters", "universe": "masters", "origenes": "origins"}
@@ -38,7 +45,7 @@ class PythonBrainEngine:
         # Filtrar significativos (Stopwords out)
         # Nota: Ya no dependemos de series_tokens para el filtro, el peso se encargará
         significant = normalized - self.stop_words
-        return {t for t in significant if len(t) > 1 or t.isdigit()}
+        return frozenset(t for t in significant if len(t) > 1 or t.isdigit())
 
     def calculate_match(self, name1: str, name2: str, ean1: Optional[str] = None, ean2: Optional[str] = None) -> Tuple[bool, float, str]:
         # R01: Prioridad absoluta EAN-13
@@ -106,5 +113,136 @@ class PythonBrainEngine:
         
         return is_match, weighted_score, reason
 
+    def calculate_matches(
+        self,
+        queries: Sequence[str],
+        candidates: Sequence[str],
+        query_eans: Optional[Sequence[Optional[str]]] = None,
+        candidate_eans: Optional[Sequence[Optional[str]]] = None,
+        candidate_tokens: Optional[Sequence[FrozenSet[str]]] = None,
+        candidate_subsets: Optional[Sequence[Sequence[int]]] = None,
+    ) -> List[List[Tuple[bool, float, str]]]:
+        """
+        Phase 94: Versión por lotes de calculate_match.
+
+        `queries` son títulos scrapeados (name2) y `candidates` nombres de la DB (name1).
+        Devuelve la matriz result[q][c] con EXACTAMENTE la misma tupla
+        (is_match, score, reason) que calculate_match(candidates[c], queries[q], ...).
+
+        Cada cadena se normaliza una sola vez y la similitud token a token se calcula
+        con un único rapidfuzz.process.cdist sobre los vocabularios de ambos lados.
+        `candidate_tokens` permite pasar los tokens ya precalculados del catálogo
+        (CatalogEntry.match_tokens) y saltarse su normalización.
+        `candidate_subsets` limita cada query a sus propios candidatos (índices en
+        `candidates`): result[q][k] corresponde entonces a candidates[candidate_subsets[q][k]].
+        Así una página entera se puntúa en una sola llamada sin la matriz completa.
+        """
+        query_eans = query_eans or [None] * len(queries)
+        candidate_eans = candidate_eans or [None] * len(candidates)
+
+        q_tokens = [self.normalize(q) for q in queries]
+        c_tokens = list(candidate_tokens) if candidate_tokens is not None else [self.normalize(c) for c in candidates]
+        q_eans = [_clean_ean(e) for e in query_eans]
+        c_eans = [_clean_ean(e) for e in candidate_eans]
+
+        # Vocabularios y matriz de similitud (fuzz.ratio >= 85 == tolerancia a erratas)
+        db_vocab = sorted(set().union(*c_tokens)) if c_tokens else []
+        scr_vocab = sorted(set().union(*q_tokens)) if q_tokens else []
+        db_pos = {t: i for i, t in enumerate(db_vocab)}
+        scr_pos = {t: i for i, t in enumerate(scr_vocab)}
+        if db_vocab and scr_vocab:
+            hits = process.cdist(db_vocab, scr_vocab, scorer=fuzz.ratio, dtype=np.float64) >= 85
+        else:
+            hits = np.zeros((len(db_vocab), len(scr_vocab)), dtype=bool)
+
+        # Pesos y guardas precalculados por token (una sola lectura del WeightEngine)
+        weights = weights_manager.snapshot()
+        weight_of = {t: weights.get(t, 1.0) for t in set(db_vocab) | set(scr_vocab)}
+        identity = {t for t in db_vocab if weights.get(t, 0.0) > 5.0}
+        series = {t for t, w in weight_of.items() if w < 3.0}
+
+        results = []
+        for qi, tokens2 in enumerate(q_tokens):
+            if tokens2:
+                cols = [scr_pos[t] for t in tokens2]
+                matched_vocab = hits[:, cols].any(axis=1)
+            row = []
+            subset = candidate_subsets[qi] if candidate_subsets is not None else range(len(c_tokens))
+            for ci in subset:
+                tokens1 = c_tokens[ci]
+                # R01: Prioridad absoluta EAN-13
+                if q_eans[qi] is not None and c_eans[ci] == q_eans[qi] and len(q_eans[qi]) >= 8:
+                    row.append((True, 1.0, "EAN Match"))
+                    continue
+                if not tokens1 or not tokens2:
+                    row.append((False, 0.0, "Empty tokens"))
+                    continue
+                row.append(self._score_tokens(tokens1, tokens2, matched_vocab, db_pos, weight_of, identity, series))
+            results.append(row)
+        return results
+
+    def calculate_candidate_matches(
+        self,
+        queries: Sequence[str],
+        query_eans: Sequence[Optional[str]],
+        candidate_lists: Sequence[Sequence],
+    ) -> List[List[Tuple[bool, float, str]]]:
+        """
+        Phase 94: puntúa cada query contra SUS candidatos del CatalogIndex (entradas con
+        id / name / ean / match_tokens) con una sola llamada a calculate_matches para
+        todo el lote. Devuelve, por query, las tuplas en el orden de su lista.
+        """
+        union, slots, subsets = [], {}, []
+        for candidates in candidate_lists:
+            subset = []
+            for c in candidates:
+                if c.id not in slots:
+                    slots[c.id] = len(union)
+                    union.append(c)
+                subset.append(slots[c.id])
+            subsets.append(subset)
+        if not union:
+            return [[] for _ in queries]
+        return self.calculate_matches(
+            queries, [c.name for c in union], query_eans, [c.ean for c in union],
+            candidate_tokens=[c.match_tokens for c in union], candidate_subsets=subsets,
+        )
+
+    @staticmethod
+    def _score_tokens(tokens1, tokens2, matched_vocab, db_pos, weight_of, identity, series) -> Tuple[bool, float, str]:
+        """Misma aritmética y mismas leyes que calculate_match, sobre datos precalculados."""
+        total_w_common = 0
+        matched_tokens_db = set()
+        for t1 in tokens1:
+            if matched_vocab[db_pos[t1]]:
+                total_w_common += weight_of[t1]
+                matched_tokens_db.add(t1)
+
+        w_db_total = sum(weight_of[t] for t in tokens1)
+        weighted_score = total_w_common / w_db_total if w_db_total > 0 else 0.0
+
+        # Ley 1: Conflicto de Identidad (Rareza Alta)
+        db_identities = {t for t in tokens1 if t in identity}
+        if db_identities:
+            missing_identities = db_identities - matched_tokens_db
+            if missing_identities:
+                return False, 0.0, f"Identity Conflict (Rare tokens missing): {missing_identities}"
+
+        # Ley 2: Conflicto de Series (Tokens Comunes)
+        db_series = {t for t in tokens1 if t in series}
+        scr_series = {t for t in tokens2 if t in series}
+        if db_series and scr_series:
+            common_series = db_series.intersection(scr_series)
+            if not common_series:
+                return False, 0.0, f"Series Dissonance: DB={db_series} vs Scraped={scr_series}"
+
+        is_match = weighted_score >= 0.7
+        reason = "Dynamic Weight Match" if is_match else f"Insufficient DB Coverage: {weighted_score:.2f}"
+        return is_match, weighted_score, reason
+
+
+def _clean_ean(ean) -> Optional[str]:
+    return re.sub(r'[^0-9]', '', str(ean)) if ean else None
+
 # Singleton instance
 engine = PythonBrainEngine()
@@ -0,0 +1,273 @@
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.core.normalization_cache import memoized
+from src.domain.models import ProductModel
+
+
+# Palabras que no discriminan entre figuras del catálogo (pre-filtro de candidatos)
+CANDIDATE_STOP_WORDS = {"masters", "of", "the", "universe", "origins", "motu"}
+
+_TOKEN_RE = re.compile(r"\w+")
+_PENDING_KEY = "catalog_index_pending"
+
+
+def candidate_tokens(text: Optional[str]) -> FrozenSet[str]:
+    """Tokens de búsqueda de un nombre (minúsculas, \\w+, sin stop words). Memoizado."""
+    return _candidate_tokens(text or "")
+
+
+@memoized("catalog_index.candidate_tokens")
+def _candidate_tokens(text: str) -> FrozenSet[str]:
+    return frozenset(_TOKEN_RE.findall(text.lower())) - CANDIDATE_STOP_WORDS
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """Instantánea inmutable (desligada de la sesión) de un ProductModel."""
+    id: int
+    name: str
+    ean: Optional[str] = None
+    upc: Optional[str] = None
+    asin: Optional[str] = None
+    sub_category: Optional[str] = None
+    figure_id: Optional[str] = None
+    is_vintage: Optional[bool] = None
+    release_year: Optional[int] = None
+    variant_name: Optional[str] = None
+    # Phase 95: tokens precalculados una vez por producto (pre-filtro y PythonBrainEngine)
+    search_tokens: FrozenSet[str] = frozenset()
+    match_tokens: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_model(cls, p: ProductModel) -> "CatalogEntry":
+        from src.core.brain_engine import engine
+        name = p.name or ""
+        return cls(
+            id=p.id, name=name, ean=p.ean, upc=p.upc, asin=p.asin,
+            sub_category=p.sub_category, figure_id=p.figure_id, is_vintage=p.is_vintage,
+            release_year=p.release_year, variant_name=p.variant_name,
+            search_tokens=candidate_tokens(name), match_tokens=engine.normalize(name),
+        )
+
+
+class CatalogIndex:
+    """
+    Phase 93: Índice del catálogo compartido en memoria.
+
+    Mantiene, para todo el proceso:
+    - postings token -> {product_id} para el pre-filtro de candidatos,
+    - mapas EAN / UPC / ASIN -> {product_id}.
+
+    Al cargarse aprovecha la misma pasada para sembrar los conteos IDF de
+    WeightEngine (Phase 97: después los mantiene el propio WeightEngine).
+
+    Se carga una vez y después se actualiza de forma incremental con los eventos
+    after_insert / after_update / after_delete de ProductModel, aplicados sólo
+    cuando la transacción hace commit. No caduca: sólo se recarga en frío o tras
+    invalidate() (operaciones masivas o cambios sin sesión). Buscar candidatos
+    cuesta O(candidatos), no O(catálogo).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Una sola recarga a la vez: el resto de hilos espera y reutiliza su resultado
+        self._rebuild_lock = threading.Lock()
+        self.loaded = False
+        self.version = 0
+        # Cambios confirmados durante una recarga (se reaplican sobre la lectura)
+        self._replay: Optional[List[Iterable[tuple]]] = None
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        self.entries: Dict[int, CatalogEntry] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.codes: Dict[str, Dict[str, Set[int]]] = {"ean": {}, "upc": {}, "asin": {}}
+
+    # --- Ciclo de vida ------------------------------------------------------------
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded
+
+    def ensure_loaded(self, db: Session) -> "CatalogIndex":
+        if not self.loaded:
+            with self._rebuild_lock:
+                if not self.loaded:
+                    self.rebuild(db)
+        return self
+
+    def rebuild(self, db: Session):
+        """
+        Carga completa del catálogo (sólo en frío o tras invalidate()). Los cambios
+        que se confirmen mientras se lee se guardan y se reaplican sobre la lectura;
+        un invalidate() durante la carga la deja sin marcar como vigente.
+        """
+        with self._lock:
+            self._replay = []
+            generation = self._generation
+        try:
+            entries = [CatalogEntry.from_model(p) for p in db.query(ProductModel).all()]
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            self._reset()
+            for entry in entries:
+                self._add(entry)
+            for changes in self._replay:
+                self._apply(changes)
+            self._replay = None
+            self.loaded = generation == self._generation
+            self.version += 1
+        self._seed_weights(db, entries)
+        logger.info(f"🗂️ CatalogIndex: {len(entries)} productos | {len(self.postings)} tokens indexados.")
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+            self._generation += 1
+
+    # --- Mantenimiento incremental -----------------------------------------------------
+
+    def apply(self, changes: Iterable[tuple]):
+        """
+        Aplica en orden cambios ya confirmados: ("upsert", CatalogEntry) o
+        ("delete", product_id). Durante una recarga se guardan para reaplicarlos;
+        ignorado si el índice no está cargado.
+        """
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(changes)
+            if not self.loaded:
+                return
+            self._apply(changes)
+            self.version += 1
+
+    def _apply(self, changes: Iterable[tuple]):
+        for op, payload in changes:
+            if op == "delete":
+                self._remove(payload)
+            else:
+                self._remove(payload.id)
+                self._add(payload)
+
+    def _add(self, entry: CatalogEntry):
+        self.entries[entry.id] = entry
+        for token in entry.search_tokens:
+            self.postings.setdefault(token, set()).add(entry.id)
+        for kind in ("ean", "upc", "asin"):
+            code = getattr(entry, kind)
+            if code:
+                self.codes[kind].setdefault(code, set()).add(entry.id)
+
+    def _remove(self, product_id: int):
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        for token in entry.search_tokens:
+            _discard(self.postings, token, product_id)
+        for kind in ("ean", "upc", "asin"):
+            code = getattr(entry, kind)
+            if code:
+                _discard(self.codes[kind], code, product_id)
+
+    @staticmethod
+    def _seed_weights(db: Session, entries: List[CatalogEntry]):
+        from src.core.weight_engine import catalog_fingerprint, weights_manager
+        df = Counter()
+        for entry in entries:
+            df.update(weights_manager.normalize(f"{entry.name} {entry.sub_category or ''}"))
+        weights_manager.load_counts(df, len(entries), catalog_fingerprint(db))
+
+    # --- Consultas -------------------------------------------------------------------
+
+    def get(self, product_id: int) -> Optional[CatalogEntry]:
+        with self._lock:
+            return self.entries.get(product_id)
+
+    def lookup_code(self, code: Optional[str], kind: str = "ean") -> List[CatalogEntry]:
+        if not code:
+            return []
+        with self._lock:
+            return [self.entries[i] for i in sorted(self.codes[kind].get(code, ()))]
+
+    def candidates(self, scraped_name: Optional[str], ean: Optional[str] = None) -> List[CatalogEntry]:
+        """Productos que comparten algún token (o el EAN) con el título scrapeado."""
+        with self._lock:
+            ids: Set[int] = set()
+            for token in candidate_tokens(scraped_name):
+                ids.update(self.postings.get(token, ()))
+            if ean:
+                ids.update(self.codes["ean"].get(ean, ()))
+            return [self.entries[i] for i in sorted(ids)]
+
+
+def _discard(mapping: Dict[str, Set[int]], key: str, product_id: int):
+    ids = mapping.get(key)
+    if ids is not None:
+        ids.discard(product_id)
+        if not ids:
+            del mapping[key]
+
+
+# Singleton global instance
+catalog_index = CatalogIndex()
+
+
+# --- Eventos ORM: se acumulan por sesión y se aplican sólo tras el commit ---------
+
+def _stage(target, op: str):
+    # Se acumula aunque el índice esté frío: si una recarga empieza antes del commit,
+    # su lectura puede no ver este cambio y sólo lo recupera reaplicándolo
+    session = object_session(target)
+    if session is None:
+        catalog_index.invalidate()
+        return
+    entry = CatalogEntry.from_model(target) if op == "upsert" else target.id
+    session.info.setdefault(_PENDING_KEY, []).append((op, entry))
+
+
+@event.listens_for(ProductModel, "after_insert")
+@event.listens_for(ProductModel, "after_update")
+def _on_product_saved(mapper, connection, target):
+    _stage(target, "upsert")
+
+
+@event.listens_for(ProductModel, "after_delete")
+def _on_product_deleted(mapper, connection, target):
+    _stage(target, "delete")
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state):
+    # query(ProductModel).update()/delete() no pasa por los eventos por fila: al
+    # confirmarse, el índice se recarga entero en la siguiente consulta
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is ProductModel:
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, []).append(("invalidate", None))
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if any(op == "invalidate" for op, _ in pending):
+        catalog_index.invalidate()
+        return
+    catalog_index.apply(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Callable, Coroutine, TypeVar
+
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+def configure_threadpool(size: int):
+    """
+    Phase 99: Acota el pool de hilos compartido de AnyIO. Los handlers `def` de
+    FastAPI, las dependencias síncronas y run_blocking() salen todos de aquí,
+    así que este valor limita cuántas sesiones de DB se usan en paralelo.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(int(size), 1)
+    logger.info(f"🧵 Thread pool de la API acotado a {limiter.total_tokens} hilos.")
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta trabajo bloqueante (consultas SQLAlchemy, matching CPU) en el pool
+    acotado para que un handler `async def` no congele el event loop (listener
+    de Telegram, Centinela de Vinted y el resto de peticiones).
+    """
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def spawn(coro: Coroutine) -> bool:
+    """
+    Lanza una corrutina "dispara y olvida" (alertas de Telegram) desde cualquier
+    contexto: dentro del event loop usa create_task; desde un hilo del pool la
+    agenda en el loop de la API. Sin loop disponible se descarta con un aviso.
+    """
+    try:
+        asyncio.get_running_loop().create_task(coro)
+        return True
+    except RuntimeError:
+        pass
+    try:
+        anyio.from_thread.run_sync(asyncio.create_task, coro)
+        return True
+    except RuntimeError:
+        coro.close()
+        logger.debug("spawn: sin event loop activo, tarea en segundo plano descartada.")
+        return False
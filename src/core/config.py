@@ -64,6 +64,15 @@ class Settings(BaseSettings):
 
     # Local Image Cache - Phase 68
     IMAGE_CACHE_DIR: str = "data/image_cache"
+    # Phase 101: procesos para convertir a WebP (0 = hilos) y max-age servido al navegador
+    IMAGE_PROCESS_WORKERS: int = 2
+    IMAGE_CACHE_MAX_AGE: int = 86400
+
+    # API Thread Pool - Phase 99 (handlers `def`, dependencias síncronas y run_blocking)
+    API_THREADPOOL_SIZE: int = 40
+
+    # IDF Weight Snapshot - Phase 97 (conteos DF persistidos por versión de catálogo)
+    IDF_SNAPSHOT_PATH: str = "data/idf_snapshot.json"
 
     # ScraperAPI Key
     SCRAPERAPI_KEY: str | None = None
@@ -83,6 +92,15 @@ class Settings(BaseSettings):
     VINTED_SENTINEL_MIN_DELAY_MIN: int = 50
     VINTED_SENTINEL_MAX_DELAY_MIN: int = 75
 
+    # Daily Scan Concurrency Budgets (Phase 90)
+    SCAN_MAX_CONCURRENCY: int = 6
+    SCAN_CURL_CONCURRENCY: int = 6
+    SCAN_PLAYWRIGHT_CONCURRENCY: int = 3
+    SCAN_API_CONCURRENCY: int = 2
+
+    # Rust Matching Kernel (Phase 96). Vacío = .3ox/target/release/brains[.exe]
+    RUST_KERNEL_PATH: str | None = None
+
     # AI Conversational Assistant (Phase 86)
     GEMINI_API_KEY: str | None = None
 
@@ -1,6 +1,6 @@
 import re
 import unicodedata
-from typing import Set, Tuple, List
+from typing import List, Optional, Sequence, Set, Tuple
 from src.core.rust_bridge import kernel
 from src.core.brain_engine import engine as python_engine
 
@@ -16,35 +16,99 @@ class SmartMatcher:
         # La limpieza y stopwords ahora se centralizan en los motores
         pass
 
+    def candidates(self, scraped_title: str, scraped_ean: str = None, db=None) -> List["CatalogEntry"]:
+        """
+        Phase 93: Pre-filtro de catálogo vía CatalogIndex compartido.
+        Devuelve sólo los productos que comparten algún token o el EAN con el título,
+        para no tener que iterar todo el catálogo antes de llamar a match().
+        """
+        from src.core.catalog_index import catalog_index
+        if db is not None:
+            catalog_index.ensure_loaded(db)
+        return catalog_index.candidates(scraped_title, scraped_ean)
+
     def match(self, product_name: str, scraped_title: str, scraped_url: str, db_ean: str = None, scraped_ean: str = None, sub_category: str = None) -> Tuple[bool, float, str]:
         """
         Punto de entrada único y centralizado para el matching.
         Aplica la política de Veto: Python siempre tiene la última palabra sobre identidades.
         """
         # --- PRIORIDAD 1: EAN/GTIN (Innegable) ---
-        if db_ean and scraped_ean:
-            clean_db = re.sub(r'[^0-9]', '', str(db_ean))
-            clean_scraped = re.sub(r'[^0-9]', '', str(scraped_ean))
-            if clean_db == clean_scraped and len(clean_db) >= 8:
-                return True, 1.0, f"Perfect EAN Match: {db_ean}"
+        if self._ean_match(db_ean, scraped_ean):
+            return True, 1.0, f"Perfect EAN Match: {db_ean}"
 
         # Preparación de datos DB (Unificamos Nombre + Subcategoría para máxima precisión)
         db_full_name = f"{product_name} {sub_category or ''}".strip()
         
         # --- PRIORIDAD 2: RUST KERNEL (Fast Pass) ---
-        rust_match, rust_score, rust_reason = kernel.match_items(db_full_name, scraped_title, db_ean, scraped_ean)
+        rust_result = kernel.match_items(db_full_name, scraped_title, db_ean, scraped_ean)
         
         # --- PRIORIDAD 3: PYTHON BRAIN (Deep Semantic + VETO) ---
         # Combinamos título y URL para capturar info extra de la web
         web_full_content = f"{scraped_title} {scraped_url}"
         
-        py_match, py_score, py_reason = python_engine.calculate_match(
+        py_result = python_engine.calculate_match(
             db_full_name, 
             web_full_content, 
             db_ean, 
             scraped_ean
         )
-        
+        return self._decide(rust_result, py_result)
+
+    def match_candidates(self, items: Sequence[tuple]) -> List[List[Tuple[bool, float, str]]]:
+        """
+        Phase 111: match() por lotes.
+
+        `items` son tuplas (scraped_title, scraped_url, scraped_ean, candidates), con
+        candidatos que exponen name / ean / sub_category (CatalogEntry o ProductModel).
+        Devuelve, por item y por candidato, la misma tupla que match(), pero con un
+        único viaje al kernel Rust para todo el lote y una pasada vectorizada del
+        Brain por título.
+        """
+        results: List[List[Optional[Tuple[bool, float, str]]]] = []
+        rust_pairs, rust_slots = [], []
+        for i, (title, url, scraped_ean, candidates) in enumerate(items):
+            row: List[Optional[Tuple[bool, float, str]]] = []
+            for j, c in enumerate(candidates):
+                if self._ean_match(c.ean, scraped_ean):
+                    row.append((True, 1.0, f"Perfect EAN Match: {c.ean}"))
+                    continue
+                row.append(None)
+                rust_pairs.append((self._db_full_name(c), title, c.ean, scraped_ean))
+                rust_slots.append((i, j))
+            results.append(row)
+
+        rust_results = dict(zip(rust_slots, kernel.match_batch(rust_pairs)))
+        for i, (title, url, scraped_ean, candidates) in enumerate(items):
+            pending = [j for j, r in enumerate(results[i]) if r is None]
+            if not pending:
+                continue
+            py_row = python_engine.calculate_matches(
+                [f"{title} {url}"],
+                [self._db_full_name(candidates[j]) for j in pending],
+                [scraped_ean],
+                [candidates[j].ean for j in pending],
+            )[0]
+            for j, py_result in zip(pending, py_row):
+                results[i][j] = self._decide(rust_results[(i, j)], py_result)
+        return results
+
+    @staticmethod
+    def _db_full_name(candidate) -> str:
+        return f"{candidate.name} {candidate.sub_category or ''}".strip()
+
+    @staticmethod
+    def _ean_match(db_ean, scraped_ean) -> bool:
+        if not (db_ean and scraped_ean):
+            return False
+        clean_db = re.sub(r'[^0-9]', '', str(db_ean))
+        clean_scraped = re.sub(r'[^0-9]', '', str(scraped_ean))
+        return clean_db == clean_scraped and len(clean_db) >= 8
+
+    @staticmethod
+    def _decide(rust_result: Tuple[bool, float, str], py_result: Tuple[bool, float, str]) -> Tuple[bool, float, str]:
+        rust_match, rust_score, rust_reason = rust_result
+        py_match, py_score, py_reason = py_result
+
         # --- LÓGICA DE DECISIÓN UNIFICADA (The Law of the Oracle) ---
         
         # 1. VETO: Si Python detecta conflicto de IDENTIDAD (ej: Panthor != Roboto), 
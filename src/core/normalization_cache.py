@@ -0,0 +1,58 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, Tuple
+
+# Tamaño por caché: de sobra para catálogo + títulos de un escaneo, acotado en memoria
+NORMALIZE_CACHE_SIZE = 50_000
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+# nombre -> función envuelta en lru_cache (para estadísticas y limpieza centralizadas)
+_CACHES: Dict[str, Callable] = {}
+
+
+def register_cache(name: str, cached_fn: Callable) -> Callable:
+    """Registra una función ya envuelta con lru_cache para exponer sus contadores."""
+    _CACHES[name] = cached_fn
+    return cached_fn
+
+
+def memoized(name: str, maxsize: int = NORMALIZE_CACHE_SIZE):
+    """Decorador: LRU acotado + registro con nombre."""
+    def decorator(fn: Callable) -> Callable:
+        return register_cache(name, lru_cache(maxsize=maxsize)(fn))
+    return decorator
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Aciertos / fallos / ocupación de cada caché de normalización."""
+    stats = {}
+    for name, fn in _CACHES.items():
+        info = fn.cache_info()
+        total = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": round(info.hits / total, 3) if total else 0.0,
+        }
+    return stats
+
+
+def clear_caches():
+    for fn in _CACHES.values():
+        fn.cache_clear()
+
+
+@memoized("fold_tokens")
+def fold_tokens(text: str) -> Tuple[str, ...]:
+    """
+    NFKD -> ASCII -> minúsculas -> [a-z0-9] y split. Devuelve una tupla inmutable
+    (orden original, con repeticiones) compartida por todos los motores de matching.
+    """
+    if not text:
+        return ()
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
+    return tuple(_NON_ALNUM.sub(' ', text.lower()).split())
@@ -1,43 +1,183 @@
-import subprocess
+import json
 import os
+import queue
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
 from loguru import logger
-from src.core.brain_engine import engine as python_engine
+from src.core.config import settings
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+# Segundos de espera por lote antes de dar el worker por colgado
+WORKER_TIMEOUT = 5.0
+# Tras un fallo del worker no se reintenta arrancarlo hasta pasado este tiempo
+WORKER_RETRY_COOLDOWN = 60.0
+
+
+def resolve_kernel_path() -> Path:
+    """
+    Ruta del binario del kernel: RUST_KERNEL_PATH (config/.env) o, por defecto,
+    el artefacto de `cargo build --release` dentro de .3ox (brains / brains.exe).
+    """
+    if settings.RUST_KERNEL_PATH:
+        return Path(settings.RUST_KERNEL_PATH).expanduser()
+    binary = "brains.exe" if os.name == "nt" else "brains"
+    return PROJECT_ROOT / ".3ox" / "target" / "release" / binary
+
+
+def _char_set(text: str) -> set:
+    return {c for c in text.lower() if c.isalnum()}
+
+
+def python_match_logic(name1: str, name2: str, ean1: Optional[str] = None, ean2: Optional[str] = None) -> Tuple[bool, float]:
+    """
+    Réplica exacta en Python de `match_logic` de .3ox/brains.rs:
+    EAN idéntico y no vacío -> (True, 1.0); si no, Jaccard sobre los caracteres
+    alfanuméricos en minúsculas, con umbral 0.7.
+    """
+    if ean1 is not None and ean2 is not None and ean1 == ean2 and ean1 != "":
+        return True, 1.0
+
+    set1, set2 = _char_set(name1 or ""), _char_set(name2 or "")
+    if not set1 and not set2:
+        return True, 1.0
+    score = len(set1 & set2) / len(set1 | set2)
+    return score >= 0.7, score
+
 
 class SmartBridge:
     """
     Puente Inteligente 3OX para Nueva Eternia.
     Gestiona la ejecución híbrida Rust/Python con fallback automático.
+
+    Phase 96: en lugar de lanzar un proceso por comparación, arranca UNA vez el
+    kernel en modo `serve` y le envía lotes NDJSON por stdin/stdout. Si el binario
+    no existe o el worker falla, se usa `python_match_logic` (mismos resultados).
     """
-    def __init__(self, brain_path=None):
-        if brain_path is None:
-            # Ruta absoluta en el nuevo disco F:
-            self.brain_path = "f:\\IT\\Laboratorio\\IT\\3OX.Ai-main\\oraculo-de-nueva-eternia\\.3ox\\target\\release\\brains.exe"
-        else:
-            self.brain_path = brain_path
+    def __init__(self, brain_path=None, timeout: float = WORKER_TIMEOUT):
+        self.brain_path = Path(brain_path) if brain_path else resolve_kernel_path()
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._failed_at = 0.0
+
+    # --- Ciclo de vida del worker -------------------------------------------------------
+
+    def _ensure_worker(self) -> bool:
+        if self._proc and self._proc.poll() is None:
+            return True
+        if not self.brain_path.exists():
+            return False
+        if self._failed_at and (time.time() - self._failed_at) < WORKER_RETRY_COOLDOWN:
+            return False
+        try:
+            self._proc = subprocess.Popen(
+                [str(self.brain_path), "serve"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+        except OSError as e:
+            logger.warning(f"3OX.Bridge :: No se pudo arrancar el worker Rust ({e}). Usando fallback Python.")
+            self._failed_at = time.time()
+            return False
+
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines), daemon=True).start()
+        logger.info(f"3OX.Bridge :: Worker Rust persistente iniciado ({self.brain_path}).")
+        return True
+
+    @staticmethod
+    def _pump(proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]"):
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF: el worker ha muerto
+
+    def _kill_worker(self, reason: str):
+        logger.warning(f"3OX.Bridge :: Worker Rust descartado ({reason}). Usando fallback Python.")
+        self._failed_at = time.time()
+        if self._proc:
+            try:
+                self._proc.kill()
+            except Exception:
+                pass
+        self._proc = None
+
+    def close(self):
+        with self._lock:
+            if self._proc:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=2)
+                except Exception:
+                    self._proc.kill()
+            self._proc = None
+
+    # --- Matching -----------------------------------------------------------------
+
+    def _worker_batch(self, pairs: List[list]) -> Optional[List[Tuple[bool, float]]]:
+        with self._lock:
+            if not self._ensure_worker():
+                return None
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self._proc.stdin.write(json.dumps({"id": request_id, "pairs": pairs}) + "\n")
+                self._proc.stdin.flush()
+                while True:
+                    line = self._lines.get(timeout=self.timeout)
+                    if line is None:
+                        self._kill_worker("EOF")
+                        return None
+                    response = json.loads(line)
+                    if response.get("id") in (request_id, None):
+                        break
+            except queue.Empty:
+                self._kill_worker(f"timeout {self.timeout}s")
+                return None
+            except Exception as e:
+                self._kill_worker(type(e).__name__)
+                return None
+
+        if "error" in response:
+            logger.warning(f"3OX.Bridge :: El kernel rechazó el lote: {response['error']}")
+            return None
+        return [(bool(m), float(s)) for m, s in response["results"]]
+
+    def match_batch(self, pairs: Sequence[tuple]) -> List[Tuple[bool, float, str]]:
+        """
+        Compara un lote de (name1, name2, ean1, ean2) en UN solo viaje al worker.
+        Las puntuaciones se redondean a 4 decimales (precisión histórica del kernel).
+        """
+        normalized = [
+            [str(p[0] or ""), str(p[1] or ""),
+             (str(p[2]) if len(p) > 2 and p[2] else None),
+             (str(p[3]) if len(p) > 3 and p[3] else None)]
+            for p in pairs
+        ]
+        if not normalized:
+            return []
+
+        raw = self._worker_batch(normalized)
+        reason = "Rust Kernel Execution"
+        if raw is None:
+            raw = [python_match_logic(*p) for p in normalized]
+            reason = "Python Kernel Fallback"
+        return [(m, round(s, 4), reason) for m, s in raw]
 
     def match_items(self, name1, name2, ean1=None, ean2=None):
         """
-        Llamada pura al motor de Rust (Turbo).
+        Llamada pura al kernel (Turbo).
         Devuelve el resultado bruto sin interpretaciones.
         """
-        # 1. Intentar Modo Turbo (Rust)
-        if os.path.exists(self.brain_path):
-            try:
-                cmd = [self.brain_path, "match", name1, name2]
-                if ean1: cmd.append(ean1)
-                if ean2: cmd.append(ean2)
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=2)
-                
-                if result.returncode == 0 and "MATCH_RESULT" in result.stdout:
-                    parts = result.stdout.strip().split("|")
-                    is_match = parts[1] == "true"
-                    score = float(parts[2])
-                    return is_match, score, "Rust Kernel Execution"
-            except Exception as e:
-                logger.warning(f"3OX.Bridge :: Motor Rust falló ({type(e).__name__}). No hay fallback.")
-        
-        return False, 0.0, "Rust Unavailable"
+        return self.match_batch([(name1, name2, ean1, ean2)])[0]
 
 # Global Dispatcher
 kernel = SmartBridge()
@@ -3,11 +3,11 @@ import hmac
 import os
 from typing import Optional
 import httpx
-from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from loguru import logger
 from src.core.config import settings
 from src.domain.models import AuthorizedDeviceModel
+from src.core.auth_cache import auth_cache, device_access_tracker
 
 class SecurityShield:
     """
@@ -64,7 +64,17 @@ class SecurityShield:
         """
         Verifica si un dispositivo tiene permiso. 
         Si es nuevo, lo registra y notifica al administrador.
+        Phase 111: los dispositivos conocidos se resuelven desde AuthCache y
+        last_access_at se vuelca por lotes (sin escrituras en el camino caliente).
         """
+        is_authorized = auth_cache.get_device(device_id)
+        if is_authorized is not None:
+            device_access_tracker.touch(device_id, db)
+            if not is_authorized:
+                logger.warning(f"🚫 Acceso denegado para dispositivo conocido pero no autorizado: {device_id}")
+            return is_authorized
+
+        generation = auth_cache.generation
         device = db.query(AuthorizedDeviceModel).filter(AuthorizedDeviceModel.device_id == device_id).first()
         
         if not device:
@@ -100,8 +110,8 @@ class SecurityShield:
             return False
             
         # El dispositivo ya es conocido
-        device.last_access_at = datetime.now(timezone.utc).replace(tzinfo=None)
-        db.commit()
+        auth_cache.put_device(device_id, device.is_authorized, generation)
+        device_access_tracker.touch(device_id, db)
         
         if not device.is_authorized:
             logger.warning(f"🚫 Acceso denegado para dispositivo conocido pero no autorizado: {device_id}")
@@ -1,4 +1,11 @@
 import re
+from typing import Iterable, List, Tuple
+
+from src.core.normalization_cache import memoized
+
+# Phase 104: 'vintage' o un año 1980-1989 en una única pasada precompilada
+_VINTAGE_RE = re.compile(r"vintage|\b198[0-9]\b", re.IGNORECASE)
+
 
 def check_is_vintage(text: str) -> bool:
     """
@@ -8,17 +15,12 @@ def check_is_vintage(text: str) -> bool:
     """
     if not text:
         return False
-    
-    text_lower = text.lower()
-    if "vintage" in text_lower:
-        return True
-        
-    # Match any word boundaries containing a year between 1980 and 1989
-    years = re.findall(r"\b(198[0-9])\b", text)
-    if years:
-        return True
-        
-    return False
+    return _check_is_vintage(text)
+
+
+@memoized("vintage_utils.check_is_vintage")
+def _check_is_vintage(text: str) -> bool:
+    return _VINTAGE_RE.search(text) is not None
 
 
 # --- MOTU RELEVANCE & BRAND EXCLUSIONS ---
@@ -47,6 +49,34 @@ MOTU_CORE_KEYWORDS = [
     r"turbodactyl\b", r"bionatops\b", r"tyrantisaurus\b", r"lote\s+motu\b", r"figura\s+motu\b"
 ]
 
+# Exclusion List (Hard Blacklist): marca -> patrón, en orden de prioridad del motivo
+MOTU_BRAND_BLACKLIST = {
+    "funko": r"funko",
+    "pop": r"\bpop\b|\bpops\b",
+    "big jim": r"big[\s-]*jim",
+    "masterverse": r"masterverse",
+    "gi joe": r"gi[\s-]*joe|g\.i\.[\s-]*joe",
+    "star wars": r"star\s*wars",
+    "action man": r"action\s*man",
+    "madelman": r"madelman",
+    "geyperman": r"geyperman",
+    "max steel": r"max\s*steel",
+    "barbie": r"barbie",
+    "marvel legends": r"marvel\s*legends?",
+    "dc multiverse": r"dc\s*multiverse|dc\s*universe|mcfarlane"
+}
+
+# Phase 104: cada lista se compila en UNA alternancia, así que un título se recorre
+# una vez por lista en lugar de ~165 re.search con patrones sin compilar. El motivo
+# de exclusión se resuelve (camino raro) con los patrones individuales en su orden,
+# para devolver exactamente la misma marca que la versión secuencial.
+_BLACKLIST_ANY = re.compile("|".join(f"(?:{p})" for p in MOTU_BRAND_BLACKLIST.values()))
+_BLACKLIST_EACH = [(brand, re.compile(p)) for brand, p in MOTU_BRAND_BLACKLIST.items()]
+_KEYWORDS_ANY = re.compile("|".join(f"(?:{p})" for p in MOTU_CORE_KEYWORDS))
+
+_NO_KEYWORD_REASON = "No contiene ninguna palabra clave de Masters of the Universe"
+
+
 def validate_motu_relevance(text: str) -> tuple[bool, str]:
     """
     Validates if a given text title is relevant to the Masters of the Universe universe.
@@ -55,34 +85,24 @@ def validate_motu_relevance(text: str) -> tuple[bool, str]:
     """
     if not text:
         return False, "Texto vacío"
-        
-    text_lower = text.lower()
-    
+    return _validate_motu_relevance(text.lower())
+
+
+@memoized("vintage_utils.validate_motu_relevance")
+def _validate_motu_relevance(text_lower: str) -> Tuple[bool, str]:
     # 1. Exclusion List (Hard Blacklist)
-    blacklist = {
-        "funko": r"funko",
-        "pop": r"\bpop\b|\bpops\b",
-        "big jim": r"big[\s-]*jim",
-        "masterverse": r"masterverse",
-        "gi joe": r"gi[\s-]*joe|g\.i\.[\s-]*joe",
-        "star wars": r"star\s*wars",
-        "action man": r"action\s*man",
-        "madelman": r"madelman",
-        "geyperman": r"geyperman",
-        "max steel": r"max\s*steel",
-        "barbie": r"barbie",
-        "marvel legends": r"marvel\s*legends?",
-        "dc multiverse": r"dc\s*multiverse|dc\s*universe|mcfarlane"
-    }
-    
-    for brand, pattern in blacklist.items():
-        if re.search(pattern, text_lower):
-            return False, f"Marca excluida detectada: {brand.capitalize()}"
-            
+    if _BLACKLIST_ANY.search(text_lower):
+        for brand, pattern in _BLACKLIST_EACH:
+            if pattern.search(text_lower):
+                return False, f"Marca excluida detectada: {brand.capitalize()}"
+
     # 2. Inclusion List (MOTU Keywords)
-    for pattern in MOTU_CORE_KEYWORDS:
-        if re.search(pattern, text_lower):
-            return True, ""
-            
-    return False, "No contiene ninguna palabra clave de Masters of the Universe"
+    if _KEYWORDS_ANY.search(text_lower):
+        return True, ""
+    return False, _NO_KEYWORD_REASON
+
+
+def validate_motu_relevance_batch(texts: Iterable[str]) -> List[Tuple[bool, str]]:
+    """Clasifica un lote de títulos (mismo orden); los repetidos salen de la caché."""
+    return [validate_motu_relevance(text) for text in texts]
 
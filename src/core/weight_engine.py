@@ -1,92 +1,213 @@
 
-import re
+import json
 import math
-import unicodedata
+import os
 import threading
-from typing import Dict, Set, Optional
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
 from collections import Counter
 from loguru import logger
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
 from src.core.config import settings
 from src.domain.models import ProductModel
+from src.core.normalization_cache import fold_tokens, memoized
+
+# Formato del fichero de snapshot (cambiar si cambia la tokenización)
+SNAPSHOT_FORMAT = 1
+_PENDING_KEY = "weight_engine_pending"
+
+
+def catalog_fingerprint(db: Session) -> str:
+    """
+    Versión barata del catálogo (consultas agregadas, sin cargar filas): nº de
+    productos, id máximo y cursor del diario de sync (Phase 105). Cada alta, baja,
+    renombrado o cambio de subcategoría hecho por el ORM (también las operaciones
+    masivas) avanza el cursor, aunque el nombre nuevo tenga la misma longitud.
+    """
+    from src.infrastructure.repositories.product_sync_log import current_cursor
+    count, max_id = db.query(func.count(ProductModel.id), func.max(ProductModel.id)).one()
+    return f"v{SNAPSHOT_FORMAT}:{count or 0}:{max_id or 0}:{current_cursor(db)}"
+
 
 class WeightEngine:
     """
     Motor Dinámico de Pesos basado en IDF (Inverse Document Frequency).
     Analiza la base de datos matriz para determinar qué palabras son 'Identidades' 
     (raras y únicas) y cuáles son 'Series' (comunes y repetitivas).
+
+    Phase 97: ya no recorre el catálogo al importar. Los conteos se cargan bajo
+    demanda desde un snapshot en disco (validado con catalog_fingerprint) y sólo
+    si no coincide se recuentan una vez con la sesión compartida. A partir de ahí
+    las altas, renombrados y bajas de productos ajustan únicamente sus tokens.
     """
     
-    def __init__(self, db_url: Optional[str] = None):
-        # Usar la base de datos de configuración por defecto
-        self.db_url = db_url or settings.DATABASE_URL
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = Path(snapshot_path or settings.IDF_SNAPSHOT_PATH)
         self.weights: Dict[str, float] = {}
         self.token_df: Counter = Counter()
         self.total_docs: int = 0
+        self.is_loaded = False
         self._lock = threading.Lock()
-        
-        # Cargar inicial
-        self.refresh()
-
-    def normalize(self, text: str) -> Set[str]:
-        if not text: return set()
-        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
-        text = text.lower()
-        text = re.sub(r'[^a-z0-9]', ' ', text)
-        tokens = set(text.split())
-        # Filtro básico: longitud > 1 para evitar ruido (ej: 'a', 'la')
-        return {t for t in tokens if len(t) > 1 or t.isdigit()}
-
-    def refresh(self):
-        """Recalcula los pesos analizando todos los productos de la DB."""
+        self._load_lock = threading.Lock()
+
+    def normalize(self, text: str) -> FrozenSet[str]:
+        return _idf_tokens(text or "")
+
+    # --- Carga --------------------------------------------------------------------
+
+    def ensure_loaded(self, db: Optional[Session] = None):
+        """Primera lectura: snapshot si sigue vigente; si no, un recuento completo."""
+        if self.is_loaded:
+            return
+        with self._load_lock:
+            if self.is_loaded:
+                return
+            try:
+                if db is not None:
+                    self._load_or_refresh(db)
+                else:
+                    from src.infrastructure.database_cloud import SessionCloud
+                    with SessionCloud() as session:
+                        self._load_or_refresh(session)
+            except Exception as e:
+                logger.error(f"WeightEngine: Error loading weights: {e}")
+            finally:
+                # Sin DB se trabaja con pesos por defecto; refresh() permite reintentar
+                self.is_loaded = True
+
+    def _load_or_refresh(self, db: Session):
+        fingerprint = catalog_fingerprint(db)
+        if self.load_snapshot(fingerprint):
+            return
+        self.refresh(db, fingerprint)
+
+    def refresh(self, db: Optional[Session] = None, fingerprint: Optional[str] = None):
+        """Recalcula los pesos analizando todos los productos de la DB (y guarda snapshot)."""
+        if db is None:
+            from src.infrastructure.database_cloud import SessionCloud
+            with SessionCloud() as session:
+                return self.refresh(session, fingerprint)
+
         try:
-            engine = create_engine(self.db_url)
-            Session = sessionmaker(bind=engine)
-            with Session() as session:
-                products = session.query(ProductModel).all()
-                new_total_docs = len(products)
-                
-                if new_total_docs == 0:
-                    logger.warning("WeightEngine: Database is empty. Using default weights.")
-                    return
-
-                new_df = Counter()
-                for p in products:
-                    combined = f"{p.name} {p.sub_category or ''}"
-                    tokens = self.normalize(combined)
-                    for t in tokens:
-                        new_df[t] += 1
-                
-                # Calcular Pesos Dinámicos
-                new_weights = {}
-                max_idf = math.log10(new_total_docs) if new_total_docs > 0 else 1
-                
-                for t, count in new_df.items():
-                    # IDF = log10(Total / df)
-                    idf = math.log10(new_total_docs / count)
-                    # Escala [1.0, 10.0]
-                    # Si aparece en todos (df=N), idf=0 -> peso=1.0
-                    # Si aparece en 1 (df=1), idf=max -> peso=10.0
-                    scale = 9 * (idf / max_idf) if max_idf > 0 else 0
-                    new_weights[t] = round(1.0 + scale, 2)
-
-                with self._lock:
-                    self.weights = new_weights
-                    self.token_df = new_df
-                    self.total_docs = new_total_docs
-                
-                logger.success(f"WeightEngine: Refreshed weights for {len(self.weights)} tokens from {new_total_docs} products.")
-                
+            rows = db.query(ProductModel.name, ProductModel.sub_category).all()
+            if not rows:
+                logger.warning("WeightEngine: Database is empty. Using default weights.")
+                return
+
+            new_df = Counter()
+            for name, sub_category in rows:
+                new_df.update(self.normalize(f"{name} {sub_category or ''}"))
+
+            self.load_counts(new_df, len(rows), fingerprint or catalog_fingerprint(db))
+            logger.success(f"WeightEngine: Refreshed weights for {len(self.weights)} tokens from {len(rows)} products.")
         except Exception as e:
             logger.error(f"WeightEngine: Error refreshing weights: {e}")
 
+    # --- Snapshot en disco ------------------------------------------------------------
+
+    def load_snapshot(self, fingerprint: str) -> bool:
+        """Carga los conteos persistidos si corresponden a esta versión del catálogo."""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("fingerprint") != fingerprint or not data.get("total_docs"):
+            return False
+        self.load_counts(Counter(data["token_df"]), data["total_docs"])
+        logger.info(f"WeightEngine: {len(self.weights)} pesos cargados desde snapshot ({fingerprint}).")
+        return True
+
+    def save_snapshot(self, fingerprint: str):
+        with self._lock:
+            data = {"fingerprint": fingerprint, "total_docs": self.total_docs, "token_df": dict(self.token_df)}
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"WeightEngine: No se pudo guardar el snapshot IDF: {e}")
+
+    # --- Pesos ----------------------------------------------------------------------
+
+    def load_counts(self, token_df: Counter, total_docs: int, fingerprint: Optional[str] = None):
+        """
+        Recalcula los pesos a partir de frecuencias documentales ya contadas
+        (Phase 93: CatalogIndex las aporta al cargarse). Con fingerprint, además
+        se persisten como snapshot para el próximo arranque.
+        """
+        if total_docs <= 0:
+            return
+
+        new_weights = {t: _weight(count, total_docs) for t, count in token_df.items()}
+
+        with self._lock:
+            self.weights = new_weights
+            self.token_df = token_df
+            self.total_docs = total_docs
+            self.is_loaded = True
+
+        if fingerprint:
+            self.save_snapshot(fingerprint)
+
+    def apply_changes(self, changes: Iterable[Tuple[int, FrozenSet[str], FrozenSet[str]]]):
+        """
+        Phase 97: aplica altas/renombrados/bajas ya confirmados como tuplas
+        (Δdocumentos, tokens_añadidos, tokens_retirados): alta (1, tokens, ∅),
+        baja (-1, ∅, tokens), renombrado (0, nuevos, perdidos).
+        Si el nº de documentos no cambia sólo se recalculan los tokens afectados;
+        si cambia, log(N) mueve todas las escalas y se recalculan desde los conteos
+        en memoria (nunca desde la DB).
+        """
+        delta, docs_delta = Counter(), 0
+        for docs, added, removed in changes:
+            docs_delta += docs
+            for t in added:
+                delta[t] += 1
+            for t in removed:
+                delta[t] -= 1
+
+        with self._lock:
+            if not self.is_loaded or (not docs_delta and not any(delta.values())):
+                return
+            token_df = Counter(self.token_df)
+            token_df.update(delta)
+            token_df = Counter({t: c for t, c in token_df.items() if c > 0})
+            total_docs = self.total_docs + docs_delta
+
+            if total_docs <= 0:
+                weights = {}
+            elif docs_delta:
+                weights = {t: _weight(c, total_docs) for t, c in token_df.items()}
+            else:
+                weights = dict(self.weights)
+                for t in delta:
+                    if t in token_df:
+                        weights[t] = _weight(token_df[t], total_docs)
+                    else:
+                        weights.pop(t, None)
+
+            self.weights = weights
+            self.token_df = token_df
+            self.total_docs = total_docs
+
+    def snapshot(self) -> Dict[str, float]:
+        """Referencia inmutable a los pesos vigentes (load_counts sustituye el dict, no lo muta)."""
+        self.ensure_loaded()
+        with self._lock:
+            return self.weights
+
     def get_weight(self, token: str) -> float:
         """
         Devuelve el peso de un token. 
         Si es conocido, se usa su IDF [1.0, 10.0].
         Si es DESCONOCIDO, se asume que es RUIDO (peso 1.0) para no penalizar el match.
         """
+        if not self.is_loaded:
+            self.ensure_loaded()
         with self._lock:
             # Si no conocemos el token, probablemente sea una palabra de la web que no está en la DB
             return self.weights.get(token, 1.0)
@@ -94,10 +215,89 @@ class WeightEngine:
     def is_identity(self, token: str) -> bool:
         """Determina si un token es una Identidad Crítica (peso > 5.0)."""
         # Solo consideramos identidades palabras que SÍ están en nuestra DB
+        if not self.is_loaded:
+            self.ensure_loaded()
         with self._lock:
             if token not in self.weights:
                 return False
             return self.weights[token] > 5.0
 
+def _weight(count: int, total_docs: int) -> float:
+    # IDF = log10(Total / df), escalado a [1.0, 10.0]:
+    # si aparece en todos (df=N), idf=0 -> peso=1.0; si aparece en 1 (df=1), idf=max -> peso=10.0
+    max_idf = math.log10(total_docs)
+    idf = math.log10(total_docs / count)
+    scale = 9 * (idf / max_idf) if max_idf > 0 else 0
+    return round(1.0 + scale, 2)
+
+
+@memoized("weight_engine.normalize")
+def _idf_tokens(text: str) -> FrozenSet[str]:
+    if not text: return frozenset()
+    tokens = set(fold_tokens(text))
+    # Filtro básico: longitud > 1 para evitar ruido (ej: 'a', 'la')
+    return frozenset(t for t in tokens if len(t) > 1 or t.isdigit())
+
 # Singleton global instance
 weights_manager = WeightEngine()
+
+
+# --- Eventos ORM: ajustes de DF por producto, aplicados sólo tras el commit ----------
+
+def _product_tokens(name, sub_category) -> FrozenSet[str]:
+    return weights_manager.normalize(f"{name} {sub_category or ''}")
+
+
+def _stage(target, change: Tuple[int, FrozenSet[str], FrozenSet[str]]):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+@event.listens_for(ProductModel.name, "set", active_history=True)
+@event.listens_for(ProductModel.sub_category, "set", active_history=True)
+def _keep_previous_value(target, value, oldvalue, initiator):
+    # active_history: carga el valor anterior aunque el atributo esté expirado,
+    # para que after_update sepa qué tokens retirar en un renombrado
+    pass
+
+
+@event.listens_for(ProductModel, "after_insert")
+def _on_product_inserted(mapper, connection, target):
+    if weights_manager.is_loaded:
+        _stage(target, (1, _product_tokens(target.name, target.sub_category), frozenset()))
+
+
+@event.listens_for(ProductModel, "after_update")
+def _on_product_updated(mapper, connection, target):
+    if not weights_manager.is_loaded:
+        return
+    state = inspect(target)
+    name_hist, sub_hist = state.attrs.name.history, state.attrs.sub_category.history
+    if not name_hist.has_changes() and not sub_hist.has_changes():
+        return
+    old_name = name_hist.deleted[0] if name_hist.deleted else target.name
+    old_sub = sub_hist.deleted[0] if sub_hist.deleted else target.sub_category
+    old_tokens = _product_tokens(old_name, old_sub)
+    new_tokens = _product_tokens(target.name, target.sub_category)
+    if old_tokens != new_tokens:
+        # Renombrado: mismo documento, sólo cambian los tokens distintos
+        _stage(target, (0, new_tokens - old_tokens, old_tokens - new_tokens))
+
+
+@event.listens_for(ProductModel, "after_delete")
+def _on_product_deleted(mapper, connection, target):
+    if weights_manager.is_loaded:
+        _stage(target, (-1, frozenset(), _product_tokens(target.name, target.sub_category)))
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        weights_manager.apply_changes(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
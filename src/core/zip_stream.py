@@ -0,0 +1,232 @@
+import hashlib
+import os
+import struct
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+# Tamaño de lectura/envío: la memoria del stream no depende del tamaño del catálogo
+CHUNK_SIZE = 64 * 1024
+# CRC32 ya calculados por (ruta, tamaño, mtime_ns): una descarga reanudada no relee lo ya enviado
+_CRC_CACHE: Dict[Tuple[str, int, int], int] = {}
+_CRC_CACHE_MAX = 50_000
+
+_FLAGS = 0x08 | 0x800  # data descriptor tras los datos + nombres UTF-8
+_VERSION = 20
+_VERSION_ZIP64 = 45
+_UNIX_FILE_ATTR = 0o100644 << 16
+_ZIP32_MAX = 0xFFFFFFFF
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_DATA_DESCRIPTOR = struct.Struct("<4sLLL")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_ZIP64_OFFSET_EXTRA = struct.Struct("<HHQ")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    arcname: str
+    path: str
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, path: str, arcname: str) -> "ZipEntry":
+        st = os.stat(path)
+        return cls(arcname, path, st.st_size, st.st_mtime_ns)
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return (self.path, self.size, self.mtime_ns)
+
+
+def _dos_datetime(mtime_ns: int) -> Tuple[int, int]:
+    t = time.localtime(mtime_ns / 1e9)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class StreamingZip:
+    """
+    Phase 102: ZIP generado al vuelo y de forma determinista.
+
+    Las imágenes (WebP/JPEG/PNG) ya vienen comprimidas, así que se guardan con
+    ZIP_STORED: el tamaño final se conoce antes de leer un solo byte y cada
+    posición del archivo corresponde a un trozo concreto (cabecera, datos de
+    un fichero, descriptor o directorio central). Eso permite:
+
+    - emitir el ZIP en trozos de CHUNK_SIZE con memoria constante;
+    - servir cualquier rango de bytes (Range / reanudación de descargas)
+      regenerando sólo ese tramo;
+    - Content-Length exacto y un ETag estable mientras no cambien los ficheros.
+
+    Los CRC32 se calculan mientras se emiten los datos (y se cachean); sólo
+    un rango que empieza a mitad de un fichero obliga a leerlo para el CRC.
+    Se usa ZIP64 en el directorio central cuando el archivo supera los 4 GiB.
+    """
+
+    def __init__(self, entries: List[ZipEntry]):
+        self.entries = [e for e in entries if e.size < _ZIP32_MAX]
+        for skipped in set(entries) - set(self.entries):
+            logger.warning(f"📦 ZIP: {skipped.path} supera 4 GiB y se omite.")
+
+        # (offset, longitud, tipo, dato) en orden; tipo: bytes | file | descriptor | central
+        self._segments: List[Tuple[int, int, str, object]] = []
+        self._offsets: List[int] = []
+        self._names = [e.arcname.encode("utf-8") for e in self.entries]
+
+        offset = 0
+        for idx, entry in enumerate(self.entries):
+            self._offsets.append(offset)
+            header = self._local_header(idx)
+            offset = self._add(offset, len(header), "bytes", header)
+            offset = self._add(offset, entry.size, "file", idx)
+            offset = self._add(offset, _DATA_DESCRIPTOR.size, "descriptor", idx)
+
+        self._central_offset = offset
+        self._central_size = sum(
+            _CENTRAL_HEADER.size + len(name) + (_ZIP64_OFFSET_EXTRA.size if self._offsets[i] >= _ZIP32_MAX else 0)
+            for i, name in enumerate(self._names)
+        )
+        offset = self._add(offset, self._central_size, "central", None)
+        end = self._end_records()
+        offset = self._add(offset, len(end), "bytes", end)
+        self.total_size = offset
+
+    def _add(self, offset: int, length: int, kind: str, data) -> int:
+        if length:
+            self._segments.append((offset, length, kind, data))
+        return offset + length
+
+    @property
+    def etag(self) -> str:
+        digest = hashlib.md5(usedforsecurity=False)
+        for entry in self.entries:
+            digest.update(f"{entry.arcname}\0{entry.size}\0{entry.mtime_ns}\n".encode("utf-8"))
+        return f'"{digest.hexdigest()}"'
+
+    # --- Registros ZIP ---------------------------------------------------------------
+
+    def _local_header(self, idx: int) -> bytes:
+        entry, name = self.entries[idx], self._names[idx]
+        dos_time, dos_date = _dos_datetime(entry.mtime_ns)
+        return _LOCAL_HEADER.pack(
+            b"PK\x03\x04", _VERSION, 0, _FLAGS, zipfile.ZIP_STORED, dos_time, dos_date,
+            0, entry.size, entry.size, len(name), 0,
+        ) + name
+
+    def _descriptor(self, idx: int) -> bytes:
+        entry = self.entries[idx]
+        return _DATA_DESCRIPTOR.pack(b"PK\x07\x08", self.crc(idx), entry.size, entry.size)
+
+    def _central_directory(self) -> bytes:
+        records = []
+        for idx, entry in enumerate(self.entries):
+            name, offset = self._names[idx], self._offsets[idx]
+            dos_time, dos_date = _dos_datetime(entry.mtime_ns)
+            extra = b""
+            version = _VERSION
+            if offset >= _ZIP32_MAX:
+                extra = _ZIP64_OFFSET_EXTRA.pack(0x0001, 8, offset)
+                offset, version = _ZIP32_MAX, _VERSION_ZIP64
+            records.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", version, 3, version, 0, _FLAGS, zipfile.ZIP_STORED, dos_time, dos_date,
+                self.crc(idx), entry.size, entry.size, len(name), len(extra), 0, 0, 0,
+                _UNIX_FILE_ATTR, offset,
+            ) + name + extra)
+        return b"".join(records)
+
+    def _end_records(self) -> bytes:
+        count = len(self.entries)
+        cd_offset, cd_size = self._central_offset, self._central_size
+        if count < 0xFFFF and cd_offset < _ZIP32_MAX and cd_size < _ZIP32_MAX:
+            return _END_RECORD.pack(b"PK\x05\x06", 0, 0, count, count, cd_size, cd_offset, 0)
+
+        zip64_end_offset = cd_offset + cd_size
+        return (
+            _ZIP64_END_RECORD.pack(
+                b"PK\x06\x06", _ZIP64_END_RECORD.size - 12, _VERSION_ZIP64, _VERSION_ZIP64,
+                0, 0, count, count, cd_size, cd_offset,
+            )
+            + _ZIP64_END_LOCATOR.pack(b"PK\x06\x07", 0, zip64_end_offset, 1)
+            + _END_RECORD.pack(
+                b"PK\x05\x06", 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                min(cd_size, _ZIP32_MAX), min(cd_offset, _ZIP32_MAX), 0,
+            )
+        )
+
+    # --- CRC ---------------------------------------------------------------------------
+
+    def crc(self, idx: int) -> int:
+        entry = self.entries[idx]
+        value = _CRC_CACHE.get(entry.key)
+        if value is None:
+            value = 0
+            for chunk in self._read(entry, 0, entry.size):
+                value = zlib.crc32(chunk, value)
+            _remember_crc(entry.key, value)
+        return value
+
+    @staticmethod
+    def _read(entry: ZipEntry, start: int, end: int) -> Iterator[bytes]:
+        """Bytes [start, end) del fichero; falla si ha encogido desde que se listó."""
+        with open(entry.path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"{entry.path} cambió durante la descarga del ZIP")
+                remaining -= len(chunk)
+                yield chunk
+
+    # --- Emisión ---------------------------------------------------------------------
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Genera los bytes [start, end] (ambos inclusive, como en Range) del ZIP."""
+        end = self.total_size - 1 if end is None else min(end, self.total_size - 1)
+        for seg_offset, length, kind, data in self._segments:
+            seg_end = seg_offset + length
+            if seg_end <= start:
+                continue
+            if seg_offset > end:
+                break
+            lo, hi = max(start - seg_offset, 0), min(end + 1 - seg_offset, length)
+
+            if kind == "file":
+                entry = self.entries[data]
+                crc = 0 if lo == 0 and entry.key not in _CRC_CACHE else None
+                for chunk in self._read(entry, lo, hi):
+                    if crc is not None:
+                        crc = zlib.crc32(chunk, crc)
+                    yield chunk
+                if crc is not None and hi == length:
+                    _remember_crc(entry.key, crc)
+                continue
+
+            if kind == "bytes":
+                blob = data
+            elif kind == "descriptor":
+                blob = self._descriptor(data)
+            else:
+                blob = self._central_directory()
+            yield blob[lo:hi]
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_range()
+
+
+def _remember_crc(key: Tuple[str, int, int], value: int):
+    if len(_CRC_CACHE) >= _CRC_CACHE_MAX:
+        _CRC_CACHE.clear()
+    _CRC_CACHE[key] = value
@@ -1,6 +1,6 @@
-from sqlalchemy import Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, UniqueConstraint
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import List, Optional
 
 DOMAIN_VERSION = "1.2.1-GUARDIAN"
@@ -579,6 +579,43 @@ class CharacterLoreModel(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+class ProductSyncLogModel(Base):
+    """
+    Diario de cambios del catálogo para la sincronización delta de IndexedDB (Phase 105).
+    El id autoincremental es el cursor de sync: monotónico y opaco para el cliente.
+    op: "upsert" (alta/cambio), "delete" (tombstone) o "reset" (operación masiva:
+    el cliente debe resincronizar el catálogo completo).
+    """
+    __tablename__ = "product_sync_log"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    product_id: Mapped[Optional[int]] = mapped_column(Integer, index=True, nullable=True)
+    op: Mapped[str] = mapped_column(String)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+class MarketIndexDailyModel(Base):
+    """
+    Serie diaria materializada del Eternia Market Index (Phase 106).
+    Una fila por día y Wave (wave "*" = índice global). avg_price/samples agregan
+    price_history de ese día; figures_count/avg_msrp/avg_market son la foto del
+    catálogo tomada por el job de mantenimiento (sólo en los días en que corre).
+    """
+    __tablename__ = "market_index_daily"
+    __table_args__ = (UniqueConstraint("day", "wave", name="uq_market_index_daily_day_wave"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, index=True)
+    wave: Mapped[str] = mapped_column(String)
+
+    avg_price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    samples: Mapped[int] = mapped_column(Integer, default=0)
+
+    figures_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    avg_msrp: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    avg_market: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
 __all__ = [
     "Base", 
     "ProductModel", 
@@ -604,6 +641,8 @@ __all__ = [
     "VintageMiscellaneousModel",
     "ProductMonthlyStatsModel",
     "CharacterLoreModel",
+    "ProductSyncLogModel",
+    "MarketIndexDailyModel",
     "DOMAIN_VERSION"
 ]
 
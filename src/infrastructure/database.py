@@ -28,6 +28,11 @@ if "sqlite" in settings.DATABASE_URL:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Phase 105: registra los eventos ORM del diario de sync del catálogo (delta de IndexedDB)
+import src.infrastructure.repositories.product_sync_log  # noqa: E402,F401
+# Phase 109: eventos ORM que versionan/invalidan la caché de reglas logísticas
+import src.infrastructure.repositories.logistic_rules_cache  # noqa: E402,F401
+
 def init_db():
     """Initializes the database tables and runs migrations."""
     from src.domain.models import Base
@@ -30,6 +30,11 @@ engine_cloud = create_engine(
 )
 SessionCloud = sessionmaker(autocommit=False, autoflush=False, bind=engine_cloud)
 
+# Phase 105: registra los eventos ORM del diario de sync del catálogo (delta de IndexedDB)
+import src.infrastructure.repositories.product_sync_log  # noqa: E402,F401
+# Phase 109: eventos ORM que versionan/invalidan la caché de reglas logísticas
+import src.infrastructure.repositories.logistic_rules_cache  # noqa: E402,F401
+
 
 def _add_column_if_missing_sqlite(session, table: str, ddl: str) -> None:
     """
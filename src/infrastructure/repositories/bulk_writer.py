@@ -0,0 +1,222 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from src.domain.models import (
+    BlackcludedItemModel,
+    OfferHistoryModel,
+    OfferModel,
+    PendingMatchModel,
+    PriceHistoryModel,
+)
+
+
+# Columnas que un candidato repetido refresca en el Purgatorio (mismo contrato que el
+# antiguo upsert fila a fila de REFACTOR 7.3).
+PENDING_CONFLICT_COLUMNS = ["price", "found_at", "scraped_name", "last_price_update", "is_sold", "sold_at"]
+# Items bloqueados por el Centinela: sólo se refresca el veredicto.
+BLOCKED_CONFLICT_COLUMNS = ["price", "is_blocked", "anomaly_flags", "validation_status"]
+# Columnas de una oferta vinculada que el pipeline recalcula en cada escaneo.
+OFFER_UPDATE_COLUMNS = [
+    "price", "min_price", "max_price", "is_available", "last_seen", "source_type",
+    "time_left_raw", "sold_at", "is_sold", "original_listing_date", "last_price_update",
+    "opportunity_score",
+]
+
+SNAPSHOT_INTERVAL_SECONDS = 86400
+
+
+class PipelineBulkWriter:
+    """
+    Phase 91: Escritor por lotes del ScrapingPipeline.
+
+    El pipeline clasifica el lote en memoria y encola aquí las filas; `flush()` las
+    escribe con un número fijo de sentencias por lote (en vez de una por oferta):
+    - Purgatorio: un INSERT ... ON CONFLICT(url) DO UPDATE multi-fila.
+    - Ofertas vinculadas: un INSERT ... ON CONFLICT(id) DO UPDATE multi-fila.
+    - PriceHistory / OfferHistory / Blacklist: un executemany cada uno.
+
+    PostgreSQL usa su dialecto nativo y SQLite el suyo (ON CONFLICT requiere 3.24+).
+    Cualquier otro motor cae a SELECT previo + INSERT/UPDATE por lotes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.pending_rows: List[dict] = []
+        self.blocked_pending_rows: List[dict] = []
+        self.offer_updates: List[tuple] = []
+        self.blacklist_rows: List[dict] = []
+        self.history_rows: List[dict] = []
+
+    # --- Encolado -----------------------------------------------------------
+
+    def queue_pending(self, row: dict, blocked: bool = False):
+        (self.blocked_pending_rows if blocked else self.pending_rows).append(row)
+
+    def queue_offer_update(self, offer: OfferModel, offer_data: dict):
+        self.offer_updates.append((offer, offer_data))
+
+    def queue_blacklist(self, row: dict):
+        self.blacklist_rows.append(row)
+
+    def queue_history(self, row: dict):
+        self.history_rows.append(row)
+
+    # --- Escritura ------------------------------------------------------------
+
+    def flush(self) -> Dict[str, set]:
+        """
+        Escribe todo lo encolado sin commitear (el pipeline commitea el lote entero).
+        Retorna {"pending": urls_escritas, "blocked": urls_escritas} para que el
+        llamante cuente novedades y dispare alertas sólo de lo que llegó a la BD.
+        """
+        written = {
+            "pending": self._upsert_pending(self.pending_rows, PENDING_CONFLICT_COLUMNS),
+            "blocked": self._upsert_pending(self.blocked_pending_rows, BLOCKED_CONFLICT_COLUMNS),
+        }
+        self._write_offer_updates()
+        if self.blacklist_rows:
+            self.db.execute(insert(BlackcludedItemModel), self.blacklist_rows)
+        if self.history_rows:
+            self.db.execute(insert(OfferHistoryModel), self.history_rows)
+
+        self.pending_rows, self.blocked_pending_rows = [], []
+        self.offer_updates, self.blacklist_rows, self.history_rows = [], [], []
+        return written
+
+    def _dialect_insert(self):
+        """Devuelve el `insert` con soporte ON CONFLICT del motor actual, o None."""
+        name = self.db.get_bind().dialect.name.lower()
+        if "postgresql" in name:
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+            return pg_insert
+        if name == "sqlite" and sqlite3.sqlite_version_info >= (3, 24, 0):
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            return sqlite_insert
+        return None
+
+    def _upsert_pending(self, rows: List[dict], conflict_columns: List[str]) -> set:
+        if not rows:
+            return set()
+
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is None:
+            return self._merge_pending_fallback(rows, conflict_columns)
+
+        stmt = dialect_insert(PendingMatchModel)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["url"],
+            set_={c: getattr(stmt.excluded, c) for c in conflict_columns},
+        )
+        try:
+            with self.db.begin_nested():
+                self.db.execute(stmt, rows)
+            return {r["url"] for r in rows}
+        except Exception as e:
+            # Un registro corrupto no debe tumbar el lote: se reintenta fila a fila
+            # aislando cada una en su SAVEPOINT (comportamiento previo a Phase 91).
+            logger.warning(f"⚠️ Bulk upsert al Purgatorio falló ({e}); reintentando fila a fila.")
+
+        written = set()
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(stmt, [row])
+                written.add(row["url"])
+            except Exception as e:
+                if "unique" in str(e).lower():
+                    logger.debug(f"⏳ Duplicate URL skipped (SaveMode): {row['url']}")
+                else:
+                    logger.warning(f"⚠️ Item insertion error ({row['url']}): {e}")
+        return written
+
+    def _merge_pending_fallback(self, rows: List[dict], conflict_columns: List[str]) -> set:
+        """Motores sin ON CONFLICT: un SELECT por lote y separación insert/update."""
+        urls = [r["url"] for r in rows]
+        existing_ids = dict(
+            self.db.query(PendingMatchModel.url, PendingMatchModel.id)
+            .filter(PendingMatchModel.url.in_(urls))
+            .all()
+        )
+        to_insert = [r for r in rows if r["url"] not in existing_ids]
+        to_update = [
+            {"id": existing_ids[r["url"]], **{c: r.get(c) for c in conflict_columns}}
+            for r in rows if r["url"] in existing_ids
+        ]
+        with self.db.begin_nested():
+            if to_insert:
+                self.db.execute(insert(PendingMatchModel), to_insert)
+            if to_update:
+                self.db.execute(update(PendingMatchModel), to_update)
+        return set(urls)
+
+    def _write_offer_updates(self):
+        if not self.offer_updates:
+            return
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        offer_ids = [offer.id for offer, _ in self.offer_updates]
+        # Phase 40 (snapshots): última entrada de histórico por oferta en UNA consulta agrupada
+        last_recorded = dict(
+            self.db.query(PriceHistoryModel.offer_id, func.max(PriceHistoryModel.recorded_at))
+            .filter(PriceHistoryModel.offer_id.in_(offer_ids))
+            .group_by(PriceHistoryModel.offer_id)
+            .all()
+        )
+
+        offer_rows, history_rows = [], []
+        for offer, data in self.offer_updates:
+            current_price = float(data["price"])
+            if abs(offer.price - current_price) > 0.01:
+                history_rows.append({"offer_id": offer.id, "price": current_price, "is_snapshot": False})
+            else:
+                last = last_recorded.get(offer.id)
+                if not last or (now - last).total_seconds() > SNAPSHOT_INTERVAL_SECONDS:
+                    history_rows.append({"offer_id": offer.id, "price": current_price, "is_snapshot": True})
+
+            min_price = offer.min_price or 0.0
+            max_price = offer.max_price or 0.0
+            offer_rows.append({
+                "id": offer.id,
+                "product_id": offer.product_id,
+                "shop_name": offer.shop_name,
+                "url": offer.url,
+                "price": current_price,
+                "min_price": current_price if min_price == 0 or current_price < min_price else min_price,
+                "max_price": current_price if current_price > max_price else max_price,
+                "is_available": data.get("is_available", True),
+                "last_seen": now,
+                "source_type": data.get("source_type", offer.source_type),
+                "time_left_raw": data.get("time_left_raw"),
+                "sold_at": data.get("sold_at"),
+                "is_sold": data.get("is_sold", False),
+                "original_listing_date": data.get("original_listing_date"),
+                "last_price_update": data.get("last_price_update", now),
+                "opportunity_score": data.get("opportunity_score", offer.opportunity_score),
+            })
+
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is not None:
+            stmt = dialect_insert(OfferModel)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={c: getattr(stmt.excluded, c) for c in OFFER_UPDATE_COLUMNS},
+            )
+            self.db.execute(stmt, offer_rows)
+        else:
+            # ORM bulk UPDATE por clave primaria (executemany)
+            self.db.execute(
+                update(OfferModel),
+                [{"id": r["id"], **{c: r[c] for c in OFFER_UPDATE_COLUMNS}} for r in offer_rows],
+            )
+
+        if history_rows:
+            self.db.execute(insert(PriceHistoryModel), history_rows)
+
+        # Las instancias ORM cargadas en la sesión quedan obsoletas tras la escritura Core
+        for offer, _ in self.offer_updates:
+            self.db.expire(offer)
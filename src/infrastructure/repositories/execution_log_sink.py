@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from src.domain.models import ScraperExecutionLogModel
+
+
+# Líneas acumuladas antes de forzar una escritura
+LOG_FLUSH_LINES = 50
+# Segundos máximos que una línea espera en memoria antes de llegar a la DB
+LOG_FLUSH_INTERVAL = 2.0
+
+
+class ExecutionLogSink:
+    """
+    Phase 98: Sumidero en bloque del log en vivo de una ejecución.
+
+    Sustituye al patrón "abrir sesión -> leer logs -> concatenar una línea -> guardar"
+    de cada mensaje (O(n²) bytes reescritos y un viaje a la DB por línea). Las líneas
+    se acumulan en memoria y se vuelcan por tamaño (LOG_FLUSH_LINES) o por tiempo
+    (LOG_FLUSH_INTERVAL) con un único UPDATE ... SET logs = logs || :chunk, que sólo
+    envía el tramo nuevo. Es invocable (`sink(msg)`), así que sirve directamente
+    como log_callback de scrapers y pipeline. Llamar a close() al terminar.
+    """
+
+    def __init__(
+        self,
+        log_id: Optional[int],
+        session_factory: Callable[[], Session],
+        max_lines: int = LOG_FLUSH_LINES,
+        interval: float = LOG_FLUSH_INTERVAL,
+    ):
+        self.log_id = log_id
+        self.session_factory = session_factory
+        self.max_lines = max_lines
+        self.interval = interval
+        self._buffer: List[str] = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._flushing = False
+        self.flushes = 0
+
+    def __call__(self, msg: str):
+        self.write(msg)
+
+    def write(self, msg: str):
+        if not self.log_id:
+            return
+        ts = datetime.now(ZoneInfo("Europe/Madrid")).strftime("%H:%M:%S")
+        with self._lock:
+            self._buffer.append(f"[{ts}] {msg}")
+            full = len(self._buffer) >= self.max_lines
+            if not full and self._timer is None and self.interval > 0:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Vuelca el buffer con una sola sentencia (las líneas nuevas llegan en orden)."""
+        with self._flush_lock:
+            if self._flushing:
+                return  # un log emitido durante el propio volcado espera al siguiente
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not lines:
+                return
+
+            chunk = "".join("\n" + line for line in lines)
+            self._flushing = True
+            try:
+                with self.session_factory() as db:
+                    db.execute(
+                        update(ScraperExecutionLogModel)
+                        .where(ScraperExecutionLogModel.id == self.log_id)
+                        .values(logs=func.coalesce(ScraperExecutionLogModel.logs, "") + chunk)
+                    )
+                    db.commit()
+                self.flushes += 1
+            except Exception as ex:
+                logger.warning(f"Log preservation failed: {ex}")
+            finally:
+                self._flushing = False
+
+    def close(self):
+        self.flush()
+
+
+def read_log_tail(db: Session, log_id: int, offset: int = 0) -> Optional[dict]:
+    """
+    Devuelve sólo el tramo de logs posterior a `offset` (en caracteres) junto con el
+    nuevo offset, para que la UI haga polling incremental sin descargar el texto entero.
+    """
+    offset = max(int(offset or 0), 0)
+    row = (
+        db.query(
+            ScraperExecutionLogModel.status,
+            func.length(func.coalesce(ScraperExecutionLogModel.logs, "")),
+            func.substr(func.coalesce(ScraperExecutionLogModel.logs, ""), offset + 1),
+        )
+        .filter(ScraperExecutionLogModel.id == log_id)
+        .first()
+    )
+    if row is None:
+        return None
+    status, length, chunk = row
+    if offset > length:
+        # El texto se ha consolidado/recortado (mantenimiento): se reenvía entero
+        chunk = db.query(ScraperExecutionLogModel.logs).filter(ScraperExecutionLogModel.id == log_id).scalar() or ""
+    return {"log_id": log_id, "status": status, "offset": length, "chunk": chunk}
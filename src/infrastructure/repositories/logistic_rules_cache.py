@@ -0,0 +1,224 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session, object_session
+
+from src.domain.models import LogisticRuleModel, SystemConfigModel
+
+SHOP_ALIASES = {
+    "toymi": "ToymiEU",
+    "toymieu": "ToymiEU",
+    "fantasia": "Fantasia Personajes",
+    "fantasia personajes": "Fantasia Personajes",
+    "tradeinn": "Tradeinn",
+    "tradeinn (kidinn)": "Tradeinn",
+    "tradeinn (techinn)": "Tradeinn",
+    "tradeinn (dressinn)": "Tradeinn",
+    "kidinn": "Tradeinn",
+    "techinn": "Tradeinn",
+    "wallapop": "Wallapop",
+    "wallapopmanual": "Wallapop",
+    "ebay": "Ebay.es",
+    "ebay.es": "Ebay.es",
+    "ebay.com": "Ebay.es",
+    "ebay es": "Ebay.es",
+    "frikimaz": "Frikimaz",
+    "triguetech": "Triguetech",
+    "lamansiondelterror": "LaMansionDelTerror",
+    "la mansion del terror": "LaMansionDelTerror",
+    "vinted": "Vinted",
+}
+
+# Token de versión de las reglas (cambia en cada escritura): otros procesos lo
+# comparan como mucho cada RULES_VERSION_CHECK_INTERVAL segundos
+RULES_VERSION_CONFIG_KEY = "logistic_rules_version"
+RULES_VERSION_CHECK_INTERVAL = 30
+
+_PENDING_KEY = "logistic_rules_pending"
+_DIRTY_KEY = "logistic_rules_dirty"
+_MISSING = object()
+
+
+def canonical_shop_name(shop_name: Optional[str]) -> str:
+    """Normaliza el nombre de la tienda para resolver alias conocidos."""
+    if not shop_name:
+        return ""
+    clean = shop_name.strip()
+    return SHOP_ALIASES.get(clean.lower(), clean)
+
+
+@dataclass(frozen=True)
+class LogisticRule:
+    """Copia inmutable (desligada de la sesión) de un LogisticRuleModel."""
+    shop_name: str
+    country_code: str
+    base_shipping: float = 0.0
+    free_shipping_threshold: float = 0.0
+    vat_multiplier: float = 1.0
+    custom_fees: float = 0.0
+    strategy_key: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, r: LogisticRuleModel) -> "LogisticRule":
+        return cls(
+            shop_name=r.shop_name, country_code=r.country_code,
+            base_shipping=r.base_shipping or 0.0, free_shipping_threshold=r.free_shipping_threshold or 0.0,
+            vat_multiplier=r.vat_multiplier if r.vat_multiplier is not None else 1.0,
+            custom_fees=r.custom_fees or 0.0, strategy_key=r.strategy_key,
+        )
+
+
+class RulesSnapshot:
+    """
+    Tabla de reglas inmutable compartida por todo el proceso.
+    `rules` conserva las claves `{tienda}_{país}` de los antiguos rules_map;
+    resolve() memoiza la resolución alias -> regla (con fallback a ES).
+    """
+
+    def __init__(self, rules: Iterable[LogisticRule], version: Optional[str] = None):
+        self.version = version
+        self.rules: Mapping[str, LogisticRule] = MappingProxyType(
+            {f"{r.shop_name}_{r.country_code}": r for r in rules}
+        )
+        self._resolved: Dict[Tuple[Optional[str], str], Optional[LogisticRule]] = {}
+        # Alias y nombres de tienda ya resueltos para cada país con reglas
+        countries = {r.country_code for r in self.rules.values()} | {"ES"}
+        names = set(SHOP_ALIASES) | {r.shop_name for r in self.rules.values()}
+        for country in countries:
+            for name in names:
+                self.resolve(name, country)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def get(self, key: str, default=None):
+        return self.rules.get(key, default)
+
+    def _lookup(self, shop_name: str, user_location: str) -> Optional[LogisticRule]:
+        return self.rules.get(f"{shop_name}_{user_location}") or self.rules.get(f"{shop_name}_ES")
+
+    def resolve(self, shop_name: Optional[str], user_location: str) -> Optional[LogisticRule]:
+        key = (shop_name, user_location)
+        rule = self._resolved.get(key, _MISSING)
+        if rule is _MISSING:
+            canonical = canonical_shop_name(shop_name)
+            rule = self._lookup(canonical, user_location)
+            if rule is None and shop_name and canonical != shop_name:
+                rule = self._lookup(shop_name, user_location)
+            self._resolved[key] = rule
+        return rule
+
+
+def _read_version(db: Session) -> Optional[str]:
+    return db.query(SystemConfigModel.value).filter(SystemConfigModel.key == RULES_VERSION_CONFIG_KEY).scalar()
+
+
+class LogisticRulesCache:
+    """
+    Phase 109: reglas logísticas cargadas una vez por proceso.
+
+    Las escrituras vía ORM (por fila o masivas) invalidan la instantánea local al
+    hacer commit y cambian el token de versión en system_config dentro de la misma
+    transacción; los demás procesos (scrapers, workers) lo detectan en su siguiente
+    comprobación periódica.
+    """
+
+    def __init__(self, check_interval: float = RULES_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[RulesSnapshot] = None
+        self._checked_at = 0.0
+        self._generation = 0
+
+    def fresh(self) -> Optional[RulesSnapshot]:
+        """Instantánea vigente sin tocar la DB, o None si toca recargar/comprobar versión."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        return None
+
+    def get(self, db: Session) -> RulesSnapshot:
+        return self.fresh() or self.load(db)
+
+    def load(self, db: Session) -> RulesSnapshot:
+        generation = self._generation
+        version = _read_version(db)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = RulesSnapshot(
+                (LogisticRule.from_model(r) for r in db.query(LogisticRuleModel).all()), version
+            )
+            logger.info(f"🚚 LogisticRulesCache: {len(snapshot)} reglas cargadas.")
+        with self._lock:
+            # Una invalidación durante la carga gana: no se guarda una foto posiblemente vieja
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._checked_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+            self._generation += 1
+
+
+# Singleton global instance
+logistic_rules_cache = LogisticRulesCache()
+
+
+# --- Eventos ORM: versión en la misma transacción, invalidación local tras commit ---
+
+def _bump_version(session: Session):
+    connection = session.connection()
+    table = SystemConfigModel.__table__
+    token = uuid.uuid4().hex
+    updated = connection.execute(
+        update(table).where(table.c.key == RULES_VERSION_CONFIG_KEY).values(value=token)
+    ).rowcount
+    if not updated:
+        connection.execute(insert(table).values(key=RULES_VERSION_CONFIG_KEY, value=token))
+    session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(LogisticRuleModel, "after_insert")
+@event.listens_for(LogisticRuleModel, "after_update")
+@event.listens_for(LogisticRuleModel, "after_delete")
+def _on_rule_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        logistic_rules_cache.invalidate()
+        return
+    session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session, flush_context):
+    if session.info.pop(_PENDING_KEY, False):
+        _bump_version(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state):
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is LogisticRuleModel:
+        _bump_version(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        logistic_rules_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,216 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import Integer, String, cast, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+
+from src.domain.models import ProductModel, ProductSyncLogModel, SystemConfigModel
+
+# Campos de ProductModel que cachea el cliente (IndexedDB): sólo sus cambios generan delta
+SYNCED_FIELDS = ("name", "sub_category", "release_year", "retail_price", "p25_price", "image_url", "ean", "is_vintage")
+# Entradas de diario más antiguas se purgan en el mantenimiento; un cliente con un
+# cursor anterior al suelo purgado recibe un full sync
+SYNC_LOG_RETENTION_DAYS = 30
+SYNC_FLOOR_CONFIG_KEY = "product_sync_floor"
+# Contador de cursores: se incrementa en la misma transacción que el cambio y su
+# bloqueo de fila (hasta el commit) hace que las entradas se commiteen en orden de id
+SYNC_SEQUENCE_CONFIG_KEY = "product_sync_sequence"
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+_PENDING_KEY = "product_sync_pending"
+
+
+# --- Captura de cambios (eventos ORM) --------------------------------------------------
+
+def _stage(session: Optional[Session], product_id: Optional[int], op: str):
+    if session is not None:
+        # Por flush basta una entrada por producto (la última operación manda)
+        session.info.setdefault(_PENDING_KEY, {})[product_id] = op
+
+
+@event.listens_for(ProductModel, "after_insert")
+def _on_product_inserted(mapper, connection, target):
+    _stage(object_session(target), target.id, "upsert")
+
+
+@event.listens_for(ProductModel, "after_update")
+def _on_product_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in SYNCED_FIELDS):
+        _stage(object_session(target), target.id, "upsert")
+
+
+@event.listens_for(ProductModel, "after_delete")
+def _on_product_deleted(mapper, connection, target):
+    _stage(object_session(target), target.id, "delete")
+
+
+def _reserve_cursors(connection, count: int) -> int:
+    """
+    Reserva `count` cursores consecutivos y devuelve el primero.
+
+    El id autoincremental se asigna al INSERT y no al COMMIT: con escritores
+    concurrentes una transacción con el id N podría commitear después de que un
+    cliente ya hubiera leído N+1 y perdería ese cambio para siempre. El UPDATE del
+    contador bloquea su fila hasta el commit (en SQLite, la escritura ya serializa),
+    así que los escritores del diario se ordenan y cada cursor leído es definitivo.
+    """
+    table = SystemConfigModel.__table__
+    row = connection.execute(
+        update(table)
+        .where(table.c.key == SYNC_SEQUENCE_CONFIG_KEY)
+        .values(value=cast(cast(table.c.value, Integer) + count, String))
+        .returning(table.c.value)
+    ).first()
+    if row is not None:
+        return int(row[0]) - count + 1
+    # Primer uso: el contador arranca tras el último id ya escrito
+    last = connection.execute(select(func.coalesce(func.max(ProductSyncLogModel.id), 0))).scalar()
+    connection.execute(insert(table).values(key=SYNC_SEQUENCE_CONFIG_KEY, value=str(last + count)))
+    return last + 1
+
+
+@event.listens_for(Session, "after_flush")
+def _write_pending(session, flush_context):
+    pending: Dict[Optional[int], str] = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        # Un único INSERT multi-fila en la misma transacción que el cambio
+        now = datetime.now(timezone.utc)
+        connection = session.connection()
+        first = _reserve_cursors(connection, len(pending))
+        connection.execute(
+            insert(ProductSyncLogModel),
+            [{"id": first + i, "product_id": pid, "op": op, "changed_at": now}
+             for i, (pid, op) in enumerate(pending.items())],
+        )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state):
+    # query(ProductModel).delete()/update() no pasa por los eventos por fila: se
+    # registra un "reset" para que los clientes resincronicen el catálogo completo
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is ProductModel:
+        connection = orm_execute_state.session.connection()
+        connection.execute(insert(ProductSyncLogModel).values(
+            id=_reserve_cursors(connection, 1), product_id=None, op="reset", changed_at=datetime.now(timezone.utc)
+        ))
+
+
+# --- Lectura del delta -------------------------------------------------------------------
+
+def current_cursor(db: Session) -> int:
+    """Último cursor commiteado (el contador sobrevive a la purga del diario)."""
+    sequence = db.query(SystemConfigModel.value).filter(SystemConfigModel.key == SYNC_SEQUENCE_CONFIG_KEY).scalar()
+    last_id = db.query(func.coalesce(func.max(ProductSyncLogModel.id), 0)).scalar()
+    return max(int(sequence or 0), last_id)
+
+
+def _sync_floor(db: Session) -> int:
+    cfg = db.get(SystemConfigModel, SYNC_FLOOR_CONFIG_KEY)
+    return int(cfg.value) if cfg and cfg.value else 0
+
+
+def _product_row(p) -> dict:
+    return {
+        "id": p.id,
+        "name": p.name,
+        "sub_category": p.sub_category or "Origins",
+        "release_year": p.release_year,
+        "retail_price": p.retail_price,
+        "p25_price": p.p25_price,
+        "image_url": p.image_url,
+        "sku": p.ean or str(p.id),
+    }
+
+
+_PRODUCT_COLUMNS = (
+    ProductModel.id, ProductModel.name, ProductModel.sub_category, ProductModel.release_year,
+    ProductModel.retail_price, ProductModel.p25_price, ProductModel.image_url, ProductModel.ean,
+)
+
+
+def read_delta(db: Session, cursor: Optional[int] = None, after_id: Optional[int] = None,
+               limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Phase 105: página de sincronización del catálogo no-vintage.
+
+    - Delta (cursor conocido): entradas del diario con id > cursor, deduplicadas por
+      producto; las bajas y los productos que pasan a vintage salen en `deleted_ids`.
+    - Full sync (sin cursor, cursor purgado, cursor por delante del servidor tras una
+      restauración o "reset" pendiente): el catálogo paginado
+      por id. El cursor devuelto queda fijado al inicio del snapshot; el cliente lo
+      reenvía con `after_id` hasta `has_more = false`. Reaplicar entradas ya vistas es
+      inocuo (upserts con el estado actual y tombstones).
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    latest = current_cursor(db)
+    full_sync = cursor is None or after_id is not None or cursor < _sync_floor(db) or cursor > latest
+    if not full_sync:
+        full_sync = db.query(ProductSyncLogModel.id).filter(
+            ProductSyncLogModel.id > cursor, ProductSyncLogModel.op == "reset"
+        ).first() is not None
+
+    if full_sync:
+        pinned = cursor if (after_id is not None and cursor is not None and cursor <= latest) else latest
+        rows = (
+            db.query(*_PRODUCT_COLUMNS)
+            .filter(ProductModel.is_vintage == False, ProductModel.id > (after_id or 0))
+            .order_by(ProductModel.id)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "full_sync": True,
+            "cursor": pinned,
+            "next_after_id": rows[-1].id if has_more else None,
+            "has_more": has_more,
+            "products": [_product_row(r) for r in rows],
+            "deleted_ids": [],
+        }
+
+    entries = (
+        db.query(ProductSyncLogModel.id, ProductSyncLogModel.product_id)
+        .filter(ProductSyncLogModel.id > cursor)
+        .order_by(ProductSyncLogModel.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    changed_ids = list(dict.fromkeys(pid for _, pid in entries if pid is not None))
+    alive = {}
+    if changed_ids:
+        alive = {
+            r.id: r
+            for r in db.query(*_PRODUCT_COLUMNS)
+            .filter(ProductModel.id.in_(changed_ids), ProductModel.is_vintage == False)
+        }
+    return {
+        "full_sync": False,
+        "cursor": entries[-1].id if entries else cursor,
+        "next_after_id": None,
+        "has_more": has_more,
+        "products": [_product_row(alive[pid]) for pid in changed_ids if pid in alive],
+        "deleted_ids": [pid for pid in changed_ids if pid not in alive],
+    }
+
+
+def prune_sync_log(db: Session, retention_days: int = SYNC_LOG_RETENTION_DAYS) -> int:
+    """Purga el diario antiguo y sube el suelo de cursores válidos (sin commit)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    floor = db.query(func.max(ProductSyncLogModel.id)).filter(ProductSyncLogModel.changed_at < cutoff).scalar()
+    if not floor:
+        return 0
+    deleted = db.query(ProductSyncLogModel).filter(ProductSyncLogModel.id <= floor).delete(synchronize_session=False)
+    cfg = db.get(SystemConfigModel, SYNC_FLOOR_CONFIG_KEY)
+    if cfg is None:
+        db.add(SystemConfigModel(key=SYNC_FLOOR_CONFIG_KEY, value=str(floor)))
+    else:
+        cfg.value = str(max(int(cfg.value or 0), floor))
+    logger.info(f"🧹 Diario de sync: {deleted} entradas purgadas (cursor mínimo válido: {floor}).")
+    return deleted
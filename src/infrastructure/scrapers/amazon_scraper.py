@@ -26,6 +26,7 @@ class AmazonScraper(BaseScraper):
     """
     def __init__(self):
         super().__init__(shop_name="Amazon.es", base_url="https://www.amazon.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.search_url = "https://www.amazon.es/s?k="
 
     async def search(self, query: str) -> List[ScrapedOffer]:
@@ -74,6 +74,7 @@ class BaseScraper(ABC):
         self.log_callback = None # Function(str) to bridge logs to UI
         self.max_pages = 100  # Default max pages to crawl
         self.is_auction_source = False # True for Wallapop/eBay
+        self.concurrency_backend = "playwright" # Phase 90: curl | playwright | api (estrategia principal)
 
     @abstractmethod
     async def search(self, query: str) -> List[ScrapedOffer]:
@@ -24,6 +24,7 @@ class EbayScraper(BaseScraper):
     """
     def __init__(self):
         super().__init__(shop_name="Ebay.es", base_url="https://www.ebay.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.search_url = "https://www.ebay.es/sch/i.html"
         self.items_scraped = 0
         self.is_auction_source = True # Routes to "El Pabellón"
@@ -17,6 +17,7 @@ class FrikimazScraper(BaseScraper):
 
     def __init__(self):
         super().__init__(shop_name="Frikimaz", base_url="https://frikimaz.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.search_base = "https://frikimaz.es/busqueda?controller=search&s="
 
     async def search(self, query: str) -> List[ScrapedOffer]:
@@ -17,6 +17,7 @@ class LaMansionDelTerrorScraper(BaseScraper):
 
     def __init__(self):
         super().__init__(shop_name="LaMansionDelTerror", base_url="https://lamansiondelterror.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.search_base = "https://lamansiondelterror.es/es/busqueda?q="
 
     async def search(self, query: str) -> List[ScrapedOffer]:
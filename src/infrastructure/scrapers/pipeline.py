@@ -1,17 +1,24 @@
 import asyncio
 import json
+import re
 import threading
-from typing import List
+from typing import AsyncIterator, Iterable, Iterator, List
 from datetime import datetime, timezone
 from loguru import logger
 from src.infrastructure.scrapers.base import BaseScraper, ScrapedOffer
 from src.domain.schemas import ProductSchema
 from src.infrastructure.repositories.product import ProductRepository
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from src.infrastructure.database_cloud import SessionCloud, init_cloud_db
 from src.infrastructure.services.telegram_service import telegram_service
 from src.application.services.deal_scorer import DealScorer
 from src.application.services.logistics_service import LogisticsService
+from src.core.normalization_cache import memoized
+from src.core.concurrency import spawn
+
+# Fase 91: tamaño de lote de update_database (IN-lists, objetos ORM en sesión y duración de transacción acotados)
+PIPELINE_CHUNK_SIZE = 500
+
 def clean_purgatory_globally(db: Session):
     """
     Elimina de forma proactiva y global del Purgatorio cualquier oferta 
@@ -35,71 +42,52 @@ def clean_purgatory_globally(db: Session):
     except Exception as e:
         logger.error(f"⚠️ Error running global purgatory cleanup: {e}")
 
+def dispatch_multiuser_alerts(alerts: List[dict]):
+    """Entrega a Telegram un lote deduplicado de alertas multi-usuario en una sola tarea."""
+    if alerts:
+        spawn(telegram_service.send_multiuser_alert_batch(alerts))
+
 def check_and_send_multiuser_alerts(db: Session, scraped_name: str, price: float, shop_name: str, url: str, is_vintage: bool):
     """
     Cruza una nueva oferta con las listas de deseos y alertas de precio de todos los usuarios
     que tengan registrado un telegram_chat_id, disparando las alertas correspondientes.
+
+    Phase 92: para lotes de ofertas usar MultiUserAlertIndex (un índice por lote);
+    esta función construye el índice para una única oferta.
     """
-    from src.domain.models import UserModel, CollectionItemModel, ProductModel, PriceAlertModel
-    from src.infrastructure.services.telegram_service import telegram_service
-    import re
-    
+    from src.application.services.alert_index import MultiUserAlertIndex
+
     try:
-        users_with_tg = db.query(UserModel).filter(UserModel.telegram_chat_id != None, UserModel.is_active == True).all()
-        if not users_with_tg:
-            return
-            
-        name_lower = scraped_name.lower()
-        
-        for u in users_with_tg:
-            # 1. Alertas de Lista de Deseos (Wishlist)
-            wishlist_items = db.query(ProductModel).join(CollectionItemModel).filter(
-                CollectionItemModel.owner_id == u.id,
-                CollectionItemModel.acquired == False
-            ).all()
-            
-            for p in wishlist_items:
-                p_clean = p.name.lower().replace("-", " ")
-                p_words = [w for w in re.sub(r'[^a-z0-9\s]', '', p_clean).split() if len(w) > 2]
-                if p_words and all(w in name_lower for w in p_words):
-                    # Coincidencia! Enviar alerta
-                    asyncio.create_task(telegram_service.send_wishlist_alert(
-                        chat_id=u.telegram_chat_id,
-                        product_name=p.name,
-                        price=price,
-                        shop_name=shop_name,
-                        url=url
-                    ))
-                    break # Evitar duplicados por oferta
-            
-            # 2. Alertas de Precio Objetivo (El Centinela)
-            price_alerts = db.query(PriceAlertModel).join(ProductModel).filter(
-                PriceAlertModel.user_id == u.id,
-                PriceAlertModel.is_active == True,
-                PriceAlertModel.target_price >= price
-            ).all()
-            
-            for pa in price_alerts:
-                p_clean = pa.product.name.lower().replace("-", " ")
-                p_words = [w for w in re.sub(r'[^a-z0-9\s]', '', p_clean).split() if len(w) > 2]
-                if p_words and all(w in name_lower for w in p_words):
-                    asyncio.create_task(telegram_service.send_price_alert(
-                        chat_id=u.telegram_chat_id,
-                        product_name=pa.product.name,
-                        price=price,
-                        target_price=pa.target_price,
-                        shop_name=shop_name,
-                        url=url
-                    ))
-                    break
+        index = MultiUserAlertIndex.build(db)
+        dispatch_multiuser_alerts(index.match(scraped_name, price, shop_name, url))
     except Exception as e:
         logger.error(f"⚠️ Error en check_and_send_multiuser_alerts: {e}")
 
+@memoized("pipeline.clean_product_name")
+def _clean_product_name(name: str) -> str:
+    n = name.lower()
+    # Specific fix for "Sun-Man" -> "Sun Man" to handle hyphenated names
+    n = n.replace("-", " ")
+    
+    remove_list = [
+        "masters of the universe", "motu", "origins", 
+        "figura", "figure", "action", "mattel", "14 cm", "14cm"
+    ]
+    for w in remove_list:
+        n = n.replace(w, "")
+    
+    # Remove special chars but keep spaces
+    n = re.sub(r'[^a-zA-Z0-9\s]', '', n)
+    return " ".join(n.split())
+
 class ScrapingPipeline:
     def __init__(self, scrapers: List[BaseScraper], cancel_event: threading.Event | None = None):
         self.scrapers = scrapers
         self.cancel_event = cancel_event
         self.log_callback = None
+        self.search_timeout = 300  # 5 min per scraper max
+        self.chunk_size = PIPELINE_CHUNK_SIZE
+        self.cancel_poll_interval = 0.5
 
     def _log(self, msg: str):
         if self.log_callback:
@@ -108,38 +96,72 @@ class ScrapingPipeline:
             except:
                 pass
 
+    async def stream_product_search(self, product_name: str) -> AsyncIterator[List[ScrapedOffer]]:
+        """
+        Fan-out concurrente: lanza todas las tiendas a la vez y cede el lote de
+        ScrapedOffer de cada una en cuanto termina (orden de llegada, no de registro).
+        Una tienda colgada sólo consume su propio timeout; si cancel_event se activa,
+        se cancelan las incursiones pendientes y el generador termina.
+        """
+        logger.info(f"Pipeline: Searching for '{product_name}' across {len(self.scrapers)} scrapers (fan-out).")
+
+        if self._is_cancelled():
+            logger.warning("🛑 Pipeline ABORTADO: Señal de cancelación recibida antes de iniciar.")
+            return
+
+        async def _run(scraper):
+            res = await asyncio.wait_for(scraper.search(product_name), timeout=self.search_timeout)
+            source = "Peer-to-Peer" if getattr(scraper, 'is_auction_source', False) else "Retail"
+            for offer in res:
+                if isinstance(offer, ScrapedOffer):
+                    offer.source_type = source
+            return res
+
+        tasks = {asyncio.create_task(_run(s)): s for s in self.scrapers}
+        pending = set(tasks)
+        try:
+            while pending:
+                # 🛡️ Cancelación cooperativa (threading.Event sondeado entre esperas)
+                if self._is_cancelled():
+                    logger.warning(f"🛑 Pipeline ABORTADO: Señal de cancelación recibida con {len(pending)} tiendas pendientes.")
+                    break
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=self.cancel_poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    scraper = tasks[task]
+                    try:
+                        res = task.result()
+                    except asyncio.TimeoutError:
+                        logger.warning(f"⏳ Scraper {scraper.shop_name} TIMEOUT ({self.search_timeout}s). Saltando.")
+                        continue
+                    except asyncio.CancelledError:
+                        logger.warning(f"🛑 Scraper {scraper.shop_name} CANCELADO.")
+                        continue
+                    except Exception as e:
+                        logger.error(f"Scraper {scraper.shop_name} failed for '{product_name}': {e}")
+                        continue
+
+                    logger.info(f"Scraper {scraper.shop_name} found {len(res)} offers.")
+                    if res:
+                        yield res
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
     async def run_product_search(self, product_name: str) -> List[dict]:
         """
-        Runs all spiders with cancellation support.
-        If cancel_event is set, aborts remaining scrapers.
+        Runs all spiders concurrently with cancellation support.
+        If cancel_event is set, aborts remaining scrapers and returns partial results.
         """
-        logger.info(f"Pipeline: Searching for '{product_name}' across {len(self.scrapers)} scrapers.")
-        
         all_legacy_offers = []
+        async for batch in self.stream_product_search(product_name):
+            all_legacy_offers.extend(batch)
         
-        for scraper in self.scrapers:
-            # 🛡️ Check cancellation before each scraper
-            if self.cancel_event and self.cancel_event.is_set():
-                logger.warning(f"🛑 Pipeline ABORTADO: Señal de cancelación recibida antes de {scraper.shop_name}.")
-                break
-            
-            try:
-                res = await asyncio.wait_for(scraper.search(product_name), timeout=300)  # 5 min per scraper max
-                logger.info(f"Scraper {scraper.shop_name} found {len(res)} offers.")
-                source = "Peer-to-Peer" if getattr(scraper, 'is_auction_source', False) else "Retail"
-                for offer in res:
-                    if isinstance(offer, ScrapedOffer):
-                        offer.source_type = source
-                all_legacy_offers.extend(res)
-            except asyncio.TimeoutError:
-                logger.warning(f"⏳ Scraper {scraper.shop_name} TIMEOUT (5 min). Saltando.")
-            except asyncio.CancelledError:
-                logger.warning(f"🛑 Scraper {scraper.shop_name} CANCELADO.")
-                break
-            except Exception as e:
-                logger.error(f"Scraper {scraper.shop_name} failed for '{product_name}': {e}")
-        
-        if self.cancel_event and self.cancel_event.is_set():
+        if self._is_cancelled():
             logger.warning(f"🛑 Pipeline cancelado. Devolviendo {len(all_legacy_offers)} ofertas parciales recolectadas.")
         
         # 3OX.Bridge :: Transformación al Contrato dev/contract.ref
@@ -148,25 +170,14 @@ class ScrapingPipeline:
         
         return transformed_offers
 
+    def _is_cancelled(self) -> bool:
+        return bool(self.cancel_event and self.cancel_event.is_set())
+
     def clean_product_name(self, name: str) -> str:
         """
         Normalizes product names for better fuzzy matching.
         """
-        import re
-        n = name.lower()
-        # Specific fix for "Sun-Man" -> "Sun Man" to handle hyphenated names
-        n = n.replace("-", " ")
-        
-        remove_list = [
-            "masters of the universe", "motu", "origins", 
-            "figura", "figure", "action", "mattel", "14 cm", "14cm"
-        ]
-        for w in remove_list:
-            n = n.replace(w, "")
-        
-        # Remove special chars but keep spaces
-        n = re.sub(r'[^a-zA-Z0-9\s]', '', n)
-        return " ".join(n.split())
+        return _clean_product_name(name)
 
     def sync_availability(self, found_urls: List[str], shop_names: List[str]):
         """
@@ -225,17 +236,124 @@ class ScrapingPipeline:
         finally:
             db.close()
 
-    def update_database(self, offers: List[dict], shop_names: List[str] = None):
+    def update_database(self, offers: Iterable, shop_names: List[str] = None, chunk_size: int | None = None):
         """
         Persists found offers to the database using SmartMatcher.
         Includes Phase 18: Búnker & Circuit Breaker.
         REFACTOR 7.3: Bulk Pre-filtering Strategy (No more N+1 / Duplicate Errors).
         Fase 44: Integración de sync_availability.
+        Fase 91: Persistencia en streaming. Acepta cualquier iterable (lista o generador) y
+        procesa bloques de `chunk_size` ofertas (prefetch → clasificación → upsert → commit),
+        cada uno en su propia sesión y transacción: las ofertas sólo viven en memoria lo que
+        dura su lote y un fallo tardío sólo revierte su bloque, no toda la tanda.
+        Lo único que crece con la tanda es el conjunto de URLs (una cadena por oferta):
+        sync_availability necesita el universo completo de la búsqueda.
         """
         if not offers and not shop_names:
             logger.warning("🛡️ Circuit Breaker: No offers found to process. Skipping DB update for this batch.")
             return 0
 
+        chunk_size = max(1, chunk_size or self.chunk_size)
+        totals = {"new": 0, "price_updates": 0, "unchanged": 0, "discarded": 0}
+        # URLs de lotes ya commiteados (dedup entre lotes). Un lote revertido no las marca:
+        # si la URL vuelve a aparecer en un lote posterior se procesa de nuevo.
+        seen_urls: set = set()
+        # URLs de lotes revertidos: no se persistieron, pero cuentan como vistas para sync_availability
+        rolled_back_urls: set = set()
+        failed_chunks = 0
+
+        # 1. Raw Snapshot (Black Box) en modo append: un fichero por tanda, sin acumular en memoria
+        snapshot = None
+        try:
+            from src.core.backup_manager import BackupManager
+            snapshot = BackupManager()
+        except Exception as e:
+            logger.error(f"⚠️ Failed to save safety snapshot: {e}")
+        snapshot_path = None
+
+        # Limpieza global proactiva del purgatorio al inicio de la tanda
+        self._run_purgatory_cleanup()
+
+        self._log("🛡️ [Filtro] Iniciando pre-filtrado y cruce de datos en base de datos...")
+        logger.info(f"🛡️ Pipeline: Initiating streaming persistence (chunk_size={chunk_size})...")
+
+        chunk_idx = 0
+        for raw_chunk in self._iter_chunks(offers, chunk_size):
+            chunk_idx += 1
+            chunk = self._prepare_offers(raw_chunk)
+            if not chunk:
+                continue
+
+            if snapshot is not None:
+                try:
+                    shop_label = chunk[0].get('shop_name', 'unknown')
+                    snapshot_path = snapshot.append_raw_snapshot(shop_label, chunk, snapshot_path)
+                except Exception as e:
+                    logger.error(f"⚠️ Failed to save safety snapshot: {e}")
+
+            chunk_urls = {str(o.get('url', '')) for o in chunk}
+            stats = self._persist_chunk(chunk, seen_urls)
+            if stats is None:
+                rolled_back_urls |= chunk_urls - seen_urls
+                failed_chunks += 1
+                self._log(f"❌ [Lote {chunk_idx}] Revertido ({len(chunk)} ofertas). Se continúa con el siguiente lote.")
+                continue
+
+            seen_urls |= chunk_urls
+            rolled_back_urls -= chunk_urls
+            for k in totals:
+                totals[k] += stats[k]
+            self._log(
+                f"📦 [Lote {chunk_idx}] {len(chunk)} ofertas | Nuevas: {stats['new']} | "
+                f"Precios: {stats['price_updates']} | Sin cambios: {stats['unchanged']} | Descartadas: {stats['discarded']}"
+            )
+
+        incoming_urls = [u for u in seen_urls | rolled_back_urls if u]
+        if not incoming_urls:
+            logger.warning("No valid URLs in batch. Aborting.")
+            return 0
+
+        # Limpieza global proactiva del purgatorio al finalizar la actualización
+        self._run_purgatory_cleanup()
+
+        # --- RESUMEN DE MÉTRICAS COMPLETO (COMPATIBLE CON PARSER FRONTEND) ---
+        stats_msg = f"📊 [Resumen] Nuevas en Purgatorio: {totals['new']} | Precios actualizados: {totals['price_updates']} | Sin cambios: {totals['unchanged']} | Descartadas: {totals['discarded']}"
+        self._log(stats_msg)
+        if failed_chunks:
+            self._log(f"⚠️ [Aviso] {failed_chunks} lote(s) revertidos por error; el resto se ha persistido.")
+        self._log(f"⚡ [Fin] Proceso de persistencia completado. {totals['new']} nuevas ofertas enviadas al Purgatorio.")
+        logger.success(f"⚡ Batch Complete: {stats_msg}")
+
+        # --- PHASE 44: AVAILABILITY SYNC ---
+        if shop_names:
+            self.sync_availability(incoming_urls, shop_names)
+
+        return totals["new"]
+
+    @staticmethod
+    def _iter_chunks(offers: Iterable, chunk_size: int) -> Iterator[list]:
+        chunk = []
+        for o in offers:
+            chunk.append(o)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _run_purgatory_cleanup(self):
+        db: Session = SessionCloud()
+        try:
+            clean_purgatory_globally(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"⚠️ Error running global purgatory cleanup: {e}")
+        finally:
+            db.close()
+
+    def _prepare_offers(self, offers: Iterable) -> List[dict]:
+        """Estandariza a dict, aplica el bypass vintage y normaliza URLs y fechas de un lote."""
         # Ensure offers are dicts (Standardize objects from different Pydantic versions)
         standardized_offers = []
         for o in offers:
@@ -304,16 +422,15 @@ class ScrapingPipeline:
             if 'last_price_update' in o:
                 o['last_price_update'] = secure_date(o['last_price_update'])
 
-        # 1. Save Raw Snapshot (Black Box)
-        try:
-            from src.core.backup_manager import BackupManager
-            bm = BackupManager()
-            shop_name = offers[0].get('shop_name', 'unknown') if offers else "unknown"
-            bm.save_raw_snapshot(shop_name, offers)
-        except Exception as e:
-            logger.error(f"⚠️ Failed to save safety snapshot: {e}")
+        return offers
 
-        from src.infrastructure.database_cloud import SessionCloud
+    def _persist_chunk(self, offers: List[dict], seen_urls: set) -> dict | None:
+        """
+        Procesa un lote ya estandarizado en su propia sesión y lo commitea.
+        `seen_urls` (sólo lectura) son las URLs de lotes anteriores ya commiteados; el
+        llamador añade las de este lote únicamente si el commit sale bien.
+        Retorna las métricas del lote o None si el lote se revirtió.
+        """
         db: Session = SessionCloud()
         from src.core.matching import SmartMatcher
         
@@ -321,25 +438,23 @@ class ScrapingPipeline:
         repo = ProductRepository(db)
         from src.application.services.auditor import AuditorService
         from src.application.services.sentinel import SentinelService
-        from src.domain.models import PendingMatchModel, BlackcludedItemModel, OfferModel, LogisticRuleModel, VintageMiscellaneousModel
+        from src.domain.models import PendingMatchModel, BlackcludedItemModel, OfferModel, ProductModel, VintageMiscellaneousModel
+        from src.infrastructure.repositories.bulk_writer import PipelineBulkWriter
         
         auditor = AuditorService(repo)
         sentinel = SentinelService(repo)
+        # Phase 91: las escrituras del lote se acumulan y se vuelcan con sentencias set-based
+        writer = PipelineBulkWriter(db)
+        purgatory_alerts = []
+        stats = {"new": 0, "price_updates": 0, "unchanged": 0, "discarded": 0}
         
         try:
-            # Limpieza global proactiva del purgatorio al inicio del lote
-            clean_purgatory_globally(db)
-            
             # --- PHASE 7.3: BULK PRE-FETCHING ---
-            self._log("🛡️ [Filtro] Iniciando pre-filtrado y cruce de datos en base de datos...")
-            logger.info("🛡️ Pipeline: Initiating Bulk Pre-filtering...")
-            
-            # A. Extract URLs from incoming batch
-            incoming_urls = [str(o.get('url', '')) for o in offers if o.get('url')]
+            # A. Extract URLs from incoming chunk (IN-lists acotadas al tamaño del lote)
+            incoming_urls = list({str(o.get('url', '')) for o in offers if o.get('url')})
             
             if not incoming_urls:
-                logger.warning("No valid URLs in batch. Aborting.")
-                return 0
+                return stats
 
             # B. Bulk Check against Database (4 Queries instead of N)
             # 1. Blocked Items
@@ -352,8 +467,11 @@ class ScrapingPipeline:
             }
             existing_pending_urls = set(existing_pending.keys())
             # 3. Active Offers (Linked) - Fetch full objects for updates
+            # (con producto y colección precargados: el DealScorer los consulta por oferta)
             existing_offers = {
-                o.url: o for o in db.query(OfferModel).filter(OfferModel.url.in_(incoming_urls)).all()
+                o.url: o for o in db.query(OfferModel)
+                .options(selectinload(OfferModel.product).selectinload(ProductModel.collection_items))
+                .filter(OfferModel.url.in_(incoming_urls)).all()
             }
             # 4. Miscellaneous Items - Fetch full objects for updates
             existing_misc = {
@@ -371,15 +489,14 @@ class ScrapingPipeline:
                     existing_pending_urls.discard(url)
                     existing_pending.pop(url, None)
             
-            # Pre-fetch all products for matching (only if needed)
-            all_products = repo.get_all(limit=5000)
+            # Nota: el bucle SmartMatch desactivado más abajo (Purgatory-First) no necesita
+            # pre-cargar el catálogo: si se reactiva, usar matcher.candidates(nombre, ean, db)
+            # (CatalogIndex compartido, Phase 93) en lugar de repo.get_all().
 
             # --- PHASE 34: LOGISTICS PRE-CACHE (Eliminate N+1) ---
-            rules = db.query(LogisticRuleModel).all()
-            rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
+            rules_map = LogisticsService.load_rules_map(db)  # Phase 109: instantánea compartida
             user_location = "ES" # Default
 
-            self._log(f"📊 [Stats] {len(offers)} ofertas recibidas | {len(existing_offers)} activas en catálogo | {len(existing_pending_urls)} en Purgatorio | {len(blocked_urls)} en Lista Negra")
             logger.info(f"📊 Stats: {len(offers)} incoming | {len(existing_offers)} active links | {len(existing_pending_urls)} in Purgatory | {len(blocked_urls)} blocked")
 
             processed_urls_in_batch = set()
@@ -391,8 +508,8 @@ class ScrapingPipeline:
             for offer in offers:
                 url_str = str(offer.get('url', ''))
                 
-                # a. Dedup within batch
-                if url_str in processed_urls_in_batch:
+                # a. Dedup within batch (y contra lotes anteriores ya commiteados)
+                if url_str in processed_urls_in_batch or url_str in seen_urls:
                     discarded_count += 1
                     continue
                 processed_urls_in_batch.add(url_str)
@@ -420,8 +537,8 @@ class ScrapingPipeline:
                     is_wish = any(ci.owner_id == 2 and not ci.acquired for ci in existing_offer.product.collection_items)
                     opp_score = DealScorer.calculate_score(existing_offer.product, landed_price, is_wish)
 
-                    # Update without committing yet
-                    repo.add_offer(existing_offer.product, {
+                    # Phase 91: se encola; el writer lo vuelca en un único upsert por lote
+                    writer.queue_offer_update(existing_offer, {
                         "shop_name": offer.get('shop_name'),
                         "price": offer.get('price'),
                         "currency": offer.get('currency'), 
@@ -437,7 +554,7 @@ class ScrapingPipeline:
                         "is_sold": offer.get('is_sold', False),
                         "original_listing_date": offer.get('original_listing_date'),
                         "last_price_update": datetime.now(timezone.utc).replace(tzinfo=None)
-                    }, commit=False)
+                    })
                     continue
 
                 # c2. Check Miscellaneous Items (Update Logic)
@@ -455,27 +572,24 @@ class ScrapingPipeline:
                 # d2. Relevance check for MOTU (Brand exclusion & keyword check)
                 if url_str not in existing_offers and url_str not in existing_misc and url_str not in existing_pending_urls:
                     from src.core.vintage_utils import validate_motu_relevance
-                    from src.domain.models import OfferHistoryModel
                     is_relevant, reason = validate_motu_relevance(offer.get('product_name', ''))
                     if not is_relevant:
                         # Auto-blacklist the item to prevent future scraping attempts
-                        bl = BlackcludedItemModel(
-                            url=url_str,
-                            scraped_name=offer.get('product_name', 'Desconocido'),
-                            reason=f"Descarte automático: {reason}",
-                            source_type=offer.get('source_type', 'Retail')
-                        )
-                        db.add(bl)
+                        writer.queue_blacklist({
+                            "url": url_str,
+                            "scraped_name": offer.get('product_name', 'Desconocido'),
+                            "reason": f"Descarte automático: {reason}",
+                            "source_type": offer.get('source_type', 'Retail')
+                        })
                         # Add history log for auditability
-                        history = OfferHistoryModel(
-                            offer_url=url_str,
-                            product_name=offer.get('product_name', 'Desconocido'),
-                            shop_name=offer.get('shop_name', 'Unknown'),
-                            price=offer.get('price', 0.0),
-                            action_type="AUTO_DISCARDED_RELEVANCE",
-                            details=json.dumps({"reason": reason})
-                        )
-                        db.add(history)
+                        writer.queue_history({
+                            "offer_url": url_str,
+                            "product_name": offer.get('product_name', 'Desconocido'),
+                            "shop_name": offer.get('shop_name', 'Unknown'),
+                            "price": offer.get('price', 0.0),
+                            "action_type": "AUTO_DISCARDED_RELEVANCE",
+                            "details": json.dumps({"reason": reason})
+                        })
                         blocked_urls.add(url_str)
                         discarded_count += 1
                         logger.info(f"🚫 Auto-Discarded: {offer.get('product_name')} ({reason})")
@@ -526,7 +640,7 @@ class ScrapingPipeline:
                 # The following SmartMatch logic is disabled to prevent false positives (e.g. Dragstor -> Despara).
                 # To re-enable, uncomment the matching loop below.
                 
-                # for p in all_products:
+                # for p in matcher.candidates(offer.get('product_name'), offer.get('ean'), db):
                 #     is_match, score, reason = matcher.match(
                 #         p.name, 
                 #         offer.get('product_name'), 
@@ -586,35 +700,9 @@ class ScrapingPipeline:
                             "found_at": datetime.now(timezone.utc).replace(tzinfo=None)
                         }
                         
-                        # Atomic Upsert to Purgatory (Reusing same logic as below)
-                        try:
-                            with db.begin_nested():
-                                if 'postgresql' in db.bind.dialect.name.lower():
-                                    from sqlalchemy.dialects.postgresql import insert as pg_insert
-                                    stmt = pg_insert(PendingMatchModel).values(pending_data)
-                                    stmt = stmt.on_conflict_do_update(
-                                        index_elements=['url'],
-                                        set_={
-                                            "price": stmt.excluded.price,
-                                            "is_blocked": stmt.excluded.is_blocked,
-                                            "anomaly_flags": stmt.excluded.anomaly_flags,
-                                            "validation_status": stmt.excluded.validation_status
-                                        }
-                                    )
-                                    db.execute(stmt)
-                                else:
-                                    existing = db.query(PendingMatchModel).filter(PendingMatchModel.url == url_str).first()
-                                    if existing:
-                                        existing.price = pending_data["price"]
-                                        existing.is_blocked = True
-                                        existing.anomaly_flags = json.dumps(flags)
-                                        existing.validation_status = status
-                                    else:
-                                        db.add(PendingMatchModel(**pending_data))
-                            new_items_count += 1
-                        except Exception as e:
-                            logger.error(f"Failed to move blocked item to Purgatory: {e}")
-                            
+                        # Upsert al Purgatorio en bloque (Phase 91)
+                        writer.queue_pending(pending_data, blocked=True)
+
                         continue # Skip adding as active offer
                     
                     # --- PHASE 18: DEAL SCORER ---
@@ -644,7 +732,7 @@ class ScrapingPipeline:
 
                     # --- PHASE 8.5 & 18: NOTIFICATIONS ---
                     if DealScorer.is_mandatory_buy(best_match_product, landed_price, opp_score):
-                        asyncio.create_task(telegram_service.send_mandatory_buy_alert(
+                        spawn(telegram_service.send_mandatory_buy_alert(
                             product_name=best_match_product.name,
                             price=offer.get('price'),
                             landed_price=landed_price,
@@ -652,7 +740,7 @@ class ScrapingPipeline:
                             url=url_str
                         ))
                     elif best_match_score >= 0.90:
-                        asyncio.create_task(telegram_service.send_deal_alert(
+                        spawn(telegram_service.send_deal_alert(
                             product_name=best_match_product.name,
                             price=offer.get('price'),
                             shop_name=offer.get('shop_name'),
@@ -700,90 +788,50 @@ class ScrapingPipeline:
                         "is_vintage": is_v
                     }
                     
-                    # --- REFACTOR 7.3: DEFINITIVE ATOMIC UPSERT ---
-                    try:
-                        # Use a nested transaction (SAVEPOINT) to isolate this operation
-                        with db.begin_nested():
-                            if 'postgresql' in db.bind.dialect.name.lower():
-                                from sqlalchemy.dialects.postgresql import insert as pg_insert
-                                
-                                # Use ON CONFLICT DO UPDATE to handle latent duplicates and price updates atomically
-                                stmt = pg_insert(PendingMatchModel).values(pending_data)
-                                stmt = stmt.on_conflict_do_update(
-                                    index_elements=['url'],
-                                    set_={
-                                        "price": stmt.excluded.price,
-                                        "found_at": stmt.excluded.found_at,
-                                        "scraped_name": stmt.excluded.scraped_name,
-                                        "last_price_update": stmt.excluded.last_price_update,
-                                        "is_sold": stmt.excluded.is_sold,
-                                        "sold_at": stmt.excluded.sold_at
-                                    }
-                                )
-                                db.execute(stmt)
-                            else:
-                                # SQLite / Fallback
-                                existing = db.query(PendingMatchModel).filter(PendingMatchModel.url == url_str).first()
-                                if existing:
-                                    existing.price = pending_data["price"]
-                                    existing.found_at = pending_data["found_at"]
-                                    existing.last_price_update = pending_data["last_price_update"]
-                                    existing.is_sold = pending_data["is_sold"]
-                                    existing.sold_at = pending_data["sold_at"]
-                                else:
-                                    pending = PendingMatchModel(**pending_data)
-                                    db.add(pending)
-                        # No db.commit() here! We commit the whole batch at the end.
-                        new_items_count += 1
-                        
-                        # Disparar alertas para nuevos candidatos en Purgatorio
-                        if url_str not in existing_pending_urls:
-                            if is_v:
-                                asyncio.create_task(telegram_service.send_new_purgatory_vintage_alert(
-                                    scraped_name=pending_data["scraped_name"],
-                                    price=pending_data["price"],
-                                    shop_name=pending_data["shop_name"],
-                                    url=url_str
-                                ))
-                            
-                            check_and_send_multiuser_alerts(
-                                db,
-                                scraped_name=pending_data["scraped_name"],
-                                price=pending_data["price"],
-                                shop_name=pending_data["shop_name"],
-                                url=url_str,
-                                is_vintage=is_v
-                            )
-                        
-                    except Exception as e:
-                        # db.begin_nested() context manager handles rollback of the savepoint automatically
-                        if "unique" in str(e).lower():
-                            logger.debug(f"⏳ Duplicate URL skipped (SaveMode): {url_str}")
-                        else:
-                            logger.warning(f"⚠️ Item insertion error ({url_str}): {e}")
-            
-            # Limpieza global proactiva del purgatorio al finalizar la actualización
-            clean_purgatory_globally(db)
+                    # --- REFACTOR 7.3 / PHASE 91: SET-BASED UPSERT ---
+                    # Se encola y se vuelca con un único INSERT ... ON CONFLICT(url) por lote.
+                    writer.queue_pending(pending_data)
+                    if url_str not in existing_pending_urls:
+                        purgatory_alerts.append((pending_data, is_v))
+
+            # --- PHASE 91: VOLCADO DEL LOTE (O(1) sentencias) ---
+            written = writer.flush()
+            new_items_count += len(written["pending"]) + len(written["blocked"])
+
+            # Disparar alertas para nuevos candidatos en Purgatorio (sólo los que llegaron a la BD)
+            fresh = [(data, is_v) for data, is_v in purgatory_alerts if data["url"] in written["pending"]]
+            for pending_data, is_v in fresh:
+                if is_v:
+                    spawn(telegram_service.send_new_purgatory_vintage_alert(
+                        scraped_name=pending_data["scraped_name"],
+                        price=pending_data["price"],
+                        shop_name=pending_data["shop_name"],
+                        url=pending_data["url"]
+                    ))
+
+            # --- PHASE 92: ÍNDICE DE ALERTAS MULTI-USUARIO (uno por lote) ---
+            if fresh:
+                from src.application.services.alert_index import MultiUserAlertIndex
+                try:
+                    alert_index = MultiUserAlertIndex.build(db)
+                    dispatch_multiuser_alerts(alert_index.match_batch(data for data, _ in fresh))
+                except Exception as e:
+                    logger.error(f"⚠️ Error en alertas multi-usuario del lote: {e}")
+
             db.commit()
-            
-            # --- RESUMEN DE MÉTRICAS COMPLETO (COMPATIBLE CON PARSER FRONTEND) ---
-            stats_msg = f"📊 [Resumen] Nuevas en Purgatorio: {new_items_count} | Precios actualizados: {price_updates_count} | Sin cambios: {unchanged_count} | Descartadas: {discarded_count}"
-            self._log(stats_msg)
-            self._log(f"⚡ [Fin] Proceso de persistencia completado. {new_items_count} nuevas ofertas enviadas al Purgatorio.")
-            logger.success(f"⚡ Batch Complete: {stats_msg}")
-
-            # --- PHASE 44: AVAILABILITY SYNC ---
-            if shop_names:
-                incoming_urls = [str(o.get('url', '')) for o in offers if o.get('url')]
-                self.sync_availability(incoming_urls, shop_names)
-            
-            return new_items_count
+            stats.update(
+                new=new_items_count,
+                price_updates=price_updates_count,
+                unchanged=unchanged_count,
+                discarded=discarded_count,
+            )
+            return stats
 
         except Exception as e:
             error_msg = f"❌ Pipeline Critical Error: {e}"
             self._log(error_msg)
             logger.error(error_msg)
             db.rollback()
-            return 0
+            return None
         finally:
             db.close()
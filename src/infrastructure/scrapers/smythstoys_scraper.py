@@ -35,6 +35,7 @@ class SmythsToysScraper(BaseScraper):
             shop_name="SmythsToys",
             base_url="https://www.smythstoys.com"
         )
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.category_url = "https://www.smythstoys.com/de/de-de/spielzeug/action-spielzeug/actionfiguren/masters-of-the-universe-figuren-und-sets/c/SM1001010408?sort=creationDate_dt+desc"
         self.search_url = self.category_url
         self.keywords_de = "masters of the universe figuren und sets"
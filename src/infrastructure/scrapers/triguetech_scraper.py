@@ -16,6 +16,7 @@ class TriguetechScraper(BaseScraper):
 
     def __init__(self):
         super().__init__(shop_name="Triguetech", base_url="https://www.triguetech.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         # Base url for MOTU Origins catalog
         self.catalog_url = "https://www.triguetech.es/categoria-producto/motu/masters-del-universo-origins/"
         # Search URL if query is explicitly provided
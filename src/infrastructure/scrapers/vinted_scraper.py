@@ -24,6 +24,7 @@ class VintedScraper(BaseScraper):
     
     def __init__(self):
         super().__init__(shop_name="Vinted", base_url="https://www.vinted.es")
+        self.concurrency_backend = "curl"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.is_auction_source = True
         self._session: Optional[AsyncSession] = None
         
@@ -34,6 +34,7 @@ class WallapopScraper(BaseScraper):
 
     def __init__(self):
         super().__init__(shop_name="Wallapop", base_url="https://es.wallapop.com")
+        self.concurrency_backend = "api"  # Phase 90: presupuesto de concurrencia del Daily Scan
         self.is_auction_source = True # Peer-to-Peer
         
     async def _fetch_free_proxies(self, session: AsyncSession) -> List[str]:
@@ -161,6 +161,33 @@ class TelegramService:
         
         return await self.send_message(message, chat_id=chat_id)
 
+    async def send_multiuser_alert_batch(self, alerts: list):
+        """
+        Phase 92: Envía en serie un lote ya deduplicado de alertas de Wishlist / precio
+        objetivo (salida de MultiUserAlertIndex.match_batch) desde una sola tarea.
+        """
+        for alert in alerts or []:
+            try:
+                if alert["kind"] == "price":
+                    await self.send_price_alert(
+                        chat_id=alert["chat_id"],
+                        product_name=alert["product_name"],
+                        price=alert["price"],
+                        target_price=alert["target_price"],
+                        shop_name=alert["shop_name"],
+                        url=alert["url"]
+                    )
+                else:
+                    await self.send_wishlist_alert(
+                        chat_id=alert["chat_id"],
+                        product_name=alert["product_name"],
+                        price=alert["price"],
+                        shop_name=alert["shop_name"],
+                        url=alert["url"]
+                    )
+            except Exception as e:
+                logger.error(f"⚠️ Error enviando alerta multi-usuario ({alert.get('url')}): {e}")
+
     async def send_bargain_hunt_alert(self, product_name: str, item_title: str, price: float, landed_price: float, benchmark_price: float, savings_pct: float, shop_name: str, url: str, image_url: Optional[str] = None, chat_id: Optional[str] = None):
         """Alerta de ganga detectada en incursión de caza con Landed Price inferior a mercado."""
         if not self.enabled:
@@ -5,6 +5,7 @@ from fastapi import Depends, HTTPException, Header, Request
 from fastapi.security import OAuth2PasswordBearer
 from loguru import logger
 
+from src.core.auth_cache import auth_cache
 from src.core.config import settings
 from src.core.security import SecurityShield
 from src.domain.models import AuthorizedDeviceModel, ScraperStatusModel, UserModel
@@ -15,6 +16,23 @@ from src.infrastructure.database_cloud import SessionCloud
 _oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
+def _active_user(user_id: int) -> UserModel | None:
+    """Usuario activo por id (Phase 111: vía AuthCache, invalidada al cambiar rol/estado)."""
+    user = auth_cache.get_user(user_id)
+    if user is not None:
+        return user
+    generation = auth_cache.generation
+    with SessionCloud() as db:
+        user = (
+            db.query(UserModel)
+            .filter(UserModel.id == user_id, UserModel.is_active == True)  # noqa: E712
+            .first()
+        )
+    if user is not None:
+        auth_cache.put_user(user, generation)
+    return user
+
+
 def _user_from_token(token: str | None) -> UserModel | None:
     """Decodifica un JWT y devuelve el usuario activo, o None si es inválido."""
     if not token:
@@ -24,12 +42,7 @@ def _user_from_token(token: str | None) -> UserModel | None:
         user_id = int(payload["sub"])
     except (jwt.InvalidTokenError, KeyError, ValueError):
         return None
-    with SessionCloud() as db:
-        return (
-            db.query(UserModel)
-            .filter(UserModel.id == user_id, UserModel.is_active == True)  # noqa: E712
-            .first()
-        )
+    return _active_user(user_id)
 
 
 def _is_service_key(x_api_key: str | None) -> bool:
@@ -148,11 +161,10 @@ def get_current_user(token: str = Depends(_oauth2_scheme)) -> UserModel:
     except (jwt.InvalidTokenError, KeyError, ValueError):
         raise HTTPException(status_code=401, detail="Token inválido.")
 
-    with SessionCloud() as db:
-        user = db.query(UserModel).filter(UserModel.id == user_id, UserModel.is_active == True).first()  # noqa: E712
-        if not user:
-            raise HTTPException(status_code=401, detail="Usuario no encontrado.")
-        return user
+    user = _active_user(user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado.")
+    return user
 
 
 def require_admin(user: UserModel = Depends(get_current_user)) -> UserModel:
@@ -73,6 +73,10 @@ async def lifespan(app: FastAPI):
         init_cloud_db()
         ensure_scrapers_registered()
 
+        # Phase 99: pool acotado para el trabajo bloqueante (DB) fuera del event loop
+        from src.core.concurrency import configure_threadpool
+        configure_threadpool(settings.API_THREADPOOL_SIZE)
+
         # Iniciar escucha de comandos de Telegram en segundo plano (supervisada)
         app.state.telegram_task = asyncio.create_task(_supervised_telegram_listener())
 
@@ -97,6 +101,13 @@ async def lifespan(app: FastAPI):
         from src.application.services.vinted_sentinel_service import vinted_sentinel
         vinted_sentinel.stop()
 
+    from src.application.services.image_service import image_service
+    image_service.shutdown()
+
+    # Phase 111: volcado final de los last_access_at pendientes
+    from src.core.auth_cache import device_access_tracker
+    device_access_tracker.close()
+
     if hasattr(app.state, "telegram_task"):
         app.state.telegram_task.cancel()
         try:
@@ -109,108 +120,68 @@ import os
 
 app = FastAPI(title="Oráculo API Broker", version="1.0.0", lifespan=lifespan)
 
-async def _fetch_and_cache_product_image(product_id: int) -> "str | None":
+
+def _conditional_file_response(request: Request, path: str):
     """
-    Fase AAA-4.2 (B.7): rellena la caché local de imágenes bajo demanda.
-
-    Hasta ahora, la conversión a WebP solo pasaba por el importador antiguo
-    de Excel (storage_service.py, vía GitHub Actions) o por un script de
-    migración puntual (scripts/phase0_migration.py) que nadie vuelve a
-    ejecutar — las imágenes descubiertas por los ~17 scrapers de tiendas
-    nunca se descargaban ni convertían, solo se servía la URL remota tal
-    cual. Esta función descarga la imagen remota del producto, la convierte
-    a WebP (mismo patrón que storage_service.py/phase0_migration.py) y la
-    guarda en IMAGE_CACHE_DIR, para que la siguiente petición ya la sirva
-    desde caché local sin volver a descargarla.
+    Phase 101: FileResponse con Cache-Control + ETag/Last-Modified que además
+    responde 304 a If-None-Match / If-Modified-Since (Starlette sólo emite las
+    cabeceras, nunca el 304), para que navegador y nginx revaliden sin bajar
+    la imagen de nuevo.
     """
-    from src.infrastructure.database_cloud import SessionCloud
-    from src.domain.models import ProductModel, OfferModel
-
-    candidate_urls = []
-    with SessionCloud() as db:
-        product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
-        if product and product.image_url:
-            candidate_urls.append(product.image_url)
-        
-        offers = db.query(OfferModel).filter(OfferModel.product_id == product_id, OfferModel.image_url.is_not(None)).all()
-        for o in offers:
-            if o.image_url and o.image_url not in candidate_urls:
-                candidate_urls.append(o.image_url)
-
-    if not candidate_urls:
-        return None
-
-    dest_path = os.path.join(settings.IMAGE_CACHE_DIR, f"{product_id}.webp")
-    os.makedirs(settings.IMAGE_CACHE_DIR, exist_ok=True)
-    if os.path.exists(dest_path) and os.path.getsize(dest_path) > 0:
-        return dest_path
-
-    import io
-    import httpx
-    from PIL import Image
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-        "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
-    }
-
-    async with httpx.AsyncClient(timeout=15.0, follow_redirects=True, headers=headers) as client:
-        for image_url in candidate_urls:
-            if not image_url or not image_url.startswith("http"):
-                continue
+    from email.utils import parsedate_to_datetime
+    from fastapi.responses import FileResponse, Response
+
+    stat_result = os.stat(path)
+    response = FileResponse(
+        path,
+        stat_result=stat_result,
+        headers={"Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}"},
+    )
+    validators = {k: response.headers[k] for k in ("etag", "last-modified", "cache-control")}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or validators["etag"] in tags:
+            return Response(status_code=304, headers=validators)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
             try:
-                resp = await client.get(image_url)
-                status_code = getattr(resp, "status_code", 200)
-                if status_code == 200 and len(resp.content) > 50:
-                    with Image.open(io.BytesIO(resp.content)) as img:
-                        if img.mode in ("RGBA", "LA"):
-                            background = Image.new("RGB", img.size, (255, 255, 255))
-                            background.paste(img, mask=img.split()[-1])
-                            img = background
-                        elif img.mode != "RGB":
-                            img = img.convert("RGB")
-                        img.save(dest_path, "WEBP", quality=85)
-
-                    logger.info(f"📸 Imagen del producto {product_id} descargada y cacheada en WebP desde {image_url}.")
-                    return dest_path
-            except Exception as e:
-                logger.warning(f"⚠️ Error intentando descargar desde {image_url} para producto {product_id}: {e}")
-
-    return None
+                if int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp():
+                    return Response(status_code=304, headers=validators)
+            except (TypeError, ValueError):
+                pass
+    return response
 
 
 @app.get("/api/static/images/{product_id}.webp")
-async def get_static_image_override(product_id: int, source: str = None, user_id: int = 2):
-    from fastapi.responses import FileResponse
+async def get_static_image_override(
+    request: Request, product_id: int, source: str = None, user_id: int = 2, variant: str = "full"
+):
     from fastapi import HTTPException
-    from src.infrastructure.database_cloud import SessionCloud
-    from src.domain.models import UserModel
+    from src.application.services.image_service import IMAGE_VARIANTS, image_service
+    from src.core.concurrency import run_blocking
 
-    extensions = [".webp", ".jpg", ".jpeg", ".png"]
+    if variant not in IMAGE_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Variante no soportada: {variant}")
 
-    # 1. Try custom path if not explicitly cache-only
+    # 1. Try custom path if not explicitly cache-only (las carpetas propias sólo tienen el original)
     if source != "cache":
-        with SessionCloud() as db:
-            user = db.query(UserModel).filter(UserModel.id == user_id).first()
-            if user:
-                for custom_dir in [user.pc_image_path, user.mobile_image_path]:
-                    if custom_dir:
-                        for ext in extensions:
-                            file_path = os.path.join(custom_dir, f"{product_id}{ext}")
-                            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                                return FileResponse(file_path)
+        custom_path = await run_blocking(image_service.custom_path, user_id, product_id)
+        if custom_path:
+            return _conditional_file_response(request, custom_path)
 
     # 2. Try server cache if not explicitly custom-only
     if source != "custom":
-        for ext in extensions:
-            server_cache_file = os.path.join(settings.IMAGE_CACHE_DIR, f"{product_id}{ext}")
-            if os.path.exists(server_cache_file) and os.path.getsize(server_cache_file) > 0:
-                return FileResponse(server_cache_file)
+        cached_path = image_service.cached_path(product_id, variant)
+        if cached_path:
+            return _conditional_file_response(request, cached_path)
 
-        # 3. Cache miss: descarga + convierte + cachea automáticamente.
-        cached_path = await _fetch_and_cache_product_image(product_id)
+        # 3. Cache miss: descarga + convierte + cachea (una sola vez por producto).
+        cached_path = await image_service.fetch_and_cache(product_id, variant)
         if cached_path:
-            return FileResponse(cached_path)
+            return _conditional_file_response(request, cached_path)
 
     raise HTTPException(status_code=404, detail="Imagen no encontrada")
 
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from typing import List
 
@@ -6,6 +5,7 @@ from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from loguru import logger
 from sqlalchemy import desc, func, or_
 
+from src.core.concurrency import spawn
 from src.core.security import SecurityShield
 from src.domain.models import (
     AuthorizedDeviceModel,
@@ -34,7 +34,7 @@ router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
 @router.post("/users/create", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def create_user(request: CreateUserRequest):
+def create_user(request: CreateUserRequest):
     with SessionCloud() as db:
         exists = db.query(UserModel).filter(
             or_(UserModel.email == request.email, UserModel.username == request.username)
@@ -57,7 +57,7 @@ async def create_user(request: CreateUserRequest):
 
 
 @router.get("/users", response_model=List[HeroOutput], dependencies=[Depends(verify_api_key)])
-async def get_all_heroes():
+def get_all_heroes():
     with SessionCloud() as db:
         counts = db.query(
             CollectionItemModel.owner_id,
@@ -84,7 +84,7 @@ async def get_all_heroes():
 
 
 @router.patch("/users/{user_id}/role", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def update_hero_role(user_id: int, request: UserRoleUpdateRequest):
+def update_hero_role(user_id: int, request: UserRoleUpdateRequest):
     with SessionCloud() as db:
         user = db.query(UserModel).filter(UserModel.id == user_id).first()
         if not user:
@@ -96,7 +96,7 @@ async def update_hero_role(user_id: int, request: UserRoleUpdateRequest):
 
 
 @router.post("/users/{user_id}/reset-password", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def reset_hero_password(user_id: int):
+def reset_hero_password(user_id: int):
     with SessionCloud() as db:
         user = db.query(UserModel).filter(UserModel.id == user_id).first()
         if not user:
@@ -107,7 +107,7 @@ async def reset_hero_password(user_id: int):
 
 
 @router.delete("/users/{user_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def delete_hero(user_id: int):
+def delete_hero(user_id: int):
     with SessionCloud() as db:
         user = db.query(UserModel).filter(UserModel.id == user_id).first()
         if not user:
@@ -127,7 +127,7 @@ async def delete_hero(user_id: int):
 
 
 @router.get("/duplicates", response_model=List[DuplicateGroupOutput], dependencies=[Depends(verify_api_key)])
-async def get_duplicates():
+def get_duplicates():
     from src.domain.models import ProductModel
 
     with SessionCloud() as db:
@@ -157,7 +157,7 @@ async def get_duplicates():
 
 
 @router.post("/nexus/sync", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def sync_nexus(background_tasks: BackgroundTasks):
+def sync_nexus(background_tasks: BackgroundTasks):
     try:
         from src.application.services.nexus_service import NexusService
 
@@ -171,7 +171,7 @@ async def sync_nexus(background_tasks: BackgroundTasks):
 
 
 @router.post("/nexus/sync/vintage", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def sync_nexus_vintage(background_tasks: BackgroundTasks):
+def sync_nexus_vintage(background_tasks: BackgroundTasks):
     try:
         from src.application.services.nexus_vintage_service import NexusVintageService
 
@@ -186,7 +186,7 @@ async def sync_nexus_vintage(background_tasks: BackgroundTasks):
 
 
 @router.post("/validate-anomaly", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def validate_anomaly(request: AnomalyValidationRequest):
+def validate_anomaly(request: AnomalyValidationRequest):
     with SessionCloud() as db:
         item = db.query(PendingMatchModel).filter(PendingMatchModel.id == request.id).first()
         if not item:
@@ -207,7 +207,7 @@ async def validate_anomaly(request: AnomalyValidationRequest):
 
 
 @router.post("/reset-smartmatches", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def reset_smartmatches():
+def reset_smartmatches():
     with SessionCloud() as db:
         all_offers = db.query(OfferModel).filter(OfferModel.product_id.isnot(None)).all()
 
@@ -238,27 +238,27 @@ async def reset_smartmatches():
 
 
 @router.get("/devices", response_model=List[AuthorizedDeviceOutput], dependencies=[Depends(verify_api_key)])
-async def get_all_devices():
+def get_all_devices():
     with SessionCloud() as db:
         devices = db.query(AuthorizedDeviceModel).order_by(desc(AuthorizedDeviceModel.created_at)).all()
         return devices
 
 
 @router.post("/devices/{device_id}/authorize", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def authorize_device(device_id: str):
+def authorize_device(device_id: str):
     with SessionCloud() as db:
         success = SecurityShield.authorize_device(device_id, db)
         if not success:
             raise HTTPException(status_code=404, detail="Dispositivo no encontrado")
 
         alert_msg = f"✅ *ORÁCULO INFORMA*\n\nEl dispositivo `{device_id}` ha sido **AUTORIZADO** con éxito."
-        asyncio.create_task(SecurityShield.send_telegram_alert(alert_msg))
+        spawn(SecurityShield.send_telegram_alert(alert_msg))
 
         return {"status": "success", "message": f"Dispositivo {device_id} autorizado."}
 
 
 @router.delete("/devices/{device_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def revoke_device(device_id: str):
+def revoke_device(device_id: str):
     with SessionCloud() as db:
         device = db.query(AuthorizedDeviceModel).filter(
             AuthorizedDeviceModel.device_id == device_id
@@ -272,7 +272,7 @@ async def revoke_device(device_id: str):
 
 
 @router.get("/temporary-products", response_model=List[TemporaryProductOutput], dependencies=[Depends(verify_api_key)])
-async def get_temporary_products():
+def get_temporary_products():
     with SessionCloud() as db:
         query = db.query(ProductModel).filter(
             or_(
@@ -299,14 +299,14 @@ async def get_temporary_products():
 
 
 @router.get("/ssl/status", response_model=SSLStatusOutput, dependencies=[Depends(verify_api_key)])
-async def get_ssl_status():
+def get_ssl_status():
     """Obtiene la telemetría, vigencia y fechas de renovación del certificado SSL."""
     from src.application.services.ssl_service import SSLService
     return SSLService.get_certificate_status()
 
 
 @router.post("/ssl/renew", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def renew_ssl(background_tasks: BackgroundTasks, request: SSLRenewRequest = SSLRenewRequest()):
+def renew_ssl(background_tasks: BackgroundTasks, request: SSLRenewRequest = SSLRenewRequest()):
     """Dispara la renovación manual/forzada de certificados SSL en segundo plano."""
     from src.application.services.ssl_service import SSLService
     background_tasks.add_task(SSLService.renew_ssl_certificate, force=request.force)
@@ -15,12 +15,15 @@ class BudgetOptimizeRequest(BaseModel):
     user_location: str = "ES"
 
 @router.get("/analytics/market-index")
-async def get_market_index(period: str = Query(default="3M", description="1M, 3M, 6M, 1A, ALL")):
-    """Calcula y devuelve el Índice Bursátil MOTU (EMI) por Waves con serie histórica."""
+def get_market_index(period: str = Query(default="3M", description="1M, 3M, 6M, 1A, ALL")):
+    """
+    Devuelve el Índice Bursátil MOTU (EMI) por Waves con serie histórica.
+    Phase 106: lee la serie diaria materializada por el mantenimiento (caché TTL por periodo).
+    """
     return MarketAnalyticsService.get_market_index(period=period)
 
 @router.post("/cart/budget-optimize")
-async def optimize_cart_budget(request: BudgetOptimizeRequest):
+def optimize_cart_budget(request: BudgetOptimizeRequest):
     """Encuentra la combinación matemática óptima de compras dentro de un presupuesto dado."""
     return BudgetOptimizerService.optimize_cart(
         budget_limit=request.budget_limit,
@@ -30,6 +33,14 @@ async def optimize_cart_budget(request: BudgetOptimizeRequest):
     )
 
 @router.get("/sync/delta-updates")
-async def get_sync_delta_updates(since: Optional[str] = Query(default=None)):
-    """Suministra el catálogo optimizado para caché y búsqueda instantánea en IndexedDB."""
-    return MarketAnalyticsService.get_delta_updates(since_timestamp=since)
+def get_sync_delta_updates(
+    cursor: Optional[int] = Query(default=None, ge=0, description="Cursor devuelto por la última sincronización"),
+    after_id: Optional[int] = Query(default=None, ge=0, description="Paginación del full sync (next_after_id)"),
+    limit: int = Query(default=500, ge=1, le=2000),
+):
+    """
+    Suministra el catálogo optimizado para caché y búsqueda instantánea en IndexedDB.
+    Phase 105: sin cursor (o con `full_sync` en la respuesta) se descarga el catálogo
+    paginado; después sólo llegan los cambios posteriores al cursor y los `deleted_ids`.
+    """
+    return MarketAnalyticsService.get_delta_updates(cursor=cursor, after_id=after_id, limit=limit)
@@ -28,7 +28,7 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=StatusMessageOutput, dependencies=[Depends(rate_limit(5, 300, "register"))])
-async def register(request: RegisterRequest):
+def register(request: RegisterRequest):
     """
     Fase de Reclutamiento: Permite a nuevos usuarios unirse como Guardianes con nombre propio.
     """
@@ -67,7 +67,7 @@ async def register(request: RegisterRequest):
 
 
 @router.post("/forgot-password", response_model=ForgotPasswordOutput, dependencies=[Depends(rate_limit(3, 300, "forgot-password"))])
-async def forgot_password(
+def forgot_password(
     request: ForgotPasswordRequest, background_tasks: BackgroundTasks
 ):
     """
@@ -99,7 +99,7 @@ async def forgot_password(
 
 
 @router.post("/reset-password", response_model=StatusMessageOutput, dependencies=[Depends(rate_limit(5, 300, "reset-password"))])
-async def reset_password(request: ResetPasswordRequest):
+def reset_password(request: ResetPasswordRequest):
     """
     Fase 15: Valida el token y cambia la contraseña.
     """
@@ -131,7 +131,7 @@ async def reset_password(request: ResetPasswordRequest):
 
 
 @router.post("/login", response_model=LoginOutput, dependencies=[Depends(rate_limit(10, 300, "login"))])
-async def login(request: LoginRequest):
+def login(request: LoginRequest):
     """
     Autenticación de Héroes y Guardianes. Valida email y contraseña (PBKDF2).
     El antiguo bypass "password == ORACULO_API_KEY" se eliminó en la Fase
@@ -187,7 +187,7 @@ async def login(request: LoginRequest):
 
 
 @router.get("/users", response_model=List[UserMinimalOutput])
-async def get_users_minimal(_admin: UserModel = Depends(require_admin)):
+def get_users_minimal(_admin: UserModel = Depends(require_admin)):
     """Retorna la lista de usuarios para el selector rápido. Solo administradores (Fase AAA-1.8)."""
     with SessionCloud() as db:
         users = db.query(UserModel).all()
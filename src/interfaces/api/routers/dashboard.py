@@ -10,7 +10,6 @@ from src.application.services.logistics_service import LogisticsService
 from src.domain.models import (
     BlackcludedItemModel,
     CollectionItemModel,
-    LogisticRuleModel,
     OfferHistoryModel,
     OfferModel,
     PendingMatchModel,
@@ -32,7 +31,7 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
 @router.get("/stats", response_model=DashboardStatsOutput, dependencies=[Depends(verify_device)])
-async def get_dashboard_stats(user_id: int = 1):
+def get_dashboard_stats(user_id: int = 1):
     try:
         with SessionCloud() as db:
             # Total products counts (Agrupado por is_vintage para ahorrar 1 query)
@@ -143,7 +142,7 @@ async def get_dashboard_stats(user_id: int = 1):
 
 
 @router.get("/hall-of-fame", response_model=HallOfFameOutput, dependencies=[Depends(verify_device)])
-async def get_dashboard_hall_of_fame(user_id: int = 1):
+def get_dashboard_hall_of_fame(user_id: int = 1):
     with SessionCloud() as db:
         items = (
             db.query(CollectionItemModel)
@@ -234,7 +233,7 @@ async def get_dashboard_hall_of_fame(user_id: int = 1):
 
 
 @router.get("/top-deals", response_model=List[TopDealOutput], dependencies=[Depends(verify_device)])
-async def get_top_deals(user_id: int = 2):
+def get_top_deals(user_id: int = 2):
     with SessionCloud() as db:
         owned_ids = [
             p[0]
@@ -246,8 +245,7 @@ async def get_top_deals(user_id: int = 2):
 
         freshness_threshold = datetime.now(timezone.utc) - timedelta(hours=72)
 
-        rules = db.query(LogisticRuleModel).all()
-        rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
+        rules_map = LogisticsService.load_rules_map(db)  # Phase 109: instantánea compartida
 
         user_location = "ES"
         user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -319,7 +317,7 @@ async def get_top_deals(user_id: int = 2):
 
 
 @router.get("/match-stats", response_model=List[MatchStatOutput], dependencies=[Depends(verify_device)])
-async def get_dashboard_match_stats():
+def get_dashboard_match_stats():
     with SessionCloud() as db:
         stats = (
             db.query(OfferModel.shop_name.label("shop"), func.count(OfferModel.id).label("count"))
@@ -332,7 +330,7 @@ async def get_dashboard_match_stats():
 
 
 @router.get("/history", response_model=List[MatchHistoryOutput], dependencies=[Depends(verify_device)])
-async def get_dashboard_history():
+def get_dashboard_history():
     with SessionCloud() as db:
         history = (
             db.query(OfferHistoryModel)
@@ -356,7 +354,7 @@ async def get_dashboard_history():
 
 
 @router.post("/revert", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def revert_action(request: dict):
+def revert_action(request: dict):
     # Fase AAA-2.1 / Fix Logística: esta acción borra/reconstruye entradas de OfferModel,
     # BlackcludedItemModel, VintageMiscellaneousModel e historial con soporte completo de tipos
     history_id = request.get("history_id")
@@ -108,5 +108,5 @@ def seed_lore(
     current_user: UserModel = Depends(get_current_user)
 ):
     """Ejecuta el sembrado inicial del catálogo para cubrir los 507 muñecos."""
-    result = LoreHarvesterService.seed_initial_catalog(db=db)
+    result = LoreHarvesterService.seed_initial_catalog(db=db, force=True)
     return {"status": "ok", "result": result}
@@ -11,7 +11,6 @@ from src.application.services.deal_scorer import DealScorer
 from src.application.services.logistics_service import LogisticsService
 from src.domain.models import (
     CollectionItemModel,
-    LogisticRuleModel,
     OfferModel,
     PendingMatchModel,
     ProductModel,
@@ -64,37 +63,22 @@ def get_purgatory_counts(db) -> dict[int, int]:
         if _purgatory_counts_cache is not None and (now - _purgatory_counts_timestamp) < 600:
             return _purgatory_counts_cache
 
-    from src.domain.models import PendingMatchModel, ProductModel
     from src.core.brain_engine import engine
-    import re
+    from src.core.catalog_index import catalog_index
 
     pending = db.query(PendingMatchModel).all()
-    products = db.query(ProductModel).all()
+    # Phase 93: candidatos desde el índice de catálogo compartido (sin recargar productos)
+    index = catalog_index.ensure_loaded(db)
 
-    _STOP_WORDS = {"masters", "of", "the", "universe", "origins", "motu"}
-
-    # Build token index
-    token_index = {}
-    ean_index = {}
-    for p in products:
-        for token in set(re.findall(r"\w+", (p.name or "").lower())) - _STOP_WORDS:
-            token_index.setdefault(token, []).append(p)
-        if p.ean:
-            ean_index.setdefault(p.ean, []).append(p)
+    # Phase 94: todos los pendientes contra sus candidatos en una sola pasada vectorizada
+    all_candidates = [index.candidates(item.scraped_name, item.ean) for item in pending]
+    all_scores = engine.calculate_candidate_matches(
+        [item.scraped_name for item in pending], [item.ean for item in pending], all_candidates
+    )
 
     counts = {}
-    for item in pending:
-        scraped_name_safe = (item.scraped_name or "").lower()
-        search_tokens = set(re.findall(r"\w+", scraped_name_safe)) - _STOP_WORDS
-
-        candidates = set()
-        for token in search_tokens:
-            candidates.update(token_index.get(token, []))
-        if item.ean:
-            candidates.update(ean_index.get(item.ean, []))
-
-        for p in candidates:
-            _, score, _ = engine.calculate_match(p.name, item.scraped_name, p.ean, item.ean)
+    for candidates, scores in zip(all_candidates, all_scores):
+        for p, (_, score, _) in zip(candidates, scores):
             if score > 0.30:
                 counts[p.id] = counts.get(p.id, 0) + 1
 
@@ -106,7 +90,7 @@ def get_purgatory_counts(db) -> dict[int, int]:
 
 
 @router.get("/api/products", response_model=List[ProductOutput])
-async def get_products(
+def get_products(
     is_vintage: bool = False, 
     shop: Optional[str] = None,
     limit: Optional[int] = None,
@@ -183,7 +167,7 @@ async def get_products(
 
 
 @router.get("/api/products/search", response_model=List[ProductSearchResultOutput])
-async def search_products(q: str = ""):
+def search_products(q: str = ""):
     if len(q) < 2:
         return []
 
@@ -207,7 +191,7 @@ async def search_products(q: str = ""):
 
 
 @router.get("/api/auctions/products", response_model=List[ProductOutput])
-async def get_auction_products(is_vintage: bool = False):
+def get_auction_products(is_vintage: bool = False):
     with SessionCloud() as db:
         subq = (
             select(OfferModel.product_id, func.min(OfferModel.price).label("min_price"))
@@ -265,7 +249,7 @@ async def get_auction_products(is_vintage: bool = False):
 
 
 @router.get("/api/intelligence/market/{product_id}", dependencies=[Depends(verify_api_key)])
-async def get_market_intelligence(product_id: int):
+def get_market_intelligence(product_id: int):
     from src.application.services.market_intelligence import MarketIntelligenceService
 
     with SessionCloud() as db:
@@ -287,7 +271,7 @@ async def get_wallapop_preview(url: str):
 
 
 @router.put("/api/products/{product_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def edit_product(product_id: int, request: ProductEditRequest):
+def edit_product(product_id: int, request: ProductEditRequest):
     from src.domain.models import VintageProductModel
     with SessionCloud() as db:
         product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
@@ -329,7 +313,7 @@ async def edit_product(product_id: int, request: ProductEditRequest):
 
 
 @router.post("/api/products/merge", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def merge_products(request: ProductMergeRequest):
+def merge_products(request: ProductMergeRequest):
     from src.domain.models import ProductAliasModel, VintageProductModel, PriceAlertModel
 
     with SessionCloud() as db:
@@ -397,7 +381,7 @@ async def merge_products(request: ProductMergeRequest):
 
 
 @router.get("/api/products/with-offers", response_model=List[int], dependencies=[Depends(verify_device)])
-async def get_products_with_offers():
+def get_products_with_offers():
     with SessionCloud() as db:
         product_ids = (
             db.query(OfferModel.product_id)
@@ -409,7 +393,7 @@ async def get_products_with_offers():
 
 
 @router.get("/api/products/{product_id}/offers", response_model=List[ProductOfferOutput], dependencies=[Depends(verify_device)])
-async def get_product_offers(product_id: int):
+def get_product_offers(product_id: int):
     with SessionCloud() as db:
         all_offers = (
             db.query(OfferModel)
@@ -423,8 +407,7 @@ async def get_product_offers(product_id: int):
         if user:
             user_location = user.location
 
-        rules = db.query(LogisticRuleModel).all()
-        rules_map = {f"{r.shop_name}_{r.country_code}": r for r in rules}
+        rules_map = LogisticsService.load_rules_map(db)  # Phase 109: instantánea compartida
 
         best_by_shop = {}
         for o in all_offers:
@@ -463,7 +446,7 @@ async def get_product_offers(product_id: int):
 
 
 @router.get("/api/market/analytics/{product_id}", response_model=MarketAnalyticsOutput)
-async def get_market_analytics(product_id: int):
+def get_market_analytics(product_id: int):
     with SessionCloud() as db:
         offers = db.query(OfferModel).filter(
             OfferModel.product_id == product_id, OfferModel.is_available == True
@@ -490,7 +473,7 @@ async def get_market_analytics(product_id: int):
 
 
 @router.get("/api/products/{product_id}/price-history", response_model=List[ProductPriceHistoryOutput])
-async def get_product_price_history(product_id: int):
+def get_product_price_history(product_id: int):
     from src.domain.models import PriceHistoryModel
 
     with SessionCloud() as db:
@@ -531,7 +514,7 @@ async def get_product_price_history(product_id: int):
 
 
 @router.get("/api/products/shops", response_model=List[str])
-async def get_unique_shops():
+def get_unique_shops():
     with SessionCloud() as db:
         query = select(OfferModel.shop_name).distinct()
         results = db.execute(query).scalars().all()
@@ -540,7 +523,7 @@ async def get_unique_shops():
 
 
 @router.get("/api/vintage/products", response_model=List[VintageProductListingOutput])
-async def get_vintage_products():
+def get_vintage_products():
     with SessionCloud() as db:
         # Fetch all offers marked as is_vintage to list them individually
         query = (
@@ -581,7 +564,7 @@ async def get_vintage_products():
 
 
 @router.delete("/api/products/{product_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def delete_product(product_id: int):
+def delete_product(product_id: int):
     from src.domain.models import OfferModel, PendingMatchModel, ProductAliasModel, ProductModel, VintageProductModel, PriceAlertModel
     
     with SessionCloud() as db:
@@ -638,7 +621,7 @@ async def delete_product(product_id: int):
 
 
 @router.get("/api/vintage/miscellaneous", response_model=List[VintageMiscellaneousItemOutput])
-async def get_vintage_miscellaneous():
+def get_vintage_miscellaneous():
     with SessionCloud() as db:
         from src.domain.models import VintageMiscellaneousModel
         results = db.query(VintageMiscellaneousModel).order_by(desc(VintageMiscellaneousModel.added_at)).all()
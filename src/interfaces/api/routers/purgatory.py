@@ -1,5 +1,4 @@
 import json
-import re
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
@@ -45,31 +44,10 @@ from typing import List
 router = APIRouter(tags=["purgatory"])
 
 
-_STOP_WORDS = {"masters", "of", "the", "universe", "origins", "motu"}
-
-
-def _build_product_index(products: list) -> tuple[dict, dict]:
-    """
-    Builds two lookup structures from the product list (called once per request):
-      token_index : token → [ProductModel, ...]  — for name-based pre-filtering
-      ean_index   : ean   → [ProductModel, ...]  — for exact EAN matches
-
-    Reduces the matching loop from O(pending × all_products) to
-    O(pending × avg_candidates), typically a 10-50x speedup.
-    """
-    token_index: dict = {}
-    ean_index: dict = {}
-    for p in products:
-        for token in set(re.findall(r"\w+", (p.name or "").lower())) - _STOP_WORDS:
-            token_index.setdefault(token, []).append(p)
-        if p.ean:
-            ean_index.setdefault(p.ean, []).append(p)
-    return token_index, ean_index
-
-
 @router.get("/api/purgatory", response_model=List[PurgatoryItemOutput], dependencies=[Depends(verify_api_key)])
-async def get_purgatory(page: int = 1, limit: int = 500):
+def get_purgatory(page: int = 1, limit: int = 500):
     from src.core.brain_engine import engine
+    from src.core.catalog_index import catalog_index
     from src.infrastructure.scrapers.pipeline import clean_purgatory_globally
 
     with SessionCloud() as db:
@@ -89,26 +67,21 @@ async def get_purgatory(page: int = 1, limit: int = 500):
             .all()
         )
 
-        # Single DB round-trip; index built once for the whole page
-        products = db.query(ProductModel).all()
-        token_index, ean_index = _build_product_index(products)
+        # Phase 93: índice de catálogo compartido (incremental), sin recargar productos por petición
+        index = catalog_index.ensure_loaded(db)
+
+        # Phase 94: candidatos de toda la página puntuados en una sola pasada vectorizada
+        # (mismas puntuaciones que calculate_match)
+        page_candidates = [index.candidates(item.scraped_name, item.ean) for item in pending]
+        page_scores = engine.calculate_candidate_matches(
+            [item.scraped_name for item in pending], [item.ean for item in pending], page_candidates
+        )
 
         results = []
-        for item in pending:
+        for item, candidates, scores in zip(pending, page_candidates, page_scores):
             try:
-                scraped_name_safe = (item.scraped_name or "").lower()
-                search_tokens = set(re.findall(r"\w+", scraped_name_safe)) - _STOP_WORDS
-
-                # Gather candidates via index — avoids iterating over every product
-                candidates: set = set()
-                for token in search_tokens:
-                    candidates.update(token_index.get(token, []))
-                if item.ean:
-                    candidates.update(ean_index.get(item.ean, []))
-
                 suggestions = []
-                for p in candidates:
-                    _, score, reason = engine.calculate_match(p.name, item.scraped_name, p.ean, item.ean)
+                for p, (_, score, reason) in zip(candidates, scores):
                     if score > 0.30:
                         suggestions.append({
                             "product_id": p.id,
@@ -232,7 +205,7 @@ def run_match_task(pending_id: int, product_id: int):
 
 
 @router.post("/api/purgatory/match", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def match_purgatory(request: PurgatoryMatchRequest, background_tasks: BackgroundTasks):
+def match_purgatory(request: PurgatoryMatchRequest, background_tasks: BackgroundTasks):
     if request.pending_id in PROCESSING_IDS:
         return {"status": "success", "message": "Vinculación ya se está procesando en segundo plano"}
 
@@ -357,7 +330,7 @@ def run_match_bulk_task(matches: list[dict]):
 
 
 @router.post("/api/purgatory/match/bulk", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def match_purgatory_bulk(request: PurgatoryBulkMatchRequest, background_tasks: BackgroundTasks):
+def match_purgatory_bulk(request: PurgatoryBulkMatchRequest, background_tasks: BackgroundTasks):
     to_process = []
     for m in request.matches:
         if m.pending_id not in PROCESSING_IDS:
@@ -432,7 +405,7 @@ def run_discard_task(pending_id: int, reason: str):
 
 
 @router.post("/api/purgatory/discard", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def discard_purgatory(request: PurgatoryDiscardRequest, background_tasks: BackgroundTasks):
+def discard_purgatory(request: PurgatoryDiscardRequest, background_tasks: BackgroundTasks):
     if request.pending_id in PROCESSING_IDS:
         return {"status": "success", "message": "El descarte ya se está procesando en segundo plano"}
 
@@ -496,7 +469,7 @@ def run_discard_bulk_task(pending_ids: list[int], reason: str):
 
 
 @router.post("/api/purgatory/discard/bulk", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def discard_purgatory_bulk(request: PurgatoryBulkDiscardRequest, background_tasks: BackgroundTasks):
+def discard_purgatory_bulk(request: PurgatoryBulkDiscardRequest, background_tasks: BackgroundTasks):
     to_process = [pid for pid in request.pending_ids if pid not in PROCESSING_IDS]
     if not to_process:
         return {"status": "success", "message": "Todos los descartes ya se están procesando"}
@@ -509,7 +482,7 @@ async def discard_purgatory_bulk(request: PurgatoryBulkDiscardRequest, backgroun
 
 
 @router.post("/api/offers/{offer_id}/unlink", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def unlink_offer(offer_id: int):
+def unlink_offer(offer_id: int):
     with SessionCloud() as db:
         offer = db.query(OfferModel).filter(OfferModel.id == offer_id).first()
         if not offer:
@@ -546,7 +519,7 @@ async def unlink_offer(offer_id: int):
 
 
 @router.post("/api/offers/{offer_id}/relink", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def relink_offer(offer_id: int, request: RelinkOfferRequest):
+def relink_offer(offer_id: int, request: RelinkOfferRequest):
     with SessionCloud() as db:
         offer = db.query(OfferModel).filter(OfferModel.id == offer_id).first()
         if not offer:
@@ -779,7 +752,7 @@ def run_match_vintage_task(pending_id: int, custom_name: Optional[str], product_
 
 
 @router.post("/api/purgatory/{pending_id}/vintage", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def match_purgatory_vintage(pending_id: int, background_tasks: BackgroundTasks, request: Optional[VintageMatchRequest] = None):
+def match_purgatory_vintage(pending_id: int, background_tasks: BackgroundTasks, request: Optional[VintageMatchRequest] = None):
     if pending_id in PROCESSING_IDS:
         return {"status": "success", "message": "La clasificación ya se está procesando en segundo plano"}
 
@@ -799,7 +772,7 @@ async def match_purgatory_vintage(pending_id: int, background_tasks: BackgroundT
 
 
 @router.post("/api/vintage/revert-offer/{offer_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def revert_vintage_offer(offer_id: int):
+def revert_vintage_offer(offer_id: int):
     with SessionCloud() as db:
         offer = db.query(OfferModel).filter(OfferModel.id == offer_id).first()
         if not offer:
@@ -930,7 +903,7 @@ def run_match_miscellaneous_task(pending_id: int):
 
 
 @router.post("/api/purgatory/{pending_id}/miscellaneous", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def match_purgatory_miscellaneous(pending_id: int, background_tasks: BackgroundTasks):
+def match_purgatory_miscellaneous(pending_id: int, background_tasks: BackgroundTasks):
     if pending_id in PROCESSING_IDS:
         return {"status": "success", "message": "La clasificación miscelánea ya se está procesando en segundo plano"}
 
@@ -945,7 +918,7 @@ async def match_purgatory_miscellaneous(pending_id: int, background_tasks: Backg
 
 
 @router.post("/api/vintage/miscellaneous/revert/{item_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def revert_miscellaneous_item(item_id: int):
+def revert_miscellaneous_item(item_id: int):
     with SessionCloud() as db:
         from src.domain.models import VintageMiscellaneousModel
         misc_item = db.query(VintageMiscellaneousModel).filter(VintageMiscellaneousModel.id == item_id).first()
@@ -990,7 +963,7 @@ async def revert_miscellaneous_item(item_id: int):
 
 
 @router.delete("/api/vintage/miscellaneous/{item_id}", response_model=StatusMessageOutput, dependencies=[Depends(verify_api_key)])
-async def delete_miscellaneous_item(item_id: int):
+def delete_miscellaneous_item(item_id: int):
     with SessionCloud() as db:
         from src.domain.models import VintageMiscellaneousModel
         misc_item = db.query(VintageMiscellaneousModel).filter(VintageMiscellaneousModel.id == item_id).first()
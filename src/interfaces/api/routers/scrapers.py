@@ -10,7 +10,9 @@ from loguru import logger
 from sqlalchemy import desc
 
 from src.domain.models import ScraperExecutionLogModel, ScraperStatusModel, WallapopIpLogModel
+from src.core.concurrency import run_blocking
 from src.infrastructure.database_cloud import SessionCloud
+from src.infrastructure.repositories.execution_log_sink import read_log_tail, ExecutionLogSink
 from src.interfaces.api.deps import verify_api_key
 from src.interfaces.api.schemas import (
     ScraperRunRequest,
@@ -74,22 +76,8 @@ def run_scraper_task(
             db.commit()
             log_id = execution_log.id
 
-    def update_live_log(msg: str):
-        if not log_id:
-            return
-        try:
-            with SessionCloud() as db_l:
-                entry = db_l.query(ScraperExecutionLogModel).get(log_id)
-                if entry:
-                    ts = datetime.now(ZoneInfo("Europe/Madrid")).strftime("%H:%M:%S")
-                    line = f"[{ts}] {msg}"
-                    if entry.logs:
-                        entry.logs += "\n" + line
-                    else:
-                        entry.logs = line
-                    db_l.commit()
-        except Exception:
-            pass
+    # Phase 98: log en vivo con buffer y volcado append-only (no relee el texto entero)
+    update_live_log = ExecutionLogSink(log_id, SessionCloud)
 
     update_live_log(f"⚔️ Iniciando secuencia de extracción para {spider_name}...")
 
@@ -204,6 +192,7 @@ def run_scraper_task(
                 f"✅ Incursión completada con éxito. {items_found} reliquias encontradas."
             )
 
+        update_live_log.close()
         with SessionCloud() as db:
             status = (
                 db.query(ScraperStatusModel)
@@ -230,6 +219,7 @@ def run_scraper_task(
     except Exception as e:
         logger.error(f"Scraper Error ({spider_name}): {e}")
         update_live_log(f"❌ FALLO CRÍTICO: {str(e)}")
+        update_live_log.close()
         with SessionCloud() as db:
             status = (
                 db.query(ScraperStatusModel)
@@ -253,7 +243,7 @@ def run_scraper_task(
 
 
 @router.get("/status", response_model=List[ScraperStatusOutput], dependencies=[Depends(verify_api_key)])
-async def get_scrapers_status():
+def get_scrapers_status():
     """Retorna el estado actual de los recolectores (Admin Only)"""
     with SessionCloud() as db:
         return (
@@ -268,7 +258,7 @@ async def get_scrapers_status():
 
 
 @router.get("/logs", response_model=List[ScraperExecutionLogOutput], dependencies=[Depends(verify_api_key)])
-async def get_scrapers_logs():
+def get_scrapers_logs():
     """Retorna el historial de ejecuciones (Admin Only)"""
     with SessionCloud() as db:
         return (
@@ -279,6 +269,16 @@ async def get_scrapers_logs():
         )
 
 
+@router.get("/logs/{log_id}/tail", dependencies=[Depends(verify_api_key)])
+def get_scraper_log_tail(log_id: int, offset: int = 0):
+    """Tramo nuevo del log en vivo a partir de `offset` (polling incremental de la UI)."""
+    with SessionCloud() as db:
+        tail = read_log_tail(db, log_id, offset)
+    if tail is None:
+        raise HTTPException(status_code=404, detail="Log de ejecución no encontrado")
+    return tail
+
+
 @router.get("/quota-status", dependencies=[Depends(verify_api_key)])
 async def get_github_quota_status():
     """Retorna el estado en vivo de la cuota mensual de GitHub Actions (2.000 min), saldo y reposición."""
@@ -287,7 +287,7 @@ async def get_github_quota_status():
 
 
 @router.get("/execution-logs/export", dependencies=[Depends(verify_api_key)])
-async def export_execution_logs_csv():
+def export_execution_logs_csv():
     """Genera y descarga un archivo CSV con el historial de ejecuciones y minutos facturables."""
     from src.application.services.github_quota_service import GitHubQuotaService
     csv_data = GitHubQuotaService.generate_logs_csv()
@@ -300,7 +300,7 @@ async def export_execution_logs_csv():
 
 
 @router.post("/run", response_model=RunScraperOutput, dependencies=[Depends(verify_api_key)])
-async def run_scrapers(request: ScraperRunRequest, background_tasks: BackgroundTasks):
+def run_scrapers(request: ScraperRunRequest, background_tasks: BackgroundTasks):
     """Inicia la recolección de reliquias en segundo plano (Admin Only)"""
     # 1. Marcar inicio en la base de datos y crear Log
     with SessionCloud() as db:
@@ -337,7 +337,7 @@ async def run_scrapers(request: ScraperRunRequest, background_tasks: BackgroundT
 
 
 @router.post("/stop", response_model=StopScrapersOutput, dependencies=[Depends(verify_api_key)])
-async def stop_scrapers():
+def stop_scrapers():
     """
     Protocolo de Emergencia: Mata procesos de scrapers activos y resetea estados en BD.
     (Admin Only - URGENTE)
@@ -401,7 +401,7 @@ async def stop_scrapers():
 
 
 @router.get("/wallapop/ip-logs", response_model=List[WallapopIpLogOutput], dependencies=[Depends(verify_api_key)])
-async def get_wallapop_ip_logs():
+def get_wallapop_ip_logs():
     """Retorna el historial de logs de IP de Wallapop (Admin Only)"""
     with SessionCloud() as db:
         return (
@@ -413,7 +413,7 @@ async def get_wallapop_ip_logs():
 
 
 @router.get("/wallapop/ip-logs/download", dependencies=[Depends(verify_api_key)])
-async def download_wallapop_ip_logs():
+def download_wallapop_ip_logs():
     """Descarga los logs de IP de Wallapop en formato TXT (Admin Only)"""
     with SessionCloud() as db:
         logs = (
@@ -456,14 +456,6 @@ from typing import Optional
 async def import_wallapop_manual_html(file: Optional[UploadFile] = File(None)):
     """Parsea el archivo local o subido data/wallapop_search.html e inserta los artículos nuevos en el Purgatorio."""
     import os
-    import re
-    from bs4 import BeautifulSoup
-    from src.domain.models import (
-        PendingMatchModel,
-        OfferModel,
-        BlackcludedItemModel,
-        VintageMiscellaneousModel
-    )
 
     # 1. Definir rutas
     project_root = os.getcwd()
@@ -500,6 +492,21 @@ async def import_wallapop_manual_html(file: Optional[UploadFile] = File(None)):
                 detail=f"Error al leer el archivo HTML local: {str(e)}"
             )
 
+    # Phase 99: parseo y escritura en DB fuera del event loop
+    return await run_blocking(_import_wallapop_html, content)
+
+
+def _import_wallapop_html(content: str) -> dict:
+    """Parseo del HTML de búsqueda de Wallapop + alta masiva en el Purgatorio (síncrono)."""
+    import re
+    from bs4 import BeautifulSoup
+    from src.domain.models import (
+        PendingMatchModel,
+        OfferModel,
+        BlackcludedItemModel,
+        VintageMiscellaneousModel
+    )
+
     # 3. Parsear con BeautifulSoup
     soup = BeautifulSoup(content, 'html.parser')
     cards = soup.select("a[href*='/item/']")
@@ -9,7 +9,7 @@ from src.interfaces.api.schemas import PublicShowcaseOutput
 router = APIRouter(tags=["showcase"])
 
 @router.get("/api/public/showcase/{username}", response_model=PublicShowcaseOutput)
-async def get_public_showcase(username: str):
+def get_public_showcase(username: str):
     """
     Retorna la colección de un usuario de forma pública si la tiene configurada como pública.
     Excluye estrictamente campos financieros (purchase_price) para proteger la privacidad.
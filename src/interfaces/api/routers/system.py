@@ -3,6 +3,7 @@ import sys
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from loguru import logger
 
+from src.core.concurrency import run_blocking
 from src.infrastructure.database_cloud import SessionCloud
 from src.interfaces.api.deps import get_current_user, is_admin, verify_api_key
 from src.interfaces.api.schemas import StatusMessageOutput
@@ -11,7 +12,7 @@ router = APIRouter(tags=["system"])
 
 
 @router.get("/api/system/audit", dependencies=[Depends(verify_api_key)])
-async def system_audit():
+def system_audit():
     import sqlalchemy
 
     from src.core.config import settings
@@ -113,7 +114,7 @@ from src.interfaces.api.deps import get_current_user
 from src.domain.models import SystemConfigModel, UserModel
 
 @router.get("/api/system/sword-configs")
-async def get_sword_configs(current_user: UserModel = Depends(get_current_user)):
+def get_sword_configs(current_user: UserModel = Depends(get_current_user)):
     with SessionCloud() as db:
         cfg = db.query(SystemConfigModel).filter(SystemConfigModel.key == "sword_configs").first()
         if cfg:
@@ -124,7 +125,7 @@ async def get_sword_configs(current_user: UserModel = Depends(get_current_user))
         return {}
 
 @router.post("/api/system/sword-configs", response_model=StatusMessageOutput)
-async def save_sword_configs(configs: dict, current_user: UserModel = Depends(get_current_user)):
+def save_sword_configs(configs: dict, current_user: UserModel = Depends(get_current_user)):
     if not is_admin(current_user):
         raise HTTPException(status_code=403, detail="No autorizado para modificar la configuración de espadas.")
         
@@ -138,7 +139,7 @@ async def save_sword_configs(configs: dict, current_user: UserModel = Depends(ge
     return {"status": "success", "message": "Configuración de espadas guardada exitosamente."}
 
 @router.get("/api/system/tcg-layouts")
-async def get_tcg_layouts(current_user: UserModel = Depends(get_current_user)):
+def get_tcg_layouts(current_user: UserModel = Depends(get_current_user)):
     with SessionCloud() as db:
         cfg = db.query(SystemConfigModel).filter(SystemConfigModel.key == "tcg_layouts").first()
         if cfg:
@@ -149,7 +150,7 @@ async def get_tcg_layouts(current_user: UserModel = Depends(get_current_user)):
         return {}
 
 @router.post("/api/system/tcg-layouts", response_model=StatusMessageOutput)
-async def save_tcg_layouts(layouts: dict, current_user: UserModel = Depends(get_current_user)):
+def save_tcg_layouts(layouts: dict, current_user: UserModel = Depends(get_current_user)):
     if not is_admin(current_user):
         raise HTTPException(status_code=403, detail="No autorizado para modificar la configuración de cartas TCG.")
         
@@ -168,30 +169,35 @@ async def run_maintenance_task():
     from src.core.security import SecurityShield
     
     logger.info("🧹 [TASK] Iniciando purificación FinOps de base de datos en segundo plano...")
-    try:
+
+    def _compact():
         with SessionCloud() as db:
-            stats = MaintenanceService.compact_database(db)
-            
-            # Formatear el reporte de Telegram
-            msg = (
-                "🧹 <b>[FinOps] Purificación del Oráculo Completada</b>\n\n"
-                f"• Productos procesados: <b>{stats.get('products_processed', 0)}</b>\n"
-                f"• Resúmenes mensuales guardados: <b>{stats.get('monthly_stats_saved', 0)}</b>\n"
-                f"• Ofertas inactivas purgadas: <b>{stats.get('offers_purged', 0)}</b>\n"
-                f"• Historial detallado purgado: <b>{stats.get('price_history_purged', 0)}</b>\n"
-                f"• Logs de scrapers truncados: <b>{stats.get('logs_truncated', 0)}</b>\n"
-                f"• Registros de lista negra purgados: <b>{stats.get('blacklist_purged', 0)}</b>\n\n"
-                "✨ <i>¡Base de datos de Supabase saneada con éxito!</i>"
-            )
-            await SecurityShield.send_telegram_alert(msg)
-            logger.info("🧹 [TASK] Purificación en segundo plano completada y alerta de Telegram enviada.")
+            return MaintenanceService.compact_database(db)
+
+    try:
+        # Phase 99: la compactación es puro trabajo de DB; se ejecuta fuera del event loop
+        stats = await run_blocking(_compact)
+
+        # Formatear el reporte de Telegram
+        msg = (
+            "🧹 <b>[FinOps] Purificación del Oráculo Completada</b>\n\n"
+            f"• Productos procesados: <b>{stats.get('products_processed', 0)}</b>\n"
+            f"• Resúmenes mensuales guardados: <b>{stats.get('monthly_stats_saved', 0)}</b>\n"
+            f"• Ofertas inactivas purgadas: <b>{stats.get('offers_purged', 0)}</b>\n"
+            f"• Historial detallado purgado: <b>{stats.get('price_history_purged', 0)}</b>\n"
+            f"• Logs de scrapers truncados: <b>{stats.get('logs_truncated', 0)}</b>\n"
+            f"• Registros de lista negra purgados: <b>{stats.get('blacklist_purged', 0)}</b>\n\n"
+            "✨ <i>¡Base de datos de Supabase saneada con éxito!</i>"
+        )
+        await SecurityShield.send_telegram_alert(msg)
+        logger.info("🧹 [TASK] Purificación en segundo plano completada y alerta de Telegram enviada.")
     except Exception as e:
         err_msg = f"❌ <b>[FinOps] Fallo en la Purificación</b>\n\nError: <code>{str(e)}</code>"
         await SecurityShield.send_telegram_alert(err_msg)
         logger.error(f"❌ Error en la tarea de mantenimiento en segundo plano: {e}")
 
 @router.post("/api/system/maintenance", response_model=StatusMessageOutput)
-async def run_maintenance(
+def run_maintenance(
     background_tasks: BackgroundTasks,
     current_user: UserModel = Depends(get_current_user)
 ):
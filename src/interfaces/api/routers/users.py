@@ -4,7 +4,9 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 from loguru import logger
+from sqlalchemy.orm import contains_eager
 
+from src.application.services.image_service import image_service
 from src.application.services.logistics_service import LogisticsService
 from src.domain.models import OfferModel, PendingMatchModel, ProductModel, UserModel, BlackcludedItemModel, VintageMiscellaneousModel, OfferHistoryModel
 from src.infrastructure.database_cloud import SessionCloud
@@ -23,7 +25,7 @@ router = APIRouter(tags=["users"])
 
 
 @router.get("/api/users/{user_id}", response_model=UserSettingsOutput, dependencies=[Depends(verify_device)])
-async def get_user_settings(user_id: int, current_user: UserModel = Depends(get_current_user)):
+def get_user_settings(user_id: int, current_user: UserModel = Depends(get_current_user)):
     user_id = scope_user_id(current_user, user_id)
     with SessionCloud() as db:
         user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -42,7 +44,7 @@ async def get_user_settings(user_id: int, current_user: UserModel = Depends(get_
 
 
 @router.post("/api/users/{user_id}/image-paths", response_model=UserImagePathsOutput)
-async def update_user_image_paths(
+def update_user_image_paths(
     user_id: int,
     request: UserImagePathsUpdateRequest,
     current_user: UserModel = Depends(get_current_user),
@@ -59,6 +61,7 @@ async def update_user_image_paths(
         user.pc_image_path = request.pc_path
         user.mobile_image_path = request.mobile_path
         db.commit()
+        image_service.invalidate_user(user_id)
         return {
             "status": "success",
             "pc_image_path": user.pc_image_path,
@@ -67,7 +70,7 @@ async def update_user_image_paths(
 
 
 @router.post("/api/users/{user_id}/location", response_model=UserLocationOutput)
-async def update_user_location(
+def update_user_location(
     user_id: int,
     location: str,
     current_user: UserModel = Depends(get_current_user),
@@ -83,7 +86,7 @@ async def update_user_location(
 
 
 @router.post("/api/users/{user_id}/public-showcase", response_model=UserPublicShowcaseOutput)
-async def update_user_showcase(
+def update_user_showcase(
     user_id: int,
     is_public: bool,
     current_user: UserModel = Depends(get_current_user),
@@ -103,7 +106,7 @@ async def update_user_showcase(
 
 
 @router.post("/api/wallapop/import", dependencies=[Depends(verify_wallapop_import)])
-async def import_wallapop_products(request: WallapopImportRequest):
+def import_wallapop_products(request: WallapopImportRequest):
     # Fase AAA-3d: la extensión de Chrome (chrome-extension/content.js) manda
     # su propia clave de bajo privilegio (X-Extension-Key, distinta de
     # ORACULO_API_KEY — si se filtra desde el navegador no da acceso
@@ -199,7 +202,7 @@ async def import_wallapop_products(request: WallapopImportRequest):
 
 
 @router.get("/api/radar/p2p-opportunities", response_model=List[P2POpportunityOutput])
-async def get_p2p_opportunities(user_id: int = 2, current_user: UserModel = Depends(get_current_user)):
+def get_p2p_opportunities(user_id: int = 2, current_user: UserModel = Depends(get_current_user)):
     user_id = scope_user_id(current_user, user_id)
     with SessionCloud() as db:
         user_location = "ES"
@@ -207,9 +210,12 @@ async def get_p2p_opportunities(user_id: int = 2, current_user: UserModel = Depe
         if user:
             user_location = user.location
 
+        # Phase 108: producto cargado en la misma consulta (contains_eager sobre el JOIN)
+        # y reglas logísticas resueltas una vez para todo el lote -> nº de consultas constante
         opportunities = (
             db.query(OfferModel)
             .join(ProductModel)
+            .options(contains_eager(OfferModel.product))
             .filter(
                 OfferModel.is_available == True,
                 OfferModel.source_type == "Peer-to-Peer",
@@ -218,9 +224,14 @@ async def get_p2p_opportunities(user_id: int = 2, current_user: UserModel = Depe
             )
             .all()
         )
+        landing_prices = LogisticsService.get_landing_prices(
+            [(o.price, o.shop_name) for o in opportunities],
+            user_location,
+            rules_map=LogisticsService.load_rules_map(db),
+        )
 
         results = []
-        for o in opportunities:
+        for o, landing_price in zip(opportunities, landing_prices):
             saving = o.product.p25_price - o.price
             saving_pct = (saving / o.product.p25_price * 100) if o.product.p25_price > 0 else 0.0
             results.append({
@@ -236,7 +247,7 @@ async def get_p2p_opportunities(user_id: int = 2, current_user: UserModel = Depe
                 "shop_name": o.shop_name,
                 "url": o.url,
                 "opportunity_score": o.opportunity_score,
-                "landing_price": LogisticsService.get_landing_price(o.price, o.shop_name, user_location),
+                "landing_price": landing_price,
             })
 
         return sorted(results, key=lambda x: x["saving_pct"], reverse=True)
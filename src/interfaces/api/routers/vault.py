@@ -1,15 +1,16 @@
 import json
 import os
-import io
-import zipfile
 from pathlib import Path
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from loguru import logger
 
+from src.application.services.image_service import IMAGE_VARIANTS
 from src.infrastructure.database_cloud import SessionCloud
 from src.core.config import settings
+from src.core.zip_stream import StreamingZip, ZipEntry
 from src.interfaces.api.deps import require_admin
 from src.interfaces.api.schemas import StatusMessageOutput
 
@@ -36,7 +37,7 @@ def _resolve_staged_file(filename: str) -> Path:
 
 
 @router.get("/api/vault/generate")
-async def api_generate_vault(user_id: int = 2):
+def api_generate_vault(user_id: int = 2):
     from src.application.services.vault_service import VaultService
 
     vault_service = VaultService()
@@ -53,7 +54,7 @@ async def api_generate_vault(user_id: int = 2):
 
 
 @router.post("/api/vault/stage", response_model=StatusMessageOutput)
-async def api_stage_vault(user_id: int = 2, filename: str = None):
+def api_stage_vault(user_id: int = 2, filename: str = None):
     from src.application.services.vault_service import VaultService
     from src.domain.models import StagedImportModel
 
@@ -78,7 +79,7 @@ async def api_stage_vault(user_id: int = 2, filename: str = None):
 
 
 @router.post("/api/excel/sync", response_model=StatusMessageOutput)
-async def api_sync_excel(user_id: int = 2):
+def api_sync_excel(user_id: int = 2):
     from src.application.services.excel_manager import ExcelManager
     from src.domain.models import UserModel
     from src.infrastructure.database_cloud import SessionCloud
@@ -118,15 +119,43 @@ async def api_sync_excel(user_id: int = 2):
     )
 
 
+def _parse_byte_range(range_header: Optional[str], total: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango único `bytes=a-b` / `bytes=a-` / `bytes=-n` -> (inicio, fin) inclusive.
+    None = sin Range utilizable (se sirve entero); ValueError = rango insatisfacible.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else total - 1
+        else:
+            start, end = max(total - int(last), 0), total - 1
+    except ValueError:
+        return None
+    if start >= total or start > end:
+        raise ValueError(range_header)
+    return start, min(end, total - 1)
+
+
 @router.get("/api/vault/download-images/zip")
-async def download_images_zip():
+def download_images_zip(request: Request):
+    """
+    Phase 102: ZIP de la caché de imágenes servido en streaming (ZIP_STORED,
+    memoria constante, lecturas en el pool de hilos) con soporte de Range /
+    If-Range para reanudar descargas.
+    """
     cache_dir = Path(settings.IMAGE_CACHE_DIR)
     if not cache_dir.exists():
         raise HTTPException(status_code=404, detail="El directorio de caché de imágenes no existe.")
     
+    # Las variantes reducidas (thumb/card) se regeneran solas: sólo se exporta el original
+    variant_suffixes = tuple(f"_{v}" for v in IMAGE_VARIANTS if v != "full")
     image_files = []
     for ext in ("*.webp", "*.jpg", "*.jpeg", "*.png"):
-        image_files.extend(cache_dir.glob(ext))
+        image_files.extend(p for p in cache_dir.glob(ext) if not p.stem.endswith(variant_suffixes))
         
     if not image_files:
         raise HTTPException(status_code=404, detail="No hay imágenes en el caché local para descargar.")
@@ -145,32 +174,53 @@ async def download_images_zip():
         text = re.sub(r'-+', '-', text)
         return text.strip('-')
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for img_path in image_files:
-            try:
-                p_id = int(img_path.stem)
-            except ValueError:
-                zip_file.write(img_path, img_path.name)
-                continue
-                
-            if p_id in product_map:
-                name, fig_id = product_map[p_id]
-                slug_name = slugify(name)
-                if not slug_name:
-                    slug_name = "product"
-                slug_id = fig_id if fig_id else str(p_id)
-                new_name = f"{slug_name}-{slug_id}{img_path.suffix}"
-            else:
-                new_name = img_path.name
-                
-            zip_file.write(img_path, new_name)
-            
-    zip_buffer.seek(0)
-    
+    entries = []
+    for img_path in sorted(image_files):
+        try:
+            p_id = int(img_path.stem)
+        except ValueError:
+            p_id = None
+
+        if p_id in product_map:
+            name, fig_id = product_map[p_id]
+            slug_name = slugify(name)
+            if not slug_name:
+                slug_name = "product"
+            slug_id = fig_id if fig_id else str(p_id)
+            new_name = f"{slug_name}-{slug_id}{img_path.suffix}"
+        else:
+            new_name = img_path.name
+
+        try:
+            entries.append(ZipEntry.from_path(str(img_path), new_name))
+        except OSError:
+            continue  # borrada entre el listado y el stat
+
+    archive = StreamingZip(entries)
+    headers = {
+        "Content-Disposition": "attachment; filename=motu_images.zip",
+        "Accept-Ranges": "bytes",
+        "ETag": archive.etag,
+    }
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == archive.etag:
+        try:
+            byte_range = _parse_byte_range(request.headers.get("range"), archive.total_size)
+        except ValueError:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{archive.total_size}"}
+            )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(archive.total_size)
+        return StreamingResponse(archive.iter_range(), media_type="application/zip", headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{archive.total_size}"
+    headers["Content-Length"] = str(end - start + 1)
     return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": "attachment; filename=motu_images.zip"}
+        archive.iter_range(start, end), status_code=206, media_type="application/zip", headers=headers
     )
 
@@ -37,7 +37,7 @@ router = APIRouter(prefix="/api/wallapop/jobs", tags=["wallapop-nexus-bridge"])
 
 
 @router.post("", response_model=WallapopJobCreatedOutput, dependencies=[Depends(verify_api_key)])
-async def create_wallapop_job(request: WallapopJobCreateRequest):
+def create_wallapop_job(request: WallapopJobCreateRequest):
     """Encola un nuevo trabajo de búsqueda para el Nexus Local Bridge (Admin Only)."""
     with SessionCloud() as db:
         job = WallapopJobModel(query=request.query or "auto", status="pending")
@@ -52,7 +52,7 @@ async def create_wallapop_job(request: WallapopJobCreateRequest):
 
 
 @router.get("/pending", response_model=Optional[WallapopJobOutput], dependencies=[Depends(verify_api_key)])
-async def claim_pending_wallapop_job(worker_id: str | None = None):
+def claim_pending_wallapop_job(worker_id: str | None = None):
     """
     Reclama (y marca como 'running') el trabajo pendiente más antiguo, para que
     un worker local lo procese. Devuelve null si no hay trabajos pendientes.
@@ -80,7 +80,7 @@ async def claim_pending_wallapop_job(worker_id: str | None = None):
 
 
 @router.post("/{job_id}/results", response_model=WallapopJobResultsOutput, dependencies=[Depends(verify_api_key)])
-async def submit_wallapop_job_results(job_id: int, request: WallapopJobResultsRequest):
+def submit_wallapop_job_results(job_id: int, request: WallapopJobResultsRequest):
     """Recibe los resultados de un worker local y los enruta al Purgatorio (Admin Only)."""
     with SessionCloud() as db:
         job = db.query(WallapopJobModel).filter(WallapopJobModel.id == job_id).first()
@@ -130,7 +130,7 @@ async def submit_wallapop_job_results(job_id: int, request: WallapopJobResultsRe
 
         # Notificar a Telegram con desglose de tiendas
         try:
-            import asyncio
+            from src.core.concurrency import spawn
             from src.infrastructure.services.telegram_service import telegram_service
             if job.status == "done":
                 wallapop_count = sum(1 for o in offers_payload if o["shop_name"] == "WallapopManual")
@@ -143,14 +143,14 @@ async def submit_wallapop_job_results(job_id: int, request: WallapopJobResultsRe
                     parts.append(f"Smyths Toys: {smyths_count}")
                 details_str = f" ({', '.join(parts)})" if parts else ""
 
-                asyncio.create_task(telegram_service.send_message(
+                spawn(telegram_service.send_message(
                     f"⚡ <b>[Nexus Bridge: PC Local]</b> Trabajo #{job_id} completado con éxito.\n"
                     f"• Búsqueda: <b>{job.query}</b>\n"
                     f"• Reliquias extraídas: <b>{len(offers_payload)}</b>{details_str}\n"
                     f"• <b>{new_items}</b> nuevas en el Purgatorio."
                 ))
             elif job.status == "error":
-                asyncio.create_task(telegram_service.send_message(
+                spawn(telegram_service.send_message(
                     f"⚠️ <b>[Nexus Bridge: PC Local]</b> Error en trabajo #{job_id} ('{job.query}'): {job.error_message}"
                 ))
         except Exception:
@@ -160,7 +160,7 @@ async def submit_wallapop_job_results(job_id: int, request: WallapopJobResultsRe
 
 
 @router.get("", response_model=List[WallapopJobOutput], dependencies=[Depends(verify_api_key)])
-async def list_wallapop_jobs(limit: int = 30):
+def list_wallapop_jobs(limit: int = 30):
     """Lista los trabajos más recientes del Nexus Local Bridge, para la UI de Configuración."""
     with SessionCloud() as db:
         return (
@@ -5,8 +5,12 @@ Uses an in-memory SQLite database (shared-cache, ver nota mas abajo) so tests
 son herméticos y rápidos. All routers/servicios import SessionCloud at module
 level, so we patch each namespace.
 """
+import uuid
+from typing import Callable, List, NamedTuple
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from unittest.mock import patch
@@ -88,6 +92,77 @@ DEVICE_HEADERS = {
 }
 
 
+# ─── Per-test isolation ──────────────────────────────────────────────────────
+
+class IsolatedDB(NamedTuple):
+    engine: Engine
+    Session: sessionmaker
+    statements: List[str]  # SQL ejecutado tras crear el esquema (contador de consultas)
+
+
+@pytest.fixture
+def isolated_db_factory() -> Callable[..., IsolatedDB]:
+    """
+    DBs en memoria propias del test, con el mismo esquema que TEST_ENGINE
+    (shared-cache + NullPool + keepalive: cada Session tiene su conexión física,
+    como en Postgres, en vez de StaticPool) y un contador de sentencias.
+    `foreign_keys=True` activa PRAGMA foreign_keys en cada conexión.
+    """
+    created = []
+
+    def make(foreign_keys: bool = False) -> IsolatedDB:
+        uri = f"file:oraculo_isolated_{uuid.uuid4().hex}?mode=memory&cache=shared&uri=true"
+        engine = create_engine(
+            f"sqlite:///{uri}", connect_args={"check_same_thread": False, "uri": True}, poolclass=NullPool
+        )
+        if foreign_keys:
+            event.listen(engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys=ON"))
+        keepalive = engine.connect()
+        created.append((engine, keepalive))
+
+        from src.domain.models import Base
+        Base.metadata.create_all(bind=engine)
+        statements: List[str] = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        return IsolatedDB(engine, sessionmaker(bind=engine), statements)
+
+    yield make
+    for engine, keepalive in created:
+        keepalive.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def isolated_db(isolated_db_factory) -> IsolatedDB:
+    return isolated_db_factory()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_idf_snapshot(tmp_path, monkeypatch):
+    """
+    Cualquier reconstrucción del CatalogIndex (_seed_weights -> save_snapshot) escribe
+    el snapshot IDF: que sea en tmp_path y no en el data/idf_snapshot.json real.
+    """
+    from src.core.weight_engine import weights_manager
+    monkeypatch.setattr(weights_manager, "snapshot_path", tmp_path / "idf_snapshot.json")
+
+
+@pytest.fixture
+def isolated_image_cache(tmp_path, monkeypatch):
+    """
+    image_service es un singleton: su índice de rutas (positivas y ausentes) y la caché
+    TTL de carpetas de usuario sobreviven entre tests. Se vacían antes y después, e
+    IMAGE_CACHE_DIR apunta a tmp_path para no tocar nunca el data/image_cache real.
+    """
+    from src.application.services.image_service import image_service
+    monkeypatch.setattr(settings, "IMAGE_CACHE_DIR", str(tmp_path))
+    image_service.invalidate()
+    image_service.invalidate_user()
+    yield tmp_path
+    image_service.invalidate()
+    image_service.invalidate_user()
+
+
 # ─── Session-scoped fixtures ─────────────────────────────────────────────────
 
 @pytest.fixture(scope="session")
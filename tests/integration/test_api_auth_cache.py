@@ -0,0 +1,82 @@
+"""
+Phase 111: capa de autenticación sin escrituras en el camino caliente.
+
+Dispositivos y usuarios se resuelven desde AuthCache (invalidada por las
+escrituras ORM al hacer commit) y last_access_at se vuelca por lotes.
+"""
+from datetime import datetime
+
+import pytest
+from src.core.auth_cache import auth_cache, device_access_tracker
+from src.core.security import SecurityShield
+from src.domain.models import AuthorizedDeviceModel, UserModel
+from src.interfaces.api import deps
+
+OLD_ACCESS = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def auth_db(isolated_db, monkeypatch):
+    _, Session, statements = isolated_db
+    with Session() as db:
+        db.add_all([
+            AuthorizedDeviceModel(device_id="tablet", device_name="Tablet", is_authorized=True, last_access_at=OLD_ACCESS),
+            AuthorizedDeviceModel(device_id="phone", device_name="Phone", is_authorized=True, last_access_at=OLD_ACCESS),
+            UserModel(id=7, username="teela", email="teela@test.com", hashed_password="x", role="viewer"),
+        ])
+        db.commit()
+    monkeypatch.setattr(deps, "SessionCloud", Session)
+    monkeypatch.setattr(device_access_tracker, "interval", 0)
+    auth_cache.clear()
+    yield Session, statements
+    auth_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_known_devices_hit_cache_and_flush_access_in_batch(auth_db):
+    Session, statements = auth_db
+    with Session() as db:
+        assert await SecurityShield.check_access("tablet", "Tablet", "127.0.0.1", db)
+        assert await SecurityShield.check_access("phone", "Phone", "127.0.0.1", db)
+        statements.clear()
+        for _ in range(20):
+            assert await SecurityShield.check_access("tablet", "Tablet", "127.0.0.1", db)
+            assert await SecurityShield.check_access("phone", "Phone", "127.0.0.1", db)
+    assert statements == []
+
+    with Session() as db:
+        assert {d.last_access_at for d in db.query(AuthorizedDeviceModel)} == {OLD_ACCESS}
+    device_access_tracker.flush()
+    assert len([s for s in statements if s.startswith("UPDATE authorized_devices")]) == 1
+    with Session() as db:
+        assert all(d.last_access_at > OLD_ACCESS for d in db.query(AuthorizedDeviceModel))
+
+    # Revocar (ORM) invalida la entrada al hacer commit
+    with Session() as db:
+        db.query(AuthorizedDeviceModel).filter_by(device_id="tablet").one().is_authorized = False
+        db.commit()
+        assert auth_cache.get_device("tablet") is None
+        assert not await SecurityShield.check_access("tablet", "Tablet", "127.0.0.1", db)
+        assert auth_cache.get_device("tablet") is False
+        assert auth_cache.get_device("phone") is True
+
+
+def test_jwt_user_cached_until_role_change(auth_db):
+    Session, statements = auth_db
+    token = deps.create_access_token(7, "viewer")
+
+    assert deps.get_current_user(token).role == "viewer"
+    statements.clear()
+    first, second = deps.get_current_user(token), deps._user_from_token(token)
+    assert statements == []
+    assert first is not second and first.username == second.username == "teela"
+
+    with Session() as db:
+        db.get(UserModel, 7).role = "admin"
+        db.commit()
+    assert deps.is_admin(deps.get_current_user(token))
+
+    with Session() as db:
+        db.get(UserModel, 7).is_active = False
+        db.commit()
+    assert deps._user_from_token(token) is None
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import pytest
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.application.services.valuation_service import ValuationService
+from src.domain.models import CollectionItemModel, OfferModel, ProductModel, UserModel
+from tests.conftest import _TestSession
+
+SHOPS = [("Frikimaz", "Retail"), ("Wallapop", "Peer-to-Peer"), ("BigBadToyStore", "Retail")]
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+
+
+def _seed_collection(email: str, size: int = 24) -> int:
+    with _TestSession() as db:
+        user = db.query(UserModel).filter(UserModel.email == email).one()
+        for i in range(size):
+            product = ProductModel(name=f"Valuation Figure {i}", retail_price=20.0, avg_market_price=30.0 if i % 4 == 0 else 0.0)
+            db.add(product)
+            db.flush()
+            for j, (shop, source) in enumerate(SHOPS[: i % 4]):
+                db.add(OfferModel(product_id=product.id, shop_name=shop, source_type=source,
+                                  price=15.0 + i + j, url=f"https://valuation.test/{i}/{j}"))
+            db.add(CollectionItemModel(product_id=product.id, owner_id=user.id, acquired=True, purchase_price=10.0))
+        db.commit()
+        return user.id
+
+
+@pytest.fixture
+def seeded_collection(client, test_user):
+    user_id = _seed_collection(test_user["email"])
+    yield user_id
+    # La DB de tests es compartida por toda la sesión: se deja la colección vacía
+    with _TestSession() as db:
+        ids = [pid for (pid,) in db.query(ProductModel.id).filter(ProductModel.name.like("Valuation Figure %"))]
+        db.query(CollectionItemModel).filter(CollectionItemModel.product_id.in_(ids)).delete(synchronize_session=False)
+        db.query(OfferModel).filter(OfferModel.product_id.in_(ids)).delete(synchronize_session=False)
+        db.query(ProductModel).filter(ProductModel.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+
+def test_collection_pages_in_sql_with_constant_queries(client, seeded_collection, bearer):
+    user_id = seeded_collection
+
+    full = client.get("/api/collection", params={"user_id": user_id}, headers=bearer).json()
+    assert len(full) == 24
+
+    pages = []
+    for offset in (0, 10, 20):
+        resp = client.get("/api/collection", params={"user_id": user_id, "limit": 10, "offset": offset}, headers=bearer)
+        assert resp.status_code == 200
+        pages.extend(resp.json())
+    assert pages == full
+
+    # Misma valoración que el cálculo clásico (todas las reglas, ofertas consultadas por producto)
+    with _TestSession() as db:
+        legacy = ValuationService(db)
+        for item in full:
+            product = db.get(ProductModel, item["id"])
+            assert item["market_value"] == round(legacy.get_consolidated_value(product, "ES"), 2)
+
+    with _count_queries() as small:
+        client.get("/api/collection", params={"user_id": user_id, "limit": 3}, headers=bearer)
+    with _count_queries() as large:
+        client.get("/api/collection", params={"user_id": user_id, "limit": 24}, headers=bearer)
+    offer_queries = [s for s in large if "FROM offers" in s]
+    assert len(large) == len(small)
+    assert len(offer_queries) == 1
@@ -0,0 +1,76 @@
+"""
+Phase 99: prueba de carga del modelo de ejecución de la API.
+
+Los handlers ligados a la DB son `def` (pool acotado de AnyIO), así que N
+peticiones lentas concurrentes se solapan y el event loop sigue libre para
+el listener de Telegram / Centinela de Vinted.
+"""
+import asyncio
+import time
+
+import httpx
+
+from src.core.concurrency import run_blocking, spawn
+from tests.conftest import ADMIN_HEADERS, _TestSession
+
+DB_DELAY = 0.25
+CONCURRENT_REQUESTS = 8
+
+
+def _slow_session():
+    time.sleep(DB_DELAY)  # simula una consulta lenta (bloqueante) contra la DB
+    return _TestSession()
+
+
+def test_concurrent_db_requests_do_not_serialize(client, monkeypatch):
+    from src.interfaces.api.main import app
+    monkeypatch.setattr("src.interfaces.api.routers.scrapers.SessionCloud", _slow_session)
+
+    async def scenario():
+        gaps, running = [], True
+
+        async def heartbeat():
+            last = time.perf_counter()
+            while running:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        beat = asyncio.create_task(heartbeat())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                ac.get("/api/scrapers/status", headers=ADMIN_HEADERS) for _ in range(CONCURRENT_REQUESTS)
+            ])
+            elapsed = time.perf_counter() - start
+        running = False
+        await beat
+        return responses, elapsed, max(gaps)
+
+    responses, elapsed, worst_gap = asyncio.run(scenario())
+
+    assert all(r.status_code == 200 for r in responses)
+    # En serie tardaría CONCURRENT_REQUESTS * DB_DELAY (2s); en paralelo ~DB_DELAY
+    assert elapsed < CONCURRENT_REQUESTS * DB_DELAY / 2
+    # El event loop nunca queda bloqueado durante una consulta entera
+    assert worst_gap < DB_DELAY
+
+
+def test_spawn_schedules_on_api_loop_from_worker_thread():
+    ran = []
+
+    async def alert():
+        ran.append("sent")
+
+    async def scenario():
+        scheduled = await run_blocking(lambda: spawn(alert()))
+        await asyncio.sleep(0)
+        return scheduled
+
+    assert asyncio.run(scenario()) is True
+    assert ran == ["sent"]
+
+    # Sin event loop (hilo suelto) la tarea se descarta sin romper al llamante
+    assert spawn(alert()) is False
@@ -0,0 +1,122 @@
+"""
+Phase 105: sincronización delta del catálogo para IndexedDB.
+
+Un cliente "caliente" sólo recibe las filas cambiadas desde su cursor, las
+bajas llegan como tombstones (`deleted_ids`) y las operaciones masivas fuerzan
+un full sync paginado.
+"""
+from src.domain.models import ProductModel
+from src.infrastructure.repositories.product_sync_log import current_cursor, prune_sync_log, read_delta
+
+
+def _full_sync(db, limit):
+    page = read_delta(db, limit=limit)
+    cursor, ids = page["cursor"], [p["id"] for p in page["products"]]
+    while page["has_more"]:
+        page = read_delta(db, cursor=cursor, after_id=page["next_after_id"], limit=limit)
+        assert page["full_sync"] and page["cursor"] == cursor
+        ids += [p["id"] for p in page["products"]]
+    return cursor, ids
+
+
+def test_warm_client_only_downloads_changes_and_tombstones(isolated_db):
+    Session = isolated_db.Session
+    with Session() as db:
+        db.add_all([ProductModel(id=i, name=f"Figure {i}", p25_price=10.0, is_vintage=False) for i in range(1, 8)])
+        db.add(ProductModel(id=50, name="Vintage He-Man", is_vintage=True))
+        db.commit()
+
+        cursor, ids = _full_sync(db, limit=3)
+        assert ids == list(range(1, 8))
+
+        # Sin cambios: respuesta vacía y el cursor no se mueve
+        idle = read_delta(db, cursor=cursor)
+        assert idle["full_sync"] is False and idle["products"] == [] and idle["cursor"] == cursor
+
+        db.get(ProductModel, 2).p25_price = 12.5
+        db.get(ProductModel, 3).character_slug = "skeletor"  # campo no cacheado: no genera delta
+        db.get(ProductModel, 4).is_vintage = True
+        db.delete(db.get(ProductModel, 5))
+        db.add(ProductModel(id=9, name="New Figure", is_vintage=False))
+        db.commit()
+
+        delta = read_delta(db, cursor=cursor)
+        assert delta["full_sync"] is False and delta["has_more"] is False
+        assert {p["id"]: p["p25_price"] for p in delta["products"]} == {2: 12.5, 9: 0.0}
+        assert sorted(delta["deleted_ids"]) == [4, 5]
+        assert delta["cursor"] > cursor
+
+        # Cursor monotónico paginado: con limit=1 se recorre entrada a entrada
+        seen, page_cursor = [], cursor
+        while True:
+            page = read_delta(db, cursor=page_cursor, limit=1)
+            seen += [p["id"] for p in page["products"]] + page["deleted_ids"]
+            assert page["cursor"] > page_cursor
+            page_cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        assert sorted(seen) == [2, 4, 5, 9] and page_cursor == delta["cursor"]
+
+
+def test_bulk_statement_forces_full_resync(isolated_db):
+    Session = isolated_db.Session
+    with Session() as db:
+        db.add_all([ProductModel(id=i, name=f"Figure {i}", is_vintage=False) for i in range(1, 4)])
+        db.commit()
+        cursor = read_delta(db)["cursor"]
+
+        db.query(ProductModel).filter(ProductModel.id == 3).delete(synchronize_session=False)
+        db.commit()
+
+        page = read_delta(db, cursor=cursor)
+        assert page["full_sync"] is True
+        assert [p["id"] for p in page["products"]] == [1, 2]
+        assert read_delta(db, cursor=page["cursor"])["full_sync"] is False
+
+
+def test_cursor_ahead_of_server_forces_full_resync(isolated_db):
+    Session = isolated_db.Session
+    with Session() as db:
+        db.add_all([ProductModel(id=i, name=f"Figure {i}", is_vintage=False) for i in range(1, 3)])
+        db.commit()
+        latest = current_cursor(db)
+
+        # Cliente con un cursor de antes de una restauración / tabla recreada
+        page = read_delta(db, cursor=latest + 100)
+        assert page["full_sync"] is True and page["cursor"] == latest
+        assert [p["id"] for p in page["products"]] == [1, 2]
+
+
+def test_cursors_come_from_counter_and_survive_prune(isolated_db):
+    Session = isolated_db.Session
+    with Session() as db:
+        db.add_all([ProductModel(id=i, name=f"Figure {i}", is_vintage=False) for i in range(1, 4)])
+        db.commit()
+        cursor = read_delta(db)["cursor"]
+        assert cursor == 3
+
+        # Purga total del diario: el contador no retrocede ni reutiliza ids
+        assert prune_sync_log(db, retention_days=-1) == 3
+        db.commit()
+        assert current_cursor(db) == cursor
+
+        db.get(ProductModel, 2).name = "Figure 2 (rev)"
+        db.commit()
+        delta = read_delta(db, cursor=cursor)
+        assert delta["full_sync"] is False and delta["cursor"] == cursor + 1
+        assert [p["name"] for p in delta["products"]] == ["Figure 2 (rev)"]
+
+
+def test_delta_endpoint_pages_the_catalog(client, monkeypatch):
+    from tests.conftest import _TestSession
+    monkeypatch.setattr("src.application.services.market_analytics_service.SessionCloud", _TestSession)
+
+    first = client.get("/api/sync/delta-updates?limit=1")
+    assert first.status_code == 200
+    body = first.json()
+    assert body["full_sync"] is True and isinstance(body["cursor"], int)
+    assert body["total_count"] == len(body["products"]) <= 1
+
+    warm = client.get(f"/api/sync/delta-updates?cursor={body['cursor']}")
+    assert warm.status_code == 200
+    assert "deleted_ids" in warm.json()
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from src.domain.models import ScraperExecutionLogModel
+from src.infrastructure.repositories.execution_log_sink import ExecutionLogSink
+from tests.conftest import ADMIN_HEADERS, _TestSession
+
+
+def _new_log() -> int:
+    with _TestSession() as db:
+        entry = ScraperExecutionLogModel(spider_name="SinkTest", status="running", start_time=datetime.now(), logs="inicio\n")
+        db.add(entry)
+        db.commit()
+        return entry.id
+
+
+def _logs(log_id: int) -> str:
+    with _TestSession() as db:
+        return db.get(ScraperExecutionLogModel, log_id).logs
+
+
+def test_sink_buffers_lines_and_appends_in_batches(client):
+    log_id = _new_log()
+    sink = ExecutionLogSink(log_id, _TestSession, max_lines=3, interval=0)
+
+    sink("uno")
+    sink("dos")
+    assert _logs(log_id) == "inicio\n"  # aún en memoria
+
+    sink("tres")  # umbral de tamaño -> un solo UPDATE
+    sink("cuatro")
+    sink.close()
+
+    lines = _logs(log_id).split("\n")
+    assert sink.flushes == 2
+    assert [l.split("] ", 1)[1] for l in lines[2:]] == ["uno", "dos", "tres", "cuatro"]
+    assert lines[:2] == ["inicio", ""]
+
+
+def test_log_tail_endpoint_returns_only_new_text(client):
+    log_id = _new_log()
+    sink = ExecutionLogSink(log_id, _TestSession, interval=0)
+
+    first = client.get(f"/api/scrapers/logs/{log_id}/tail", headers=ADMIN_HEADERS).json()
+    assert first["chunk"] == "inicio\n" and first["status"] == "running"
+
+    sink("nueva línea")
+    sink.close()
+    tail = client.get(f"/api/scrapers/logs/{log_id}/tail", params={"offset": first["offset"]}, headers=ADMIN_HEADERS).json()
+    assert tail["chunk"].startswith("\n[") and tail["chunk"].endswith("] nueva línea")
+    assert tail["offset"] == len(_logs(log_id))
+
+    assert client.get("/api/scrapers/logs/999999/tail", headers=ADMIN_HEADERS).status_code == 404
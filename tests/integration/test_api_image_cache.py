@@ -1,20 +1,21 @@
 """
 Tests for the on-demand image cache population added in Fase AAA-4.2 (B.7):
-main.py::_fetch_and_cache_product_image downloads a product's remote
+ProductImageService.fetch_and_cache (Phase 101) downloads a product's remote
 image_url, converts it to WebP with Pillow, and saves it into
 IMAGE_CACHE_DIR the first time it's requested — closing the gap where
 images discovered by the live shop scrapers were never converted (only the
 old Excel-importer path was).
 
 These tests exercise the function directly (not through the FastAPI
-TestClient) because it does its own `from ... import SessionCloud` inside
-the function body — a throwaway in-memory session is patched in directly,
+TestClient) because the service does its own `from ... import SessionCloud`
+inside the method body — a throwaway in-memory session is patched in directly,
 independent of the shared conftest.py session-scoped client fixture.
 """
 import asyncio
 import io
 from unittest.mock import AsyncMock, patch
 
+import pytest
 from PIL import Image
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -23,6 +24,12 @@ from sqlalchemy.pool import StaticPool
 from src.domain.models import Base, ProductModel
 
 
+@pytest.fixture(autouse=True)
+def _fresh_image_service(isolated_image_cache):
+    """El singleton no arrastra rutas/ausentes de otros tests ni toca data/image_cache."""
+    yield
+
+
 def _make_test_session(seed_product: bool = True):
     engine = create_engine(
         "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
@@ -54,7 +61,7 @@ class _FakeResponse:
 
 
 def test_downloads_converts_and_caches_as_webp(tmp_path):
-    from src.interfaces.api.main import _fetch_and_cache_product_image
+    from src.application.services.image_service import image_service
 
     TestSession = _make_test_session()
     fake_response = _FakeResponse(_fake_source_image_bytes())
@@ -62,7 +69,7 @@ def test_downloads_converts_and_caches_as_webp(tmp_path):
     with patch("src.infrastructure.database_cloud.SessionCloud", TestSession), \
          patch("src.core.config.settings.IMAGE_CACHE_DIR", str(tmp_path)), \
          patch("httpx.AsyncClient.get", new=AsyncMock(return_value=fake_response)):
-        result = asyncio.run(_fetch_and_cache_product_image(1))
+        result = asyncio.run(image_service.fetch_and_cache(1))
 
     expected_path = str(tmp_path / "1.webp")
     assert result == expected_path
@@ -72,7 +79,7 @@ def test_downloads_converts_and_caches_as_webp(tmp_path):
 
 
 def test_returns_none_when_product_has_no_image_url(tmp_path):
-    from src.interfaces.api.main import _fetch_and_cache_product_image
+    from src.application.services.image_service import image_service
 
     TestSession = _make_test_session(seed_product=False)
     with TestSession() as db:
@@ -80,29 +87,29 @@ def test_returns_none_when_product_has_no_image_url(tmp_path):
         db.commit()
 
     with patch("src.infrastructure.database_cloud.SessionCloud", TestSession):
-        result = asyncio.run(_fetch_and_cache_product_image(2))
+        result = asyncio.run(image_service.fetch_and_cache(2))
 
     assert result is None
 
 
 def test_returns_none_for_nonexistent_product(tmp_path):
-    from src.interfaces.api.main import _fetch_and_cache_product_image
+    from src.application.services.image_service import image_service
 
     TestSession = _make_test_session()  # only has product id=1
     with patch("src.infrastructure.database_cloud.SessionCloud", TestSession):
-        result = asyncio.run(_fetch_and_cache_product_image(999))
+        result = asyncio.run(image_service.fetch_and_cache(999))
 
     assert result is None
 
 
 def test_returns_none_and_does_not_crash_on_download_failure(tmp_path):
-    from src.interfaces.api.main import _fetch_and_cache_product_image
+    from src.application.services.image_service import image_service
 
     TestSession = _make_test_session()
     with patch("src.infrastructure.database_cloud.SessionCloud", TestSession), \
          patch("src.core.config.settings.IMAGE_CACHE_DIR", str(tmp_path)), \
          patch("httpx.AsyncClient.get", new=AsyncMock(side_effect=Exception("network down"))):
-        result = asyncio.run(_fetch_and_cache_product_image(1))
+        result = asyncio.run(image_service.fetch_and_cache(1))
 
     assert result is None
     assert not (tmp_path / "1.webp").exists()
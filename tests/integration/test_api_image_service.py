@@ -0,0 +1,113 @@
+"""
+Phase 101: ProductImageService + endpoint de imágenes.
+
+- N peticiones concurrentes de un producto sin cachear hacen UNA descarga.
+- La conversión (en el pool de procesos) deja thumb/card/full en una pasada.
+- El endpoint emite Cache-Control/ETag y responde 304 a la revalidación.
+"""
+import asyncio
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from src.application.services.image_service import ProductImageService
+from src.domain.models import ProductModel
+
+
+@pytest.fixture(autouse=True)
+def _fresh_image_service(isolated_image_cache):
+    """Singleton sin índice heredado y caché de imágenes en tmp_path."""
+    yield
+
+
+def _session_with_product(TestSession):
+    with TestSession() as db:
+        db.add(ProductModel(id=1, name="He-Man", image_url="https://shop.example.com/heman.jpg"))
+        db.commit()
+    return TestSession
+
+
+def _source_image_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 800), color=(0, 128, 255)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class _FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+
+
+def test_concurrent_requests_share_one_download_and_render_all_variants(isolated_db, tmp_path):
+    calls = []
+    payload = _source_image_bytes()
+
+    async def slow_get(self, url, *args, **kwargs):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return _FakeResponse(payload)
+
+    service = ProductImageService(workers=1)
+    try:
+        with patch("src.infrastructure.database_cloud.SessionCloud", _session_with_product(isolated_db.Session)), \
+             patch("httpx.AsyncClient.get", new=slow_get):
+            async def scenario():
+                return await asyncio.gather(
+                    *(service.fetch_and_cache(1, variant) for variant in ["full", "card", "thumb"] * 3)
+                )
+            results = asyncio.run(scenario())
+
+            # Índice positivo: ya no hace falta descargar ni sondear nada
+            assert service.cached_path(1, "thumb") == str(tmp_path / "1_thumb.webp")
+    finally:
+        service.shutdown()
+
+    assert len(calls) == 1
+    assert set(results) == {str(tmp_path / n) for n in ("1.webp", "1_card.webp", "1_thumb.webp")}
+    sizes = {}
+    for name in ("1.webp", "1_card.webp", "1_thumb.webp"):
+        with Image.open(tmp_path / name) as img:
+            assert img.format == "WEBP"
+            sizes[name] = max(img.size)
+    assert sizes == {"1.webp": 1200, "1_card.webp": 600, "1_thumb.webp": 200}
+
+
+def test_missing_image_is_remembered_without_new_lookups(tmp_path):
+    service = ProductImageService(workers=0)
+    lookups = []
+
+    def counting_urls(product_id):
+        lookups.append(product_id)
+        return []
+
+    with patch("src.application.services.image_service._candidate_urls", counting_urls):
+        assert asyncio.run(service.fetch_and_cache(5)) is None
+        assert asyncio.run(service.fetch_and_cache(5)) is None
+
+    assert lookups == [5]
+
+
+def test_image_endpoint_sends_validators_and_answers_304(client, tmp_path):
+    Image.new("RGB", (10, 10), color=(255, 0, 0)).save(tmp_path / "7.webp", "WEBP")
+
+    first = client.get("/api/static/images/7.webp?source=cache")
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    again = client.get("/api/static/images/7.webp?source=cache", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    since = client.get("/api/static/images/7.webp?source=cache", headers={"If-Modified-Since": last_modified})
+    assert since.status_code == 304
+
+    stale = client.get("/api/static/images/7.webp?source=cache", headers={"If-None-Match": '"otro"'})
+    assert stale.status_code == 200
+
+    bad = client.get("/api/static/images/7.webp?source=cache&variant=huge")
+    assert bad.status_code == 400
@@ -0,0 +1,163 @@
+"""
+Phase 106: Eternia Market Index servido desde la serie diaria materializada.
+
+El refresco sólo re-agrega price_history desde el último día materializado, la
+serie sobrevive a la purga del historial detallado y el endpoint responde desde
+la caché TTL por periodo sin volver a agregar. La primera materialización (sin
+mantenimiento previo) se hace una sola vez aunque lleguen peticiones a la vez.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+from src.application.services import market_analytics_service
+from src.application.services.market_analytics_service import (
+    GLOBAL_WAVE,
+    MarketAnalyticsService,
+    invalidate_market_index_cache,
+)
+from src.domain.models import Base, MarketIndexDailyModel, OfferModel, PriceHistoryModel, ProductModel
+
+
+def _seed(db):
+    db.add_all([
+        ProductModel(id=1, name="He-Man", sub_category="Origins Wave 1", retail_price=20.0, p25_price=30.0, is_vintage=False),
+        ProductModel(id=2, name="Skeletor", sub_category="Origins Wave 1", retail_price=20.0, p25_price=None, is_vintage=False),
+        ProductModel(id=3, name="Trap Jaw", sub_category=None, retail_price=0.0, p25_price=40.0, is_vintage=False),
+        ProductModel(id=4, name="Vintage Beast Man", retail_price=100.0, is_vintage=True),
+    ])
+    db.add_all([
+        OfferModel(id=1, product_id=1, shop_name="A", price=30.0, url="https://a/1"),
+        OfferModel(id=2, product_id=3, shop_name="A", price=40.0, url="https://a/3"),
+    ])
+    today = datetime.now(timezone.utc).replace(tzinfo=None, hour=12)
+    for days_ago, offer_id, price in [(10, 1, 20.0), (10, 2, 40.0), (3, 1, 30.0)]:
+        db.add(PriceHistoryModel(offer_id=offer_id, price=price, recorded_at=today - timedelta(days=days_ago)))
+    db.commit()
+    return today
+
+
+def test_refresh_materializes_waves_and_is_incremental(isolated_db):
+    engine, Session, _ = isolated_db
+    with Session() as db:
+        today = _seed(db)
+        MarketAnalyticsService.refresh_daily_series(db)
+        db.commit()
+
+        ten_days_ago = (today - timedelta(days=10)).date()
+        rows = {(r.day, r.wave): r for r in db.query(MarketIndexDailyModel)}
+        assert rows[(ten_days_ago, GLOBAL_WAVE)].avg_price == 30.0 and rows[(ten_days_ago, GLOBAL_WAVE)].samples == 2
+        assert rows[(ten_days_ago, "Origins")].avg_price == 40.0
+
+        snapshot = {w: r for (d, w), r in rows.items() if d == today.date()}
+        assert snapshot["Origins Wave 1"].figures_count == 2 and snapshot["Origins Wave 1"].avg_market == 25.0
+        # retail 0.0 cuenta como ausente (19.99); el vintage no entra en la foto
+        assert snapshot["Origins"].avg_msrp == 19.99
+        assert snapshot[GLOBAL_WAVE].figures_count == 3
+
+        # Refresco incremental: la consulta sobre price_history empieza en el último día materializado
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if "price_history" in statement:
+                statements.append(parameters)
+
+        MarketAnalyticsService.refresh_daily_series(db)
+        db.commit()
+        bounds = [v for params in statements for v in params if isinstance(v, str) and v.startswith("20")]
+        assert bounds and min(bounds) >= str(today.date() - timedelta(days=5))
+
+        # La purga del historial detallado no borra la serie ya materializada
+        db.query(PriceHistoryModel).delete()
+        db.commit()
+        MarketAnalyticsService.refresh_daily_series(db)
+        db.commit()
+        assert db.query(MarketIndexDailyModel).filter_by(day=ten_days_ago, wave=GLOBAL_WAVE).one().avg_price == 30.0
+
+
+def test_endpoint_serves_precomputed_series_from_ttl_cache(client, isolated_db, monkeypatch):
+    engine, Session, queries = isolated_db
+    with Session() as db:
+        _seed(db)
+        MarketAnalyticsService.refresh_daily_series(db)
+        db.commit()
+    monkeypatch.setattr("src.application.services.market_analytics_service.SessionCloud", Session)
+    invalidate_market_index_cache()
+
+    res = client.get("/api/analytics/market-index?period=1m")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["period"] == "1M"
+    assert [p["index_value"] for p in body["historical_series"]] == [30.0, 30.0]
+    assert {w["category"] for w in body["waves_breakdown"]} == {"Origins", "Origins Wave 1"}
+    assert body["current_index_value"] == round((30.0 + 20.0 + 40.0) / 3, 2)
+
+    queries.clear()
+    assert client.get("/api/analytics/market-index?period=1M").json() == body
+    assert queries == []
+    invalidate_market_index_cache()
+
+
+def test_concurrent_first_requests_materialize_once(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'emi.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        _seed(db)
+    monkeypatch.setattr(market_analytics_service, "SessionCloud", Session)
+
+    refreshes, payloads, errors = [], [], []
+    refresh = MarketAnalyticsService.refresh_daily_series.__func__
+    monkeypatch.setattr(MarketAnalyticsService, "refresh_daily_series",
+                        classmethod(lambda cls, db: refreshes.append(1) or refresh(cls, db)))
+    barrier = threading.Barrier(4)
+
+    def first_request(period):
+        barrier.wait()
+        try:
+            payloads.append(MarketAnalyticsService.get_market_index(period)["current_index_value"])
+        except Exception as ex:
+            errors.append(ex)
+
+    invalidate_market_index_cache()
+    threads = [threading.Thread(target=first_request, args=(p,)) for p in ("1M", "3M", "6M", "1A")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    invalidate_market_index_cache()
+
+    assert errors == [] and refreshes == [1]
+    assert payloads == [round((30.0 + 20.0 + 40.0) / 3, 2)] * 4
+    with Session() as db:
+        assert db.query(func.count(MarketIndexDailyModel.id)).scalar() == \
+            db.query(MarketIndexDailyModel.day, MarketIndexDailyModel.wave).distinct().count()
+
+
+def test_first_request_reuses_series_written_by_another_process(isolated_db, monkeypatch):
+    Session = isolated_db.Session
+    with Session() as db:
+        _seed(db)
+    monkeypatch.setattr(market_analytics_service, "SessionCloud", Session)
+
+    refresh = MarketAnalyticsService.refresh_daily_series.__func__
+
+    def lose_the_race(cls, db):
+        # Otro worker materializa la serie entre nuestra lectura y nuestro INSERT
+        with Session() as other:
+            refresh(cls, other)
+            other.commit()
+        db.add(MarketIndexDailyModel(day=datetime.now(timezone.utc).date(), wave=GLOBAL_WAVE, samples=0))
+        db.flush()
+
+    monkeypatch.setattr(MarketAnalyticsService, "refresh_daily_series", classmethod(lose_the_race))
+    invalidate_market_index_cache()
+
+    body = MarketAnalyticsService.get_market_index("1M")
+    invalidate_market_index_cache()
+
+    assert body["current_index_value"] == round((30.0 + 20.0 + 40.0) / 3, 2)
+    assert [p["index_value"] for p in body["historical_series"]] == [30.0, 30.0]
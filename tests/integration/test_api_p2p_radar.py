@@ -0,0 +1,66 @@
+"""
+Phase 108: radar P2P con precio de aterrizaje por lotes.
+
+El número de consultas del endpoint no depende de cuántas ofertas P2P
+cualifican, y el precio por lotes coincide con el cálculo individual.
+"""
+import pytest
+
+from src.application.services.logistics_service import LogisticsService
+from src.domain.models import LogisticRuleModel, OfferModel, ProductModel
+from src.infrastructure.repositories.logistic_rules_cache import logistic_rules_cache
+
+
+@pytest.fixture(autouse=True)
+def _cold_rules_cache():
+    # Caché de reglas de proceso: cada DB aislada empieza (y termina) en frío
+    logistic_rules_cache.invalidate()
+    yield
+    logistic_rules_cache.invalidate()
+
+
+def _seeded_db(make_db, n_offers: int):
+    _, Session, queries = make_db()
+    with Session() as db:
+        db.add_all([
+            LogisticRuleModel(shop_name="Wallapop", country_code="ES", base_shipping=0.0, free_shipping_threshold=0.0,
+                              vat_multiplier=1.0, custom_fees=0.0, strategy_key="p2p_insurance"),
+            LogisticRuleModel(shop_name="Frikimaz", country_code="ES", base_shipping=4.0, free_shipping_threshold=69.0,
+                              vat_multiplier=1.0, custom_fees=0.0),
+        ])
+        for i in range(n_offers):
+            product = ProductModel(name=f"Figure {i}", p25_price=30.0)
+            db.add(product)
+            db.flush()
+            db.add(OfferModel(product_id=product.id, shop_name="wallapop" if i % 2 else "Frikimaz", price=20.0 + i % 5,
+                              url=f"https://p2p/{i}", is_available=True, source_type="Peer-to-Peer"))
+        db.commit()
+    queries.clear()
+    return Session, queries
+
+
+def test_batched_landing_prices_match_single_calculation(isolated_db_factory):
+    Session, _ = _seeded_db(isolated_db_factory, 0)
+    with Session() as db:
+        rules_map = LogisticsService.load_rules_map(db)
+    pairs = [(20.0, "wallapop"), (75.0, "Frikimaz"), (10.0, "Frikimaz"), (15.0, "Tienda sin regla"), (0.0, "Wallapop")]
+    expected = [LogisticsService.optimized_get_landing_price(p, s, "ES", rules_map) for p, s in pairs]
+    assert LogisticsService.get_landing_prices(pairs, "ES", rules_map=rules_map) == expected == [25.4, 75.0, 14.0, 15.0, 0.0]
+    assert LogisticsService.get_landing_prices([], "ES") == []
+
+
+def test_radar_query_count_is_constant(client, bearer, isolated_db_factory, monkeypatch):
+    counts = []
+    for n_offers in (2, 30):
+        Session, queries = _seeded_db(isolated_db_factory, n_offers)
+        monkeypatch.setattr("src.interfaces.api.routers.users.SessionCloud", Session)
+        resp = client.get("/api/radar/p2p-opportunities", headers=bearer)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert len(body) == n_offers
+        for o in body:
+            expected = round(o["price"] * 1.02 + 5.0, 2) if o["shop_name"] == "wallapop" else o["price"] + 4.0
+            assert o["landing_price"] == expected
+        counts.append(len(queries))
+        logistic_rules_cache.invalidate()
+    assert counts[0] == counts[1]
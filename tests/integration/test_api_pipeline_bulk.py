@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from src.domain.models import (
+    BlackcludedItemModel,
+    OfferHistoryModel,
+    OfferModel,
+    PendingMatchModel,
+    PriceHistoryModel,
+    ProductModel,
+)
+from src.infrastructure.repositories.bulk_writer import PipelineBulkWriter
+from src.infrastructure.scrapers.pipeline import ScrapingPipeline
+from tests.conftest import _TestSession
+
+
+def _pending_row(url: str, price: float) -> dict:
+    return {
+        "scraped_name": "He-Man Origins Bulk",
+        "price": price,
+        "currency": "EUR",
+        "url": url,
+        "shop_name": "BulkShop",
+        "source_type": "Retail",
+    }
+
+
+def test_bulk_writer_upserts_purgatory_on_url_conflict(client):
+    with _TestSession() as db:
+        writer = PipelineBulkWriter(db)
+        writer.queue_pending(_pending_row("https://bulk.test/p/1", 10.0))
+        writer.queue_pending(_pending_row("https://bulk.test/p/2", 11.0))
+        assert writer.flush()["pending"] == {"https://bulk.test/p/1", "https://bulk.test/p/2"}
+        db.commit()
+
+        writer.queue_pending(_pending_row("https://bulk.test/p/1", 7.5))
+        writer.flush()
+        db.commit()
+
+        rows = {p.url: p.price for p in db.query(PendingMatchModel).filter(PendingMatchModel.url.like("https://bulk.test/p/%"))}
+    assert rows == {"https://bulk.test/p/1": 7.5, "https://bulk.test/p/2": 11.0}
+
+
+def test_update_database_batches_offer_updates_and_discards(client):
+    with _TestSession() as db:
+        product = ProductModel(name="Bulk Skeletor", retail_price=25.0)
+        db.add(product)
+        db.flush()
+        offer = OfferModel(
+            product_id=product.id, shop_name="BulkShop", price=30.0,
+            url="https://bulk.test/o/1", min_price=30.0, max_price=30.0,
+        )
+        db.add(offer)
+        db.commit()
+        offer_id = offer.id
+
+    incoming = [
+        {"product_name": "Bulk Skeletor", "price": 22.0, "currency": "EUR",
+         "url": "https://bulk.test/o/1", "shop_name": "BulkShop"},
+        {"product_name": "Barbie Dreamhouse", "price": 5.0, "currency": "EUR",
+         "url": "https://bulk.test/o/2", "shop_name": "BulkShop"},
+    ]
+    pipeline = ScrapingPipeline([])
+    with patch("src.core.backup_manager.BackupManager.append_raw_snapshot"):
+        pipeline.update_database(incoming)
+
+    with _TestSession() as db:
+        updated = db.get(OfferModel, offer_id)
+        assert updated.price == 22.0
+        assert updated.min_price == 22.0
+        assert updated.max_price == 30.0
+        history = db.query(PriceHistoryModel).filter(PriceHistoryModel.offer_id == offer_id).all()
+        assert [(h.price, h.is_snapshot) for h in history] == [(22.0, False)]
+        assert db.query(BlackcludedItemModel).filter(BlackcludedItemModel.url == "https://bulk.test/o/2").count() == 1
+        assert db.query(OfferHistoryModel).filter(
+            OfferHistoryModel.offer_url == "https://bulk.test/o/2",
+            OfferHistoryModel.action_type == "AUTO_DISCARDED_RELEVANCE",
+        ).count() == 1
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from src.domain.models import PendingMatchModel
+from src.infrastructure.scrapers.pipeline import ScrapingPipeline
+from tests.conftest import _TestSession
+
+
+def _offer_stream(prefix: str, n: int):
+    for i in range(n):
+        yield {
+            "product_name": f"He-Man Origins {prefix} {i}",
+            "price": 20.0 + i,
+            "currency": "EUR",
+            "url": f"https://stream.test/{prefix}/{i}",
+            "shop_name": "StreamShop",
+            "source_type": "Retail",
+        }
+
+
+def test_update_database_streams_chunks_and_reports_per_chunk(client):
+    pipeline = ScrapingPipeline([])
+    logs = []
+    pipeline.log_callback = logs.append
+
+    with patch("src.core.backup_manager.BackupManager.append_raw_snapshot"):
+        new_items = pipeline.update_database(_offer_stream("ok", 7), chunk_size=3)
+
+    assert new_items == 7
+    chunk_logs = [m for m in logs if m.startswith("📦 [Lote")]
+    assert len(chunk_logs) == 3
+    assert any("📊 [Resumen] Nuevas en Purgatorio: 7" in m for m in logs)
+
+    with _TestSession() as db:
+        assert db.query(PendingMatchModel).filter(PendingMatchModel.url.like("https://stream.test/ok/%")).count() == 7
+
+
+def test_update_database_failed_chunk_only_rolls_back_itself(client):
+    from src.core import vintage_utils
+    real_validate = vintage_utils.validate_motu_relevance
+
+    def flaky_validate(title):
+        if title.endswith("fail 3"):
+            raise RuntimeError("late failure")
+        return real_validate(title)
+
+    pipeline = ScrapingPipeline([])
+    with patch("src.core.backup_manager.BackupManager.append_raw_snapshot"), \
+         patch("src.core.vintage_utils.validate_motu_relevance", side_effect=flaky_validate):
+        new_items = pipeline.update_database(_offer_stream("fail", 6), chunk_size=3)
+
+    # Lote 1 (0-2) persistido, lote 2 (3-5) revertido por el fallo del ítem 3
+    assert new_items == 3
+    with _TestSession() as db:
+        urls = {u for (u,) in db.query(PendingMatchModel.url).filter(PendingMatchModel.url.like("https://stream.test/fail/%"))}
+    assert urls == {f"https://stream.test/fail/{i}" for i in range(3)}
+
+
+def test_update_database_retries_urls_from_rolled_back_chunk(client):
+    from itertools import chain
+    from src.core import vintage_utils
+    real_validate = vintage_utils.validate_motu_relevance
+
+    def flaky_validate(title):
+        if title.endswith("retry 5"):
+            raise RuntimeError("late failure")
+        return real_validate(title)
+
+    # Lote 2 (3-5) se revierte al fallar el 5 (el 4 ya se había procesado); el 4
+    # reaparece en el lote 3 y debe persistirse
+    offers = list(_offer_stream("retry", 7))
+    stream = chain(offers[:6], [offers[4], offers[6]])
+
+    pipeline = ScrapingPipeline([])
+    with patch("src.core.backup_manager.BackupManager.append_raw_snapshot"), \
+         patch("src.core.vintage_utils.validate_motu_relevance", side_effect=flaky_validate), \
+         patch.object(ScrapingPipeline, "sync_availability") as sync:
+        new_items = pipeline.update_database(stream, shop_names=["StreamShop"], chunk_size=3)
+
+    assert new_items == 5
+    with _TestSession() as db:
+        urls = {u for (u,) in db.query(PendingMatchModel.url).filter(PendingMatchModel.url.like("https://stream.test/retry/%"))}
+    assert urls == {f"https://stream.test/retry/{i}" for i in (0, 1, 2, 4, 6)}
+    # Las URLs del lote revertido siguen contando como vistas para la disponibilidad
+    assert sorted(sync.call_args.args[0]) == sorted(o["url"] for o in offers)
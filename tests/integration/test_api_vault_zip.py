@@ -0,0 +1,84 @@
+"""
+Phase 102: /api/vault/download-images/zip en streaming.
+
+El ZIP se genera al vuelo (ZIP_STORED), debe abrirse con zipfile, anunciar
+Content-Length exacto y servir rangos que, concatenados, reproducen el
+archivo completo (reanudación de descargas).
+"""
+import io
+import os
+import zipfile
+from unittest.mock import patch
+
+from src.core.zip_stream import StreamingZip, ZipEntry
+
+
+def _fill_cache(tmp_path):
+    files = {
+        "987654.webp": os.urandom(200_000),
+        "legacy.png": b"\x89PNG" + os.urandom(5_000),
+        "987654_thumb.webp": b"variant",  # variante reducida: no se exporta
+    }
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    return files
+
+
+def test_zip_streams_stored_archive_with_exact_length(client, admin_bearer, tmp_path):
+    files = _fill_cache(tmp_path)
+
+    with patch("src.core.config.settings.IMAGE_CACHE_DIR", str(tmp_path)):
+        resp = client.get("/api/vault/download-images/zip", headers=admin_bearer)
+
+    assert resp.status_code == 200
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert int(resp.headers["content-length"]) == len(resp.content)
+
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as archive:
+        assert archive.testzip() is None  # CRC correctos
+        infos = {i.filename: i for i in archive.infolist()}
+        assert set(infos) == {"987654.webp", "legacy.png"}
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in infos.values())
+        assert archive.read("987654.webp") == files["987654.webp"]
+
+
+def test_zip_ranges_resume_the_same_archive(client, admin_bearer, tmp_path):
+    _fill_cache(tmp_path)
+
+    with patch("src.core.config.settings.IMAGE_CACHE_DIR", str(tmp_path)):
+        full = client.get("/api/vault/download-images/zip", headers=admin_bearer)
+        total, etag = len(full.content), full.headers["etag"]
+
+        # Corte a mitad del primer fichero: la reanudación necesita su CRC sin reenviarlo
+        cut = 1_000
+        head = client.get("/api/vault/download-images/zip", headers={**admin_bearer, "Range": f"bytes=0-{cut - 1}"})
+        tail = client.get(
+            "/api/vault/download-images/zip",
+            headers={**admin_bearer, "Range": f"bytes={cut}-", "If-Range": etag},
+        )
+        assert head.status_code == tail.status_code == 206
+        assert tail.headers["content-range"] == f"bytes {cut}-{total - 1}/{total}"
+        assert head.content + tail.content == full.content
+
+        suffix = client.get("/api/vault/download-images/zip", headers={**admin_bearer, "Range": "bytes=-22"})
+        assert suffix.content == full.content[-22:]
+
+        stale = client.get(
+            "/api/vault/download-images/zip",
+            headers={**admin_bearer, "Range": f"bytes={cut}-", "If-Range": '"otro"'},
+        )
+        assert stale.status_code == 200 and stale.content == full.content
+
+        beyond = client.get("/api/vault/download-images/zip", headers={**admin_bearer, "Range": f"bytes={total}-"})
+        assert beyond.status_code == 416
+
+
+def test_streaming_zip_switches_to_zip64_past_4gib(tmp_path):
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"x")
+    entry = ZipEntry.from_path(str(path), "big.bin")
+    archive = StreamingZip([entry])
+    # Simula un directorio central más allá de 4 GiB sin escribir 4 GiB
+    archive._central_offset = 0x1_0000_0000
+    end = archive._end_records()
+    assert end.startswith(b"PK\x06\x06") and b"PK\x06\x07" in end
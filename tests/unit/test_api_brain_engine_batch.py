@@ -0,0 +1,71 @@
+from collections import Counter
+
+import pytest
+
+from src.core.brain_engine import engine
+from src.core.catalog_index import CatalogEntry
+from src.core.weight_engine import weights_manager
+from src.domain.models import ProductModel
+
+
+CATALOG = [
+    "He-Man Origins", "Skeletor Origins", "Battle Cat Origins Deluxe", "Teela Origins",
+    "Stratos Origins", "Mer-Man Masters of the Universe", "Beast Man Vintage 1982",
+    "Castle Grayskull", "Roboto Origins", "Panthor Origins", "Orko", "Evil-Lyn Origins",
+]
+TITLES = [
+    "MOTU Origins He-Man figura nueva", "Skeletr origns loose", "Battle Cat deluxe Mattel",
+    "Panthor vintage 1983", "Castle Grayskull playset", "Evil Lyn Origins", "Teela", "",
+    "Masters of the Universe Merman", "Roboto Origins caja", "Orko Turtles of Grayskull",
+]
+
+
+@pytest.fixture
+def catalog_weights(monkeypatch):
+    for attr in ("weights", "token_df", "total_docs"):
+        monkeypatch.setattr(weights_manager, attr, getattr(weights_manager, attr))
+    df = Counter()
+    for name in CATALOG:
+        df.update(weights_manager.normalize(name))
+    weights_manager.load_counts(df, len(CATALOG))
+
+
+def test_calculate_matches_equals_pairwise_calculate_match(catalog_weights):
+    catalog_eans = ["8400000000017" if i == 0 else None for i in range(len(CATALOG))]
+    title_eans = ["8400000000017", None, "1234"] + [None] * (len(TITLES) - 3)
+
+    matrix = engine.calculate_matches(TITLES, CATALOG, title_eans, catalog_eans)
+
+    assert len(matrix) == len(TITLES)
+    for qi, title in enumerate(TITLES):
+        for ci, name in enumerate(CATALOG):
+            assert matrix[qi][ci] == engine.calculate_match(name, title, catalog_eans[ci], title_eans[qi])
+
+    assert matrix[0][0] == (True, 1.0, "EAN Match")
+
+
+def test_calculate_matches_handles_empty_inputs():
+    assert engine.calculate_matches([], CATALOG) == []
+    assert engine.calculate_matches(["He-Man"], []) == [[]]
+
+
+def test_candidate_matches_score_a_page_in_one_call(catalog_weights, monkeypatch):
+    entries = [
+        CatalogEntry.from_model(ProductModel(id=i, name=name, ean="8400000000017" if i == 0 else None))
+        for i, name in enumerate(CATALOG)
+    ]
+    titles = TITLES[:4]
+    eans = ["8400000000017", None, None, None]
+    lists = [entries[:3], entries[1:2], [], entries[2:]]
+
+    calls = []
+    batch = engine.calculate_matches
+    monkeypatch.setattr(engine, "calculate_matches", lambda *a, **kw: calls.append(a) or batch(*a, **kw))
+    rows = engine.calculate_candidate_matches(titles, eans, lists)
+
+    # Una sola llamada, con cada producto una vez aunque lo compartan varios títulos
+    assert len(calls) == 1 and len(calls[0][1]) == len(CATALOG)
+    assert [len(r) for r in rows] == [3, 1, 0, len(CATALOG) - 2]
+    for title, ean, candidates, row in zip(titles, eans, lists, rows):
+        assert row == [engine.calculate_match(c.name, title, c.ean, ean) for c in candidates]
+    assert engine.calculate_candidate_matches(["Orko"], [None], [[]]) == [[]]
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import src.core.catalog_index as catalog_module
+from src.core.catalog_index import CatalogIndex
+from src.core.weight_engine import weights_manager
+from src.domain.base import Base
+from src.domain.models import ProductModel
+
+
+@pytest.fixture
+def db_and_index(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    index = CatalogIndex()
+    monkeypatch.setattr(catalog_module, "catalog_index", index)
+    synced = []
+    monkeypatch.setattr(weights_manager, "is_loaded", False)
+    monkeypatch.setattr(
+        weights_manager, "load_counts",
+        lambda df, total, fingerprint=None: synced.append((dict(df), total, fingerprint)),
+    )
+    with Session() as db:
+        db.add_all([
+            ProductModel(name="Skeletor Origins", ean="1234567890123"),
+            ProductModel(name="Battle Cat Origins", sub_category="Origins"),
+        ])
+        db.commit()
+        yield db, index, synced
+
+
+def test_candidates_use_token_postings_and_ean(db_and_index):
+    db, index, synced = db_and_index
+    index.ensure_loaded(db)
+
+    assert [p.name for p in index.candidates("MOTU Skeletor loose")] == ["Skeletor Origins"]
+    assert [p.name for p in index.candidates("Origins figure")] == []  # stop word only
+    assert [p.name for p in index.candidates("unknown", ean="1234567890123")] == ["Skeletor Origins"]
+    assert synced[-1][1] == 2
+    assert synced[-1][0]["origins"] == 2
+    assert synced[-1][2].startswith("v1:2:")
+
+
+def test_index_follows_committed_orm_changes_only(db_and_index):
+    db, index, synced = db_and_index
+    index.ensure_loaded(db)
+    version = index.version
+
+    db.add(ProductModel(name="Stratos Origins"))
+    db.flush()
+    db.rollback()
+    assert index.candidates("Stratos") == []
+    assert index.version == version
+
+    stratos = ProductModel(name="Stratos Origins")
+    db.add(stratos)
+    db.commit()
+    assert [p.name for p in index.candidates("Stratos")] == ["Stratos Origins"]
+
+    stratos.name = "Stratos Deluxe"
+    db.commit()
+    assert [p.name for p in index.candidates("deluxe")] == ["Stratos Deluxe"]
+    assert index.candidates("origins stratos") == index.candidates("stratos")
+
+    db.delete(stratos)
+    db.commit()
+    assert index.candidates("deluxe stratos") == []
+    assert len(synced) == 1  # sólo la carga inicial siembra los pesos IDF
+
+
+def test_concurrent_cold_requests_rebuild_once(db_and_index, monkeypatch):
+    db, index, synced = db_and_index
+    calls = []
+
+    def slow_rebuild(session):
+        # Recarga lenta (sin tocar la conexión SQLite desde otros hilos)
+        calls.append(1)
+        time.sleep(0.05)
+        index.loaded = True
+
+    monkeypatch.setattr(index, "rebuild", slow_rebuild)
+    threads = [threading.Thread(target=index.ensure_loaded, args=(db,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Sin caducidad: una carga en frío y ya no se recarga
+    index.ensure_loaded(db)
+    assert calls == [1]
+
+
+def test_changes_committed_during_rebuild_are_replayed(db_and_index, monkeypatch):
+    db, index, synced = db_and_index
+    skeletor_id = db.query(ProductModel.id).filter_by(name="Skeletor Origins").scalar()
+    from_model = catalog_module.CatalogEntry.from_model
+    teela = catalog_module.CatalogEntry(id=99, name="Teela Origins", search_tokens=frozenset({"teela"}))
+
+    def read_while_others_commit(p):
+        if p.id == skeletor_id:
+            # Otra transacción confirma mientras se lee el catálogo
+            index.apply([("upsert", teela), ("delete", skeletor_id)])
+        return from_model(p)
+
+    monkeypatch.setattr(catalog_module.CatalogEntry, "from_model", staticmethod(read_while_others_commit))
+    index.ensure_loaded(db)
+
+    assert [p.name for p in index.candidates("Teela")] == ["Teela Origins"]
+    assert index.candidates("Skeletor") == []
+
+    # Un invalidate() durante la carga no deja el índice marcado como vigente
+    monkeypatch.setattr(catalog_module.CatalogEntry, "from_model",
+                        staticmethod(lambda p: index.invalidate() or from_model(p)))
+    index.invalidate()
+    index.ensure_loaded(db)
+    assert index.is_loaded is False
+
+
+def test_bulk_statement_invalidates_on_commit(db_and_index):
+    db, index, synced = db_and_index
+    index.ensure_loaded(db)
+
+    db.query(ProductModel).filter(ProductModel.name == "Skeletor Origins").update({"name": "Skeletor Deluxe"})
+    assert index.is_loaded is True
+    db.commit()
+    assert index.is_loaded is False
+
+    index.ensure_loaded(db)
+    assert [p.name for p in index.candidates("deluxe")] == ["Skeletor Deluxe"]
@@ -0,0 +1,90 @@
+"""
+Phase 109: caché de reglas logísticas compartida y versionada.
+
+Las reglas se cargan una vez; una escritura ORM invalida la instantánea local
+tras el commit y cambia el token de versión, que otro proceso detecta en su
+siguiente comprobación. La resolución de alias coincide con la clásica.
+"""
+import pytest
+
+from src.application.services.logistics_service import LogisticsService
+from src.domain.models import LogisticRuleModel, SystemConfigModel
+from src.infrastructure.repositories.logistic_rules_cache import (
+    RULES_VERSION_CONFIG_KEY,
+    LogisticRulesCache,
+    logistic_rules_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cold_rules_cache():
+    logistic_rules_cache.invalidate()
+    yield
+    logistic_rules_cache.invalidate()
+
+
+@pytest.fixture
+def rules_db(isolated_db):
+    _, Session, queries = isolated_db
+    with Session() as db:
+        db.add_all([
+            LogisticRuleModel(shop_name="Tradeinn", country_code="ES", base_shipping=3.0, free_shipping_threshold=50.0,
+                              vat_multiplier=1.0, custom_fees=0.0),
+            LogisticRuleModel(shop_name="Tradeinn", country_code="FR", base_shipping=6.0, free_shipping_threshold=0.0,
+                              vat_multiplier=1.2, custom_fees=0.0),
+            LogisticRuleModel(shop_name="Shop Local", country_code="ES", base_shipping=2.0, free_shipping_threshold=0.0,
+                              vat_multiplier=1.0, custom_fees=1.0),
+        ])
+        db.commit()
+    queries.clear()
+    return Session, queries
+
+
+def test_rules_load_once_and_resolve_like_legacy_map(rules_db):
+    Session, queries = rules_db
+    with Session() as db:
+        snapshot = LogisticsService.load_rules_map(db)
+        legacy = {f"{r.shop_name}_{r.country_code}": r for r in db.query(LogisticRuleModel).all()}
+        queries.clear()
+
+        assert LogisticsService.load_rules_map(db) is snapshot
+        assert queries == []
+
+        for shop in ("kidinn", "Tradeinn (Techinn)", "Shop Local", " shop local ", "Desconocida", "", None):
+            for location in ("ES", "FR", "DE"):
+                expected = LogisticsService._resolve_rule(shop, location, legacy)
+                resolved = snapshot.resolve(shop, location)
+                assert (resolved and (resolved.shop_name, resolved.country_code)) == \
+                    (expected and (expected.shop_name, expected.country_code))
+                assert LogisticsService.optimized_get_landing_price(30.0, shop, location, snapshot) == \
+                    LogisticsService.optimized_get_landing_price(30.0, shop, location, legacy)
+
+
+def test_orm_writes_invalidate_and_bump_version(rules_db):
+    Session, queries = rules_db
+    other_process = LogisticRulesCache(check_interval=0)
+    with Session() as db:
+        first = LogisticsService.load_rules_map(db)
+        seen_elsewhere = other_process.get(db)
+        assert first.resolve("techinn", "ES").base_shipping == 3.0
+
+        # Escritura por fila: invalidación local tras el commit
+        db.query(LogisticRuleModel).filter_by(shop_name="Tradeinn", country_code="ES").one().base_shipping = 4.5
+        db.commit()
+        token = db.get(SystemConfigModel, RULES_VERSION_CONFIG_KEY).value
+        assert token
+        second = LogisticsService.load_rules_map(db)
+        assert second is not first and second.resolve("techinn", "ES").base_shipping == 4.5
+
+        # Otro proceso no recibe el evento: lo detecta por el token de versión
+        assert other_process.get(db) is not seen_elsewhere
+        assert other_process.get(db).resolve("techinn", "ES").base_shipping == 4.5
+
+        # Operación masiva y rollback
+        db.query(LogisticRuleModel).filter_by(shop_name="Shop Local").delete(synchronize_session=False)
+        db.rollback()
+        assert LogisticsService.load_rules_map(db) is second
+        db.query(LogisticRuleModel).filter_by(shop_name="Shop Local").delete(synchronize_session=False)
+        db.commit()
+        assert db.get(SystemConfigModel, RULES_VERSION_CONFIG_KEY).value != token
+        assert LogisticsService.load_rules_map(db).resolve("Shop Local", "ES") is None
@@ -0,0 +1,58 @@
+"""
+Phase 103: siembra de lore idempotente.
+
+Un segundo arranque con la misma enciclopedia no escribe nada (ni personajes
+ni productos); sólo se vinculan altas nuevas, y un cambio de huella
+re-resuelve el catálogo escribiendo únicamente los slugs que difieren.
+"""
+from src.application.services.lore_harvester_service import LORE_SEED_CONFIG_KEY, LoreHarvesterService
+from src.domain.models import CharacterLoreModel, ProductModel, SystemConfigModel
+
+
+def _writes(statements):
+    return [s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+
+
+def test_reseeding_unchanged_encyclopedia_writes_nothing(isolated_db):
+    _, Session, statements = isolated_db
+    with Session() as db:
+        db.add_all([ProductModel(id=1, name="He-Man Origins"), ProductModel(id=2, name="Battle Armor Skeletor")])
+        db.commit()
+
+        first = LoreHarvesterService.seed_initial_catalog(db)
+        assert first["seeded_characters"] == db.query(CharacterLoreModel).count() > 0
+        assert first["linked_products"] == 2 and first["up_to_date"] is False
+        updated_at = db.get(ProductModel, 1).updated_at
+
+        statements.clear()
+        db.expire_all()
+        second = LoreHarvesterService.seed_initial_catalog(db)
+        assert second == {"seeded_characters": 0, "linked_products": 0, "up_to_date": True}
+        assert _writes(statements) == []
+        assert db.get(ProductModel, 1).updated_at == updated_at
+
+
+def test_only_new_or_changed_products_are_relinked(isolated_db):
+    _, Session, statements = isolated_db
+    with Session() as db:
+        db.add_all([ProductModel(id=1, name="He-Man Origins"), ProductModel(id=2, name="Hordak")])
+        db.commit()
+        LoreHarvesterService.seed_initial_catalog(db)
+
+        # Alta nueva tras la siembra: se vincula aunque la huella no cambie
+        db.add(ProductModel(id=3, name="King Hiss Origins"))
+        db.commit()
+        result = LoreHarvesterService.seed_initial_catalog(db)
+        assert result["linked_products"] == 1
+        assert db.get(ProductModel, 3).character_slug == "king_hiss"
+
+        # Huella distinta (enciclopedia o resolutor nuevos): re-resuelve, pero sólo escribe lo que difiere
+        db.get(SystemConfigModel, LORE_SEED_CONFIG_KEY).value = "v0:obsoleta"
+        db.get(ProductModel, 2).character_slug = "manual"
+        db.commit()
+        result = LoreHarvesterService.seed_initial_catalog(db)
+        assert result["seeded_characters"] == 0 and result["up_to_date"] is False
+        assert result["linked_products"] == 1
+        db.expire_all()
+        assert db.get(ProductModel, 2).character_slug == "hordak"
+        assert db.get(SystemConfigModel, LORE_SEED_CONFIG_KEY).value == LoreHarvesterService.seed_fingerprint()
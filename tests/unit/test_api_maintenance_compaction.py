@@ -0,0 +1,74 @@
+"""
+Phase 107: compactación FinOps por conjuntos.
+
+Mismas métricas mensuales y purgas que la versión por producto, pero con un
+número de sentencias constante respecto al tamaño del catálogo y tiempos por fase.
+"""
+from datetime import datetime, timedelta, timezone
+
+from src.application.services.maintenance_service import MaintenanceService
+from src.domain.models import OfferModel, PriceHistoryModel, ProductModel, ProductMonthlyStatsModel
+
+
+def _seed_catalog(db, n_products: int):
+    past = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=90)
+    recent = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=10)
+    for i in range(n_products):
+        dead = ProductModel(name=f"Skeletor {i}")
+        live = ProductModel(name=f"He-Man {i}")
+        db.add_all([dead, live])
+        db.flush()
+        offer_dead = OfferModel(product_id=dead.id, shop_name="Wallapop", price=20.0, url=f"https://w/{i}",
+                                is_available=False, source_type="Peer-to-Peer")
+        offer_live = OfferModel(product_id=live.id, shop_name="Smyths", price=25.0, url=f"https://s/{i}",
+                                is_available=True, source_type="Retail")
+        offer_old = OfferModel(product_id=live.id, shop_name="Amazon", price=18.0, url=f"https://a/{i}",
+                               is_available=False, source_type="Retail")
+        db.add_all([offer_dead, offer_live, offer_old])
+        db.flush()
+        db.add_all([PriceHistoryModel(offer_id=offer_dead.id, price=p, recorded_at=past) for p in (10.0, 20.0, 30.0)])
+        db.add_all([
+            PriceHistoryModel(offer_id=offer_live.id, price=25.0, recorded_at=recent),
+            PriceHistoryModel(offer_id=offer_old.id, price=15.0, recorded_at=past),
+        ])
+    db.commit()
+    return past, dead, live
+
+
+def test_compaction_keeps_monthly_metrics_and_purges_in_bulk(isolated_db_factory):
+    _, Session, _ = isolated_db_factory(foreign_keys=True)
+    with Session() as db:
+        past, dead, live = _seed_catalog(db, 1)
+        db.add(ProductMonthlyStatsModel(product_id=dead.id, year=past.year, month=past.month, source_type="Peer-to-Peer",
+                                        avg_price=0, median_price=0, min_price=0, max_price=0, std_dev_price=0,
+                                        p25_price=0, p75_price=0, offers_count=0))
+        db.commit()
+
+        stats = MaintenanceService.compact_database(db)
+
+        skeletor = db.query(ProductMonthlyStatsModel).filter_by(product_id=dead.id).one()
+        assert (skeletor.year, skeletor.month, skeletor.source_type) == (past.year, past.month, "Peer-to-Peer")
+        assert skeletor.offers_count == 3 and skeletor.avg_price == skeletor.median_price == 20.0
+        assert (skeletor.min_price, skeletor.max_price, skeletor.p25_price, skeletor.p75_price) == (10.0, 30.0, 10.0, 30.0)
+        assert skeletor.std_dev_price == 10.0
+
+        # Producto muerto: fuera ofertas e historial; vivo: conserva ofertas y sólo el historial reciente
+        assert db.query(OfferModel).filter_by(product_id=dead.id).count() == 0
+        assert db.query(OfferModel).filter_by(product_id=live.id).count() == 2
+        assert [h.price for h in db.query(PriceHistoryModel)] == [25.0]
+        assert stats["offers_purged"] == 1 and stats["price_history_purged"] == 4
+        assert stats["monthly_stats_saved"] == 3 and stats["products_processed"] == 2
+        assert set(stats["timings"]) >= {"monthly_stats", "dead_products_purge", "history_purge", "sync_log_purge"}
+
+
+def test_round_trips_do_not_grow_with_catalog_size(isolated_db_factory):
+    counts = []
+    for n_products in (2, 40):
+        _, Session, statements = isolated_db_factory(foreign_keys=True)
+        with Session() as db:
+            _seed_catalog(db, n_products)
+            statements.clear()
+            stats = MaintenanceService.compact_database(db)
+            assert stats["monthly_stats_saved"] == 3 * n_products
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
@@ -65,3 +65,17 @@ def test_validate_motu_relevance_non_motu_vintage():
         is_relevant, reason = validate_motu_relevance(title)
         assert is_relevant is False
         assert "no contiene" in reason.lower() or "marca excluida" in reason.lower()
+
+def test_compiled_classifier_matches_sequential_reference_on_real_titles():
+    # Phase 104: la alternancia precompilada debe decidir (y explicar) igual que la versión secuencial
+    from scripts.diagnostics.benchmark_motu_relevance import (
+        legacy_check_is_vintage, legacy_validate_motu_relevance, load_corpus,
+    )
+    from src.core.vintage_utils import check_is_vintage, validate_motu_relevance_batch
+
+    titles = load_corpus() + [
+        "", "Funko Pop Star Wars He-Man", "Star Wars Big Jim lote", "superhero 1984", "VINTAGE Hordak",
+        "DC Universe Skeletor", "Action Man Heman 19850", "figura motu masterverse",
+    ]
+    assert validate_motu_relevance_batch(titles) == [legacy_validate_motu_relevance(t) for t in titles]
+    assert [check_is_vintage(t) for t in titles] == [legacy_check_is_vintage(t) for t in titles]
@@ -0,0 +1,38 @@
+from src.core.brain_engine import engine
+from src.core.normalization_cache import cache_stats, fold_tokens, memoized
+from src.core.weight_engine import weights_manager
+
+
+def test_fold_tokens_returns_frozen_ascii_tuple():
+    assert fold_tokens("Évil-Lyn  Orígenes 2024") == ("evil", "lyn", "origenes", "2024")
+    assert fold_tokens("") == ()
+    assert isinstance(fold_tokens("He-Man"), tuple)
+
+
+def test_memoized_cache_is_bounded_and_counts_hits():
+    calls = []
+
+    @memoized("test.bounded", maxsize=2)
+    def upper(text):
+        calls.append(text)
+        return text.upper()
+
+    upper("a"); upper("a"); upper("b"); upper("c"); upper("a")
+
+    stats = cache_stats()["test.bounded"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["size"] == 2
+    assert calls == ["a", "b", "c", "a"]
+
+
+def test_engine_normalizers_are_memoized_and_immutable():
+    before = cache_stats()["brain_engine.normalize"]["hits"]
+    first = engine.normalize("Masters of the Universe Origins Skeletor")
+    second = engine.normalize("Masters of the Universe Origins Skeletor")
+
+    assert first is second
+    assert isinstance(first, frozenset)
+    assert first == {"masters", "origins", "skeletor"}
+    assert cache_stats()["brain_engine.normalize"]["hits"] > before
+    assert weights_manager.normalize("Battle Cat a 1") == frozenset({"battle", "cat", "1"})
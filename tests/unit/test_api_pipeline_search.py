@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.infrastructure.scrapers.base import ScrapedOffer
+from src.infrastructure.scrapers.pipeline import ScrapingPipeline
+
+
+class _FakeScraper:
+    def __init__(self, shop_name, delay, auction=False, fail=False):
+        self.shop_name = shop_name
+        self.spider_name = shop_name
+        self.delay = delay
+        self.is_auction_source = auction
+        self.fail = fail
+
+    async def search(self, query):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [ScrapedOffer(product_name=f"{query} {self.shop_name}", price=10.0,
+                             url=f"https://{self.shop_name}.test/{query}", shop_name=self.shop_name)]
+
+
+@pytest.mark.asyncio
+async def test_stream_product_search_yields_in_completion_order_and_skips_hung_shop():
+    pipeline = ScrapingPipeline([
+        _FakeScraper("Slow", 0.2),
+        _FakeScraper("Hung", 5.0),
+        _FakeScraper("Fast", 0.01, auction=True),
+        _FakeScraper("Broken", 0.01, fail=True),
+    ])
+    pipeline.search_timeout = 0.4
+    pipeline.cancel_poll_interval = 0.05
+
+    start = time.perf_counter()
+    batches = []
+    async for batch in pipeline.stream_product_search("He-Man"):
+        batches.append((batch[0].shop_name, time.perf_counter() - start, batch[0].source_type))
+    elapsed = time.perf_counter() - start
+
+    assert [b[0] for b in batches] == ["Fast", "Slow"]
+    assert batches[0][1] < 0.15
+    assert batches[0][2] == "Peer-to-Peer" and batches[1][2] == "Retail"
+    # La tienda colgada sólo consume su propio timeout, no el de las demás en serie
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_run_product_search_honours_cancel_event():
+    cancel = threading.Event()
+    pipeline = ScrapingPipeline([_FakeScraper("Fast", 0.01), _FakeScraper("Slow", 5.0)], cancel_event=cancel)
+    pipeline.cancel_poll_interval = 0.05
+
+    async def _cancel_soon():
+        await asyncio.sleep(0.1)
+        cancel.set()
+
+    canceller = asyncio.create_task(_cancel_soon())
+    start = time.perf_counter()
+    results = await pipeline.run_product_search("Skeletor")
+    await canceller
+
+    assert time.perf_counter() - start < 1.0
+    assert [r["shop_name"] for r in results] == ["Fast"]
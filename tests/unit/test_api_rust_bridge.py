@@ -0,0 +1,50 @@
+import pytest
+
+from src.core.rust_bridge import SmartBridge, python_match_logic, resolve_kernel_path
+
+# Mismo binario que usa producción: RUST_KERNEL_PATH o el build de .3ox
+BUILT_KERNEL = resolve_kernel_path()
+
+PAIRS = [
+    ("He-Man Masters of the Universe Origins", "He-Man Origins MOTU", None, None),
+    ("Skeletor", "Beast Man Deluxe", None, None),
+    ("Evil-Lyn", "Totally different", "8410000000001", "8410000000001"),
+    ("", "", None, None),
+    ("Teela 200X", "teela 200x mattel", "", ""),
+]
+
+
+def test_python_fallback_matches_kernel_logic():
+    bridge = SmartBridge(brain_path="/nonexistent/brains")
+    results = bridge.match_batch(PAIRS)
+
+    assert len(results) == len(PAIRS)
+    assert all(reason == "Python Kernel Fallback" for _, _, reason in results)
+    assert results[2][:2] == (True, 1.0)  # EAN idéntico
+    assert results[3][:2] == (True, 1.0)  # ambos vacíos
+    for (m, s, _), pair in zip(results, PAIRS):
+        exp_m, exp_s = python_match_logic(*pair)
+        assert (m, s) == (exp_m, round(exp_s, 4))
+
+
+def test_match_items_is_single_pair_batch():
+    bridge = SmartBridge(brain_path="/nonexistent/brains")
+    assert bridge.match_items("Skeletor", "Skeletor") == (True, 1.0, "Python Kernel Fallback")
+    assert bridge.match_batch([]) == []
+
+
+@pytest.mark.skipif(not BUILT_KERNEL.exists(), reason="kernel Rust no compilado")
+def test_persistent_worker_agrees_with_python_replica():
+    bridge = SmartBridge(brain_path=BUILT_KERNEL)
+    try:
+        first = bridge.match_batch(PAIRS)
+        second = bridge.match_batch(PAIRS)  # mismo proceso, segundo lote
+        pid = bridge._proc.pid
+        assert all(reason == "Rust Kernel Execution" for _, _, reason in first)
+        expected = [(m, round(s, 4)) for m, s in (python_match_logic(*p) for p in PAIRS)]
+        assert [r[:2] for r in first] == expected
+        assert second == first
+        bridge.match_items("Skeletor", "Skeletor")
+        assert bridge._proc.pid == pid
+    finally:
+        bridge.close()
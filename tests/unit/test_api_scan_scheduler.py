@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from src.application.jobs.scan_scheduler import ScanScheduler
+
+
+class _FakeScraper:
+    def __init__(self, name, backend="curl", shop=None, delay=0.05):
+        self.spider_name = name
+        self.shop_name = shop or name
+        self.concurrency_backend = backend
+        self.delay = delay
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_scrapers_concurrently_under_budgets():
+    scrapers = [_FakeScraper(f"curl-{i}", "curl") for i in range(4)] + \
+               [_FakeScraper(f"pw-{i}", "playwright") for i in range(4)]
+    active = {"global": 0, "playwright": 0}
+    peaks = {"global": 0, "playwright": 0}
+
+    async def scrape(s):
+        active["global"] += 1
+        if s.concurrency_backend == "playwright":
+            active["playwright"] += 1
+        peaks["global"] = max(peaks["global"], active["global"])
+        peaks["playwright"] = max(peaks["playwright"], active["playwright"])
+        await asyncio.sleep(s.delay)
+        active["global"] -= 1
+        if s.concurrency_backend == "playwright":
+            active["playwright"] -= 1
+        return [s.spider_name]
+
+    persisted = []
+    scheduler = ScanScheduler(max_concurrency=5, backend_limits={"curl": 4, "playwright": 2})
+
+    start = time.perf_counter()
+    outcome = await scheduler.run(scrapers, scrape, lambda s, payload: persisted.extend(payload))
+    elapsed = time.perf_counter() - start
+
+    assert peaks["global"] <= 5
+    assert peaks["playwright"] <= 2
+    assert sorted(persisted) == sorted(s.spider_name for s in scrapers)
+    assert all(err is None for err in outcome.values())
+    # 8 incursiones de 50ms en serie serían ~0.4s
+    assert elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serializes_writer_and_isolates_shop_and_crashes():
+    scrapers = [
+        _FakeScraper("a", shop="Ebay.es"),
+        _FakeScraper("b", shop="Ebay.es"),
+        _FakeScraper("boom", shop="Other"),
+    ]
+    in_shop = {"Ebay.es": 0}
+    shop_peak = {"Ebay.es": 0}
+    writer_active = {"n": 0, "peak": 0}
+    progress = []
+
+    async def scrape(s):
+        if s.spider_name == "boom":
+            raise RuntimeError("kaput")
+        in_shop[s.shop_name] += 1
+        shop_peak[s.shop_name] = max(shop_peak[s.shop_name], in_shop[s.shop_name])
+        await asyncio.sleep(0.01)
+        in_shop[s.shop_name] -= 1
+        return s.spider_name
+
+    def persist(s, payload):
+        writer_active["n"] += 1
+        writer_active["peak"] = max(writer_active["peak"], writer_active["n"])
+        writer_active["n"] -= 1
+
+    outcome = await ScanScheduler(max_concurrency=4).run(
+        scrapers, scrape, persist, on_done=lambda s, done, total: progress.append((done, total))
+    )
+
+    assert shop_peak["Ebay.es"] == 1
+    assert writer_active["peak"] == 1
+    assert outcome["boom"] == "kaput"
+    assert outcome["a"] is None and outcome["b"] is None
+    assert sorted(progress) == [(1, 3), (2, 3), (3, 3)]
+
+
+@pytest.mark.asyncio
+async def test_blocking_writer_runs_off_the_event_loop():
+    # Un volcado bloqueante (SQLAlchemy) no debe congelar a los scrapers en curso
+    scrapers = [_FakeScraper("fast", shop="A", delay=0.0)] + \
+               [_FakeScraper(f"slow-{i}", shop=f"S{i}", delay=0.05) for i in range(3)]
+    order, scraped, seen_while_writing = [], [], {}
+
+    async def scrape(s):
+        await asyncio.sleep(s.delay)
+        scraped.append(s.spider_name)
+        return s.spider_name
+
+    def persist(s, payload):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        time.sleep(0.15)
+        seen_while_writing.setdefault(payload, len(scraped))
+        order.append(payload)
+
+    outcome = await ScanScheduler(max_concurrency=4).run(scrapers, scrape, persist)
+
+    assert all(err is None for err in outcome.values())
+    assert order[0] == "fast" and sorted(order[1:]) == ["slow-0", "slow-1", "slow-2"]
+    # Mientras se escribía "fast" los scrapers lentos terminaron en el event loop
+    assert seen_while_writing["fast"] == 4
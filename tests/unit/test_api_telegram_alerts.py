@@ -1,44 +1,50 @@
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from src.infrastructure.scrapers.pipeline import check_and_send_multiuser_alerts
-from src.domain.models import UserModel, ProductModel, CollectionItemModel, PriceAlertModel
+from src.application.services.alert_index import AlertEntry, MultiUserAlertIndex, alert_words
+from src.domain.models import Base, UserModel, ProductModel, CollectionItemModel, PriceAlertModel
 
 @pytest.fixture
 def anyio_backend():
     return "asyncio"
 
-@pytest.mark.anyio
-async def test_check_and_send_multiuser_alerts_wishlist():
-    db = MagicMock()
-    
-    mock_user = UserModel(
-        id=1,
-        username="guardian_test",
-        telegram_chat_id="123456789",
-        is_active=True
-    )
-    
-    mock_product = ProductModel(
-        id=10,
-        name="He-Man Vintage Action Figure"
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
     )
-    
-    def mock_query(model):
-        q = MagicMock()
-        if model == UserModel:
-            q.filter.return_value.all.return_value = [mock_user]
-        elif model == ProductModel:
-            q.join.return_value.filter.return_value.all.return_value = [mock_product]
-        elif model == PriceAlertModel:
-            q.join.return_value.filter.return_value.all.return_value = []
-        return q
-        
-    db.query.side_effect = mock_query
-    
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            UserModel(id=1, username="guardian_test", email="g@test.com", hashed_password="x",
+                      telegram_chat_id="123456789", is_active=True),
+            UserModel(id=2, username="sin_telegram", email="s@test.com", hashed_password="x", is_active=True),
+        ])
+        session.commit()
+        yield session
+
+
+def _entry(kind, user_id, chat_id, name, target_price=None):
+    return AlertEntry(kind, user_id, chat_id, name, tuple(alert_words(name)), target_price)
+
+
+@pytest.mark.anyio
+async def test_check_and_send_multiuser_alerts_wishlist(db):
+    db.add(ProductModel(id=10, name="He-Man Vintage Action Figure"))
+    db.add_all([
+        CollectionItemModel(product_id=10, owner_id=1, acquired=False),
+        CollectionItemModel(product_id=10, owner_id=2, acquired=False),
+    ])
+    db.commit()
+
     with patch("src.infrastructure.services.telegram_service.telegram_service.send_wishlist_alert", new_callable=AsyncMock) as mock_send_wishlist:
         with patch("src.infrastructure.services.telegram_service.telegram_service.send_price_alert", new_callable=AsyncMock) as mock_send_price:
-            
+
             check_and_send_multiuser_alerts(
                 db=db,
                 scraped_name="Masters of the Universe He-Man Vintage Action Figure on card",
@@ -47,9 +53,9 @@ async def test_check_and_send_multiuser_alerts_wishlist():
                 url="https://wallapop.com/item/1",
                 is_vintage=True
             )
-            
+
             await asyncio.sleep(0.1)
-            
+
             mock_send_wishlist.assert_called_once_with(
                 chat_id="123456789",
                 product_name="He-Man Vintage Action Figure",
@@ -60,45 +66,17 @@ async def test_check_and_send_multiuser_alerts_wishlist():
             mock_send_price.assert_not_called()
 
 @pytest.mark.anyio
-async def test_check_and_send_multiuser_alerts_price_alert():
-    db = MagicMock()
-    
-    mock_user = UserModel(
-        id=1,
-        username="guardian_test",
-        telegram_chat_id="123456789",
-        is_active=True
-    )
-    
-    mock_product = ProductModel(
-        id=10,
-        name="Skeletor Vintage"
-    )
-    
-    mock_price_alert = PriceAlertModel(
-        id=200,
-        product_id=10,
-        user_id=1,
-        target_price=30.0,
-        is_active=True,
-        product=mock_product
-    )
-    
-    def mock_query(model):
-        q = MagicMock()
-        if model == UserModel:
-            q.filter.return_value.all.return_value = [mock_user]
-        elif model == ProductModel:
-            q.join.return_value.filter.return_value.all.return_value = []
-        elif model == PriceAlertModel:
-            q.join.return_value.filter.return_value.all.return_value = [mock_price_alert]
-        return q
-        
-    db.query.side_effect = mock_query
-    
+async def test_check_and_send_multiuser_alerts_price_alert(db):
+    db.add(ProductModel(id=10, name="Skeletor Vintage"))
+    db.add_all([
+        PriceAlertModel(id=200, product_id=10, user_id=1, target_price=30.0, is_active=True),
+        PriceAlertModel(id=201, product_id=10, user_id=1, target_price=10.0, is_active=False),
+    ])
+    db.commit()
+
     with patch("src.infrastructure.services.telegram_service.telegram_service.send_wishlist_alert", new_callable=AsyncMock) as mock_send_wishlist:
         with patch("src.infrastructure.services.telegram_service.telegram_service.send_price_alert", new_callable=AsyncMock) as mock_send_price:
-            
+
             check_and_send_multiuser_alerts(
                 db=db,
                 scraped_name="Skeletor Vintage figure loose 80s",
@@ -107,9 +85,9 @@ async def test_check_and_send_multiuser_alerts_price_alert():
                 url="https://ebay.es/itm/2",
                 is_vintage=True
             )
-            
+
             await asyncio.sleep(0.1)
-            
+
             mock_send_price.assert_called_once_with(
                 chat_id="123456789",
                 product_name="Skeletor Vintage",
@@ -119,3 +97,42 @@ async def test_check_and_send_multiuser_alerts_price_alert():
                 url="https://ebay.es/itm/2"
             )
             mock_send_wishlist.assert_not_called()
+
+
+def test_alert_index_batch_is_deduplicated_and_respects_target_price():
+    index = MultiUserAlertIndex([
+        _entry("wishlist", 1, "111", "Skeletor Origins"),
+        _entry("wishlist", 1, "111", "Origins Skeletor Deluxe"),
+        _entry("price", 2, "222", "Skeletor Origins", target_price=15.0),
+        _entry("wishlist", 3, "333", "Battle Cat"),
+    ])
+    offers = [
+        {"scraped_name": "Skeletor Origins Deluxe MOTU", "price": 20.0, "shop_name": "S", "url": "u1"},
+        {"scraped_name": "Skeletor Origins Deluxe MOTU", "price": 20.0, "shop_name": "S", "url": "u1"},
+        {"scraped_name": "Skeletor Origins", "price": 12.0, "shop_name": "S", "url": "u2"},
+    ]
+
+    batch = index.match_batch(offers)
+
+    assert [(a["kind"], a["chat_id"], a["url"]) for a in batch] == [
+        ("wishlist", "111", "u1"),
+        ("wishlist", "111", "u2"),
+        ("price", "222", "u2"),
+    ]
+    assert batch[0]["product_name"] == "Skeletor Origins"
+
+
+@pytest.mark.parametrize("scraped_name, product_name", [
+    ("Skeletor's Havoc Staff", "Skeletor"),             # posesivo
+    ("MOTU HeMan Origins figure", "HeMan"),             # nombre pegado
+    ("Origins_Skeletor 2020", "Skeletor Origins"),      # separador no espacio
+    ("BattleCat loose", "Battle Cat"),                  # palabras del producto pegadas
+])
+def test_alert_index_keeps_substring_rule(scraped_name, product_name):
+    index = MultiUserAlertIndex([_entry("wishlist", 1, "111", product_name)])
+
+    alerts = index.match(scraped_name, 10.0, "S", "u")
+
+    # Misma decisión que la regla histórica (todas las palabras como subcadena)
+    assert all(w in scraped_name.lower() for w in alert_words(product_name))
+    assert [a["product_name"] for a in alerts] == [product_name]
@@ -0,0 +1,90 @@
+"""
+Phase 111: Centinela de Vinted con matching indexado por catálogo.
+
+Cada oferta sólo se puntúa contra los productos no vintage que comparten token
+o EAN con su título; match_candidates() devuelve lo mismo que match() par a par.
+"""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.application.services import vinted_hunter_service
+from src.application.services.vinted_hunter_service import VintedHunterService
+from src.core.catalog_index import CatalogIndex
+from src.core.matching import SmartMatcher
+from src.core.weight_engine import weights_manager
+from src.domain.models import HunterAlertLogModel, LogisticRuleModel, ProductModel
+from src.infrastructure.repositories.logistic_rules_cache import logistic_rules_cache
+from src.infrastructure.scrapers.base import ScrapedOffer
+
+
+@pytest.fixture
+def hunter_db(isolated_db, monkeypatch):
+    Session = isolated_db.Session
+    with Session() as db:
+        db.add(LogisticRuleModel(shop_name="Vinted", country_code="ES", base_shipping=0.0, free_shipping_threshold=0.0,
+                                 vat_multiplier=1.0, custom_fees=0.0, strategy_key="p2p_insurance"))
+        db.add_all([ProductModel(name=f"Filler Figure {i}", p25_price=25.0, is_vintage=False) for i in range(60)])
+        db.add_all([
+            ProductModel(name="He-Man Origins", sub_category="Origins", p25_price=30.0, is_vintage=False),
+            ProductModel(name="He-Man", sub_category="Vintage", p25_price=300.0, is_vintage=True),
+            ProductModel(name="Skeletor Origins", sub_category="Origins", p25_price=35.0, is_vintage=False,
+                         ean="0194735012345"),
+        ])
+        db.commit()
+    monkeypatch.setattr(vinted_hunter_service, "SessionCloud", Session)
+    monkeypatch.setattr(vinted_hunter_service, "catalog_index", CatalogIndex())
+    monkeypatch.setattr(weights_manager, "load_counts", lambda df, total, fingerprint=None: None)
+    logistic_rules_cache.invalidate()
+    yield Session
+    logistic_rules_cache.invalidate()
+
+
+def _offer(title, url, price, ean=None):
+    return ScrapedOffer(product_name=title, price=price, currency="EUR", url=url, shop_name="Vinted",
+                        is_available=True, ean=ean)
+
+
+@pytest.mark.asyncio
+async def test_hunt_scores_only_indexed_candidates(hunter_db, monkeypatch):
+    monkeypatch.setattr(vinted_hunter_service, "HUNT_MATCH_BATCH_SIZE", 2)
+    offers = [
+        _offer("He-Man Masters of the Universe Origins", "https://www.vinted.es/items/1-he-man", 12.0),
+        _offer("Figura sin relación", "https://www.vinted.es/items/2-otra", 5.0),
+        _offer("Lote MOTU caja", "https://www.vinted.es/items/3-skeletor", 15.0, ean="0194735012345"),
+    ]
+    with patch.object(vinted_hunter_service.VintedScraper, "search", new_callable=AsyncMock, return_value=offers), \
+         patch.object(vinted_hunter_service.ScrapingPipeline, "update_database"), \
+         patch.object(vinted_hunter_service.telegram_service, "send_bargain_hunt_alert", new_callable=AsyncMock), \
+         patch.object(vinted_hunter_service.telegram_service, "send_message", new_callable=AsyncMock), \
+         patch.object(vinted_hunter_service.asyncio, "sleep", new_callable=AsyncMock):
+        res = await VintedHunterService.run_hunt(query="auto", chat_id="12345678")
+
+    stats = res["match_stats"]
+    assert stats["catalog_size"] == 63 and stats["offers_scored"] == 3 and stats["batches"] == 2
+    # He-Man Origins (el vintage queda fuera), ninguno, y Skeletor sólo por EAN
+    assert stats["candidates_scored"] == 2 and stats["max_candidates"] == 1
+    assert stats["offers_without_candidates"] == 1
+    assert sorted(b["product_name"] for b in res["bargains"]) == ["He-Man Origins", "Skeletor Origins"]
+    with hunter_db() as db:
+        assert db.query(HunterAlertLogModel).count() == 2
+
+
+def test_batched_candidates_score_like_single_match():
+    products = [
+        ProductModel(name="He-Man Origins", sub_category="Origins", ean="0194735012345"),
+        ProductModel(name="Skeletor Origins", sub_category="Origins"),
+        ProductModel(name="Battle Cat", sub_category=None),
+    ]
+    items = [
+        ("He-Man Masters of the Universe Origins", "https://v/1", None, products),
+        ("Skeletor Origins MOTU", "https://v/2", "0194735012345", products),
+        ("Battle Cat Origins loose", "https://v/3", None, products[2:]),
+        ("Sin candidatos", "https://v/4", None, []),
+    ]
+    matcher = SmartMatcher()
+    expected = [
+        [matcher.match(p.name, title, url, p.ean, ean, p.sub_category) for p in candidates]
+        for title, url, ean, candidates in items
+    ]
+    assert matcher.match_candidates(items) == expected
@@ -0,0 +1,104 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.weight_engine import WeightEngine, catalog_fingerprint, weights_manager
+from src.domain.base import Base
+from src.domain.models import ProductModel
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            ProductModel(name="He-Man Origins"),
+            ProductModel(name="Skeletor Origins"),
+            ProductModel(name="Battle Cat", sub_category="Origins"),
+            ProductModel(name="Castle Grayskull"),
+        ])
+        session.commit()
+        yield session
+
+
+def _full_recount(db):
+    engine = WeightEngine(snapshot_path="/nonexistent/idf.json")
+    engine.refresh(db, fingerprint="")
+    return engine
+
+
+def test_no_scan_at_construction_and_snapshot_skips_recount(db, tmp_path, monkeypatch):
+    path = tmp_path / "idf.json"
+    first = WeightEngine(snapshot_path=str(path))
+    assert first.is_loaded is False and first.weights == {}
+
+    first.ensure_loaded(db)
+    assert path.exists()
+    assert first.total_docs == 4 and first.token_df["origins"] == 3
+
+    second = WeightEngine(snapshot_path=str(path))
+    monkeypatch.setattr(second, "refresh", lambda *a, **k: pytest.fail("full scan on warm start"))
+    second.ensure_loaded(db)
+    assert second.weights == first.weights
+
+    db.add(ProductModel(name="Teela Origins"))
+    db.commit()
+    stale = WeightEngine(snapshot_path=str(path))
+    assert stale.load_snapshot(catalog_fingerprint(db)) is False
+    stale.ensure_loaded(db)
+    assert stale.total_docs == 5
+
+
+def test_same_length_rename_changes_fingerprint(db):
+    before = catalog_fingerprint(db)
+    db.query(ProductModel).filter_by(name="Skeletor Origins").one().name = "Skeletor Deluxes"
+    db.commit()
+    assert catalog_fingerprint(db) != before
+
+    before = catalog_fingerprint(db)
+    db.query(ProductModel).filter_by(name="Battle Cat").one().sub_category = "Originz"
+    db.commit()
+    assert catalog_fingerprint(db) != before
+
+
+def test_orm_changes_update_counts_incrementally(db, tmp_path, monkeypatch):
+    for attr in ("weights", "token_df", "total_docs", "is_loaded"):
+        monkeypatch.setattr(weights_manager, attr, getattr(weights_manager, attr))
+    monkeypatch.setattr(weights_manager, "snapshot_path", tmp_path / "idf.json")
+    weights_manager.refresh(db)
+
+    teela = ProductModel(name="Teela Origins")
+    db.add(teela)
+    db.commit()
+    assert weights_manager.weights == _full_recount(db).weights
+
+    teela.name = "Teela Deluxe"
+    db.commit()
+    assert weights_manager.token_df == _full_recount(db).token_df
+    assert weights_manager.weights == _full_recount(db).weights
+
+    db.add(ProductModel(name="Stratos"))
+    db.flush()
+    db.rollback()
+    db.delete(db.query(ProductModel).filter_by(name="Castle Grayskull").one())
+    db.commit()
+    expected = _full_recount(db)
+    assert weights_manager.total_docs == expected.total_docs == 4
+    assert weights_manager.weights == expected.weights
+    assert "grayskull" not in weights_manager.token_df
+
+
+def test_rename_only_touches_affected_tokens():
+    engine = WeightEngine(snapshot_path="/nonexistent/idf.json")
+    engine.load_counts(Counter({"he": 1, "man": 1, "origins": 2, "skeletor": 1}), 2)
+    before = engine.weights
+
+    engine.apply_changes([(0, frozenset({"deluxe"}), frozenset({"origins"}))])
+
+    assert engine.total_docs == 2
+    assert engine.token_df["origins"] == 1 and engine.token_df["deluxe"] == 1
+    assert engine.weights["he"] == before["he"]
+    assert before is not engine.weights  # snapshot() sigue siendo inmutable
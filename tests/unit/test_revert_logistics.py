@@ -13,10 +13,8 @@ from src.domain.models import (
 )
 from src.infrastructure.scrapers.pipeline import clean_purgatory_globally
 from src.interfaces.api.routers.dashboard import revert_action
-import asyncio
 
-@pytest.mark.asyncio
-async def test_revert_discarded_manual_returns_to_purgatory_and_survives_cleanup():
+def test_revert_discarded_manual_returns_to_purgatory_and_survives_cleanup():
     test_url = "https://www.test-shop.com/test-discard-item-12345"
     
     with SessionCloud() as db:
@@ -64,7 +62,7 @@ async def test_revert_discarded_manual_returns_to_purgatory_and_survives_cleanup
         history_id = history.id
 
     # 2. Call revert_action
-    result = await revert_action({"history_id": history_id})
+    result = revert_action({"history_id": history_id})
     assert result["status"] == "success"
 
     # 3. Check DB state
@@ -94,8 +92,7 @@ async def test_revert_discarded_manual_returns_to_purgatory_and_survives_cleanup
         db.commit()
 
 
-@pytest.mark.asyncio
-async def test_revert_linked_vintage_returns_to_purgatory_and_survives_cleanup():
+def test_revert_linked_vintage_returns_to_purgatory_and_survives_cleanup():
     test_url = "https://www.test-shop.com/test-vintage-item-99999"
     
     with SessionCloud() as db:
@@ -154,7 +151,7 @@ async def test_revert_linked_vintage_returns_to_purgatory_and_survives_cleanup()
         history_id = history.id
 
     # Call revert
-    result = await revert_action({"history_id": history_id})
+    result = revert_action({"history_id": history_id})
     assert result["status"] == "success"
 
     with SessionCloud() as db: